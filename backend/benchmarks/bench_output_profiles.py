@@ -0,0 +1,88 @@
+"""
+PDF Output Profile Benchmark
+
+Reports save time, end-to-end fill time and output size for each PDF output
+profile (standard, incremental, final, flattened) on the 2024 1040 template,
+with every widget filled.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_output_profiles.py [--iterations 20]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from province.agents.tax.tools.form_filler import (  # noqa: E402
+    PDF_OUTPUT_PROFILES,
+    TaxFormFiller,
+    get_mapping_cache,
+    open_pdf_for_profile,
+    save_pdf_with_profile,
+)
+
+from bench_fill_plan import TEMPLATE_PATH, build_mapping_and_data  # noqa: E402
+
+
+def fill_widgets(doc, form_data):
+    """Set every widget the way the filler does, without timing the mapping lookups."""
+    for page_num, page in enumerate(doc, start=1):
+        for i, widget in enumerate(page.widgets()):
+            value = form_data.get(f'p{page_num}_field_{i}')
+            if value is None:
+                continue
+            widget.field_value = 'Yes' if value is True else str(value)
+            widget.update()
+
+
+def time_save(pdf_data: bytes, form_data, profile: str, iterations: int):
+    """Average wall-clock save time in milliseconds and the output size."""
+    total = 0.0
+    size = 0
+    for round_num in range(iterations + 1):
+        doc = open_pdf_for_profile(pdf_data, profile)
+        fill_widgets(doc, form_data)
+        start = time.perf_counter()
+        size = len(save_pdf_with_profile(doc, profile))
+        if round_num:  # first round is warm-up
+            total += time.perf_counter() - start
+    return total / iterations * 1000, size
+
+
+def time_fill(filler, pdf_data: bytes, form_data, mapping, profile: str, iterations: int) -> float:
+    """Average wall-clock time of a full _fill_pdf_with_hybrid_mapping call in milliseconds."""
+    plan_key = ('F1040', '2024', 'benchmark')
+    filler._fill_pdf_with_hybrid_mapping(pdf_data, form_data, mapping, plan_key=plan_key, output_profile=profile)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        filler._fill_pdf_with_hybrid_mapping(pdf_data, form_data, mapping, plan_key=plan_key, output_profile=profile)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    with open(TEMPLATE_PATH, 'rb') as f:
+        pdf_data = f.read()
+    mapping, form_data = build_mapping_and_data(pdf_data)
+    filler = TaxFormFiller.__new__(TaxFormFiller)  # no AWS clients needed
+    get_mapping_cache().invalidate('F1040', '2024')
+
+    print(f"Template: f1040.pdf ({len(pdf_data):,} bytes), {len(form_data)} filled widgets")
+    print(f"{'profile':<14}{'save ms':>10}{'fill ms':>10}{'output bytes':>15}")
+    for profile in PDF_OUTPUT_PROFILES:
+        save_ms, size = time_save(pdf_data, form_data, profile, args.iterations)
+        fill_ms = time_fill(filler, pdf_data, form_data, mapping, profile, args.iterations)
+        print(f"{profile:<14}{save_ms:>10.1f}{fill_ms:>10.1f}{size:>15,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Tax Engine Benchmark
+
+Computes N random returns (mixed filing statuses, AGI up to $900k, 0-3
+children) three ways and reports returns per second:
+
+    decimal loop    the per-return Decimal bracket walk calc_1040 used to run
+    compute_return  the engine's single-return path, once per return
+    compute_returns the engine's vectorized path, one call for the whole batch
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_tax_engine.py [--returns 100000] [--year 2025]
+"""
+
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'src'))
+
+from province.agents.tax.tools.tax_engine import FILING_STATUSES, cents_to_decimal, get_tax_engine  # noqa: E402
+
+
+def decimal_loop(engine, tax_year, statuses, agi):
+    """The previous calculation: walk each return's brackets in Decimal."""
+    rules = engine.rules(tax_year)
+    taxes = []
+    for status, income in zip(statuses, agi):
+        index = FILING_STATUSES.index(status)
+        taxable = max(Decimal(0), Decimal(str(income)) - cents_to_decimal(rules.standard_deduction_cents[index]))
+        floors, rates = rules.bracket_floors_cents[index], rules.bracket_rates_bp[index]
+        tax = Decimal(0)
+        for position, floor in enumerate(floors):
+            low = cents_to_decimal(floor)
+            high = cents_to_decimal(floors[position + 1]) if position + 1 < len(floors) else taxable
+            if taxable <= low:
+                break
+            tax += (min(taxable, high) - low) * Decimal(int(rates[position])) / 10000
+        taxes.append(tax)
+    return taxes
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<16} {elapsed * 1000:10.1f} ms  {count / elapsed:14,.0f} returns/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--returns', type=int, default=100000)
+    parser.add_argument('--year', type=int, default=2025)
+    args = parser.parse_args()
+
+    engine = get_tax_engine()
+    rng = np.random.default_rng(0)
+    statuses = rng.choice(FILING_STATUSES, args.returns)
+    agi = rng.integers(0, 900_000_00, args.returns) / 100
+    children = rng.integers(0, 4, args.returns)
+    single_count = min(args.returns, 10000)
+
+    timed("decimal loop", args.returns, lambda: decimal_loop(engine, args.year, statuses, agi))
+    timed("compute_return", single_count, lambda: [
+        engine.compute_return(args.year, statuses[i], agi[i], 0, int(children[i])) for i in range(single_count)])
+    timed("compute_returns", args.returns, lambda: engine.compute_returns(args.year, statuses, agi, 0, children))
+
+
+if __name__ == '__main__':
+    main()
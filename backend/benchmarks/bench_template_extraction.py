@@ -0,0 +1,143 @@
+"""
+Template Field Extraction Benchmark
+
+Times FormTemplateProcessor.extract_fields_from_pdf over every template in
+tax_form_templates/2024/ (the local mirror of s3://<templates>/tax_forms/2024/),
+comparing the previous algorithm (temp file, full label scan and sort per
+widget) with the grid label index, sequentially and with per-page workers.
+It also times nearest-label resolution on its own.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_template_extraction.py [--iterations 10] [--templates DIR]
+"""
+
+import argparse
+import glob
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'src'))
+
+
+def load_processor_module():
+    """Import lambda/form_template_processor.py ('lambda' is a keyword, so not as a package)."""
+    path = os.path.join(BACKEND_DIR, 'src', 'province', 'lambda', 'form_template_processor.py')
+    name = 'province.lambda.form_template_processor'
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module  # so spawned pool workers can import its functions
+    spec.loader.exec_module(module)
+    return module
+
+
+def find_nearby_label_scan(field_rect, text_labels):
+    """The previous label lookup: distance to every line, then sort."""
+    field_x = field_rect.x0
+    field_y = field_rect.y0
+    candidates = []
+    for label in text_labels:
+        label_x = label['bbox'][0]
+        label_y = label['bbox'][1]
+        if (label_y < field_y and field_y - label_y < 50) or \
+           (label_x < field_x and field_x - label_x < 100):
+            distance = ((label_x - field_x)**2 + (label_y - field_y)**2)**0.5
+            candidates.append((distance, label['text']))
+    if candidates:
+        candidates.sort(key=lambda x: x[0])
+        return candidates[0][1]
+    return None
+
+
+def page_labels_and_rects(doc):
+    """Per page: text lines as label dicts and the widget rects."""
+    pages = []
+    for page in doc:
+        labels = []
+        for block in page.get_text("dict")['blocks']:
+            if block['type'] == 0:
+                for line in block.get('lines', []):
+                    text = ''.join(span['text'] for span in line.get('spans', []))
+                    if text.strip():
+                        labels.append({'text': text.strip(), 'bbox': line['bbox']})
+        pages.append((labels, [w.rect for w in page.widgets() if w.field_name]))
+    return pages
+
+
+def extract_previous(pdf_bytes: bytes):
+    """The previous extraction: temp file, sequential pages, full label scan."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+        temp_file.write(pdf_bytes)
+        temp_path = temp_file.name
+    try:
+        doc = fitz.open(temp_path)
+        fields = []
+        for labels, rects in page_labels_and_rects(doc):
+            fields.extend(find_nearby_label_scan(rect, labels) for rect in rects)
+        doc.close()
+        return fields
+    finally:
+        os.unlink(temp_path)
+
+
+def time_wall(fn, iterations: int) -> float:
+    """Average wall-clock time per call in milliseconds."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--templates', default=os.path.join(BACKEND_DIR, 'tax_form_templates', '2024'))
+    args = parser.parse_args()
+
+    module = load_processor_module()
+    logging.disable(logging.CRITICAL)
+    processor = module.FormTemplateProcessor.__new__(module.FormTemplateProcessor)  # no AWS clients needed
+    workers = max(os.cpu_count() or 1, 2)  # at least two so the parallel path is exercised
+
+    paths = sorted(glob.glob(os.path.join(args.templates, '**', '*.pdf'), recursive=True))
+    print(f"{len(paths)} templates under {args.templates}, {os.cpu_count()} CPUs, {workers} extraction workers")
+    print(f"{'template':<22}{'pages':>6}{'fields':>8}{'labels':>8}"
+          f"{'scan ms':>10}{'index ms':>10}{'previous':>10}{'seq':>10}{'parallel':>10}")
+    for path in paths:
+        with open(path, 'rb') as f:
+            pdf_bytes = f.read()
+        doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+        pages = page_labels_and_rects(doc)
+        page_count = doc.page_count
+        doc.close()
+        indexes = [(module.LabelIndex(labels), rects) for labels, rects in pages]
+
+        scan_ms = time_wall(lambda: [find_nearby_label_scan(r, labels) for labels, rects in pages for r in rects],
+                            args.iterations)
+        index_ms = time_wall(lambda: [index.nearest(r.x0, r.y0) for index, rects in indexes for r in rects],
+                             args.iterations)
+
+        previous_ms = time_wall(lambda: extract_previous(pdf_bytes), args.iterations)
+        module.EXTRACT_WORKERS = 1
+        sequential_ms = time_wall(lambda: processor.extract_fields_from_pdf(pdf_bytes), args.iterations)
+        # Parallel regardless of the size thresholds, on the already-started shared pool
+        module.EXTRACT_WORKERS, module.EXTRACT_PARALLEL_MIN_PAGES, module.EXTRACT_PARALLEL_MIN_FIELDS = workers, 1, 0
+        processor.extract_fields_from_pdf(pdf_bytes)
+        parallel_ms = time_wall(lambda: processor.extract_fields_from_pdf(pdf_bytes), args.iterations)
+
+        print(f"{os.path.relpath(path, args.templates):<22}{page_count:>6}"
+              f"{sum(len(r) for _, r in pages):>8}{sum(len(l) for l, _ in pages):>8}"
+              f"{scan_ms:>10.2f}{index_ms:>10.2f}{previous_ms:>10.1f}{sequential_ms:>10.1f}{parallel_ms:>10.1f}")
+    module.shutdown_extract_pool()
+    print("scan/index: nearest-label resolution only; previous/seq/parallel: full extraction (ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""
+W-2 Markdown Parser Benchmark
+
+Compares the previous W-2 markdown extraction (a dozen DOTALL re.search calls
+over the first page) with the single-pass parser in w2_markdown.py, reporting
+documents per second and field accuracy.
+
+Documents come from Bedrock Data Automation standard output for the Kaggle
+W-2 set (scripts/download_kaggle_w2_dataset.py uploads it to
+datasets/w2-forms/; run those files through ingestion and the result JSONs
+land under inference_results/ in the BDA output bucket):
+
+    --results DIR       result JSONs copied locally (searched recursively)
+    --bucket NAME       read them from the output bucket (--limit caps the count)
+    --synthetic N       generated W-2 markdown with known values (the default)
+
+With real results, accuracy is agreement with the previous parser on the fields
+it extracted, plus the fields only the new parser finds. With synthetic
+documents both parsers are scored against the generated values.
+
+Every run also times both parsers on pathological OCR noise (the input of
+test_noisy_input_stays_linear: repeated partial labels with no values) at
+doubling sizes, where the previous DOTALL searches go quadratic, and the new
+parser alone on the test's full-size input (--pathological-steps 0 skips it).
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_w2_markdown_parser.py [--synthetic 500] [--noise 0.2]
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'src'))
+
+from province.agents.tax.tools.w2_markdown import parse_w2_markdown  # noqa: E402
+
+# Fields both parsers extract, as flat names
+COMPARED_FIELDS = ('EIN', 'employer_name', 'SSN', 'employee_name', 'address',
+                   '1', '2', '3', '4', '5', '6', '15', '16', '17', '20')
+
+
+def _number(text):
+    try:
+        return float(text.replace(',', ''))
+    except ValueError:
+        return None
+
+
+def extract_previous(markdown: str) -> dict:
+    """The previous extraction: independent DOTALL searches, first page only (flat field names)."""
+    fields = {}
+    flags = re.IGNORECASE | re.DOTALL
+    searches = {
+        'EIN': r'\*\*b\*\*\s+Employer\s+identification\s+number.*?\n\s*\*\*([0-9]{2}-[0-9]{7})\*\*',
+        'employer_name': r'\*\*C\*\*\s+Employer\'s\s+name,\s+address,\s+and\s+ZIP\s+code.*?\n\s*\*\*([^*\n]+)\*\*',
+        'SSN': r'\*\*a\s+Employee\'s\s+social\s+security\s+number\*\*.*?\n.*?\*\*([0-9]{3}-[0-9]{2}-[0-9]{4})\*\*',
+    }
+    for name, pattern in searches.items():
+        match = re.search(pattern, markdown, flags)
+        if match:
+            fields[name] = match.group(1).strip()
+    match = re.search(r'\*\*e\*\*\s+Employee\'s\s+first\s+name\s+and\s+initial.*?\n.*?\*\*([A-Za-z]+)\*\*.*?\n'
+                      r'\*\*([A-Za-z]+)\*\*', markdown, flags)
+    if match:
+        fields['employee_name'] = f"{match.group(1).strip()} {match.group(2).strip()}"
+    match = re.search(r'\*\*[A-Za-z]+\*\*(?:\s*\n\s*\*\*[A-Za-z]+\*\*)?\s*\n+\s*\*\*([^\*\n]+)\*\*\s*\n+\s*'
+                      r'([A-Za-z\s]+\s+[A-Z]{2})\s*\n\s*\*\*([0-9]{5}(?:-[0-9]{4})?)\*\*', markdown, re.MULTILINE)
+    if match:
+        city_state = match.group(2).strip().rsplit(' ', 1)
+        if len(city_state) == 2:
+            fields['address'] = f"{match.group(1).strip()}, {city_state[0].strip()}, {city_state[1]} {match.group(3)}"
+    left = {'1': r'1\s+Wages,\s+tips,\s+other\s+compensation', '3': r'3\s+Social\s+security\s+wages',
+            '5': r'5\s+Medicare\s+wages\s+and\s+tips'}
+    right = {'2': r'2\s+Federal\s+income\s+tax\s+withheld', '4': r'4\s+Social\s+security\s+tax\s+withheld',
+             '6': r'6\s+Medicare\s+tax\s+withheld'}
+    for box, label in left.items():
+        match = re.search(label + r'.*?\n([0-9,]+\.?[0-9]*)', markdown, flags)
+        if match and _number(match.group(1)) is not None:
+            fields[box] = _number(match.group(1))
+    for box, label in right.items():
+        match = re.search(label + r'.*?\n[0-9,]+\.?[0-9]*\t+([0-9,]+\.?[0-9]*)', markdown, flags)
+        if match and _number(match.group(1)) is not None:
+            fields[box] = _number(match.group(1))
+    match = re.search(r'\|\s*([A-Z]{2})\s*\|\s*[0-9-]+\s*\|\s*([0-9,]+\.?[0-9]*)\s*\|\s*([0-9,]+\.?[0-9]*)\s*\|'
+                      r'\s*([0-9,]+\.?[0-9]*)\s*\|\s*([0-9,]+\.?[0-9]*)\s*\|\s*([^|]+)\s*\|', markdown)
+    if match:
+        fields['15'] = match.group(1).strip()
+        fields['16'], fields['17'] = _number(match.group(2)), _number(match.group(3))
+        fields['20'] = match.group(6).strip()
+    return fields
+
+
+def flatten(form: dict) -> dict:
+    """A parsed form as flat field names comparable with extract_previous."""
+    fields = dict(form['boxes'])
+    employer, employee = form['employer'], form['employee']
+    for name, value in (('EIN', employer.get('EIN')), ('employer_name', employer.get('name')),
+                        ('SSN', employee.get('SSN')), ('employee_name', employee.get('name')),
+                        ('address', employee.get('address'))):
+        if value:
+            fields[name] = value
+    return fields
+
+
+def extract_new(pages) -> dict:
+    forms = parse_w2_markdown(pages, 'w2.pdf')
+    return flatten(forms[0]) if forms else {}
+
+
+def synthetic_document(rng: random.Random, noise: float):
+    """Markdown in the BDA standard output layout, and the values it contains."""
+    def amount():
+        return round(rng.uniform(1000, 150000), 2)
+
+    first, last = rng.choice(['April', 'Taylor', 'Jordan', 'Casey']), rng.choice(['Hensley', 'Cox', 'Rivera'])
+    truth = {
+        'SSN': f"{rng.randint(100, 899)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        'EIN': f"{rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}",
+        'employer_name': rng.choice(['Rocha Wells LLC', 'Acme Payroll Inc', 'Northwind Traders']),
+        'employee_name': f"{first} {last}",
+        '15': rng.choice(['DC', 'VA', 'CA', 'NY']), '16': amount(), '17': amount(), '20': 'Metro',
+        **{str(box): amount() for box in range(1, 7)},
+    }
+    street, city, state, zip_code = f"{rng.randint(1, 99999)} David Circles", 'West Erinfort', 'WY', '45881-3334'
+    truth['address'] = f"{street}, {city}, {state} {zip_code}"
+    lines = [
+        "**a Employee's social security number**\tOMB No. 1545-0008", f"**{truth['SSN']}**",
+        "**b** Employer identification number (EIN)", f"**{truth['EIN']}**",
+        "**C** Employer's name, address, and ZIP code", f"**{truth['employer_name']}**", "100 Industrial Way",
+        "**e** Employee's first name and initial\tLast name", f"**{first}**", f"**{last}**", "",
+        f"**{street}**", "", f"{city} {state}", f"**{zip_code}**",
+    ]
+    for left, right, a, b in (('1 Wages, tips, other compensation', '2 Federal income tax withheld', '1', '2'),
+                              ('3 Social security wages', '4 Social security tax withheld', '3', '4'),
+                              ('5 Medicare wages and tips', '6 Medicare tax withheld', '5', '6')):
+        lines += [f"{left}\t\t\t{right}\t", f"{truth[a]}\t\t\t{truth[b]}\t"]
+    lines += ["| 15 State | ID | 16 | 17 | 18 | 19 | 20 |", "|---|---|---|---|---|---|---|",
+              f"| {truth['15']} | 786-41-049 | {truth['16']} | {truth['17']} | 100.0 | 10.0 | {truth['20']} |"]
+    # OCR noise: stray lines of label fragments and digits between the real ones
+    noisy = []
+    for line in lines:
+        noisy.append(line)
+        if rng.random() < noise:
+            noisy.append(' '.join(rng.choice(['Wages', 'tips', '**', '1', 'Copy', 'B', '0.00', 'Federal'])
+                                  for _ in range(rng.randint(5, 40))))
+    return ['\n'.join(noisy)], truth
+
+
+def pathological_document(scale: float) -> str:
+    """The OCR noise of test_noisy_input_stays_linear at `scale` times its size."""
+    return ("1 Wages, tips, other compensation 2 Federal " * int(20000 * scale)) + "\n" + ("**b** " * int(50000 * scale))
+
+
+def seconds(fn, pages) -> float:
+    start = time.perf_counter()
+    fn(pages)
+    return time.perf_counter() - start
+
+
+def load_results(paths):
+    documents = []
+    for path in paths:
+        with open(path) as f:
+            result = json.load(f)
+        pages = [(p.get('representation') or {}).get('markdown') for p in result.get('pages', [])]
+        if any(pages):
+            documents.append((pages, None))
+    return documents
+
+
+def load_bucket_results(bucket: str, limit: int):
+    import boto3
+
+    s3 = boto3.client('s3')
+    documents = []
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix='inference_results/'):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith('standard_output/0/result.json'):
+                result = json.loads(s3.get_object(Bucket=bucket, Key=obj['Key'])['Body'].read())
+                pages = [(p.get('representation') or {}).get('markdown') for p in result.get('pages', [])]
+                if any(pages):
+                    documents.append((pages, None))
+                if len(documents) >= limit:
+                    return documents
+    return documents
+
+
+def docs_per_second(fn, documents, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for pages, _ in documents:
+            fn(pages)
+    return len(documents) * iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--results', help="Directory of BDA result JSONs")
+    parser.add_argument('--bucket', help="BDA output bucket to read result JSONs from")
+    parser.add_argument('--limit', type=int, default=1000)
+    parser.add_argument('--synthetic', type=int, default=500)
+    parser.add_argument('--noise', type=float, default=0.2, help="Chance of an OCR noise line after each line")
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--pathological-steps', type=int, default=4,
+                        help="Doubling sizes of pathological noise, from 1%% of the test's input, to time")
+    args = parser.parse_args()
+
+    if args.results:
+        documents = load_results(glob.glob(os.path.join(args.results, '**', '*.json'), recursive=True))
+    elif args.bucket:
+        documents = load_bucket_results(args.bucket, args.limit)
+    else:
+        rng = random.Random(args.seed)
+        documents = [synthetic_document(rng, args.noise) for _ in range(args.synthetic)]
+    if not documents:
+        raise SystemExit("No documents with markdown found")
+
+    previous = lambda pages: extract_previous(pages[0] or '')  # noqa: E731
+    previous_rate = docs_per_second(previous, documents, args.iterations)
+    new_rate = docs_per_second(extract_new, documents, args.iterations)
+
+    correct = {'previous': Counter(), 'new': Counter()}
+    agree, only_new, multi_form = Counter(), Counter(), 0
+    for pages, truth in documents:
+        old_fields, new_fields = previous(pages), extract_new(pages)
+        multi_form += len(parse_w2_markdown(pages, 'w2.pdf')) > 1
+        for name in COMPARED_FIELDS:
+            if truth is not None:
+                correct['previous'][name] += old_fields.get(name) == truth[name]
+                correct['new'][name] += new_fields.get(name) == truth[name]
+            elif name in old_fields:
+                agree[name] += new_fields.get(name) == old_fields[name]
+            elif name in new_fields:
+                only_new[name] += 1
+
+    count = len(documents)
+    source = args.results or args.bucket or f"{count} synthetic (noise {args.noise})"
+    print(f"{count} documents from {source}")
+    print(f"previous: {previous_rate:>10.0f} docs/s")
+    print(f"new:      {new_rate:>10.0f} docs/s  ({new_rate / previous_rate:.1f}x)")
+    print(f"files with more than one W-2 (new parser only): {multi_form}")
+    if documents[0][1] is not None:
+        print(f"{'field':<16}{'previous':>10}{'new':>10}   (accuracy against generated values)")
+        for name in COMPARED_FIELDS:
+            print(f"{name:<16}{correct['previous'][name] / count:>10.1%}{correct['new'][name] / count:>10.1%}")
+    else:
+        print(f"{'field':<16}{'agree':>10}{'only new':>10}   (against the previous parser)")
+        for name in COMPARED_FIELDS:
+            print(f"{name:<16}{agree[name]:>10}{only_new[name]:>10}")
+
+    if args.pathological_steps > 0:
+        print(f"{'pathological':<16}{'previous':>10}{'new':>10}   (seconds per document)")
+        for step in range(args.pathological_steps):
+            pages = [pathological_document(0.01 * 2 ** step)]
+            print(f"{len(pages[0]) // 1024:>10} KiB  {seconds(previous, pages):>10.3f}{seconds(extract_new, pages):>10.3f}")
+        pages = [pathological_document(1)] * 3
+        print(f"{sum(map(len, pages)) // 1024:>10} KiB  {'-':>10}{seconds(extract_new, pages):>10.3f}   (the test's input)")
+
+
+if __name__ == '__main__':
+    main()
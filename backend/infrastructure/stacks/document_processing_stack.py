@@ -5,7 +5,10 @@ This stack creates:
 1. Lambda function for document processing
 2. S3 event notifications → EventBridge → Lambda
 3. DynamoDB table for chat notifications
-4. IAM roles and permissions
+4. SQS ingest job queue (with dead-letter queue), ingest jobs table and
+   Bedrock Data Automation results index
+5. Fargate service running the ingest workers that consume the queue
+6. IAM roles and permissions
 """
 
 from aws_cdk import (
@@ -18,6 +21,9 @@ from aws_cdk import (
     aws_events_targets as targets,
     aws_dynamodb as dynamodb,
     aws_iam as iam,
+    aws_sqs as sqs,
+    aws_ec2 as ec2,
+    aws_ecs as ecs,
     RemovalPolicy
 )
 from constructs import Construct
@@ -34,6 +40,17 @@ class DocumentProcessingStack(Stack):
             bucket_name="province-documents-<account-id>-<region>"
         )
 
+        # Bedrock Data Automation project, profile and output bucket the ingest workers use
+        bda_project_arn = (self.node.try_get_context("bda_project_arn")
+                           or f"arn:aws:bedrock:{self.region}:{self.account}:data-automation-project/<project-id>")
+        bda_profile_arn = (self.node.try_get_context("bda_profile_arn")
+                           or f"arn:aws:bedrock:{self.region}:{self.account}:data-automation-profile/us.data-automation-v1")
+        bda_output_bucket = s3.Bucket.from_bucket_name(
+            self, "BedrockOutputBucket",
+            bucket_name=(self.node.try_get_context("bda_output_bucket_name")
+                         or f"province-bda-output-{self.account}-{self.region}")
+        )
+
         # Create DynamoDB table for chat notifications
         notifications_table = dynamodb.Table(
             self, "ChatNotificationsTable",
@@ -51,6 +68,50 @@ class DocumentProcessingStack(Stack):
             time_to_live_attribute="ttl"  # Auto-cleanup old notifications
         )
 
+        # Ingest jobs: the Lambda queues uploads, ingest workers run them
+        ingest_jobs_table = dynamodb.Table(
+            self, "IngestJobsTable",
+            table_name="province-ingest-jobs",
+            partition_key=dynamodb.Attribute(
+                name="job_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        # Earlier Bedrock Data Automation results by input key (KEY#<s3 key>) and by
+        # content hash (SHA256#<hex>); see province.agents.tax.tools.bda_results_index
+        bda_results_index_table = dynamodb.Table(
+            self, "BdaResultsIndexTable",
+            table_name="province-bda-results-index",
+            partition_key=dynamodb.Attribute(
+                name="lookup_key",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        ingest_dead_letter_queue = sqs.Queue(
+            self, "IngestJobsDeadLetterQueue",
+            queue_name="province-ingest-jobs-dlq",
+            retention_period=Duration.days(14)
+        )
+
+        # Workers dead-letter after INGEST_JOB_MAX_ATTEMPTS; the redrive policy covers
+        # messages whose worker kept dying before it could record the failure
+        ingest_queue = sqs.Queue(
+            self, "IngestJobsQueue",
+            queue_name="province-ingest-jobs",
+            visibility_timeout=Duration.minutes(5),
+            receive_message_wait_time=Duration.seconds(20),
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=5,
+                queue=ingest_dead_letter_queue
+            )
+        )
+
         # Create Lambda execution role
         lambda_role = iam.Role(
             self, "DocumentProcessorRole",
@@ -81,10 +142,14 @@ class DocumentProcessingStack(Stack):
             resources=[
                 notifications_table.table_arn,
                 "arn:aws:dynamodb:us-east-1:*:table/province-tax-documents",
-                "arn:aws:dynamodb:us-east-1:*:table/province-tax-engagements"
+                "arn:aws:dynamodb:us-east-1:*:table/province-tax-engagements",
+                ingest_jobs_table.table_arn
             ]
         ))
 
+        ingest_queue.grant_send_messages(lambda_role)
+        bda_results_index_table.grant_read_write_data(lambda_role)
+
         lambda_role.add_to_policy(iam.PolicyStatement(
             effect=iam.Effect.ALLOW,
             actions=[
@@ -108,10 +173,111 @@ class DocumentProcessingStack(Stack):
             role=lambda_role,
             environment={
                 "NOTIFICATIONS_TABLE": notifications_table.table_name,
+                "INGEST_QUEUE_URL": ingest_queue.queue_url,
+                "INGEST_JOBS_TABLE_NAME": ingest_jobs_table.table_name,
+                "BDA_RESULTS_INDEX_TABLE_NAME": bda_results_index_table.table_name,
+                # The worker service below consumes the queue; invocations only enqueue
+                "INGEST_WORKERS_IN_PROCESS": "false",
+                "AWS_REGION": self.region
+            }
+        )
+
+        # Ingest workers: long-running tasks receiving from the queue (the
+        # standalone worker entry point of province.agents.tax.tools.ingest_jobs)
+        worker_vpc = ec2.Vpc(
+            self, "IngestWorkerVpc",
+            max_azs=2,
+            nat_gateways=0,
+            subnet_configuration=[
+                ec2.SubnetConfiguration(name="public", subnet_type=ec2.SubnetType.PUBLIC)
+            ]
+        )
+        worker_cluster = ecs.Cluster(self, "IngestWorkerCluster", vpc=worker_vpc)
+
+        worker_task = ecs.FargateTaskDefinition(
+            self, "IngestWorkerTask",
+            cpu=1024,
+            memory_limit_mib=2048
+        )
+        worker_task.add_container(
+            "IngestWorker",
+            image=ecs.ContainerImage.from_asset("."),
+            command=["python", "-m", "province.agents.tax.tools.ingest_jobs"],
+            logging=ecs.LogDrivers.aws_logs(stream_prefix="ingest-worker"),
+            environment={
+                "INGEST_QUEUE_URL": ingest_queue.queue_url,
+                "INGEST_DEAD_LETTER_QUEUE_URL": ingest_dead_letter_queue.queue_url,
+                "INGEST_JOBS_TABLE_NAME": ingest_jobs_table.table_name,
+                "BDA_RESULTS_INDEX_TABLE_NAME": bda_results_index_table.table_name,
+                "NOTIFICATIONS_TABLE": notifications_table.table_name,
+                "TAX_ENGAGEMENTS_TABLE_NAME": "province-tax-engagements",
+                "TAX_DOCUMENTS_TABLE_NAME": "province-tax-documents",
+                "DOCUMENTS_BUCKET_NAME": documents_bucket.bucket_name,
+                "BEDROCK_OUTPUT_BUCKET_NAME": bda_output_bucket.bucket_name,
+                "BEDROCK_DATA_AUTOMATION_PROJECT_ARN": bda_project_arn,
+                "BEDROCK_DATA_AUTOMATION_PROFILE_ARN": bda_profile_arn,
+                "INGEST_WORKERS": "4",
+                "AWS_ACCOUNT_ID": self.account,
                 "AWS_REGION": self.region
             }
         )
 
+        worker_role = worker_task.task_role
+        ingest_queue.grant_consume_messages(worker_role)
+        ingest_dead_letter_queue.grant_send_messages(worker_role)
+        ingest_jobs_table.grant_read_write_data(worker_role)
+        bda_results_index_table.grant_read_write_data(worker_role)
+        notifications_table.grant_write_data(worker_role)
+        # Bedrock Data Automation writes its results as the caller; workers read them back
+        bda_output_bucket.grant_read_write(worker_role)
+
+        # Uploads are read; the merged W2_Extracts.json is written back to the engagement
+        worker_role.add_to_principal_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=[
+                "s3:GetObject",
+                "s3:GetObjectVersion",
+                "s3:PutObject"
+            ],
+            resources=[f"{documents_bucket.bucket_arn}/*"]
+        ))
+
+        worker_role.add_to_principal_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=[
+                "dynamodb:PutItem",
+                "dynamodb:GetItem",
+                "dynamodb:UpdateItem",
+                "dynamodb:Query",
+                "dynamodb:Scan"
+            ],
+            resources=[
+                "arn:aws:dynamodb:us-east-1:*:table/province-tax-documents",
+                "arn:aws:dynamodb:us-east-1:*:table/province-tax-engagements"
+            ]
+        ))
+
+        worker_role.add_to_principal_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=[
+                "bedrock:InvokeModel",
+                "bedrock:InvokeDataAutomationAsync",
+                "bedrock:GetDataAutomationStatus",
+                "bedrock:ListDataAutomationJobs"
+            ],
+            resources=["*"]
+        ))
+
+        # No NAT gateway: tasks reach SQS, DynamoDB, S3 and Bedrock through a public IP
+        ingest_worker_service = ecs.FargateService(
+            self, "IngestWorkerService",
+            cluster=worker_cluster,
+            task_definition=worker_task,
+            desired_count=1,
+            assign_public_ip=True,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC)
+        )
+
         # Create EventBridge rule for S3 events
         s3_event_rule = events.Rule(
             self, "S3DocumentUploadRule",
@@ -155,3 +321,8 @@ class DocumentProcessingStack(Stack):
         self.notifications_table_name = notifications_table.table_name
         self.document_processor_arn = document_processor.function_arn
         self.notifications_api_arn = notifications_api.function_arn
+        self.ingest_queue_url = ingest_queue.queue_url
+        self.ingest_dead_letter_queue_url = ingest_dead_letter_queue.queue_url
+        self.ingest_jobs_table_name = ingest_jobs_table.table_name
+        self.bda_results_index_table_name = bda_results_index_table.table_name
+        self.ingest_worker_service_name = ingest_worker_service.service_name
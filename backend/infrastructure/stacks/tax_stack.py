@@ -19,6 +19,7 @@ class TaxResources:
         self.tax_permissions_table: dynamodb.Table
         self.tax_deadlines_table: dynamodb.Table
         self.tax_connections_table: dynamodb.Table
+        self.tax_document_versions_table: dynamodb.Table
 
 
 class TaxStack(cdk.Stack):
@@ -203,6 +204,67 @@ class TaxStack(cdk.Stack):
             ),
         )
     
+        # Tax Document Versions table (filled form versions, one row per vNNN)
+        self.tax_resources.tax_document_versions_table = dynamodb.Table(
+            self, "TaxDocumentVersionsTable",
+            table_name="province-document-versions",
+            partition_key=dynamodb.Attribute(
+                name="document_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="version",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            encryption=dynamodb.TableEncryption.CUSTOMER_MANAGED,
+            encryption_key=self.kms_key,
+            point_in_time_recovery_specification=dynamodb.PointInTimeRecoverySpecification(
+                point_in_time_recovery_enabled=True
+            ),
+            removal_policy=cdk.RemovalPolicy.RETAIN,
+        )
+        
+        # Add GSI for a taxpayer's forms
+        self.tax_resources.tax_document_versions_table.add_global_secondary_index(
+            index_name="taxpayer-form-index",
+            partition_key=dynamodb.Attribute(
+                name="taxpayer_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="form_type",
+                type=dynamodb.AttributeType.STRING
+            ),
+        )
+        
+        # Add GSI for form type queries by creation time
+        self.tax_resources.tax_document_versions_table.add_global_secondary_index(
+            index_name="created-at-index",
+            partition_key=dynamodb.Attribute(
+                name="form_type",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="created_at",
+                type=dynamodb.AttributeType.STRING
+            ),
+        )
+        
+        # Add GSI for newest versions by number ('vNNN' sort keys order 'v999' after 'v1000');
+        # must match VERSION_NUMBER_INDEX in province.agents.tax.tools.form_filler
+        self.tax_resources.tax_document_versions_table.add_global_secondary_index(
+            index_name="document-version-number-index",
+            partition_key=dynamodb.Attribute(
+                name="document_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="version_number",
+                type=dynamodb.AttributeType.NUMBER
+            ),
+        )
+    
     def _create_outputs(self) -> None:
         """Create CloudFormation outputs."""
         
@@ -235,3 +297,9 @@ class TaxStack(cdk.Stack):
             value=self.tax_resources.tax_connections_table.table_name,
             description="Tax Connections DynamoDB table name"
         )
+        
+        cdk.CfnOutput(
+            self, "TaxDocumentVersionsTableName",
+            value=self.tax_resources.tax_document_versions_table.table_name,
+            description="Tax Document Versions DynamoDB table name"
+        )
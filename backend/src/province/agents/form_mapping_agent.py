@@ -4,15 +4,24 @@ FormMappingAgent - Intelligent PDF form field mapping using agentic reasoning.
 This agent uses iterative reasoning to achieve 100% field coverage, unlike single-shot prompts.
 """
 
+import asyncio
+import copy
 import json
 import logging
+import os
+import re
 import boto3
-import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 from botocore.exceptions import ClientError
 
+from province.agents.form_premapper import PremapResult, premap_fields
+from province.core.rate_limit import get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
+# Largest number of unmapped fields sent in one gap-filling request
+GAP_CHUNK_SIZE = 30
+
 
 class FormMappingAgent:
     """
@@ -24,11 +33,25 @@ class FormMappingAgent:
     3. Identifies gaps
     4. Iterates until 100% coverage
     5. Self-validates
+
+    Gap-filling chunks (one or more per page) are independent, so each iteration
+    issues them concurrently under the process-wide Bedrock RPM/TPM limiter of
+    the model, shared with every other agent in the process.
     """
     
-    def __init__(self, aws_region: str = 'us-east-1'):
+    def __init__(
+        self,
+        aws_region: str = 'us-east-1',
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
         self.bedrock = boto3.client('bedrock-runtime', region_name=aws_region)
         self.model_id = 'us.anthropic.claude-3-5-sonnet-20241022-v2:0'
+        # Account quota for the model; the Lambda sets these from its environment
+        self.requests_per_minute = requests_per_minute or float(os.getenv('BEDROCK_RPM_LIMIT', '2'))
+        tokens_per_minute = tokens_per_minute or float(os.getenv('BEDROCK_TPM_LIMIT', '0'))
+        self.limiter = get_rate_limiter(f"bedrock:{self.model_id}", self.requests_per_minute,
+                                        tokens_per_minute or None)
         
     def map_form_fields(
         self, 
@@ -38,6 +61,8 @@ class FormMappingAgent:
     ) -> Dict[str, Any]:
         """
         Intelligently map ALL form fields using iterative agentic reasoning.
+
+        Synchronous entry point for callers without an event loop (the template Lambda).
         
         Args:
             form_type: Form type (e.g., "F1040")
@@ -47,26 +72,31 @@ class FormMappingAgent:
         Returns:
             Complete mapping with 90%+ coverage guaranteed
         """
+        return asyncio.run(self.map_form_fields_async(form_type, tax_year, fields))
+
+    async def map_form_fields_async(
+        self,
+        form_type: str,
+        tax_year: str,
+        fields: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Async form of map_form_fields; gap-filling chunks run concurrently."""
         logger.info(f"🤖 FormMappingAgent starting for {form_type} ({tax_year})")
         logger.info(f"📋 Total fields to map: {len(fields)}")
         
         # Initialize mapping
-        mapping = {
-            "form_metadata": {
-                "form_type": form_type,
-                "tax_year": tax_year,
-                "total_fields": len(fields),
-                "field_types": {
-                    "text": len([f for f in fields if f['field_type'] == 'Text']),
-                    "checkbox": len([f for f in fields if f['field_type'] == 'CheckBox'])
-                }
-            }
-        }
+        mapping = {"form_metadata": self._form_metadata(form_type, tax_year, fields)}
         
-        # Phase 1: Initial comprehensive mapping
-        logger.info("🔍 Phase 1: Initial comprehensive analysis")
-        initial_mapping = self._initial_mapping(form_type, tax_year, fields)
-        mapping.update(initial_mapping)
+        # Phase 0: Deterministic pre-mapping of high-confidence fields
+        logger.info("🧭 Phase 0: Local pre-mapping")
+        premap = premap_fields(form_type, fields)
+        self._merge_gap_mapping(mapping, premap.mapping)
+        
+        # Phase 1: Initial comprehensive mapping of the fields left ambiguous
+        if premap.unresolved:
+            logger.info(f"🔍 Phase 1: Initial comprehensive analysis ({len(premap.unresolved)} fields)")
+            initial_mapping = await self._initial_mapping(form_type, tax_year, premap.unresolved)
+            self._merge_gap_mapping(mapping, initial_mapping, skip_fields=set(premap.assigned))
         
         # Phase 2: Identify gaps
         logger.info("🔍 Phase 2: Gap analysis")
@@ -74,43 +104,16 @@ class FormMappingAgent:
         all_field_names = {f['field_name'] for f in fields}
         unmapped = all_field_names - mapped_fields
         
-        coverage = len(mapped_fields) / len(all_field_names) * 100
+        coverage = len(mapped_fields) / len(all_field_names) * 100 if all_field_names else 100
         logger.info(f"📊 Initial coverage: {coverage:.1f}% ({len(mapped_fields)}/{len(all_field_names)} fields)")
         logger.info(f"❌ Unmapped: {len(unmapped)} fields")
         
         # Phase 3: Iteratively fill gaps until 90%+ coverage
-        iteration = 1
-        max_iterations = 5
+        await self._fill_gap_iterations(form_type, fields, mapping, all_field_names, min_coverage=90)
+        mapped_fields = self._extract_mapped_fields(mapping) & all_field_names
+        coverage = len(mapped_fields) / len(all_field_names) * 100 if all_field_names else 100
         
-        while coverage < 90 and iteration <= max_iterations and unmapped:
-            # Add delay between iterations to respect 2 RPM rate limit
-            if iteration > 1:
-                logger.info(f"⏳ Waiting 30s between iterations (2 RPM rate limit)...")
-                time.sleep(30)
-            logger.info(f"🔄 Phase 3.{iteration}: Filling gaps ({len(unmapped)} remaining)")
-            
-            # Get unmapped field details
-            unmapped_fields = [f for f in fields if f['field_name'] in unmapped]
-            
-            # Fill gaps
-            gap_mapping = self._fill_gaps(form_type, unmapped_fields, mapping)
-            
-            # Merge gap mappings
-            for section, fields_dict in gap_mapping.items():
-                if section == 'form_metadata':
-                    continue
-                if section not in mapping:
-                    mapping[section] = {}
-                mapping[section].update(fields_dict)
-            
-            # Recalculate coverage
-            mapped_fields = self._extract_mapped_fields(mapping)
-            unmapped = all_field_names - mapped_fields
-            coverage = len(mapped_fields) / len(all_field_names) * 100
-            
-            logger.info(f"📊 After iteration {iteration}: {coverage:.1f}% ({len(mapped_fields)}/{len(all_field_names)} fields)")
-            
-            iteration += 1
+        mapping['form_metadata']['mapping_stats'] = self._mapping_stats(fields, premap, mapped_fields)
         
         # Phase 4: Final validation
         logger.info("✅ Phase 4: Final validation")
@@ -125,30 +128,209 @@ class FormMappingAgent:
             logger.warning(f"⚠️  Coverage below target: {coverage:.1f}%")
         
         return mapping
+
+    def remap_changed_fields(
+        self,
+        form_type: str,
+        tax_year: str,
+        fields: List[Dict[str, Any]],
+        base_mapping: Dict[str, Any],
+        changed_field_names: Set[str]
+    ) -> Dict[str, Any]:
+        """
+        Reuse a mapping of a structurally similar template and map only the changed fields.
+
+        Args:
+            form_type: Form type (e.g., "F1040")
+            tax_year: Tax year of the new template
+            fields: All extracted fields of the new template
+            base_mapping: Mapping of the similar template, without entries for removed or changed fields
+            changed_field_names: Fields that are new or moved in this template
+
+        Returns:
+            The base mapping plus entries for the changed fields
+        """
+        return asyncio.run(self.remap_changed_fields_async(form_type, tax_year, fields, base_mapping,
+                                                           changed_field_names))
+
+    async def remap_changed_fields_async(
+        self,
+        form_type: str,
+        tax_year: str,
+        fields: List[Dict[str, Any]],
+        base_mapping: Dict[str, Any],
+        changed_field_names: Set[str]
+    ) -> Dict[str, Any]:
+        """Async form of remap_changed_fields; skips the initial full-form prompt."""
+        mapping = copy.deepcopy(base_mapping)
+        mapping['form_metadata'] = self._form_metadata(form_type, tax_year, fields)
+        targets = set(changed_field_names) & {f['field_name'] for f in fields}
+        logger.info(f"♻️  Reusing mapping for {form_type} ({tax_year}); mapping {len(targets)} changed fields")
+        premap = premap_fields(form_type, [f for f in fields if f['field_name'] in targets])
+        self._merge_gap_mapping(mapping, premap.mapping)
+        await self._fill_gap_iterations(form_type, fields, mapping, targets, min_coverage=100)
+        return mapping
+
+    async def _fill_gap_iterations(
+        self,
+        form_type: str,
+        fields: List[Dict[str, Any]],
+        mapping: Dict[str, Any],
+        target_names: Set[str],
+        min_coverage: float,
+        max_iterations: int = 5
+    ):
+        """Phase 3: fill gaps among `target_names` until `min_coverage` percent of them are mapped."""
+        if not target_names:
+            return
+        iteration = 1
+        mapped_fields = self._extract_mapped_fields(mapping) & target_names
+        unmapped = target_names - mapped_fields
+        coverage = len(mapped_fields) / len(target_names) * 100
+        
+        while coverage < min_coverage and iteration <= max_iterations and unmapped:
+            unmapped_fields = [f for f in fields if f['field_name'] in unmapped]
+            chunks = self._chunk_unmapped_fields(unmapped_fields)
+            logger.info(f"🔄 Phase 3.{iteration}: Filling gaps ({len(unmapped)} remaining, {len(chunks)} chunks)")
+            
+            # Chunks see the same snapshot of the mapping; the limiter paces the requests
+            gap_mappings = await asyncio.gather(*[
+                self._fill_gaps(form_type, chunk, mapping, remaining=len(unmapped)) for chunk in chunks
+            ])
+            
+            # Merge in chunk order so the result does not depend on completion order
+            for gap_mapping in gap_mappings:
+                self._merge_gap_mapping(mapping, gap_mapping)
+            
+            # Recalculate coverage
+            mapped_fields = self._extract_mapped_fields(mapping) & target_names
+            unmapped = target_names - mapped_fields
+            coverage = len(mapped_fields) / len(target_names) * 100
+            
+            logger.info(f"📊 After iteration {iteration}: {coverage:.1f}% ({len(mapped_fields)}/{len(target_names)} fields)")
+            
+            iteration += 1
+
+    def _mapping_stats(self, fields: List[Dict[str, Any]], premap: PremapResult, mapped_fields: Set[str]) -> Dict[str, int]:
+        """Coverage achieved locally versus by the model, and prompt tokens the pre-mapper saved."""
+        total = len(fields) or 1
+        model_mapped = len(mapped_fields - set(premap.assigned))
+        # Each pre-mapped field would otherwise appear in at least one prompt's field list
+        tokens_saved = sum(len(json.dumps(self._summarize_field(f), indent=2)) // 4
+                           for f in fields if f['field_name'] in premap.assigned)
+        stats = {
+            'premapped_fields': len(premap.assigned),
+            'model_mapped_fields': model_mapped,
+            'unmapped_fields': len(fields) - len(premap.assigned) - model_mapped,
+            'local_coverage_pct': round(len(premap.assigned) / total * 100),
+            'model_coverage_pct': round(model_mapped / total * 100),
+            'estimated_prompt_tokens_saved': tokens_saved
+        }
+        logger.info(f"🧭 Local: {stats['premapped_fields']} fields ({stats['local_coverage_pct']}%), "
+                    f"model: {model_mapped} fields ({stats['model_coverage_pct']}%), "
+                    f"~{tokens_saved} prompt tokens saved")
+        return stats
+
+    @staticmethod
+    def _form_metadata(form_type: str, tax_year: str, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "form_type": form_type,
+            "tax_year": tax_year,
+            "total_fields": len(fields),
+            "field_types": {
+                "text": len([f for f in fields if f['field_type'] == 'Text']),
+                "checkbox": len([f for f in fields if f['field_type'] == 'CheckBox'])
+            }
+        }
+
+    @staticmethod
+    def _field_sort_key(field: Dict[str, Any]) -> Tuple[Any, Any]:
+        return (field['page_number'], field.get('rect', {}).get('y0', 0))
+
+    def _chunk_unmapped_fields(self, unmapped_fields: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Split unmapped fields by page, top to bottom, into chunks of at most GAP_CHUNK_SIZE."""
+        chunks = []
+        by_page: Dict[Any, List[Dict[str, Any]]] = {}
+        for field in sorted(unmapped_fields, key=self._field_sort_key):
+            by_page.setdefault(field['page_number'], []).append(field)
+        for page_fields in by_page.values():
+            for start in range(0, len(page_fields), GAP_CHUNK_SIZE):
+                chunks.append(page_fields[start:start + GAP_CHUNK_SIZE])
+        return chunks
+
+    @staticmethod
+    def _merge_gap_mapping(mapping: Dict[str, Any], gap_mapping: Dict[str, Any], skip_fields: Optional[Set[str]] = None):
+        """
+        Merge one chunk's result into the mapping.
+
+        Existing entries win: a semantic name another chunk already used for a
+        different field is dropped and its field left unmapped (a later gap
+        iteration may name it differently). Fillers look fields up by their
+        exact semantic names, so an invented variant would never be filled.
+        Entries for `skip_fields` (already assigned elsewhere) are dropped.
+        """
+        for section, fields_dict in gap_mapping.items():
+            if section == 'form_metadata' or not isinstance(fields_dict, dict):
+                continue
+            target = mapping.setdefault(section, {})
+            if not isinstance(target, dict):
+                continue
+            for name, value in fields_dict.items():
+                if skip_fields and isinstance(value, str) and value in skip_fields:
+                    continue
+                if name not in target:
+                    target[name] = value
+                elif target[name] != value:
+                    logger.warning(f"Semantic name {section}.{name} already maps to {target[name]}; "
+                                   f"leaving {value} unmapped")
+
+    @staticmethod
+    def _summarize_field(field: Dict[str, Any]) -> Dict[str, Any]:
+        full_name = field['field_name']
+        # Extract simplified field name for reference
+        simplified = re.search(r'([fc][12]_\d+)', full_name)
+        return {
+            'field_name': full_name,
+            'simple_ref': simplified.group(1) if simplified else full_name,  # e.g., f1_04, c1_1
+            'type': field['field_type'],
+            'page': field['page_number'],
+            'y_position': round(field.get('rect', {}).get('y0', 0), 1),
+            'nearby_label': (field.get('nearby_label') or '')[:150]  # More context
+        }
+
+    @staticmethod
+    def _parse_json_response(response_text: str, context: str) -> Dict[str, Any]:
+        """Extract and clean the JSON object in a model response; {} when it cannot be parsed."""
+        json_match = re.search(r'```json\n({.*?})\n```', response_text, re.DOTALL)
+        if json_match:
+            response_text = json_match.group(1)
+        elif response_text.strip().startswith('{'):
+            pass  # Already JSON
+        else:
+            json_match = re.search(r'({.*})', response_text, re.DOTALL)
+            if json_match:
+                response_text = json_match.group(1)
+        
+        # Clean up common JSON issues
+        response_text = re.sub(r'//.*$', '', response_text, flags=re.MULTILINE)  # Remove comments
+        response_text = re.sub(r',(\s*[}\]])', r'\1', response_text)  # Fix trailing commas
+        
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"JSON parse error in {context}: {e}")
+            logger.warning(f"Problematic JSON (first 2000 chars): {response_text[:2000]}")
+            # Return empty instead of crashing - gap filling will handle it
+            return {}
     
-    def _initial_mapping(self, form_type: str, tax_year: str, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def _initial_mapping(self, form_type: str, tax_year: str, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Phase 1: Create initial comprehensive mapping."""
         
         # Prepare DETAILED field summary with position and full labels
-        field_summary = []
-        sorted_fields = sorted(fields, key=lambda x: (x['page_number'], x.get('rect', {}).get('y0', 0)))
-        
-        for idx, f in enumerate(sorted_fields):
-            import re
-            # Extract simplified field name for reference
-            full_name = f['field_name']
-            simplified = re.search(r'([fc][12]_\d+)', full_name)
-            simple_name = simplified.group(1) if simplified else full_name
-            
-            field_summary.append({
-                'index': idx + 1,
-                'field_name': full_name,
-                'simple_ref': simple_name,  # e.g., f1_04, c1_1
-                'type': f['field_type'],
-                'page': f['page_number'],
-                'y_position': round(f.get('rect', {}).get('y0', 0), 1),
-                'nearby_label': f.get('nearby_label', '')[:150]  # More context
-            })
+        field_summary = [
+            {'index': idx + 1, **self._summarize_field(f)}
+            for idx, f in enumerate(sorted(fields, key=self._field_sort_key))
+        ]
         
         prompt = f"""You are analyzing IRS Form {form_type} with {len(fields)} AcroForm fields.
 
@@ -236,64 +418,26 @@ FIELDS (sorted top-to-bottom by position):
 **OUTPUT**: Map ALL {len(fields)} fields. For fields with explicit mappings above, use those EXACT semantic names. For other fields, infer from y-position and context."""
 
         # Invoke with retry on throttling
-        response = self._invoke_with_retry(prompt, max_tokens=8000)
-        response_text = response
+        response_text = await self._invoke_with_retry(prompt, max_tokens=8000)
         
         logger.debug(f"Initial mapping response length: {len(response_text)} chars")
-        
-        # Extract and clean JSON
-        import re
-        json_match = re.search(r'```json\n({.*?})\n```', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(1)
-        elif response_text.strip().startswith('{'):
-            pass  # Already JSON
-        else:
-            json_match = re.search(r'({.*})', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(1)
-        
-        # Clean up common JSON issues
-        response_text = re.sub(r'//.*$', '', response_text, flags=re.MULTILINE)  # Remove comments
-        response_text = re.sub(r',(\s*[}\]])', r'\1', response_text)  # Fix trailing commas
-        
-        try:
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON parse error in initial_mapping: {e}")
-            logger.warning(f"Problematic JSON (first 2000 chars): {response_text[:2000]}")
-            # Return empty instead of crashing - gap filling will handle it
-            return {}
+        return self._parse_json_response(response_text, 'initial_mapping')
     
-    def _fill_gaps(
+    async def _fill_gaps(
         self, 
         form_type: str,
         unmapped_fields: List[Dict[str, Any]],
-        current_mapping: Dict[str, Any]
+        current_mapping: Dict[str, Any],
+        remaining: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Phase 3: Fill specific gaps in mapping."""
+        """Phase 3: Fill specific gaps in mapping for one chunk of unmapped fields."""
         
         if not unmapped_fields:
             return {}
         
         # Group unmapped fields with detailed analysis
-        field_summary = []
-        sorted_unmapped = sorted(unmapped_fields[:30], key=lambda x: (x['page_number'], x.get('rect', {}).get('y0', 0)))
-        
-        for f in sorted_unmapped:
-            import re
-            full_name = f['field_name']
-            simplified = re.search(r'([fc][12]_\d+)', full_name)
-            simple_name = simplified.group(1) if simplified else full_name
-            
-            field_summary.append({
-                'field_name': full_name,
-                'simple_ref': simple_name,
-                'type': f['field_type'],
-                'page': f['page_number'],
-                'y_position': round(f.get('rect', {}).get('y0', 0), 1),
-                'nearby_label': f.get('nearby_label', '')[:150]
-            })
+        sorted_unmapped = sorted(unmapped_fields[:GAP_CHUNK_SIZE], key=self._field_sort_key)
+        field_summary = [self._summarize_field(f) for f in sorted_unmapped]
         
         # Show current sections for context
         sections = [k for k in current_mapping.keys() if k != 'form_metadata']
@@ -302,7 +446,7 @@ FIELDS (sorted top-to-bottom by position):
 
 CURRENT SECTIONS: {', '.join(sections)}
 
-UNMAPPED FIELDS ({len(unmapped_fields)} remaining, analyzing {len(field_summary)}):
+UNMAPPED FIELDS ({remaining or len(unmapped_fields)} remaining, analyzing {len(field_summary)}):
 {json.dumps(field_summary, indent=2)}
 
 INSTRUCTIONS:
@@ -322,53 +466,36 @@ OUTPUT: JSON with precise mappings
 }}"""
 
         # Invoke with retry on throttling
-        response = self._invoke_with_retry(prompt, max_tokens=4000)
-        response_text = response
+        response_text = await self._invoke_with_retry(prompt, max_tokens=4000)
         
         logger.debug(f"Gap filling response length: {len(response_text)} chars")
-        
-        # Extract and clean JSON
-        import re
-        json_match = re.search(r'```json\n({.*?})\n```', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(1)
-        elif response_text.strip().startswith('{'):
-            pass  # Already JSON
-        else:
-            json_match = re.search(r'({.*})', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(1)
-        
-        # Clean up common JSON issues
-        response_text = re.sub(r'//.*$', '', response_text, flags=re.MULTILINE)  # Remove comments
-        response_text = re.sub(r',(\s*[}\]])', r'\1', response_text)  # Fix trailing commas
-        
-        try:
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON parse error in fill_gaps: {e}")
-            logger.warning(f"Problematic JSON: {response_text[:1500]}")
-            # Return empty mapping on error
-            return {}
+        return self._parse_json_response(response_text, 'fill_gaps')
     
-    def _invoke_with_retry(self, prompt: str, max_tokens: int = 4000, max_retries: int = 5) -> str:
-        """Invoke Bedrock with exponential backoff on throttling.
+    async def _invoke_with_retry(self, prompt: str, max_tokens: int = 4000, max_retries: int = 5) -> str:
+        """Invoke Bedrock under the shared rate limiter, with backoff on throttling.
         
-        Rate limit: 2 RPM (30 seconds between requests)
-        Backoff strategy: 30s, 35s, 40s, 50s, 60s
+        Each attempt takes one request and an estimate of its tokens (prompt at
+        ~4 chars/token plus max_tokens, which Bedrock reserves up front) from the
+        limiter. Backoff starts at one request interval (30s at 2 RPM) and grows
+        by 5s + attempt^2.
         """
+        estimated_tokens = len(prompt) // 4 + max_tokens
+        body = json.dumps({
+            'anthropic_version': 'bedrock-2023-05-31',
+            'max_tokens': max_tokens,
+            'temperature': 0.0,
+            'messages': [{'role': 'user', 'content': prompt}]
+        })
         for attempt in range(max_retries):
+            await self.limiter.acquire(estimated_tokens)
             try:
-                response = self.bedrock.invoke_model(
+                # boto3 is blocking; run it off the event loop so chunks overlap
+                response = await asyncio.to_thread(
+                    self.bedrock.invoke_model,
                     modelId=self.model_id,
                     contentType='application/json',
                     accept='application/json',
-                    body=json.dumps({
-                        'anthropic_version': 'bedrock-2023-05-31',
-                        'max_tokens': max_tokens,
-                        'temperature': 0.0,
-                        'messages': [{'role': 'user', 'content': prompt}]
-                    })
+                    body=body
                 )
                 
                 response_body = json.loads(response['body'].read())
@@ -376,15 +503,13 @@ OUTPUT: JSON with precise mappings
                 
             except ClientError as e:
                 if e.response['Error']['Code'] == 'ThrottlingException':
-                    # 2 RPM = 30 seconds minimum between requests
-                    # Exponential backoff: 30s, 35s, 40s, 50s, 60s
-                    base_wait = 30
-                    wait_time = base_wait + (attempt * 5) + (attempt ** 2)
-                    logger.warning(f"⏳ Throttled (2 RPM limit). Waiting {wait_time}s before retry {attempt+1}/{max_retries}")
-                    time.sleep(wait_time)
                     if attempt == max_retries - 1:
                         logger.error("❌ Max retries reached. Returning empty response.")
                         return "{}"
+                    base_wait = 60 / self.requests_per_minute
+                    wait_time = base_wait + (attempt * 5) + (attempt ** 2)
+                    logger.warning(f"⏳ Throttled. Waiting {wait_time:.0f}s before retry {attempt+1}/{max_retries}")
+                    await asyncio.sleep(wait_time)
                 else:
                     raise
         return "{}"
@@ -425,7 +550,6 @@ OUTPUT: JSON with precise mappings
 
 # Standalone testing
 if __name__ == "__main__":
-    import os
     import sys
     from dotenv import load_dotenv
     
@@ -0,0 +1,277 @@
+"""
+Deterministic pre-mapping of PDF form fields.
+
+Before FormMappingAgent prompts the model, fields whose nearby label (and, on
+known templates, AcroForm field reference) match an entry of a curated semantic
+vocabulary with high confidence are mapped locally. Only the remaining,
+ambiguous fields are sent to the model.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Minimum score for a local assignment, and lead required over the next-best entry
+CONFIDENCE_THRESHOLD = 0.8
+CONFIDENCE_MARGIN = 0.15
+
+# Phrases shorter than this only match a label exactly, never by containment
+MIN_CONTAINMENT_TOKENS = 2
+
+
+@dataclass(frozen=True)
+class VocabularyEntry:
+    """A semantic field name and the evidence that identifies it on a template."""
+    section: str
+    name: str
+    phrases: Tuple[str, ...]
+    field_type: str = 'Text'
+    refs: Tuple[str, ...] = ()
+
+
+@dataclass
+class PremapResult:
+    """Locally assigned fields, as a sectioned mapping, and the fields left for the model."""
+    mapping: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    assigned: Dict[str, str] = field(default_factory=dict)  # field_name -> semantic name
+    unresolved: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _text(section, name, *phrases, refs=()):
+    return VocabularyEntry(section, name, phrases, 'Text', refs)
+
+
+def _checkbox(section, name, *phrases, refs=()):
+    return VocabularyEntry(section, name, phrases, 'CheckBox', refs)
+
+
+# Semantic names follow the ones TaxService fills; refs are the 2024 template's field ids
+FORM_VOCABULARY: Dict[str, Tuple[VocabularyEntry, ...]] = {
+    'F1040': (
+        _text('personal_info', 'taxpayer_first_name', 'your first name and middle initial', refs=('f1_04',)),
+        _text('personal_info', 'taxpayer_last_name', 'last name', refs=('f1_05',)),
+        _text('personal_info', 'taxpayer_ssn', 'your social security number', refs=('f1_06',)),
+        _text('personal_info', 'spouse_first_name', 'if joint return spouse first name and middle initial',
+              refs=('f1_07',)),
+        _text('personal_info', 'spouse_last_name', 'last name', refs=('f1_08',)),
+        _text('personal_info', 'spouse_ssn', 'spouse social security number', refs=('f1_09',)),
+        _text('address', 'street_address', 'home address number and street', refs=('f1_10',)),
+        _text('address', 'apt_no', 'apt no', refs=('f1_11',)),
+        _text('address', 'city', 'city town or post office', refs=('f1_12',)),
+        _text('address', 'state', 'state', refs=('f1_13',)),
+        _text('address', 'zip_code', 'zip code', refs=('f1_14',)),
+        _text('address', 'foreign_country_name', 'foreign country name', refs=('f1_15',)),
+        _text('address', 'foreign_province_state_county', 'foreign province state county', refs=('f1_16',)),
+        _checkbox('digital_assets', 'digital_assets_yes_checkbox', 'yes', refs=('c1_5[0]',)),
+        _checkbox('digital_assets', 'digital_assets_no', 'no', refs=('c1_5[1]',)),
+        _text('dependents', 'dependent_1_first_name', '1 first name', refs=('f1_20',)),
+        _text('dependents', 'dependent_1_ssn', '2 social security number', refs=('f1_21',)),
+        _text('dependents', 'dependent_1_relationship', '3 relationship', refs=('f1_22',)),
+        _checkbox('dependents', 'dependent_1_child_tax_credit', 'child tax credit', refs=('c1_14',)),
+        _checkbox('dependents', 'dependent_1_other_credit', 'credit for other dependents', refs=('c1_15',)),
+        _text('dependents', 'dependent_2_first_name', '1 first name', refs=('f1_23',)),
+        _text('dependents', 'dependent_2_ssn', '2 social security number', refs=('f1_24',)),
+        _text('dependents', 'dependent_2_relationship', '3 relationship', refs=('f1_25',)),
+        _checkbox('dependents', 'dependent_2_child_tax_credit', 'child tax credit', refs=('c1_16',)),
+        _checkbox('dependents', 'dependent_2_other_credit', 'credit for other dependents', refs=('c1_17',)),
+        _text('income_page1', 'wages_line_1a', '1a', refs=('f1_32',)),
+        _text('income_page1', 'household_employee_wages_1b', '1b', refs=('f1_33',)),
+        _text('income_page1', 'tip_income_1c', '1c', refs=('f1_34',)),
+        _text('income_page1', 'medicaid_waiver_payments_1d', '1d', refs=('f1_35',)),
+        _text('income_page1', 'dependent_care_benefits_1e', '1e', refs=('f1_36',)),
+        _text('income_page1', 'adoption_benefits_1f', '1f', refs=('f1_37',)),
+        _text('income_page1', 'form_8919_wages_1g', '1g', refs=('f1_38',)),
+        _text('income_page1', 'other_earned_income_1h', '1h', refs=('f1_39',)),
+        _text('income_page1', 'wages_line_1z', '1z', refs=('f1_41',)),
+        _text('income_page1', 'tax_exempt_interest_2a', '2a', refs=('f1_42',)),
+        _text('income_page1', 'taxable_interest_2b', '2b', refs=('f1_43',)),
+        _text('income_page1', 'qualified_dividends_3a', '3a', refs=('f1_44',)),
+        _text('income_page1', 'ordinary_dividends_3b', '3b', refs=('f1_45',)),
+        _text('income_page1', 'ira_distributions_4a', '4a', refs=('f1_46',)),
+        _text('income_page1', 'taxable_ira_distributions_4b', '4b', refs=('f1_47',)),
+        _text('income_page1', 'pensions_annuities_5a', '5a', refs=('f1_48',)),
+        _text('income_page1', 'taxable_pensions_annuities_5b', '5b', refs=('f1_49',)),
+        _text('income_page1', 'social_security_benefits_6a', '6a', refs=('f1_50',)),
+        _text('income_page1', 'taxable_social_security_6b', '6b', refs=('f1_51',)),
+        _text('income_page1', 'capital_gain_or_loss_7', '7', refs=('f1_52',)),
+        _text('income_page1', 'other_income_8', '8', refs=('f1_53',)),
+        _text('income_page1', 'total_income_9', '9', refs=('f1_54',)),
+        _text('adjustments', 'adjustments_line_10', '10', refs=('f1_55',)),
+        _text('adjustments', 'adjusted_gross_income_11', '11', refs=('f1_56',)),
+        _text('deductions', 'deductions_line_12', '12', refs=('f1_57',)),
+        _text('deductions', 'qualified_business_income_deduction_13', '13', refs=('f1_58',)),
+        _text('deductions', 'total_deductions_14', '14', refs=('f1_59',)),
+        _text('deductions', 'taxable_income_15', '15', refs=('f1_60',)),
+        _text('tax_and_credits', 'tax_16', '16', refs=('f2_02',)),
+        _text('tax_and_credits', 'schedule_2_line_3_17', '17', refs=('f2_03',)),
+        _text('tax_and_credits', 'tax_before_credits_18', '18', refs=('f2_04',)),
+        _text('tax_and_credits', 'child_tax_credit_19', '19', refs=('f2_05',)),
+        _text('tax_and_credits', 'schedule_3_line_8_20', '20', refs=('f2_06',)),
+        _text('tax_and_credits', 'total_credits_21', '21', refs=('f2_07',)),
+        _text('tax_and_credits', 'tax_after_credits_22', '22', refs=('f2_08',)),
+        _text('tax_and_credits', 'other_taxes_23', '23', refs=('f2_09',)),
+        _text('tax_and_credits', 'total_tax_24', '24', refs=('f2_10',)),
+        _text('payments', 'withholding', '25a', refs=('f2_11',)),
+        _text('payments', 'withholding_1099_25b', '25b', refs=('f2_12',)),
+        _text('payments', 'total_withholding_25d', '25d', refs=('f2_14',)),
+        _text('payments', 'estimated_tax_payments_26', '26', refs=('f2_15',)),
+        _text('payments', 'additional_child_tax_credit_28', '28', refs=('f2_17',)),
+        _text('payments', 'american_opportunity_credit_29', '29', refs=('f2_18',)),
+        _text('payments', 'schedule_3_line_15_31', '31', refs=('f2_20',)),
+        _text('payments', 'total_other_payments_32', '32', refs=('f2_21',)),
+        _text('payments', 'total_payments', '33', refs=('f2_22',)),
+        _text('refund_or_amount_owed', 'overpayment', '34', refs=('f2_23',)),
+        _text('refund_or_amount_owed', 'refund_amount', '35a', refs=('f2_24',)),
+        _text('refund_or_amount_owed', 'routing_number', 'routing number', refs=('f2_25',)),
+        _text('refund_or_amount_owed', 'account_number', 'account number', refs=('f2_26',)),
+        _checkbox('refund_or_amount_owed', 'checking_account', 'checking', refs=('c2_5[0]',)),
+        _checkbox('refund_or_amount_owed', 'savings_account', 'savings', refs=('c2_5[1]',)),
+        _text('refund_or_amount_owed', 'estimated_tax_payment', '36', refs=('f2_27',)),
+        _text('refund_or_amount_owed', 'amount_owed', '37', refs=('f2_28',)),
+        _checkbox('third_party_designee', 'third_party_designee_yes', 'yes complete below', refs=('c2_6[0]',)),
+        _checkbox('third_party_designee', 'third_party_designee_no', 'no', refs=('c2_6[1]',)),
+        _text('sign_here', 'taxpayer_occupation', 'your occupation', refs=('f2_33',)),
+        _text('sign_here', 'spouse_occupation', 'spouse occupation', refs=('f2_35',)),
+        _text('sign_here', 'phone_number', 'phone no', refs=('f2_37',)),
+        _text('paid_preparer', 'preparer_name', 'preparer name', refs=('f2_39',)),
+        _text('paid_preparer', 'preparer_ptin', 'ptin', refs=('f2_40',)),
+        _text('paid_preparer', 'firm_name', 'firm name', refs=('f2_41',)),
+        _text('paid_preparer', 'firm_address', 'firm address', refs=('f2_43',)),
+    ),
+}
+
+
+def tokenize(text: Optional[str]) -> frozenset:
+    """Lower-case word tokens, with possessive 's dropped (spouse's -> spouse)."""
+    if not text:
+        return frozenset()
+    text = re.sub(r"[’']s\b", '', text.lower())
+    return frozenset(re.findall(r'[a-z0-9]+', text))
+
+
+def label_similarity(label_tokens: frozenset, phrase_tokens: frozenset) -> float:
+    """
+    Token similarity of a label to a vocabulary phrase.
+
+    Dice coefficient, or 0.9 x the share of the phrase found in the label when a
+    multi-word phrase is embedded in a longer label (labels often append instructions).
+    """
+    if not label_tokens or not phrase_tokens:
+        return 0.0
+    common = len(label_tokens & phrase_tokens)
+    dice = 2 * common / (len(label_tokens) + len(phrase_tokens))
+    if len(phrase_tokens) >= MIN_CONTAINMENT_TOKENS:
+        return max(dice, 0.9 * common / len(phrase_tokens))
+    return dice
+
+
+def field_ref(field_name: str) -> str:
+    """Last component of an AcroForm name with its index, e.g. 'f1_04[0]'."""
+    ref = field_name.rsplit('.', 1)[-1]
+    return ref if ref.endswith(']') else f"{ref}[0]"
+
+
+class _Candidate:
+    __slots__ = ('entry', 'score', 'ref_match')
+
+    def __init__(self, entry: VocabularyEntry, score: float, ref_match: bool):
+        self.entry = entry
+        self.score = score
+        self.ref_match = ref_match
+
+    @property
+    def key(self) -> Tuple[float, bool]:
+        return (self.score, self.ref_match)
+
+
+def _score(field: Dict[str, Any], entry: VocabularyEntry, label_tokens: frozenset) -> _Candidate:
+    similarity = max((label_similarity(label_tokens, tokenize(p)) for p in entry.phrases), default=0.0)
+    ref_match = field_ref(field['field_name']) in {field_ref(r) for r in entry.refs}
+    # A matching field reference lifts a partial label match; it is not enough on its own
+    score = max(similarity, (ref_match + similarity) / 2)
+    return _Candidate(entry, score, ref_match)
+
+
+def _position_key(field: Dict[str, Any]):
+    rect = field.get('rect', {})
+    return (field['page_number'], rect.get('y0', 0), rect.get('x0', 0))
+
+
+def premap_fields(form_type: str, fields: List[Dict[str, Any]]) -> PremapResult:
+    """
+    Assign the fields that match the form's vocabulary with high confidence.
+
+    A field is confident when its best entry scores at least CONFIDENCE_THRESHOLD
+    and beats the next entry by CONFIDENCE_MARGIN, or ties it on score but has a
+    matching field reference. Entries with identical evidence (e.g. taxpayer and
+    spouse "Last name" on a template without known refs) are assigned to the
+    fields claiming them in top-to-bottom order when the counts agree. Every
+    entry is used at most once; contested fields are left for the model.
+
+    Args:
+        form_type: Form type (e.g., "F1040"); forms without a vocabulary map nothing
+        fields: Fields in FormMappingAgent format
+
+    Returns:
+        PremapResult with the local mapping and the unresolved fields
+    """
+    vocabulary = FORM_VOCABULARY.get(form_type.upper(), ())
+    result = PremapResult()
+    if not vocabulary:
+        result.unresolved = list(fields)
+        return result
+
+    # Best entry (or tied entries) per field
+    claims = defaultdict(list)  # tuple of entry names -> [(candidate, field)]
+    entries_by_name = {entry.name: entry for entry in vocabulary}
+    unresolved = []
+    for f in fields:
+        label_tokens = tokenize(f.get('nearby_label'))
+        candidates = sorted(
+            (_score(f, entry, label_tokens) for entry in vocabulary if entry.field_type == f['field_type']),
+            key=lambda c: c.key, reverse=True
+        )
+        if not candidates or candidates[0].score < CONFIDENCE_THRESHOLD:
+            unresolved.append(f)
+            continue
+        best = candidates[0]
+        tied = [c for c in candidates if c.key == best.key]
+        runner_up = next((c for c in candidates if c.key != best.key), None)
+        if runner_up is not None and runner_up.score > best.score - CONFIDENCE_MARGIN \
+                and not (best.ref_match and not runner_up.ref_match):
+            unresolved.append(f)
+            continue
+        claims[tuple(c.entry.name for c in tied)].append((best, f))
+
+    used = set()
+    # Single-entry claims first: the strictly strongest claimant wins
+    for names, claimants in sorted(claims.items(), key=lambda item: len(item[0])):
+        if len(names) == 1:
+            claimants.sort(key=lambda claim: claim[0].key, reverse=True)
+            winner = claimants[0]
+            if names[0] in used or (len(claimants) > 1 and claimants[1][0].key == winner[0].key):
+                unresolved.extend(f for _, f in claimants)
+                continue
+            pairs = [(entries_by_name[names[0]], winner[1])]
+            unresolved.extend(f for _, f in claimants[1:])
+        else:
+            # Identical evidence: pair entries (vocabulary order) with fields (position order)
+            available = [name for name in names if name not in used]
+            if len(available) != len(claimants):
+                unresolved.extend(f for _, f in claimants)
+                continue
+            ordered = sorted((f for _, f in claimants), key=_position_key)
+            pairs = [(entries_by_name[name], f) for name, f in zip(available, ordered)]
+        for entry, f in pairs:
+            used.add(entry.name)
+            result.mapping.setdefault(entry.section, {})[entry.name] = f['field_name']
+            result.assigned[f['field_name']] = entry.name
+
+    order = {id(f): i for i, f in enumerate(fields)}
+    result.unresolved = sorted(unresolved, key=lambda f: order[id(f)])
+    logger.info(f"🧭 Pre-mapped {len(result.assigned)}/{len(fields)} {form_type} fields locally")
+    return result
@@ -131,43 +131,3 @@ class TaxConnection(BaseModel):
     created_at: datetime = Field(description="Creation timestamp")
     ttl: int = Field(description="TTL for automatic cleanup")
 
-
-# Tax calculation constants for 2025
-TAX_YEAR_2025_CONSTANTS = {
-    "standard_deductions": {
-        FilingStatus.SINGLE: Decimal("14600"),
-        FilingStatus.MARRIED_FILING_JOINTLY: Decimal("29200"),
-        FilingStatus.MARRIED_FILING_SEPARATELY: Decimal("14600"),
-        FilingStatus.HEAD_OF_HOUSEHOLD: Decimal("21900"),
-        FilingStatus.QUALIFYING_WIDOW: Decimal("29200"),
-    },
-    "tax_brackets": {
-        FilingStatus.SINGLE: [
-            (Decimal("11000"), Decimal("0.10")),
-            (Decimal("44725"), Decimal("0.12")),
-            (Decimal("95375"), Decimal("0.22")),
-            (Decimal("182050"), Decimal("0.24")),
-            (Decimal("231250"), Decimal("0.32")),
-            (Decimal("578125"), Decimal("0.35")),
-            (float("inf"), Decimal("0.37")),
-        ],
-        FilingStatus.MARRIED_FILING_JOINTLY: [
-            (Decimal("22000"), Decimal("0.10")),
-            (Decimal("89450"), Decimal("0.12")),
-            (Decimal("190750"), Decimal("0.22")),
-            (Decimal("364200"), Decimal("0.24")),
-            (Decimal("462500"), Decimal("0.32")),
-            (Decimal("693750"), Decimal("0.35")),
-            (float("inf"), Decimal("0.37")),
-        ],
-        # Add other filing statuses as needed
-    },
-    "child_tax_credit": {
-        "amount_per_child": Decimal("2000"),
-        "phase_out_threshold": {
-            FilingStatus.SINGLE: Decimal("200000"),
-            FilingStatus.MARRIED_FILING_JOINTLY: Decimal("400000"),
-        },
-        "phase_out_rate": Decimal("0.05"),  # $50 per $1000 over threshold
-    },
-}
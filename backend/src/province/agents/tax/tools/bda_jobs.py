@@ -0,0 +1,179 @@
+"""
+Asynchronous waiting for Bedrock Data Automation (BDA) jobs.
+
+BDAJobWaiter polls get_data_automation_status with exponentially growing
+intervals on asyncio.sleep (the blocking boto3 call runs in a thread), so many
+ingests can wait on one event loop. A job also completes early when its
+completion event arrives: EventBridge "Bedrock Data Automation" job events and
+S3 notifications for the job's job_metadata.json are published to
+BDACompletionEvents, a local stand-in for the EventBridge -> SQS queue. An
+event only triggers an immediate status check; the job's status always comes
+from get_data_automation_status.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from province.core.completion_events import CompletionEvents
+from province.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+BDA_SUCCESS_STATUSES = {'COMPLETED', 'Success'}
+BDA_FAILURE_STATUSES = {'FAILED', 'CANCELLED', 'Failed', 'Canceled', 'ServiceError', 'ClientError'}
+
+# BDA writes job_metadata.json under inference_results/<job id>/ once a job has finished
+_JOB_METADATA_KEY = re.compile(r'inference_results/+([^/]+)/job_metadata\.json$')
+
+
+def bda_job_id(invocation_arn: str) -> str:
+    """Job id (the last ARN path segment) of a BDA invocation."""
+    return invocation_arn.rstrip('/').split('/')[-1]
+
+
+def parse_bda_completion_event(event: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """
+    Extract (job id, status) from a BDA completion event.
+
+    Accepts EventBridge BDA job events, EventBridge S3 "Object Created" events
+    and S3 notification records for a job's job_metadata.json. Returns None for
+    anything else, including events for jobs that are still running.
+    """
+    detail = event.get('detail') or {}
+    detail_type = event.get('detail-type', '')
+
+    if detail_type.startswith('Bedrock Data Automation'):
+        job_ref = detail.get('invocation_arn') or detail.get('invocationArn') or detail.get('job_id')
+        if not job_ref:
+            return None
+        if 'Succeeded' in detail_type:
+            status = 'COMPLETED'
+        elif 'Failed' in detail_type:
+            status = 'FAILED'
+        else:
+            status = detail.get('job_status') or detail.get('status')
+        if status not in BDA_SUCCESS_STATUSES | BDA_FAILURE_STATUSES:
+            return None
+        return bda_job_id(job_ref), status
+
+    keys = [(detail.get('object') or {}).get('key')]
+    keys += [record.get('s3', {}).get('object', {}).get('key') for record in event.get('Records', [])]
+    for key in filter(None, keys):
+        match = _JOB_METADATA_KEY.search(key)
+        if match:
+            return match.group(1), 'COMPLETED'
+    return None
+
+
+class BDACompletionEvents(CompletionEvents):
+    """
+    In-process queue of BDA job completions, standing in for EventBridge -> SQS.
+
+    Publishers (an API route, a queue consumer thread) call publish(); waiters on
+    any event loop watch a job id and get its terminal status. Recent completions
+    are retained so a waiter that starts after its event still sees it.
+    """
+
+    def __init__(self, max_retained: int = 1024):
+        super().__init__(max_retained)
+
+    def publish(self, event: Dict[str, Any]) -> Optional[str]:
+        """Record a completion event; returns the job id, or None if the event is not one."""
+        parsed = parse_bda_completion_event(event)
+        if parsed is None:
+            return None
+        self.publish_status(*parsed)
+        return parsed[0]
+
+    def publish_status(self, job_id: str, status: str):
+        self.complete(job_id, status)
+
+
+@lru_cache()
+def get_bda_completion_events() -> BDACompletionEvents:
+    """Get the process-wide BDA completion event queue."""
+    return BDACompletionEvents()
+
+
+class BDAJobWaiter:
+    """Wait for a BDA invocation to finish without blocking the event loop."""
+
+    def __init__(self, runtime_client, events: Optional[BDACompletionEvents] = None,
+                 initial_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 multiplier: float = 2.0, timeout: Optional[float] = None):
+        settings = get_settings()
+        self.runtime_client = runtime_client
+        self.events = events
+        self.initial_interval = initial_interval if initial_interval is not None else settings.bda_poll_initial_seconds
+        self.max_interval = max_interval if max_interval is not None else settings.bda_poll_max_seconds
+        self.multiplier = multiplier
+        self.timeout = timeout if timeout is not None else settings.bda_wait_timeout_seconds
+
+    async def wait(self, invocation_arn: str) -> Dict[str, Any]:
+        """
+        Wait for a terminal status.
+
+        Returns:
+            Dict with 'status', 'succeeded', 'source' ('poll', 'event' or 'timeout'),
+            'checks', 'elapsed' and, for failures, 'error'
+        """
+        job_id = bda_job_id(invocation_arn)
+        future = self.events.watch(job_id) if self.events is not None else None
+        start = time.monotonic()
+        interval = self.initial_interval
+        checks = 0
+        source = 'poll'
+        try:
+            while True:
+                checks += 1
+                try:
+                    status_response = await asyncio.to_thread(
+                        self.runtime_client.get_data_automation_status, invocationArn=invocation_arn
+                    )
+                    status = status_response.get('status')
+                    logger.info(f"   [{time.monotonic() - start:.0f}s] Check #{checks}: Status = {status}")
+                    if status in BDA_SUCCESS_STATUSES | BDA_FAILURE_STATUSES:
+                        return self._result(status, source, checks, start, status_response.get('errorMessage'))
+                except Exception as status_error:
+                    logger.warning(f"Error checking status: {status_error}")
+                if source == 'event':
+                    logger.warning(f"Completion event for BDA job {job_id} not confirmed by its status; polling on")
+                    source = 'poll'
+
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    return self._result(None, 'timeout', checks, start)
+                delay = min(interval, remaining)
+                if future is not None:
+                    done, _ = await asyncio.wait({future}, timeout=delay)
+                    if done:
+                        # Events (POST /tax/bda-events is unauthenticated) only end the wait
+                        # early: the status is re-read from BDA now, and a forged or early
+                        # event falls back to polling
+                        self.events.unwatch(job_id, future)
+                        future, source = None, 'event'
+                        continue
+                else:
+                    await asyncio.sleep(delay)
+                interval = min(interval * self.multiplier, self.max_interval)
+        finally:
+            if future is not None:
+                self.events.unwatch(job_id, future)
+
+    @staticmethod
+    def _result(status: Optional[str], source: str, checks: int, start: float,
+                error: Optional[str] = None) -> Dict[str, Any]:
+        result = {
+            'status': status,
+            'succeeded': status in BDA_SUCCESS_STATUSES,
+            'source': source,
+            'checks': checks,
+            'elapsed': time.monotonic() - start
+        }
+        if status in BDA_FAILURE_STATUSES:
+            result['error'] = error or 'No error details provided'
+        return result
@@ -0,0 +1,257 @@
+"""
+Index of Bedrock Data Automation results by input document.
+
+When a BDA job completes, two rows are written to the results index table: one
+keyed by the input's S3 key and one by the SHA-256 of its content. Each points
+at the job's result JSON, so "was this document already processed?" is a single
+get_item instead of a scan of inference_results/. backfill_bda_results_index
+indexes jobs that ran before the table existed.
+
+The content-hash rows also let ingestion reuse an extraction across uploads and
+engagements (ExtractionDedupStats counts how often that saves a BDA run).
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'KEY#'
+SHA256_PREFIX = 'SHA256#'
+INFERENCE_RESULTS_PREFIX = 'inference_results/'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def bda_result_keys(job_id: str) -> List[str]:
+    """Candidate result JSON keys of a job, in the order BDA is known to use them."""
+    return [
+        f"inference_results/{job_id}/0/standard_output/0/result.json",
+        f"inference_results//{job_id}/0/standard_output/0/result.json",
+        f"inference_results/{job_id}/0/custom_output/0/result.json"
+    ]
+
+
+def hash_s3_object(s3_client, bucket: str, key: str) -> str:
+    """SHA-256 of an S3 object, streamed in chunks rather than read into memory."""
+    digest = hashlib.sha256()
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    for chunk in iter(lambda: body.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_key_from_job_metadata(metadata: Dict[str, Any]) -> Optional[str]:
+    """Input S3 key recorded in a job_metadata.json (bucket prefix stripped from s3:// URIs)."""
+    outputs = metadata.get('output_metadata') or []
+    if not outputs:
+        return None
+    s3_key = (outputs[0].get('asset_input_path') or {}).get('s3_key') or ''
+    if s3_key.startswith('s3://'):
+        s3_key = s3_key[len('s3://'):].split('/', 1)[-1]
+    return s3_key or None
+
+
+def engagement_of(s3_key: str) -> Optional[str]:
+    """Engagement id of a document stored under tax-engagements/<engagement_id>/."""
+    parts = s3_key.split('/')
+    return parts[1] if len(parts) > 2 and parts[0] == 'tax-engagements' else None
+
+
+class ExtractionDedupStats:
+    """Counters for extraction reuse: hits by S3 key or content hash, and misses (BDA runs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.key_hits = 0
+        self.hash_hits = 0
+        self.cross_engagement_hits = 0
+        self.misses = 0
+
+    def record(self, match: Optional[str], cross_engagement: bool = False):
+        with self._lock:
+            if match == 's3_key':
+                self.key_hits += 1
+            elif match == 'content_hash':
+                self.hash_hits += 1
+                self.cross_engagement_hits += int(cross_engagement)
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.key_hits + self.hash_hits
+            lookups = hits + self.misses
+            return {
+                'lookups': lookups,
+                'key_hits': self.key_hits,
+                'hash_hits': self.hash_hits,
+                'cross_engagement_hits': self.cross_engagement_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0
+            }
+
+
+@lru_cache()
+def get_extraction_dedup_stats() -> ExtractionDedupStats:
+    """Get the process-wide extraction dedup counters."""
+    return ExtractionDedupStats()
+
+
+class BDAResultsIndex:
+    """Lookup table from input document (S3 key or content hash) to BDA result JSON."""
+
+    def __init__(self, table, s3_client):
+        self.table = table
+        self.s3_client = s3_client
+
+    def lookup(self, s3_key: Optional[str] = None, content_sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Index row for the document, by S3 key first and then by content hash."""
+        for prefix, value in ((KEY_PREFIX, s3_key), (SHA256_PREFIX, content_sha256)):
+            if value:
+                item = self.table.get_item(Key={'lookup_key': f"{prefix}{value}"}).get('Item')
+                if item:
+                    return item
+        return None
+
+    def record(self, job_id: str, source_s3_key: str, result_bucket: str, result_key: str,
+               content_sha256: Optional[str] = None, completed_at: Optional[str] = None) -> Dict[str, Any]:
+        """Index a completed job under its source key and, when known, its content hash."""
+        entry = {
+            'job_id': job_id,
+            'source_s3_key': source_s3_key,
+            'result_bucket': result_bucket,
+            'result_key': result_key,
+            'completed_at': completed_at or datetime.utcnow().isoformat()
+        }
+        if content_sha256:
+            entry['content_sha256'] = content_sha256
+        with self.table.batch_writer() as batch:
+            batch.put_item(Item={'lookup_key': f"{KEY_PREFIX}{source_s3_key}", **entry})
+            if content_sha256:
+                batch.put_item(Item={'lookup_key': f"{SHA256_PREFIX}{content_sha256}", **entry})
+        return entry
+
+    def record_alias(self, entry: Dict[str, Any], s3_key: str):
+        """Point another document key at an existing entry's result (same content, new upload)."""
+        alias = {k: v for k, v in entry.items() if k != 'lookup_key'}
+        self.table.put_item(Item={**alias, 'lookup_key': f"{KEY_PREFIX}{s3_key}", 'source_s3_key': s3_key})
+
+    def load_result(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Result JSON an index row points at."""
+        response = self.s3_client.get_object(Bucket=entry['result_bucket'], Key=entry['result_key'])
+        return json.loads(response['Body'].read().decode('utf-8'))
+
+    def find_result_key(self, bucket: str, job_id: str) -> Optional[str]:
+        """First candidate result key of a job that exists in `bucket`."""
+        for key in bda_result_keys(job_id):
+            try:
+                self.s3_client.head_object(Bucket=bucket, Key=key)
+                return key
+            except Exception:
+                continue
+        return None
+
+
+def _job_metadata_keys(s3_client, bucket: str, page_size: int) -> Iterator[str]:
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=INFERENCE_RESULTS_PREFIX,
+                                   PaginationConfig={'PageSize': page_size}):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith('job_metadata.json'):
+                yield obj['Key']
+
+
+def backfill_bda_results_index(index: BDAResultsIndex, output_bucket: str, input_bucket: Optional[str] = None,
+                               page_size: int = 1000) -> Dict[str, int]:
+    """
+    Index every job under inference_results/ in `output_bucket`.
+
+    Walks all listing pages (not just the first 1000 keys). With `input_bucket`,
+    inputs that still exist are hashed so content-hash lookups also hit.
+
+    Returns:
+        Counts of jobs seen, indexed and skipped
+    """
+    stats = {'jobs': 0, 'indexed': 0, 'skipped': 0}
+    s3_client = index.s3_client
+    for metadata_key in _job_metadata_keys(s3_client, output_bucket, page_size):
+        stats['jobs'] += 1
+        job_id = metadata_key[len(INFERENCE_RESULTS_PREFIX):].strip('/').split('/')[0]
+        try:
+            metadata_obj = s3_client.get_object(Bucket=output_bucket, Key=metadata_key)
+            source_key = source_key_from_job_metadata(json.loads(metadata_obj['Body'].read().decode('utf-8')))
+            result_key = index.find_result_key(output_bucket, job_id)
+            if not source_key or not result_key:
+                logger.warning(f"Skipping {metadata_key}: no input key or result JSON")
+                stats['skipped'] += 1
+                continue
+            content_sha256 = None
+            if input_bucket:
+                try:
+                    content_sha256 = hash_s3_object(s3_client, input_bucket, source_key)
+                except Exception as e:
+                    logger.info(f"Input {source_key} not hashed ({e}); indexing by key only")
+            index.record(job_id, source_key, output_bucket, result_key, content_sha256,
+                         completed_at=metadata_obj['LastModified'].isoformat())
+            stats['indexed'] += 1
+        except Exception as e:
+            logger.warning(f"Could not index {metadata_key}: {e}")
+            stats['skipped'] += 1
+    logger.info(f"Backfilled BDA results index: {stats}")
+    return stats
+
+
+def ensure_results_index_table(dynamodb, table_name: str):
+    """Create the index table (lookup_key hash key) unless it already exists."""
+    from botocore.exceptions import ClientError
+
+    try:
+        dynamodb.meta.client.describe_table(TableName=table_name)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ResourceNotFoundException':
+            raise
+        logger.info(f"Creating DynamoDB table: {table_name}")
+        dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[{'AttributeName': 'lookup_key', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'lookup_key', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        dynamodb.meta.client.get_waiter('table_exists').wait(TableName=table_name)
+    return dynamodb.Table(table_name)
+
+
+# Backfill: python -m province.agents.tax.tools.bda_results_index [--no-hash]
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    import boto3
+    from dotenv import load_dotenv
+
+    from province.core.config import get_settings
+
+    parser = argparse.ArgumentParser(description="Create and backfill the Bedrock Data Automation results index")
+    parser.add_argument('--no-hash', action='store_true', help="Index by S3 key only; skip hashing inputs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv('.env.local')
+    settings = get_settings()
+    bucket = os.getenv('BEDROCK_OUTPUT_BUCKET_NAME')
+    if not bucket:
+        raise SystemExit("BEDROCK_OUTPUT_BUCKET_NAME is not set")
+
+    table = ensure_results_index_table(boto3.resource('dynamodb', region_name=settings.aws_region),
+                                       settings.bda_results_index_table_name)
+    stats = backfill_bda_results_index(
+        BDAResultsIndex(table, boto3.client('s3', region_name=settings.aws_region)),
+        bucket,
+        input_bucket=None if args.no_hash else settings.documents_bucket_name
+    )
+    print(json.dumps(stats))
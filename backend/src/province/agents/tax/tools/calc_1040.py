@@ -9,7 +9,8 @@ import boto3
 from botocore.exceptions import ClientError
 
 from province.core.config import get_settings
-from ..models import FilingStatus, TaxCalculation, TAX_YEAR_2025_CONSTANTS
+from ..models import FilingStatus, TaxCalculation
+from .tax_engine import cents_to_decimal, get_tax_engine
 # Calc1040Agent implementation moved inline
 
 logger = logging.getLogger(__name__)
@@ -217,65 +218,26 @@ def _perform_tax_calculation(
 ) -> TaxCalculation:
     """Perform inline tax calculation."""
     
-    # Get standard deduction for filing status
-    standard_deductions = TAX_YEAR_2025_CONSTANTS["standard_deductions"]
-    standard_deduction = Decimal(str(standard_deductions[filing_status.value]))
-    
-    # Calculate taxable income
-    taxable_income = max(Decimal('0'), agi - standard_deduction)
-    
-    # Calculate tax using tax brackets
-    tax_brackets = TAX_YEAR_2025_CONSTANTS["tax_brackets"][filing_status.value]
-    tax = Decimal('0')
-    
-    previous_threshold = Decimal('0')
-    
-    for threshold, rate in tax_brackets:
-        if threshold == float("inf"):
-            # Top bracket - apply rate to remaining income
-            if taxable_income > previous_threshold:
-                tax += (taxable_income - previous_threshold) * rate
-            break
-        else:
-            # Regular bracket
-            bracket_threshold = Decimal(str(threshold))
-            if taxable_income > previous_threshold:
-                bracket_income = min(taxable_income, bracket_threshold) - previous_threshold
-                if bracket_income > 0:
-                    tax += bracket_income * rate
-            
-            if taxable_income <= bracket_threshold:
-                break
-                
-            previous_threshold = bracket_threshold
-    
-    # Calculate Child Tax Credit
-    child_tax_credit = Decimal(str(qualifying_children * 2000))  # $2000 per qualifying child
-    
-    # Apply credits
-    credits = {"child_tax_credit": child_tax_credit}
-    total_credits = child_tax_credit
-    
-    # Calculate final amounts
-    tax_after_credits = max(Decimal('0'), tax - total_credits)
-    refund_or_due = withholding - tax_after_credits
+    engine = get_tax_engine()
+    result = engine.compute_return(tax_year, filing_status, agi, withholding, qualifying_children)
     
     return TaxCalculation(
         tax_year=tax_year,
         filing_status=filing_status,
-        agi=agi,
-        standard_deduction=standard_deduction,
-        taxable_income=taxable_income,
-        tax=tax,
-        credits=credits,
-        withholding=withholding,
-        refund_or_due=refund_or_due,
+        agi=result.agi,
+        standard_deduction=result.standard_deduction,
+        taxable_income=result.taxable_income,
+        tax=result.tax,
+        credits={"child_tax_credit": result.child_tax_credit},
+        withholding=result.withholding,
+        refund_or_due=result.refund_or_due,
         provenance={
-            "calculation_method": "simplified_1040",
-            "tax_brackets_used": f"TAX_YEAR_{tax_year}_CONSTANTS",
-            "standard_deduction_amount": float(standard_deduction),
-            "child_tax_credit_per_child": 2000,
+            "calculation_method": "tax_engine",
+            "rules_packages": list(result.package_ids),
+            "standard_deduction_amount": float(result.standard_deduction),
+            "child_tax_credit_per_child": float(cents_to_decimal(engine.rules(tax_year).ctc_per_child_cents)),
             "qualifying_children": qualifying_children,
+            "marginal_rate": float(result.marginal_rate),
             "calculated_at": datetime.now().isoformat()
         }
     )
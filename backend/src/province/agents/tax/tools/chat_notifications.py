@@ -0,0 +1,51 @@
+"""
+Document processing notifications for the chat interface.
+
+Notifications are rows in the notifications table (engagement_id hash key,
+millisecond timestamp range key) that the frontend polls through the
+notifications API. Both the upload Lambda and the ingest workers write them.
+"""
+
+import json
+import logging
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from province.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+async def send_chat_notification(engagement_id: str, message: str, status: str,
+                                 data: Optional[Dict[str, Any]] = None):
+    """
+    Store a processing notification for the engagement's chat.
+
+    Failures are logged, never raised: a missed notification must not fail the
+    processing it reports on.
+    """
+    import boto3
+
+    settings = get_settings()
+    try:
+        dynamodb = boto3.resource('dynamodb', region_name=settings.aws_region)
+        table = dynamodb.Table(settings.notifications_table)
+
+        notification = {
+            'engagement_id': engagement_id,
+            'timestamp': int(time.time() * 1000),
+            'message': message,
+            'status': status,
+            'type': 'document_processing'
+        }
+
+        if data:
+            # DynamoDB takes numbers as Decimal, not float
+            notification['data'] = json.loads(json.dumps(data, default=str), parse_float=Decimal)
+
+        table.put_item(Item=notification)
+        logger.info(f"Sent notification for engagement {engagement_id}: {message}")
+
+    except Exception as e:
+        logger.error(f"Failed to send chat notification: {e}")
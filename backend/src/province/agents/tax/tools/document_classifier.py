@@ -0,0 +1,176 @@
+"""
+Content-based classification of uploaded tax documents.
+
+File names decide nothing about what an upload is: a 1099 saved as "scan.pdf"
+or a W-2 named "1099.pdf" used to be sent to the wrong Bedrock Data Automation
+blueprint, and letters or receipts were sent to BDA at all. classify_document
+reads the first page's text layer with PyMuPDF (a few milliseconds) and scores
+keyword features of each supported form: the form title and number weigh most,
+box labels less, and labels printed on several forms count for each of them.
+The winning form's confidence is its lead over the runner-up, full at
+FULL_SCORE, so shared labels cancel out and only distinguishing features
+count. A page of text with no tax features is classified as not a tax
+form. Scans and images have no text to judge and are left undecided, so the
+caller falls back to its file-name guess.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Lead over the runner-up at which a form is classified with full confidence
+FULL_SCORE = 6
+# Lowest score that names a form type at all
+MIN_TYPE_SCORE = 3
+# Characters of text a page needs before "no tax features" means "not a tax form"
+MIN_TEXT_CHARS = 200
+NOT_TAX_FORM_CONFIDENCE = 0.9
+
+
+def _features(*phrases: Tuple[str, int]) -> Tuple[Tuple[Pattern, int], ...]:
+    return tuple((re.compile(r'\b' + re.escape(phrase) + r'\b'), weight) for phrase, weight in phrases)
+
+
+# Lowercase phrases (apostrophes normalized, whitespace collapsed) and their weights per form
+FORM_FEATURES: Dict[str, Tuple[Tuple[Pattern, int], ...]] = {
+    'W-2': _features(
+        ('wage and tax statement', 3), ('w-2', 2),
+        ('wages, tips, other comp', 2), ('social security wages', 1), ('social security tax withheld', 1),
+        ('medicare wages and tips', 1), ('medicare tax withheld', 1), ('allocated tips', 1),
+        ('dependent care benefits', 1), ('nonqualified plans', 1), ("employee's social security number", 1),
+        ('employer identification number', 1), ('federal income tax withheld', 1),
+    ),
+    '1099-INT': _features(
+        ('interest income', 3), ('1099-int', 3),
+        ('early withdrawal penalty', 1), ('interest on u.s. savings bonds', 1), ('investment expenses', 1),
+        ('tax-exempt interest', 1), ('bond premium', 1), ('foreign tax paid', 1),
+        ("payer's tin", 1), ("recipient's tin", 1), ('federal income tax withheld', 1),
+    ),
+    '1099-MISC': _features(
+        ('miscellaneous information', 3), ('miscellaneous income', 3), ('1099-misc', 3),
+        ('rents', 1), ('royalties', 1), ('other income', 1), ('fishing boat proceeds', 1),
+        ('medical and health care payments', 1), ('crop insurance proceeds', 1),
+        ('gross proceeds paid to an attorney', 1),
+        ("payer's tin", 1), ("recipient's tin", 1), ('federal income tax withheld', 1),
+    ),
+}
+
+# Printed on IRS information returns in general, including forms this pipeline does not extract
+TAX_FORM_MARKERS = _features(
+    ('department of the treasury', 1), ('internal revenue service', 1), ('omb no. 1545', 1),
+    ('paperwork reduction act notice', 1), ('this information is being furnished to the internal revenue service', 1),
+)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+@dataclass
+class DocumentClassification:
+    """What an upload is, as judged from its content."""
+    document_type: Optional[str] = None  # 'W-2', '1099-INT', '1099-MISC', or None if not recognized
+    is_tax_form: Optional[bool] = None  # None when there was no text to judge from
+    confidence: float = 0.0
+    method: str = 'text_layer'  # 'text_layer', 'no_text_layer' or 'unreadable_pdf'
+    scores: Dict[str, int] = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def classify_text(text: str) -> DocumentClassification:
+    """Classify the text of a document's first page."""
+    text = _WHITESPACE_RE.sub(' ', text.replace('’', "'")).lower()
+    scores = {form: sum(weight for pattern, weight in features if pattern.search(text))
+              for form, features in FORM_FEATURES.items()}
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best_form, best), (_, runner_up) = ranked[0], ranked[1]
+    result = DocumentClassification(scores=scores)
+
+    if best >= MIN_TYPE_SCORE:
+        result.document_type, result.is_tax_form = best_form, True
+        result.confidence = round(min(1.0, (best - runner_up) / FULL_SCORE), 2)
+    elif best or any(pattern.search(text) for pattern, _ in TAX_FORM_MARKERS):
+        # A tax form, but not one of the supported types (or too little of it to tell which)
+        result.is_tax_form, result.confidence = True, 0.5
+    elif len(text) >= MIN_TEXT_CHARS:
+        result.is_tax_form, result.confidence = False, NOT_TAX_FORM_CONFIDENCE
+    return result
+
+
+def classify_document(pdf_bytes: bytes, s3_key: str) -> DocumentClassification:
+    """
+    Classify a PDF upload from the text layer of its first page.
+
+    Args:
+        pdf_bytes: The uploaded PDF
+        s3_key: Its S3 key (for logging)
+
+    Returns:
+        DocumentClassification; method tells whether there was text to judge from
+    """
+    import fitz  # PyMuPDF
+
+    started = time.perf_counter()
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+    except Exception as e:
+        logger.info(f"Classifier could not open {s3_key}: {e}")
+        result = DocumentClassification(method='unreadable_pdf')
+    else:
+        try:
+            text = doc[0].get_text('text') if doc.page_count else ''
+        finally:
+            doc.close()
+        result = classify_text(text) if text.strip() else DocumentClassification(method='no_text_layer')
+    result.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+class DocumentClassifierStats:
+    """Counters for classifier decisions and the Bedrock runs they changed or avoided."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_type: Dict[str, int] = {}
+        self.not_tax_form = 0
+        self.undecided = 0
+        self.type_corrections = 0
+        self.total_ms = 0.0
+
+    def record(self, classification: DocumentClassification, decided: bool, corrected: bool = False):
+        """Count one classification; `decided` if it was confident enough to act on."""
+        with self._lock:
+            self.total_ms += classification.elapsed_ms
+            if not decided:
+                self.undecided += 1
+            elif classification.is_tax_form is False:
+                self.not_tax_form += 1
+            else:
+                label = classification.document_type or 'other_tax_form'
+                self.by_type[label] = self.by_type.get(label, 0) + 1
+            self.type_corrections += int(corrected)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            classified = sum(self.by_type.values()) + self.not_tax_form + self.undecided
+            return {
+                'classified': classified,
+                'by_type': dict(self.by_type),
+                'not_tax_form': self.not_tax_form,
+                'undecided': self.undecided,
+                'type_corrections': self.type_corrections,
+                'avg_ms': self.total_ms / classified if classified else 0.0
+            }
+
+
+@lru_cache()
+def get_document_classifier_stats() -> DocumentClassifierStats:
+    """Get the process-wide document classifier counters."""
+    return DocumentClassifierStats()
@@ -0,0 +1,141 @@
+"""
+Form Fill Process Pool
+
+Fans batches of form fills out over a bounded pool of warm worker processes.
+Each worker builds one TaxFormFiller at start-up and keeps it for its lifetime,
+so the process-wide template cache and compiled fill plans stay hot across the
+fills it serves. PyMuPDF work therefore runs in parallel on separate cores
+instead of serializing on the API event loop.
+
+A second, plain pool finalizes single fills: the 'final' profile's
+garbage-collecting save holds the GIL for its whole run, which in a fill
+thread would stall the API event loop.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from province.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Per-worker filler, created once by _init_worker
+_worker_filler = None
+
+
+def _init_worker(warm_form_types: List[str]):
+    """Build the worker's filler and pre-load templates into its caches."""
+    global _worker_filler
+    from province.agents.tax.tools.form_filler import get_tax_form_filler, get_template_cache
+
+    _worker_filler = get_tax_form_filler()
+    for form_type in warm_form_types:
+        template_key = _worker_filler._get_template_path(form_type)
+        try:
+            get_template_cache().get(_worker_filler.s3_client, _worker_filler.templates_bucket, template_key)
+        except Exception as e:
+            # Warming is an optimization; the first fill will retry the download
+            logger.warning(f"Could not warm template {template_key} in worker {os.getpid()}: {e}")
+
+
+def _fill_in_worker(form_type: str, form_data: Dict[str, Any], user_id: Optional[str],
+                    skip_questions: bool) -> Dict[str, Any]:
+    """Run one fill inside a pool worker."""
+    global _worker_filler
+    if _worker_filler is None:
+        from province.agents.tax.tools.form_filler import get_tax_form_filler
+        _worker_filler = get_tax_form_filler()
+    return asyncio.run(
+        _worker_filler.fill_tax_form(form_type, form_data, user_id=user_id, skip_questions=skip_questions)
+    )
+
+
+@lru_cache()
+def get_fill_pool() -> ProcessPoolExecutor:
+    """Get the process-wide form fill pool, starting its workers on first use."""
+    settings = get_settings()
+    max_workers = settings.form_fill_pool_workers or os.cpu_count() or 1
+    warm_form_types = [f.strip() for f in settings.form_fill_pool_warm_forms.split(',') if f.strip()]
+    logger.info(f"Starting form fill pool with {max_workers} workers (warming {warm_form_types})")
+    # spawn avoids inheriting the API process's event loop and boto3 connection pools
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(warm_form_types,)
+    )
+
+
+def shutdown_fill_pool():
+    """Stop the pool's workers if the pool was ever started."""
+    if get_fill_pool.cache_info().currsize:
+        get_fill_pool().shutdown(wait=False, cancel_futures=True)
+        get_fill_pool.cache_clear()
+
+
+def in_fill_worker() -> bool:
+    """Whether this process is a fill pool worker (already off the API process)."""
+    return _worker_filler is not None
+
+
+@lru_cache()
+def get_finalize_pool() -> ProcessPoolExecutor:
+    """Get the process-wide pool that re-saves rendered PDFs with CPU-heavy output profiles."""
+    max_workers = get_settings().form_fill_finalize_workers or os.cpu_count() or 1
+    logger.info(f"Starting PDF finalize pool with {max_workers} workers")
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def shutdown_finalize_pool():
+    """Stop the finalize pool's workers if the pool was ever started."""
+    if get_finalize_pool.cache_info().currsize:
+        get_finalize_pool().shutdown(wait=False, cancel_futures=True)
+        get_finalize_pool.cache_clear()
+
+
+async def fill_forms_batch(items: List[Dict[str, Any]], skip_questions: bool = True,
+                           executor: Optional[Executor] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Fill many forms concurrently, yielding each result as soon as it completes.
+
+    Args:
+        items: Fill requests, each with form_type, form_data and optional user_id
+        skip_questions: Passed through to every fill (batch fills cannot ask questions)
+        executor: Executor to run fills on (defaults to the shared process pool)
+
+    Yields:
+        Per-item results tagged with the item's index in the request
+    """
+    executor = executor or get_fill_pool()
+    loop = asyncio.get_running_loop()
+
+    async def run_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.time()
+        try:
+            result = await loop.run_in_executor(
+                executor, _fill_in_worker,
+                item['form_type'], item.get('form_data', {}), item.get('user_id'), skip_questions
+            )
+        except Exception as e:
+            logger.error(f"Batch fill item {index} ({item.get('form_type')}) failed: {e}")
+            result = {'success': False, 'error': str(e), 'message': f"Failed to fill {item.get('form_type')} form"}
+        return {
+            'index': index,
+            'form_type': item['form_type'],
+            'duration_ms': round((time.time() - started) * 1000, 1),
+            **result
+        }
+
+    tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
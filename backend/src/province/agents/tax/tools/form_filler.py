@@ -5,23 +5,610 @@ AI-powered form filling using hybrid mapping (seed + agent) for precise field ma
 Supports conversational questions for missing critical fields.
 """
 
+import asyncio
+import functools
+import hashlib
 import json
 import logging
 import os
 import tempfile
+import threading
 import time
-import io
 import re
-from typing import Dict, Any, List, Optional
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
 import boto3
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
+from province.agents.tax.tools.fill_pool import get_finalize_pool, in_fill_worker
 from province.core.config import get_settings
+from province.core.mapping_artifacts import get_mapping_artifact
 
 logger = logging.getLogger(__name__)
 
+
+class TemplateCache:
+    """
+    Two-tier cache for blank PDF templates stored in S3.
+
+    Templates are held in an in-process LRU and mirrored to a local directory,
+    both keyed by (bucket, key) and the object's ETag. Within the TTL a cached
+    template is served without touching S3; after it expires the template is
+    revalidated with a conditional ``get_object(IfNoneMatch=etag)``, which
+    returns 304 with no body when the template is unchanged. Storing a new
+    ETag of a template deletes the file of the ETag it replaces, so the disk
+    tier holds one file per template.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: int = 3600, max_entries: int = 32):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, s3_client, bucket: str, key: str) -> bytes:
+        """Return template bytes, downloading or revalidating only when needed."""
+        cache_key = (bucket, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+
+        if entry is None:
+            entry = self._load_from_disk(bucket, key)
+
+        if entry is not None and time.time() - entry['validated_at'] < self.ttl_seconds:
+            self._record_hit(cache_key, entry)
+            return entry['data']
+
+        request = {'Bucket': bucket, 'Key': key}
+        if entry is not None:
+            request['IfNoneMatch'] = entry['etag']
+
+        try:
+            response = s3_client.get_object(**request)
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if entry is not None and (status == 304 or e.response.get('Error', {}).get('Code') in ('304', 'NotModified')):
+                entry['validated_at'] = time.time()
+                with self._lock:
+                    self.revalidations += 1
+                self._record_hit(cache_key, entry)
+                self._write_to_disk(bucket, key, entry, write_data=False)
+                logger.info(f"Template unchanged (304): {key}")
+                return entry['data']
+            raise
+
+        data = response['Body'].read()
+        entry = {
+            'etag': response.get('ETag', ''),
+            'data': data,
+            'validated_at': time.time()
+        }
+        with self._lock:
+            self.misses += 1
+            self._store(cache_key, entry)
+        self._write_to_disk(bucket, key, entry)
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/bytes-saved counters for monitoring."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'bytes_saved': self.bytes_saved,
+                'entries': len(self._entries)
+            }
+
+    def clear(self, include_disk: bool = False):
+        """Drop all in-memory entries (and optionally the on-disk store)."""
+        with self._lock:
+            self._entries.clear()
+        if include_disk:
+            for name in os.listdir(self.cache_dir):
+                try:
+                    os.unlink(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _record_hit(self, cache_key: Tuple[str, str], entry: Dict[str, Any]):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(entry['data'])
+            self._store(cache_key, entry)
+
+    def _store(self, cache_key: Tuple[str, str], entry: Dict[str, Any]):
+        # Caller holds self._lock
+        self._entries[cache_key] = entry
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _paths(self, bucket: str, key: str, etag: str = "") -> Tuple[str, str]:
+        key_hash = hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest()
+        index_path = os.path.join(self.cache_dir, f"{key_hash}.json")
+        etag_hash = hashlib.sha256(f"{bucket}/{key}@{etag}".encode()).hexdigest()
+        data_path = os.path.join(self.cache_dir, f"{etag_hash}.pdf")
+        return index_path, data_path
+
+    def _load_from_disk(self, bucket: str, key: str) -> Optional[Dict[str, Any]]:
+        index_path, _ = self._paths(bucket, key)
+        try:
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            _, data_path = self._paths(bucket, key, index['etag'])
+            with open(data_path, 'rb') as f:
+                data = f.read()
+            return {'etag': index['etag'], 'data': data, 'validated_at': index['validated_at']}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_to_disk(self, bucket: str, key: str, entry: Dict[str, Any], write_data: bool = True):
+        index_path, data_path = self._paths(bucket, key, entry['etag'])
+        superseded_path = None
+        try:
+            if write_data:
+                try:
+                    with open(index_path, 'r') as f:
+                        previous_etag = json.load(f)['etag']
+                    if previous_etag != entry['etag']:
+                        superseded_path = self._paths(bucket, key, previous_etag)[1]
+                except (OSError, ValueError, KeyError):
+                    pass
+                tmp_path = f"{data_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(entry['data'])
+                os.replace(tmp_path, data_path)
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'bucket': bucket, 'key': key, 'etag': entry['etag'],
+                           'validated_at': entry['validated_at']}, f)
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            # The disk tier is best-effort; the in-memory tier still works
+            logger.warning(f"Could not write template cache for {key}: {e}")
+            return
+        if superseded_path:
+            try:
+                os.unlink(superseded_path)
+            except OSError:
+                pass  # already removed by another process sharing the directory
+
+
+@lru_cache()
+def get_template_cache() -> TemplateCache:
+    """Get the process-wide template cache."""
+    settings = get_settings()
+    cache_dir = settings.template_cache_dir or os.path.join(tempfile.gettempdir(), 'province-template-cache')
+    return TemplateCache(
+        cache_dir=cache_dir,
+        ttl_seconds=settings.template_cache_ttl_seconds,
+        max_entries=settings.template_cache_max_entries
+    )
+
+
+@lru_cache()
+def get_fill_executor() -> ThreadPoolExecutor:
+    """Get the thread pool that runs blocking boto3 and PyMuPDF calls for fills."""
+    return ThreadPoolExecutor(
+        max_workers=get_settings().form_fill_io_threads,
+        thread_name_prefix='form-fill'
+    )
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the fill executor so the event loop stays responsive."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_fill_executor(), functools.partial(func, *args, **kwargs))
+
+
+class ThreadLocalTable:
+    """
+    DynamoDB table handle that gives each calling thread its own boto3 resource.
+
+    boto3 resources are not thread-safe (clients are), and run_blocking spreads
+    one filler's table calls over the fill executor's threads. The Table is
+    looked up when a method is called, on the thread that calls it, so bound
+    methods such as `run_blocking(table.query, ...)` are safe.
+    """
+
+    def __init__(self, table_name: str, **resource_kwargs):
+        self.name = table_name
+        self._resource_kwargs = resource_kwargs
+        self._local = threading.local()
+
+    def _table(self):
+        table = getattr(self._local, 'table', None)
+        if table is None:
+            table = self._local.table = boto3.resource('dynamodb', **self._resource_kwargs).Table(self.name)
+        return table
+
+    def get_item(self, **kwargs):
+        return self._table().get_item(**kwargs)
+
+    def put_item(self, **kwargs):
+        return self._table().put_item(**kwargs)
+
+    def update_item(self, **kwargs):
+        return self._table().update_item(**kwargs)
+
+    def query(self, **kwargs):
+        return self._table().query(**kwargs)
+
+
+# One semaphore per event loop (the fill pool workers run a fresh loop per fill)
+_fill_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_fill_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent render+upload work on the running loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _fill_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_settings().form_fill_max_concurrency)
+        _fill_semaphores[loop] = semaphore
+    return semaphore
+
+
+def flatten_hybrid_mapping(hybrid_mapping: Dict[str, Any]) -> Dict[str, str]:
+    """Flatten a sectioned or flat hybrid mapping into {semantic_name: pdf_field_path}."""
+    flat_mapping = {}
+    
+    # Check if this is a flat mapping (fields at top level) or sectioned (fields nested in sections)
+    sample_key = list(hybrid_mapping.keys())[0] if hybrid_mapping else None
+    is_flat = sample_key and isinstance(hybrid_mapping[sample_key], dict) and 'pdf_field_path' in hybrid_mapping[sample_key]
+    
+    if is_flat:
+        # Flat mapping: {field_name: {semantic_name, pdf_field_path, section}}
+        for field_name, field_data in hybrid_mapping.items():
+            if isinstance(field_data, dict) and 'pdf_field_path' in field_data:
+                flat_mapping[field_name] = field_data['pdf_field_path']
+            elif isinstance(field_data, str):
+                flat_mapping[field_name] = field_data
+    else:
+        # Sectioned mapping: {section: {field_name: pdf_path or {pdf_field_path: ...}}}
+        for section, fields in hybrid_mapping.items():
+            if isinstance(fields, dict) and section != 'form_metadata':
+                for field_name, field_value in fields.items():
+                    if isinstance(field_value, str):
+                        flat_mapping[field_name] = field_value
+                    elif isinstance(field_value, dict) and 'pdf_field_path' in field_value:
+                        flat_mapping[field_name] = field_value['pdf_field_path']
+    
+    return flat_mapping
+
+
+def compile_fill_plan(hybrid_mapping: Dict[str, Any], doc) -> Dict[str, Tuple[str, int]]:
+    """
+    Compile a hybrid mapping against a template into a fill plan.
+    
+    Returns {normalized PDF field path: (semantic name, widget type)} for every
+    widget in the template that the mapping covers. When several semantic names
+    point at the same path the first one in mapping order wins.
+    """
+    path_to_semantic: Dict[str, str] = {}
+    for semantic_name, pdf_path in flatten_hybrid_mapping(hybrid_mapping).items():
+        if isinstance(pdf_path, str):
+            path_to_semantic.setdefault(pdf_path.strip(), semantic_name)
+    
+    fill_plan: Dict[str, Tuple[str, int]] = {}
+    for page in doc:
+        for widget in page.widgets():
+            if not widget.field_name:
+                continue
+            normalized = widget.field_name.strip()
+            semantic_name = path_to_semantic.get(normalized)
+            if semantic_name is not None:
+                fill_plan[normalized] = (semantic_name, widget.field_type)
+    
+    logger.info(f"Compiled fill plan: {len(fill_plan)}/{len(path_to_semantic)} mapped paths present in template")
+    return fill_plan
+
+
+class MappingCache:
+    """
+    Process-wide cache of hybrid mappings keyed by (form_type, tax_year).
+    
+    Each entry holds the Decimal-free mapping, its version stamp and the fill plan
+    compiled from it. Entries are served without touching DynamoDB for ttl_seconds;
+    after that the caller checks the row's version stamp (a projected read) and only
+    reloads the full mapping when the stamp changed or max_age_seconds has passed.
+    Decoded S3 mapping artifacts are also kept in a small LRU by content hash, so a
+    new stamp pointing at unchanged content does not download it again.
+    Cached mappings are shared between fills and must be treated as read-only.
+    """
+    
+    def __init__(self, ttl_seconds: int = 60, max_age_seconds: int = 900, max_artifacts: int = 32):
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_artifacts = max_artifacts
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._artifacts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.artifact_hits = 0
+    
+    def get(self, form_type: str, tax_year: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for (form_type, tax_year), fresh or stale, or None."""
+        with self._lock:
+            return self._entries.get((form_type, str(tax_year)))
+    
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry['validated_at'] < self.ttl_seconds
+    
+    def is_expired(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry['loaded_at'] >= self.max_age_seconds
+    
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+    
+    def touch(self, entry: Dict[str, Any]):
+        """Mark a stale entry as revalidated (its version stamp is unchanged)."""
+        with self._lock:
+            entry['validated_at'] = time.time()
+            self.revalidations += 1
+            self.hits += 1
+    
+    def put(self, form_type: str, tax_year: str, mapping: Dict[str, Any], version: str,
+            fill_plan: Optional[Dict[str, Tuple[str, int]]] = None) -> Dict[str, Any]:
+        now = time.time()
+        entry = {
+            'mapping': mapping,
+            'version': version,
+            'fill_plan': fill_plan,
+            'loaded_at': now,
+            'validated_at': now
+        }
+        with self._lock:
+            self._entries[(form_type, str(tax_year))] = entry
+            self.misses += 1
+        return entry
+    
+    def fill_plan(self, plan_key: Tuple[str, str, str], hybrid_mapping: Dict[str, Any], doc) -> Dict[str, Tuple[str, int]]:
+        """Get the compiled fill plan for (form_type, tax_year, version), compiling it once per version."""
+        form_type, tax_year, version = plan_key
+        entry = self.get(form_type, tax_year)
+        if entry is None or entry['version'] != version:
+            entry = self.put(form_type, tax_year, hybrid_mapping, version)
+        if entry['fill_plan'] is None:
+            entry['fill_plan'] = compile_fill_plan(hybrid_mapping, doc)
+        return entry['fill_plan']
+    
+    def get_artifact(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Return the decoded artifact with this content hash, or None."""
+        with self._lock:
+            artifact = self._artifacts.get(sha256)
+            if artifact is not None:
+                self._artifacts.move_to_end(sha256)
+                self.artifact_hits += 1
+            return artifact
+    
+    def put_artifact(self, sha256: str, artifact: Dict[str, Any]):
+        with self._lock:
+            self._artifacts[sha256] = artifact
+            self._artifacts.move_to_end(sha256)
+            while len(self._artifacts) > self.max_artifacts:
+                self._artifacts.popitem(last=False)
+    
+    def invalidate(self, form_type: Optional[str] = None, tax_year: Optional[str] = None):
+        """Drop one entry, or everything (including artifacts) when called without arguments."""
+        with self._lock:
+            if form_type is None:
+                self._entries.clear()
+                self._artifacts.clear()
+            else:
+                self._entries.pop((form_type, str(tax_year)), None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'entries': len(self._entries),
+                'artifact_hits': self.artifact_hits,
+                'artifacts': len(self._artifacts)
+            }
+
+
+@lru_cache()
+def get_mapping_cache() -> MappingCache:
+    """Get the process-wide hybrid mapping cache."""
+    settings = get_settings()
+    return MappingCache(
+        ttl_seconds=settings.mapping_cache_ttl_seconds,
+        max_age_seconds=settings.mapping_cache_max_age_seconds
+    )
+
+
+def get_fill_plan(plan_key: Tuple[str, str, str], hybrid_mapping: Dict[str, Any], doc) -> Dict[str, Tuple[str, int]]:
+    """Get the compiled fill plan for (form_type, tax_year, mapping_version), compiling it once."""
+    return get_mapping_cache().fill_plan(plan_key, hybrid_mapping, doc)
+
+
+def mapping_version_of(item: Dict[str, Any], mapping_json: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve the version stamp of a form-mappings row.
+    
+    Prefers the mapping_version written by FormTemplateProcessor.save_mapping, then
+    the generation timestamp, then (when the full mapping was read) a content hash.
+    """
+    if item.get('mapping_version'):
+        return str(item['mapping_version'])
+    generated_at = (item.get('metadata') or {}).get('generated_at')
+    if generated_at:
+        return str(generated_at)
+    if mapping_json is not None:
+        return hashlib.sha256(mapping_json.encode()).hexdigest()[:16]
+    return None
+
+
+# Sort key of the per-document head row in the versions table (version rows are 'vNNN')
+LATEST_VERSION_KEY = 'latest'
+# Versioned PDF file names: vNNN_<form>_<timestamp>.pdf (attachments live in vNNN/ folders)
+VERSION_FILE_PATTERN = re.compile(r'^v(\d+)_')
+# Versions table index on (document_id, version_number): 'vNNN' keys sort as strings, so
+# 'v999' would come after 'v1000' in the table itself
+VERSION_NUMBER_INDEX = 'document-version-number-index'
+
+
+def fill_input_hash(form_type: str, mapping_version: Optional[str], form_data: Dict[str, Any],
+                    output_profile: str = 'standard') -> str:
+    """
+    Hash the normalized inputs of a fill.
+
+    Two fills with the same hash render byte-identical PDFs (same template, same
+    mapping version, same values, same output profile), so the second one can
+    reuse the first's output.
+    """
+    canonical = json.dumps(
+        {'form_type': form_type.upper(), 'mapping_version': mapping_version or '', 'form_data': form_data,
+         'output_profile': output_profile},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# Save options per output profile:
+#   standard    - full rewrite, streams deflated (the historical behaviour)
+#   incremental - append only the changed widget objects to the template; fastest, for previews
+#   final       - garbage-collect, clean and compress into object streams; smallest, for archiving
+#   flattened   - bake field values into page content (no editable fields), for print/e-delivery
+PDF_OUTPUT_PROFILES: Dict[str, Dict[str, Any]] = {
+    'standard': {'deflate': True},
+    'incremental': {'incremental': True, 'encryption': 0},
+    'final': {'garbage': 4, 'deflate': True, 'clean': True, 'use_objstms': 1},
+    'flattened': {'garbage': 3, 'deflate': True},
+}
+
+# Profiles rendered as 'standard' on a fill thread and re-saved by finalize_pdf in
+# the finalize pool: their garbage-collecting save holds the GIL throughout
+PROCESS_FINALIZED_PROFILES = frozenset({'final'})
+
+
+def open_pdf_for_profile(pdf_data: bytes, profile: str):
+    """
+    Open template bytes for filling with the given output profile.
+
+    Incremental saves must append to a file, so for that profile the template is
+    written to a temp file first; save_pdf_with_profile removes it.
+    """
+    import fitz  # PyMuPDF
+
+    if profile not in PDF_OUTPUT_PROFILES:
+        raise ValueError(f"Unknown PDF output profile '{profile}' (expected one of {sorted(PDF_OUTPUT_PROFILES)})")
+    if profile != 'incremental':
+        return fitz.open(stream=pdf_data, filetype='pdf')
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+        temp_file.write(pdf_data)
+    return fitz.open(temp_file.name)
+
+
+def save_pdf_with_profile(doc, profile: str) -> bytes:
+    """Serialize a filled document with the given output profile and close it."""
+    try:
+        if profile == 'incremental':
+            doc.save(doc.name, **PDF_OUTPUT_PROFILES[profile])
+            with open(doc.name, 'rb') as f:
+                return f.read()
+        if profile == 'flattened':
+            doc.bake()
+        return doc.tobytes(**PDF_OUTPUT_PROFILES[profile])
+    finally:
+        path = doc.name if profile == 'incremental' else None
+        doc.close()
+        if path:
+            os.unlink(path)
+
+
+def discard_pdf(doc):
+    """Close a document opened by open_pdf_for_profile without saving it."""
+    path = doc.name if doc.name and os.path.exists(doc.name) else None
+    doc.close()
+    if path:
+        os.unlink(path)
+
+
+def rasterize_pdf_page(pdf_bytes: bytes, page_number: int, dpi: int = 72) -> bytes:
+    """Render one page (1-based) of a PDF to PNG bytes, e.g. for a preview thumbnail."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        if not 1 <= page_number <= doc.page_count:
+            raise ValueError(f"Page {page_number} is out of range (document has {doc.page_count} pages)")
+        return doc[page_number - 1].get_pixmap(dpi=dpi).tobytes("png")
+    finally:
+        doc.close()
+
+
+def resave_pdf(pdf_bytes: bytes, output_profile: str = 'standard') -> bytes:
+    """
+    Re-serialize a rendered PDF with another output profile.
+
+    Used to store a preview (rendered incremental, i.e. the whole template plus
+    an appended update) in the stored-fill profile. There is no template file to
+    append to, so the incremental profile saves as standard.
+    """
+    doc = open_pdf_for_profile(pdf_bytes, 'standard')
+    return save_pdf_with_profile(doc, 'standard' if output_profile == 'incremental' else output_profile)
+
+
+async def finalize_pdf(pdf_bytes: bytes, output_profile: str) -> bytes:
+    """
+    Re-save a rendered PDF with output_profile without stalling the event loop.
+
+    PROCESS_FINALIZED_PROFILES run in the finalize pool, whose processes have
+    their own GIL; other profiles, and every profile inside a fill pool worker
+    (already off the API process), run on a fill thread.
+    """
+    if output_profile not in PROCESS_FINALIZED_PROFILES or in_fill_worker():
+        return await run_blocking(resave_pdf, pdf_bytes, output_profile)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_finalize_pool(), resave_pdf, pdf_bytes, output_profile)
+
+
+def merge_pdfs(pdfs: List[bytes], output_profile: str = 'standard') -> bytes:
+    """
+    Concatenate filled PDFs into one document, keeping their form fields.
+
+    Forms sharing field names (IRS schedules reuse f1_01 etc.) get their
+    duplicates renamed by PyMuPDF so each keeps its own value. A new document
+    has nothing to append to, so the incremental profile saves as standard.
+    """
+    import fitz  # PyMuPDF
+
+    merged = fitz.open()
+    try:
+        for pdf in pdfs:
+            src = fitz.open(stream=pdf, filetype="pdf")
+            try:
+                merged.insert_pdf(src)
+            finally:
+                src.close()
+    except Exception:
+        merged.close()
+        raise
+    return save_pdf_with_profile(merged, 'standard' if output_profile == 'incremental' else output_profile)
+
+
 class TaxFormFiller:
     """AI-powered tax form filling with hybrid mapping and conversational questions."""
     
@@ -39,37 +626,80 @@ class TaxFormFiller:
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
         )
-        self.dynamodb = boto3.resource(
-            'dynamodb',
-            region_name=self.settings.aws_region,
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
+        dynamodb_kwargs = {
+            'region_name': self.settings.aws_region,
+            'aws_access_key_id': os.getenv('AWS_ACCESS_KEY_ID'),
+            'aws_secret_access_key': os.getenv('AWS_SECRET_ACCESS_KEY')
+        }
         self.templates_bucket = self.settings.templates_bucket_name
         self.documents_bucket = self.settings.documents_bucket_name
-        self.mappings_table = self.dynamodb.Table(os.getenv('FORM_MAPPINGS_TABLE_NAME', 'province-form-mappings'))
+        # One resource per thread: fills run these tables' calls on the fill executor
+        self.mappings_table = ThreadLocalTable(os.getenv('FORM_MAPPINGS_TABLE_NAME', 'province-form-mappings'),
+                                               **dynamodb_kwargs)
+        self.versions_table = ThreadLocalTable(os.getenv('DOCUMENT_VERSIONS_TABLE_NAME', 'province-document-versions'),
+                                               **dynamodb_kwargs)
 
     def _get_hybrid_mapping(self, form_type: str, tax_year: str = "2024") -> Optional[Dict[str, Any]]:
         """Load hybrid mapping from DynamoDB."""
+        return self._load_hybrid_mapping(form_type, tax_year)[0]
+
+    def _load_hybrid_mapping(self, form_type: str, tax_year: str = "2024") -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Load hybrid mapping and its version stamp, served from the mapping cache when current."""
         try:
             # Ensure tax_year is a string
             tax_year_str = str(tax_year)
+            cache = get_mapping_cache()
+            entry = cache.get(form_type, tax_year_str)
+            
+            if entry is not None and not cache.is_expired(entry):
+                if cache.is_fresh(entry):
+                    cache.record_hit()
+                    return entry['mapping'], entry['version']
+                
+                # Stale: compare version stamps without reading the whole mapping
+                response = self.mappings_table.get_item(
+                    Key={'form_type': form_type, 'tax_year': tax_year_str},
+                    ProjectionExpression='mapping_version, #md.generated_at',
+                    ExpressionAttributeNames={'#md': 'metadata'}
+                )
+                stamp = mapping_version_of(response.get('Item') or {})
+                if stamp is not None and stamp == entry['version']:
+                    cache.touch(entry)
+                    return entry['mapping'], entry['version']
+            
             logger.info(f"Loading mapping for form_type={form_type}, tax_year={tax_year_str}")
             
+            # Pointer rows reference an S3 artifact; legacy rows hold the mapping inline
             response = self.mappings_table.get_item(
-                Key={'form_type': form_type, 'tax_year': tax_year_str}
+                Key={'form_type': form_type, 'tax_year': tax_year_str},
+                ProjectionExpression='#m, mapping_artifact, mapping_version, #md.generated_at',
+                ExpressionAttributeNames={'#m': 'mapping', '#md': 'metadata'}
             )
             item = response.get('Item')
+            if item and item.get('mapping_artifact'):
+                pointer = item['mapping_artifact']
+                artifact = cache.get_artifact(pointer['sha256'])
+                if artifact is None:
+                    artifact = get_mapping_artifact(self.s3_client, pointer)
+                    cache.put_artifact(pointer['sha256'], artifact)
+                version = mapping_version_of(item) or pointer['sha256'][:16]
+                cache.put(form_type, tax_year_str, artifact['mapping'], version, fill_plan=artifact['fill_plan'])
+                return artifact['mapping'], version
             if item:
                 def convert_decimal(obj):
                     if isinstance(obj, Decimal):
                         return float(obj)
                     raise TypeError
-                return json.loads(json.dumps(item['mapping'], default=convert_decimal))
-            return None
+                mapping_json = json.dumps(item['mapping'], default=convert_decimal)
+                mapping = json.loads(mapping_json)
+                version = mapping_version_of(item, mapping_json)
+                cache.put(form_type, tax_year_str, mapping, version)
+                return mapping, version
+            cache.invalidate(form_type, tax_year_str)
+            return None, None
         except Exception as e:
             logger.error(f"Error loading hybrid mapping: {e}")
-            return None
+            return None, None
     
     def _get_field_metadata(self) -> Dict[str, Dict[str, Any]]:
         """Get metadata about form fields including descriptions and requirements."""
@@ -265,7 +895,7 @@ class TaxFormFiller:
             logger.error(traceback.format_exc())
             return {"needs_input": False, "ready_to_fill": True, "questions": []}
     
-    async def fill_tax_form(self, form_type: str, form_data: Dict[str, Any], user_responses: Optional[Dict[str, Any]] = None, user_id: Optional[str] = None, skip_questions: bool = False) -> Dict[str, Any]:
+    async def fill_tax_form(self, form_type: str, form_data: Dict[str, Any], user_responses: Optional[Dict[str, Any]] = None, user_id: Optional[str] = None, skip_questions: bool = False, output_profile: Optional[str] = None) -> Dict[str, Any]:
         """
         Fill tax form using AI reasoning and hybrid mapping.
         
@@ -275,6 +905,7 @@ class TaxFormFiller:
             user_responses: Optional responses to questions
             user_id: Optional Clerk user ID for PII-safe storage
             skip_questions: If True, skip the Q&A and fill with available data
+            output_profile: PDF output profile (defaults to settings.form_fill_output_profile)
             
         Returns:
             Dict with filled form URL, questions, or metadata
@@ -287,7 +918,7 @@ class TaxFormFiller:
             form_type_upper = form_type.upper()
             mapping_key = 'F1040' if '1040' in form_type_upper else form_type_upper
             
-            hybrid_mapping = self._get_hybrid_mapping(mapping_key, tax_year)
+            hybrid_mapping, mapping_version = await run_blocking(self._load_hybrid_mapping, mapping_key, tax_year)
             if not hybrid_mapping:
                 logger.warning("No hybrid mapping found, falling back to legacy method")
                 return await self._legacy_fill(form_type, form_data)
@@ -345,30 +976,64 @@ class TaxFormFiller:
                 
                 form_data = {**form_data, **processed_responses}
             
-            # 4. Download template
-            template_key = self._get_template_path(form_type)
-            template_data = await self._download_pdf_template(template_key)
-            
-            # 5. Fill using hybrid mapping
-            filled_pdf_bytes = self._fill_pdf_with_hybrid_mapping(template_data, form_data, hybrid_mapping)
-            
-            # Upload the filled form with versioning (use user_id for path, keep name in metadata)
+            # Identical inputs to the latest version render an identical PDF; reuse it
             final_user_id = user_id or form_data.get('user_id') or 'UNKNOWN_USER'
-            logger.info(f"🔑 Uploading filled form with user_id: {final_user_id} (passed user_id: {user_id})")
-            upload_result = await self._upload_filled_pdf_with_versioning(
-                file_content=filled_pdf_bytes,
-                form_type=form_type,
-                tax_year=form_data.get('tax_year', 2024),
-                metadata={
-                    'form_type': form_type,
-                    'tax_year': str(form_data.get('tax_year', 2024)),
-                    'filled_by': 'tax_form_filler_tool',
-                    'filling_method': 'pymupdf_dynamic_mapping',
-                    'fields_filled': str(len(form_data)),
-                    'taxpayer_name': form_data.get('taxpayer_name', 'Unknown')
-                },
-                taxpayer_id=final_user_id
+            output_profile = output_profile or self.settings.form_fill_output_profile
+            input_hash = fill_input_hash(form_type, mapping_version, form_data, output_profile)
+            unchanged = await self._find_unchanged_version(
+                self.build_document_id(final_user_id, form_type, form_data.get('tax_year', 2024)), input_hash
             )
+            if unchanged:
+                logger.info(f"⏩ Inputs unchanged since {unchanged['version']}, skipping render and upload")
+                return {
+                    'success': True,
+                    'filled_form_url': unchanged['download_url'],
+                    'form_type': form_type,
+                    'tax_year': form_data.get('tax_year', 2024),
+                    'fields_filled': len(form_data),
+                    'file_size': unchanged['size'],
+                    'unchanged': True,
+                    'message': f'Form {form_type} unchanged since {unchanged["version"]}',
+                    'versioning': {
+                        'document_id': unchanged['document_id'],
+                        'version': unchanged['version'],
+                        'is_new_document': False,
+                        'total_versions': unchanged['total_versions'],
+                        'previous_versions': unchanged['previous_versions'],
+                        'noop_hits': unchanged['noop_hits']
+                    }
+                }
+
+            # Bound concurrent renders/uploads; waiting here does not block the loop
+            async with get_fill_semaphore():
+                # 4. Download template
+                template_key = self._get_template_path(form_type)
+                template_data = await self._download_pdf_template(template_key)
+            
+                # 5. Fill using hybrid mapping
+                filled_pdf_bytes = await self._fill_with_profile(
+                    template_data, form_data, hybrid_mapping,
+                    (mapping_key, str(tax_year), mapping_version), output_profile
+                )
+            
+                # Upload the filled form with versioning (use user_id for path, keep name in metadata)
+                logger.info(f"🔑 Uploading filled form with user_id: {final_user_id} (passed user_id: {user_id})")
+                upload_result = await self._upload_filled_pdf_with_versioning(
+                    file_content=filled_pdf_bytes,
+                    form_type=form_type,
+                    tax_year=form_data.get('tax_year', 2024),
+                    metadata={
+                        'form_type': form_type,
+                        'tax_year': str(form_data.get('tax_year', 2024)),
+                        'filled_by': 'tax_form_filler_tool',
+                        'filling_method': 'pymupdf_dynamic_mapping',
+                        'output_profile': output_profile,
+                        'fields_filled': str(len(form_data)),
+                        'taxpayer_name': form_data.get('taxpayer_name', 'Unknown')
+                    },
+                    taxpayer_id=final_user_id,
+                    input_hash=input_hash
+                )
             
             logger.info(f"Successfully filled {form_type} form")
             
@@ -379,6 +1044,7 @@ class TaxFormFiller:
                 'tax_year': form_data.get('tax_year', 2024),
                 'fields_filled': len(form_data),
                 'file_size': len(filled_pdf_bytes),
+                'unchanged': False,
                 'message': f'Form {form_type} filled successfully with dynamic mapping',
                 'versioning': {
                     'document_id': upload_result['document_id'],
@@ -397,6 +1063,182 @@ class TaxFormFiller:
                 'message': f'Failed to fill {form_type} form'
             }
 
+    async def fill_tax_package(self, form_types: List[str], form_data: Dict[str, Any],
+                               user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fill a multi-form return package in one pass.
+        
+        Every form is rendered concurrently from the same data dict through the shared
+        template and mapping caches. The merged PDF and the individual forms are then
+        uploaded together as a single version of the package document.
+        
+        Args:
+            form_types: Forms in the package, in merge order (e.g. 1040, SCHEDULE_C, STATE_CA)
+            form_data: Semantic field values shared by all forms
+            user_id: Optional Clerk user ID for PII-safe storage
+            
+        Returns:
+            Dict with the merged package URL, per-form URLs and versioning info
+        """
+        form_types = list(dict.fromkeys(f.upper() for f in form_types))
+        try:
+            if not form_types:
+                raise ValueError("A package needs at least one form type")
+            logger.info(f"📦 Filling package of {len(form_types)} forms: {form_types}")
+            
+            output_profile = self.settings.form_fill_package_output_profile
+            rendered = await asyncio.gather(
+                *[self._render_form(form_type, form_data, output_profile) for form_type in form_types],
+                return_exceptions=True
+            )
+            failed = {f: str(r) for f, r in zip(form_types, rendered) if isinstance(r, Exception)}
+            if failed:
+                return {
+                    'success': False,
+                    'error': '; '.join(f"{f}: {e}" for f, e in failed.items()),
+                    'failed_forms': failed,
+                    'message': f"Failed to fill {len(failed)} of {len(form_types)} package forms"
+                }
+            
+            forms = {form_type: pdf for form_type, (pdf, _) in zip(form_types, rendered)}
+            merged_pdf = await run_blocking(merge_pdfs, list(forms.values()), output_profile)
+            tax_year = form_data.get('tax_year', 2024)
+            
+            upload_result = await self._upload_filled_pdf_with_versioning(
+                file_content=merged_pdf,
+                form_type='PACKAGE',
+                tax_year=tax_year,
+                metadata={
+                    'form_type': 'PACKAGE',
+                    'forms': ','.join(form_types),
+                    'tax_year': str(tax_year),
+                    'filled_by': 'tax_form_filler_tool',
+                    'filling_method': 'pymupdf_package',
+                    'output_profile': output_profile,
+                    'fields_filled': str(len(form_data))
+                },
+                taxpayer_id=user_id or form_data.get('user_id') or 'UNKNOWN_USER',
+                attachments=forms
+            )
+            
+            return {
+                'success': True,
+                'filled_form_url': upload_result['download_url'],
+                'form_types': form_types,
+                'tax_year': tax_year,
+                'file_size': len(merged_pdf),
+                'forms': {
+                    form_type: {**upload_result['attachments'][form_type], 'file_size': len(pdf)}
+                    for form_type, pdf in forms.items()
+                },
+                'message': f"Package of {len(form_types)} forms filled successfully",
+                'versioning': {
+                    'document_id': upload_result['document_id'],
+                    'version': upload_result['version'],
+                    'is_new_document': upload_result['is_new_document'],
+                    'total_versions': upload_result['total_versions'],
+                    'previous_versions': upload_result['previous_versions']
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error filling package {form_types}: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': 'Failed to fill form package'
+            }
+
+    async def render_preview(self, form_type: str, form_data: Dict[str, Any],
+                             output_profile: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """
+        Fill a form in memory for a live preview, without uploading or versioning it.
+        
+        Args:
+            form_type: Type of form (1040, SCHEDULE_C, etc.)
+            form_data: Semantic field values
+            output_profile: PDF output profile (defaults to settings.form_fill_preview_output_profile)
+            
+        Returns:
+            Tuple of (filled PDF bytes, mapping version used)
+        """
+        return await self._render_form(form_type.upper(), form_data,
+                                       output_profile or self.settings.form_fill_preview_output_profile)
+
+    async def commit_rendered_form(self, form_type: str, form_data: Dict[str, Any], pdf_bytes: bytes,
+                                   mapping_version: Optional[str], user_id: Optional[str] = None,
+                                   output_profile: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Persist an already-rendered preview as a new version of the form.
+        
+        The preview is re-saved with output_profile (defaults to
+        settings.form_fill_output_profile) before upload, so stored versions never
+        carry a preview's incremental-save overhead. Skips the upload when the
+        latest version was filled from the same inputs.
+        
+        Returns:
+            Versioning info for the stored (or reused) version
+        """
+        output_profile = output_profile or self.settings.form_fill_output_profile
+        final_user_id = user_id or form_data.get('user_id') or 'UNKNOWN_USER'
+        tax_year = form_data.get('tax_year', 2024)
+        input_hash = fill_input_hash(form_type, mapping_version, form_data, output_profile)
+        
+        unchanged = await self._find_unchanged_version(
+            self.build_document_id(final_user_id, form_type, tax_year), input_hash
+        )
+        if unchanged:
+            logger.info(f"⏩ Preview commit unchanged since {unchanged['version']}, not uploading")
+            return {'unchanged': True, **unchanged}
+        
+        pdf_bytes = await finalize_pdf(pdf_bytes, output_profile)
+        upload_result = await self._upload_filled_pdf_with_versioning(
+            file_content=pdf_bytes,
+            form_type=form_type,
+            tax_year=tax_year,
+            metadata={
+                'form_type': form_type,
+                'tax_year': str(tax_year),
+                'filled_by': 'tax_form_filler_preview',
+                'filling_method': 'pymupdf_dynamic_mapping',
+                'output_profile': output_profile,
+                'fields_filled': str(len(form_data)),
+                'taxpayer_name': form_data.get('taxpayer_name', 'Unknown')
+            },
+            taxpayer_id=final_user_id,
+            input_hash=input_hash
+        )
+        return {'unchanged': False, **upload_result}
+
+    async def _render_form(self, form_type: str, form_data: Dict[str, Any],
+                           output_profile: str = 'standard') -> Tuple[bytes, Optional[str]]:
+        """Render one form with its hybrid mapping (legacy fill when it has none)."""
+        tax_year = form_data.get('tax_year', '2024')
+        mapping_key = 'F1040' if '1040' in form_type else form_type
+        hybrid_mapping, mapping_version = await run_blocking(self._load_hybrid_mapping, mapping_key, tax_year)
+        
+        async with get_fill_semaphore():
+            template_data = await self._download_pdf_template(self._get_template_path(form_type))
+            if not hybrid_mapping:
+                logger.warning(f"No hybrid mapping for {form_type}, using legacy fill")
+                return await run_blocking(self._fill_pdf_with_pymupdf_legacy, template_data, form_data), None
+            pdf_bytes = await self._fill_with_profile(
+                template_data, form_data, hybrid_mapping,
+                (mapping_key, str(tax_year), mapping_version), output_profile
+            )
+            return pdf_bytes, mapping_version
+
+    async def _fill_with_profile(self, template_data: bytes, form_data: Dict[str, Any],
+                                 hybrid_mapping: Dict[str, Any], plan_key: Tuple[str, str, str],
+                                 output_profile: str) -> bytes:
+        """Fill on a fill thread; PROCESS_FINALIZED_PROFILES are then re-saved by finalize_pdf."""
+        if output_profile not in PROCESS_FINALIZED_PROFILES:
+            return await run_blocking(self._fill_pdf_with_hybrid_mapping, template_data, form_data,
+                                      hybrid_mapping, plan_key=plan_key, output_profile=output_profile)
+        pdf_bytes = await run_blocking(self._fill_pdf_with_hybrid_mapping, template_data, form_data,
+                                       hybrid_mapping, plan_key=plan_key, output_profile='standard')
+        return await finalize_pdf(pdf_bytes, output_profile)
+
     async def fill_1040_form(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Fill a 1040 tax form with provided data (legacy method).
@@ -436,51 +1278,41 @@ class TaxFormFiller:
         
         return template_paths.get(form_type.upper(), 'tax_forms/2024/f1040.pdf')
 
-    def _fill_pdf_with_hybrid_mapping(self, pdf_data: bytes, form_data: Dict[str, Any], hybrid_mapping: Dict[str, Any]) -> bytes:
-        """Fill PDF using hybrid mapping (seed + AI agent)."""
-        import fitz
+    def _fill_pdf_with_hybrid_mapping(self, pdf_data: bytes, form_data: Dict[str, Any], hybrid_mapping: Dict[str, Any],
+                                      plan_key: Optional[Tuple[str, str, str]] = None,
+                                      output_profile: str = 'standard') -> bytes:
+        """
+        Fill PDF using hybrid mapping (seed + AI agent).
         
+        Args:
+            pdf_data: Blank template bytes
+            form_data: Semantic field values
+            hybrid_mapping: Sectioned or flat hybrid mapping
+            plan_key: (form_type, tax_year, mapping_version) used to cache the compiled fill plan;
+                      when omitted the plan is compiled for this call only
+            output_profile: One of PDF_OUTPUT_PROFILES (standard, incremental, final, flattened)
+        """
         logger.info("Filling with hybrid mapping...")
         logger.info(f"📝 Form data keys: {list(form_data.keys())[:20]}")
-        doc = fitz.open(stream=pdf_data, filetype='pdf')
-        
-        # Flatten mapping - handle both sectioned and flat structures
-        flat_mapping = {}
-        
-        # Check if this is a flat mapping (fields at top level) or sectioned (fields nested in sections)
-        sample_key = list(hybrid_mapping.keys())[0] if hybrid_mapping else None
-        is_flat = sample_key and isinstance(hybrid_mapping[sample_key], dict) and 'pdf_field_path' in hybrid_mapping[sample_key]
-        
-        if is_flat:
-            # Flat mapping: {field_name: {semantic_name, pdf_field_path, section}}
-            logger.info("   Processing flat mapping structure")
-            for field_name, field_data in hybrid_mapping.items():
-                if isinstance(field_data, dict) and 'pdf_field_path' in field_data:
-                    flat_mapping[field_name] = field_data['pdf_field_path']
-                elif isinstance(field_data, str):
-                    flat_mapping[field_name] = field_data
-        else:
-            # Sectioned mapping: {section: {field_name: pdf_path or {pdf_field_path: ...}}}
-            logger.info("   Processing sectioned mapping structure")
-            for section, fields in hybrid_mapping.items():
-                if isinstance(fields, dict) and section != 'form_metadata':
-                    for field_name, field_value in fields.items():
-                        if isinstance(field_value, str):
-                            flat_mapping[field_name] = field_value
-                        elif isinstance(field_value, dict) and 'pdf_field_path' in field_value:
-                            flat_mapping[field_name] = field_value['pdf_field_path']
-        
-        logger.info(f"Hybrid mapping has {len(flat_mapping)} semantic fields")
-        logger.info(f"🗺️  Sample mapping: {dict(list(flat_mapping.items())[:5])}")
-        
+        doc = open_pdf_for_profile(pdf_data, output_profile)
+        try:
+            fill_plan = get_fill_plan(plan_key, hybrid_mapping, doc) if plan_key else compile_fill_plan(hybrid_mapping, doc)
+            self._apply_fill_plan(doc, fill_plan, form_data)
+        except Exception:
+            discard_pdf(doc)
+            raise
+        return save_pdf_with_profile(doc, output_profile)
+    
+    def _apply_fill_plan(self, doc, fill_plan: Dict[str, Tuple[str, int]], form_data: Dict[str, Any]):
+        """Set every planned widget whose semantic field is in form_data."""
+        logger.info(f"Fill plan covers {len(fill_plan)} PDF fields")
         
         filled_text = 0
         filled_checkboxes = 0
         match_attempts = 0
         successful_matches = 0
         
-        for page_num in range(doc.page_count):
-            page = doc[page_num]
+        for page in doc:
             for widget in page.widgets():
                 full_field_name = widget.field_name
                 if not full_field_name:
@@ -488,27 +1320,22 @@ class TaxFormFiller:
                 
                 match_attempts += 1
                 
-                # Find semantic name for this PDF field
-                semantic_name = None
-                for sem, pdf_path in flat_mapping.items():
-                    # Normalize both strings to remove any potential whitespace/encoding issues
-                    pdf_path_clean = pdf_path.strip() if isinstance(pdf_path, str) else pdf_path
-                    full_field_clean = full_field_name.strip() if isinstance(full_field_name, str) else full_field_name
-                    
-                    if pdf_path_clean == full_field_clean:
-                        semantic_name = sem
-                        successful_matches += 1
-                        break
+                # Single hash lookup: normalized PDF field path -> (semantic name, widget type)
+                planned = fill_plan.get(full_field_name.strip())
+                if planned is None:
+                    continue
+                semantic_name, widget_type = planned
+                successful_matches += 1
                 
-                if semantic_name and semantic_name in form_data:
+                if semantic_name in form_data:
                     value = form_data[semantic_name]
                     logger.info(f"   ✏️  Filling {semantic_name} = {value} -> {full_field_name[:50]}")
                     
-                    if widget.field_type == 7:  # Text
+                    if widget_type == 7:  # Text
                         widget.field_value = str(value)
                         widget.update()
                         filled_text += 1
-                    elif widget.field_type == 2:  # Checkbox
+                    elif widget_type == 2:  # Checkbox
                         # Handle both True and False values
                         if value is True or value == "Yes" or value == 1:
                             widget.field_value = "Yes"
@@ -519,26 +1346,17 @@ class TaxFormFiller:
                             widget.field_value = "Off"
                             widget.update()
                             logger.info(f"      ⬜ Checkbox unchecked")
-                elif semantic_name:
+                else:
                     logger.debug(f"   ⏭️  Semantic name '{semantic_name}' not in form_data")
         
         logger.info(f"📊 Match stats: {successful_matches}/{match_attempts} PDF fields matched to semantic names")
         logger.info(f"✅ Filled {filled_text} text, {filled_checkboxes} checkboxes")
-        
-        # Save to bytes
-        output_buffer = io.BytesIO()
-        doc.save(output_buffer, deflate=True)
-        output_buffer.seek(0)
-        pdf_bytes = output_buffer.read()
-        doc.close()
-        
-        return pdf_bytes
     
     async def _legacy_fill(self, form_type: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Legacy fill method (fallback)."""
         template_key = self._get_template_path(form_type)
         template_data = await self._download_pdf_template(template_key)
-        filled_pdf_bytes = self._fill_pdf_with_pymupdf_legacy(template_data, form_data)
+        filled_pdf_bytes = await run_blocking(self._fill_pdf_with_pymupdf_legacy, template_data, form_data)
         
         upload_result = await self._upload_filled_pdf_with_versioning(
             file_content=filled_pdf_bytes,
@@ -741,15 +1559,11 @@ class TaxFormFiller:
         return bool(value)
 
     async def _download_pdf_template(self, template_key: str) -> bytes:
-        """Download PDF template from S3."""
+        """Download PDF template from S3 (served from the template cache when fresh)."""
         try:
-            logger.info(f"Downloading template: {template_key}")
-            response = self.s3_client.get_object(
-                Bucket=self.templates_bucket,
-                Key=template_key
-            )
-            template_data = response['Body'].read()
-            logger.info(f"Downloaded template: {len(template_data):,} bytes")
+            logger.info(f"Loading template: {template_key}")
+            template_data = await run_blocking(get_template_cache().get, self.s3_client, self.templates_bucket, template_key)
+            logger.info(f"Loaded template: {len(template_data):,} bytes")
             return template_data
         except Exception as e:
             logger.error(f"Failed to download template {template_key}: {e}")
@@ -757,8 +1571,15 @@ class TaxFormFiller:
 
     async def _upload_filled_pdf_with_versioning(self, file_content: bytes, form_type: str, 
                                                tax_year: int, metadata: Dict[str, str], 
-                                               taxpayer_id: str = None) -> Dict[str, Any]:
-        """Upload filled PDF with versioning support using user_id for PII-safe storage."""
+                                               taxpayer_id: str = None,
+                                               input_hash: Optional[str] = None,
+                                               attachments: Optional[Dict[str, bytes]] = None) -> Dict[str, Any]:
+        """
+        Upload filled PDF with versioning support using user_id for PII-safe storage.
+
+        Attachments (e.g. the individual forms of a package) are stored under the
+        same version as `{version}/{name}.pdf` and share its version record.
+        """
         try:
             # Ensure taxpayer_id is provided (should be Clerk user ID)
             if not taxpayer_id or taxpayer_id == 'UNKNOWN_USER':
@@ -766,16 +1587,16 @@ class TaxFormFiller:
                 taxpayer_id = metadata.get('user_id', 'UNKNOWN_USER')
             
             # Create base document ID for versioning (using user_id, not name)
-            document_id = f"tax_form_{taxpayer_id}_{form_type}_{tax_year}"
+            document_id = self.build_document_id(taxpayer_id, form_type, tax_year)
             base_key = f"filled_forms/{taxpayer_id}/{form_type.lower()}/{tax_year}"
             
-            # Check for existing versions
-            existing_versions = await self._list_existing_versions(base_key)
-            version_num = len(existing_versions) + 1
+            # Allocate the next version number atomically
+            version_num = await self._allocate_version_number(document_id, base_key)
+            version = f"v{version_num:03d}"
             
             # Create versioned S3 key
             timestamp = int(time.time())
-            output_key = f"{base_key}/v{version_num:03d}_{form_type}_{timestamp}.pdf"
+            output_key = f"{base_key}/{version}_{form_type}_{timestamp}.pdf"
             
             logger.info(f"Uploading filled form version {version_num} to: {output_key}")
             
@@ -783,7 +1604,7 @@ class TaxFormFiller:
             enhanced_metadata = {
                 **metadata,
                 'document_id': document_id,
-                'version': f"v{version_num}",
+                'version': version,
                 'taxpayer_id': taxpayer_id,
                 'created_at': datetime.now().isoformat(),
                 'file_size': str(len(file_content)),
@@ -791,20 +1612,38 @@ class TaxFormFiller:
             }
             
             # Add previous version reference if exists
-            if existing_versions:
-                enhanced_metadata['previous_version'] = existing_versions[-1]['version']
-            
-            # Upload to S3
-            self.s3_client.put_object(
-                Bucket=self.documents_bucket,
-                Key=output_key,
-                Body=file_content,
-                ContentType='application/pdf',
-                Metadata=enhanced_metadata
+            if version_num > 1:
+                enhanced_metadata['previous_version'] = f"v{version_num - 1:03d}"
+            
+            # Upload to S3 (attachments in parallel with the main PDF)
+            attachment_keys = {
+                name: f"{base_key}/{version}/{name.lower()}.pdf" for name in (attachments or {})
+            }
+            await asyncio.gather(
+                run_blocking(
+                    self.s3_client.put_object,
+                    Bucket=self.documents_bucket,
+                    Key=output_key,
+                    Body=file_content,
+                    ContentType='application/pdf',
+                    Metadata=enhanced_metadata
+                ),
+                *[
+                    run_blocking(
+                        self.s3_client.put_object,
+                        Bucket=self.documents_bucket,
+                        Key=attachment_keys[name],
+                        Body=content,
+                        ContentType='application/pdf',
+                        Metadata={'document_id': document_id, 'version': version, 'form_type': name}
+                    )
+                    for name, content in (attachments or {}).items()
+                ]
             )
             
-            # Generate presigned URL
-            download_url = self.s3_client.generate_presigned_url(
+            # Generate presigned URLs
+            download_url = await run_blocking(
+                self.s3_client.generate_presigned_url,
                 'get_object',
                 Params={
                     'Bucket': self.documents_bucket,
@@ -812,15 +1651,27 @@ class TaxFormFiller:
                 },
                 ExpiresIn=3600
             )
+            attachment_urls = {
+                name: await run_blocking(
+                    self.s3_client.generate_presigned_url,
+                    'get_object',
+                    Params={'Bucket': self.documents_bucket, 'Key': key},
+                    ExpiresIn=3600
+                )
+                for name, key in attachment_keys.items()
+            }
             
             # Store version info in DynamoDB if table exists
             await self._store_version_metadata(document_id, {
-                'version': f"v{version_num}",
+                'version': version,
                 's3_key': output_key,
                 'size': len(file_content),
                 'created_at': datetime.now().isoformat(),
                 'metadata': enhanced_metadata,
-                'download_url': download_url
+                'download_url': download_url,
+                'version_number': version_num,
+                'input_hash': input_hash,
+                'attachments': attachment_keys
             })
             
             logger.info(f"Successfully uploaded filled form version {version_num}: {output_key}")
@@ -828,11 +1679,15 @@ class TaxFormFiller:
             return {
                 'download_url': download_url,
                 'document_id': document_id,
-                'version': f"v{version_num}",
+                'version': version,
                 's3_key': output_key,
                 'is_new_document': version_num == 1,
-                'previous_versions': [v['version'] for v in existing_versions],
-                'total_versions': version_num
+                'previous_versions': [f"v{n:03d}" for n in range(1, version_num)],
+                'total_versions': version_num,
+                'attachments': {
+                    name: {'s3_key': key, 'download_url': attachment_urls[name]}
+                    for name, key in attachment_keys.items()
+                }
             }
             
         except Exception as e:
@@ -1262,38 +2117,121 @@ class TaxFormFiller:
         
         return potential_fields[:3]  # Return top 3 matches to avoid too many attempts
 
+    async def _allocate_version_number(self, document_id: str, base_key: str) -> int:
+        """
+        Allocate the next version number from the document's head-row counter.
+
+        The counter is bumped with a single conditional UpdateItem, so concurrent fills
+        get distinct numbers. Documents versioned before the counter existed are seeded
+        once from their S3 objects.
+        """
+        key = {'document_id': document_id, 'version': LATEST_VERSION_KEY}
+        try:
+            response = await run_blocking(
+                self.versions_table.update_item,
+                Key=key,
+                UpdateExpression='ADD version_counter :one',
+                ConditionExpression='attribute_exists(version_counter)',
+                ExpressionAttributeValues={':one': 1},
+                ReturnValues='UPDATED_NEW'
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            existing_versions = await self._list_existing_versions(base_key)
+            seed = max((v['version_number'] for v in existing_versions), default=0)
+            logger.info(f"Seeding version counter for {document_id} at {seed}")
+            response = await run_blocking(
+                self.versions_table.update_item,
+                Key=key,
+                UpdateExpression='SET version_counter = if_not_exists(version_counter, :seed) + :one',
+                ExpressionAttributeValues={':seed': seed, ':one': 1},
+                ReturnValues='UPDATED_NEW'
+            )
+        return int(response['Attributes']['version_counter'])
+
     async def _list_existing_versions(self, base_key: str) -> List[Dict[str, Any]]:
-        """List existing versions of a document in S3."""
+        """List existing versions of a document in S3 (for documents predating the versions table)."""
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.documents_bucket,
-                Prefix=base_key
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            pages = await run_blocking(
+                lambda: list(paginator.paginate(Bucket=self.documents_bucket, Prefix=base_key))
             )
             
             versions = []
-            if 'Contents' in response:
-                for obj in response['Contents']:
+            for page in pages:
+                for obj in page.get('Contents', []):
                     key = obj['Key']
-                    if key.endswith('.pdf'):
-                        # Extract version from filename
-                        filename = key.split('/')[-1]
-                        if filename.startswith('v'):
-                            version = filename.split('_')[0]  # e.g., 'v001'
-                            versions.append({
-                                'version': version,
-                                's3_key': key,
-                                'size': obj['Size'],
-                                'last_modified': obj['LastModified'].isoformat()
-                            })
+                    # Extract version from filename, e.g. 'v001_1040_1700000000.pdf'
+                    match = VERSION_FILE_PATTERN.match(key.split('/')[-1])
+                    if key.endswith('.pdf') and match:
+                        version_number = int(match.group(1))
+                        versions.append({
+                            'version': f"v{version_number:03d}",
+                            'version_number': version_number,
+                            's3_key': key,
+                            'size': obj['Size'],
+                            'last_modified': obj['LastModified'].isoformat(),
+                            'noop_hits': 0
+                        })
             
             # Sort by version number
-            versions.sort(key=lambda x: int(x['version'][1:]))
+            versions.sort(key=lambda x: x['version_number'])
             return versions
             
         except Exception as e:
             logger.warning(f"Could not list existing versions for {base_key}: {e}")
             return []
 
+    def build_document_id(self, taxpayer_id: str, form_type: str, tax_year: Any) -> str:
+        """Build the versioned document ID for a taxpayer's form and year."""
+        return f"tax_form_{taxpayer_id or 'UNKNOWN_USER'}_{form_type}_{tax_year}"
+
+    async def _find_unchanged_version(self, document_id: str, input_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the latest version of a document if it was filled from the same inputs.
+
+        Reads the document's head row; on a match, bumps the reused version's noop_hits
+        counter and signs a fresh download URL for it.
+        """
+        try:
+            head = (await run_blocking(
+                self.versions_table.get_item,
+                Key={'document_id': document_id, 'version': LATEST_VERSION_KEY}
+            )).get('Item')
+            if not head or head.get('input_hash') != input_hash:
+                return None
+
+            updated = await run_blocking(
+                self.versions_table.update_item,
+                Key={'document_id': document_id, 'version': head['latest_version']},
+                UpdateExpression='ADD noop_hits :one SET last_noop_at = :now',
+                ConditionExpression='attribute_exists(document_id)',
+                ExpressionAttributeValues={':one': 1, ':now': datetime.now().isoformat()},
+                ReturnValues='UPDATED_NEW'
+            )
+            download_url = await run_blocking(
+                self.s3_client.generate_presigned_url,
+                'get_object',
+                Params={'Bucket': self.documents_bucket, 'Key': head['s3_key']},
+                ExpiresIn=3600
+            )
+            version_num = int(head['version_number'])
+            return {
+                'document_id': document_id,
+                'version': head['latest_version'],
+                's3_key': head['s3_key'],
+                'size': int(head.get('size', 0)),
+                'download_url': download_url,
+                'total_versions': version_num,
+                'previous_versions': [f"v{n:03d}" for n in range(1, version_num)],
+                'noop_hits': int(updated['Attributes']['noop_hits'])
+            }
+        except Exception as e:
+            # Any doubt about the stored version means we fill normally
+            logger.warning(f"Could not check for an unchanged version of {document_id}: {e}")
+            return None
+
     def _calculate_content_hash(self, content: bytes) -> str:
         """Calculate SHA256 hash of content."""
         import hashlib
@@ -1302,15 +2240,9 @@ class TaxFormFiller:
     async def _store_version_metadata(self, document_id: str, version_info: Dict[str, Any]):
         """Store version metadata in DynamoDB if available."""
         try:
-            import boto3
-            from botocore.exceptions import ClientError
-            
             # Use the document versions table
-            dynamodb = boto3.resource('dynamodb', region_name=self.settings.aws_region)
-            
-            # Use the document versions table name
-            table_name = os.getenv('DOCUMENT_VERSIONS_TABLE_NAME', 'province-document-versions')
-            table = dynamodb.Table(table_name)
+            table = self.versions_table
+            table_name = table.name
             
             # Extract form type and taxpayer from document_id
             # Format: tax_form_TaxpayerName_FormType_Year
@@ -1325,10 +2257,12 @@ class TaxFormFiller:
                 tax_year = '2024'
             
             # Store version metadata with proper structure
-            table.put_item(
+            await run_blocking(
+                table.put_item,
                 Item={
                     'document_id': document_id,
                     'version': version_info['version'],
+                    'version_number': version_info.get('version_number', 0),
                     'taxpayer_id': taxpayer_id,
                     'form_type': form_type,
                     'tax_year': tax_year,
@@ -1340,9 +2274,38 @@ class TaxFormFiller:
                     'filling_method': version_info['metadata'].get('filling_method', ''),
                     'fields_filled': version_info['metadata'].get('fields_filled', ''),
                     'download_url': version_info['download_url'],
-                    'metadata': version_info['metadata']
+                    'metadata': version_info['metadata'],
+                    'input_hash': version_info.get('input_hash') or '',
+                    'attachments': version_info.get('attachments') or {},
+                    'noop_hits': 0
                 }
             )
+
+            # Head row lets the next fill with identical inputs skip rendering. Update it in
+            # place (it also holds the version counter) and never move it backwards when
+            # concurrent fills finish out of order.
+            try:
+                await run_blocking(
+                    table.update_item,
+                    Key={'document_id': document_id, 'version': LATEST_VERSION_KEY},
+                    UpdateExpression=(
+                        'SET latest_version = :version, version_number = :number, s3_key = :s3_key, '
+                        '#size = :size, input_hash = :input_hash, updated_at = :updated_at'
+                    ),
+                    ConditionExpression='attribute_not_exists(version_number) OR version_number < :number',
+                    ExpressionAttributeNames={'#size': 'size'},
+                    ExpressionAttributeValues={
+                        ':version': version_info['version'],
+                        ':number': version_info.get('version_number', 0),
+                        ':s3_key': version_info['s3_key'],
+                        ':size': version_info['size'],
+                        ':input_hash': version_info.get('input_hash') or '',
+                        ':updated_at': version_info['created_at']
+                    }
+                )
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
             
             logger.info(f"Stored version metadata for {document_id} {version_info['version']} in {table_name}")
             
@@ -1350,9 +2313,61 @@ class TaxFormFiller:
             logger.warning(f"Could not store version metadata: {e}")
             # Don't fail the upload if metadata storage fails
 
-    async def get_version_history(self, document_id: str) -> List[Dict[str, Any]]:
-        """Get version history for a document."""
+    async def get_version_history(self, document_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get version history for a document, oldest first.
+
+        Reads the document's version rows with one key-condition Query. The newest
+        `limit` rows come from VERSION_NUMBER_INDEX, newest first by number (the
+        head row is indexed too and skipped); without the index, or when it holds
+        fewer than `limit` rows, every row is read and the newest kept. Documents with no rows in the versions table fall
+        back to listing their S3 prefix.
+        """
         try:
+            rows = None
+            if limit:
+                try:
+                    response = await run_blocking(
+                        self.versions_table.query,
+                        IndexName=VERSION_NUMBER_INDEX,
+                        KeyConditionExpression=Key('document_id').eq(document_id),
+                        ScanIndexForward=False,
+                        Limit=limit + 1
+                    )
+                    rows = [row for row in response.get('Items', [])
+                            if row['version'] != LATEST_VERSION_KEY][:limit]
+                    if len(rows) < limit:
+                        rows = None  # a short history, or rows written without version_number
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') not in ('ValidationException',
+                                                                      'ResourceNotFoundException'):
+                        raise
+                    logger.warning(f"Versions table has no {VERSION_NUMBER_INDEX}, reading all versions")
+            
+            if rows is None:
+                query_args = {
+                    'KeyConditionExpression': Key('document_id').eq(document_id) & Key('version').begins_with('v')
+                }
+                rows = []
+                while True:
+                    response = await run_blocking(self.versions_table.query, **query_args)
+                    rows.extend(response.get('Items', []))
+                    if 'LastEvaluatedKey' not in response:
+                        break
+                    query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            
+            if rows:
+                versions = [{
+                    'version': row['version'],
+                    'version_number': int(row.get('version_number') or row['version'][1:]),
+                    's3_key': row['s3_key'],
+                    'size': int(row.get('size', 0)),
+                    'last_modified': row.get('created_at', ''),
+                    'noop_hits': int(row.get('noop_hits', 0))
+                } for row in rows]
+                versions.sort(key=lambda v: v['version_number'])
+                return versions[-limit:] if limit else versions
+            
             # Extract base info from document_id
             # Format: tax_form_John_Doe_1040_2024
             parts = document_id.split('_')
@@ -1363,8 +2378,9 @@ class TaxFormFiller:
                 tax_year = parts[-1]
                 
                 base_key = f"filled_forms/{taxpayer_id}/{form_type.lower()}/{tax_year}/"
-                logger.info(f"Looking for versions with base key: {base_key}")
-                return await self._list_existing_versions(base_key)
+                logger.info(f"No version rows for {document_id}, listing S3 prefix: {base_key}")
+                versions = await self._list_existing_versions(base_key)
+                return versions[-limit:] if limit else versions
             
             return []
             
@@ -1373,6 +2389,12 @@ class TaxFormFiller:
             return []
 
 
+@lru_cache()
+def get_tax_form_filler() -> TaxFormFiller:
+    """Get a shared filler so boto3 clients are built once, not on every tool call."""
+    return TaxFormFiller()
+
+
 # Tool function for agent integration
 async def fill_tax_form(form_type: str, form_data: Dict[str, Any], user_id: Optional[str] = None, skip_questions: bool = False) -> Dict[str, Any]:
     """
@@ -1387,10 +2409,27 @@ async def fill_tax_form(form_type: str, form_data: Dict[str, Any], user_id: Opti
     Returns:
         Dictionary with filled form URL and metadata
     """
-    filler = TaxFormFiller()
+    filler = get_tax_form_filler()
     return await filler.fill_tax_form(form_type, form_data, user_id=user_id, skip_questions=skip_questions)
 
 
+# Tool function for multi-form return packages
+async def fill_tax_package(form_types: List[str], form_data: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Fill several tax forms from one data dict and merge them into a single package PDF.
+    
+    Args:
+        form_types: Forms to include, in order (1040, SCHEDULE_A, ..., STATE_CA)
+        form_data: Dictionary containing form field data shared by all forms
+        user_id: Optional Clerk user ID for PII-safe storage
+        
+    Returns:
+        Dictionary with merged package URL, per-form URLs and metadata
+    """
+    filler = get_tax_form_filler()
+    return await filler.fill_tax_package(form_types, form_data, user_id=user_id)
+
+
 # Tool function for getting available forms
 def get_available_tax_forms() -> List[Dict[str, Any]]:
     """Get list of available tax forms."""
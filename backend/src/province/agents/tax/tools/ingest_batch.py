@@ -0,0 +1,102 @@
+"""
+Batch document ingestion.
+
+Runs ingest_documents for many uploads at once, at most
+ingest_batch_max_concurrency at a time, so their Bedrock Data Automation jobs
+run side by side and a batch takes about as long as its slowest document.
+Progress is yielded per document as it happens. W-2 results are written to
+each engagement's W2_Extracts.json once, aggregated, after the batch finishes.
+"""
+
+import asyncio
+import logging
+import time
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from province.core.config import get_settings
+from .bda_results_index import engagement_of
+from .ingest_documents import ingest_documents, save_w2_extracts_for_calc
+
+logger = logging.getLogger(__name__)
+
+
+async def ingest_documents_batch(s3_keys: List[str], taxpayer_name: str, tax_year: int,
+                                 document_type: Optional[str] = None,
+                                 max_concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Ingest many documents concurrently, yielding progress events as they occur.
+
+    Args:
+        s3_keys: S3 keys of the documents
+        taxpayer_name: Name of the taxpayer for validation
+        tax_year: Tax year of the documents
+        document_type: Document type for every key, or None to detect each one
+        max_concurrency: Documents in flight at once (defaults to ingest_batch_max_concurrency)
+
+    Yields:
+        'started' and 'result' events tagged with the key's index in the request,
+        then one 'summary' event with batch totals and the saved extract keys
+    """
+    max_concurrency = max_concurrency or get_settings().ingest_batch_max_concurrency
+    semaphore = asyncio.Semaphore(max_concurrency)
+    events: asyncio.Queue = asyncio.Queue()
+    started_at = time.time()
+
+    async def run_item(index: int, s3_key: str) -> Dict[str, Any]:
+        async with semaphore:
+            await events.put({'type': 'started', 'index': index, 's3_key': s3_key})
+            started = time.time()
+            try:
+                result = await ingest_documents(s3_key, taxpayer_name, tax_year, document_type,
+                                                save_extract=False)
+            except Exception as e:
+                logger.error(f"Batch ingest item {index} ({s3_key}) failed: {e}")
+                result = {'success': False, 'error': str(e)}
+            result = {
+                'type': 'result',
+                'index': index,
+                's3_key': s3_key,
+                'duration_ms': round((time.time() - started) * 1000, 1),
+                **result
+            }
+            await events.put(result)
+            return result
+
+    tasks = [asyncio.create_task(run_item(i, key)) for i, key in enumerate(s3_keys)]
+    results: List[Dict[str, Any]] = []
+    try:
+        while len(results) < len(tasks):
+            event = await events.get()
+            if event['type'] == 'result':
+                results.append(event)
+            yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    # One extract per engagement, written once every document has finished
+    w2_by_engagement: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for result in sorted(results, key=lambda r: r['index']):
+        engagement_id = engagement_of(result['s3_key'])
+        if result.get('success') and result.get('document_type') == 'W-2' and engagement_id:
+            w2_by_engagement.setdefault(engagement_id, {})[result['s3_key']] = result
+    extract_keys = []
+    for engagement_id, w2_results in w2_by_engagement.items():
+        extract_key = await save_w2_extracts_for_calc(engagement_id, w2_results, taxpayer_name, tax_year)
+        if extract_key:
+            extract_keys.append(extract_key)
+
+    succeeded = [r for r in results if r.get('success')]
+    yield {
+        'type': 'summary',
+        'total': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'extraction_reused': sum(1 for r in succeeded if r.get('extraction_reused')),
+        'forms_count': sum(r.get('forms_count', 0) for r in succeeded),
+        'total_wages': float(sum(Decimal(str(r.get('total_wages', 0))) for r in succeeded)),
+        'total_withholding': float(sum(Decimal(str(r.get('total_withholding', 0))) for r in succeeded)),
+        'extract_keys': extract_keys,
+        'duration_ms': round((time.time() - started_at) * 1000, 1)
+    }
@@ -1,24 +1,36 @@
 """Multi-document ingestion tool using AWS Bedrock Data Automation (supports PDF and JPEG).
 Handles W-2, 1099-INT, 1099-MISC, and other tax documents."""
 
+import asyncio
+import hashlib
 import json
 import logging
 import os
-import re
-import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from decimal import Decimal
 import boto3
 from botocore.exceptions import ClientError
 
 from province.core.config import get_settings
 from ..models import W2Form, W2Extract
+from .bda_jobs import BDAJobWaiter, bda_job_id, get_bda_completion_events
+from .bda_results_index import (
+    BDAResultsIndex,
+    bda_result_keys,
+    engagement_of,
+    get_extraction_dedup_stats,
+    hash_s3_object,
+)
+from .document_classifier import DocumentClassification, classify_document, get_document_classifier_stats
+from .w2_markdown import parse_w2_markdown
+from .w2_text_layer import extract_w2_text_layer, get_text_layer_stats
 
 logger = logging.getLogger(__name__)
 
 
-async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, document_type: str = None) -> Dict[str, Any]:
+async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, document_type: str = None,
+                           save_extract: bool = True) -> Dict[str, Any]:
     """
     Extract tax document data using AWS Bedrock Data Automation (supports PDF and JPEG).
     Supports W-2, 1099-INT, 1099-MISC, and other tax documents.
@@ -28,6 +40,8 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
         taxpayer_name: Name of the taxpayer for validation
         tax_year: Tax year for the document
         document_type: Type of document ('W-2', '1099-INT', '1099-MISC', or None for auto-detection)
+        save_extract: Write the W-2 result to the engagement's W2_Extracts.json (batch
+            ingests pass False and write one aggregated extract instead)
     
     Returns:
         Dict with extracted tax document data and validation results
@@ -61,6 +75,13 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
             aws_access_key_id=data_automation_access_key,
             aws_secret_access_key=data_automation_secret_key
         )
+        dynamodb = boto3.resource(
+            'dynamodb',
+            region_name=settings.aws_region,
+            aws_access_key_id=data_automation_access_key,
+            aws_secret_access_key=data_automation_secret_key
+        )
+        results_index = BDAResultsIndex(dynamodb.Table(settings.bda_results_index_table_name), s3_client)
         
         # Use Bedrock Data Automation configuration from environment
         project_arn = os.getenv('BEDROCK_DATA_AUTOMATION_PROJECT_ARN')
@@ -97,6 +118,21 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
                 'error': f"Unsupported file format: {file_extension}. Supported formats: {', '.join(supported_formats)}"
             }
         
+        # PDFs are read once for the local classifier and the W-2 text layer fast path
+        pdf_bytes = None
+        if file_extension == 'pdf' and (settings.document_classifier_enabled or settings.w2_text_layer_enabled):
+            pdf_bytes = await asyncio.to_thread(_download_document, s3_client, input_bucket, s3_key)
+        
+        # Decide the document type from the content, not the file name, before choosing a blueprint
+        classification = None
+        if pdf_bytes is not None and settings.document_classifier_enabled:
+            classification = await asyncio.to_thread(classify_document, pdf_bytes, s3_key)
+            document_type, rejection = _apply_classification(
+                classification, document_type, s3_key, settings.document_classifier_min_confidence
+            )
+            if rejection:
+                return rejection
+        
         # Auto-detect document type if not provided
         if not document_type:
             document_type = _detect_document_type(s3_key)
@@ -109,10 +145,25 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
         # Bedrock Data Automation will create its own UUID-based output structure
         # We don't need to specify a custom output key - it uses inference_results/{uuid}/
         
-        # First, check if we already have results for this file in the output bucket
-        existing_result = _check_existing_bedrock_results(s3_client, output_bucket, s3_key)
-        if existing_result:
+        # Payroll-generated W-2 PDFs have a text layer that can be read locally in milliseconds
+        text_layer_forms = None
+        if document_type == 'W-2' and pdf_bytes is not None and settings.w2_text_layer_enabled:
+            text_layer_forms = await asyncio.to_thread(
+                _extract_w2_from_text_layer, pdf_bytes, s3_key, settings.w2_text_layer_min_confidence
+            )
+        
+        # Otherwise, check the results index for an earlier job on this file or on identical bytes
+        existing_result, content_sha256 = (None, None) if text_layer_forms else await asyncio.to_thread(
+            _find_reusable_bedrock_result, results_index, input_bucket, s3_key, pdf_bytes
+        )
+        extraction_reused = existing_result is not None
+        processing_method = 'bedrock_data_automation'
+        if text_layer_forms:
+            tax_data = text_layer_forms
+            processing_method = 'pdf_text_layer'
+        elif existing_result:
             logger.info(f"Found existing Bedrock results for {s3_key}")
+            # Extracted against this upload's key, so nothing refers to the document it was first run on
             tax_data = _extract_tax_data_from_bedrock(existing_result, s3_key, document_type)
         else:
             logger.info(f"No existing results found, attempting to process {s3_key} with Bedrock Data Automation")
@@ -125,7 +176,8 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
                     logger.info(f"   Input: s3://{input_bucket}/{s3_key}")
                     logger.info(f"   Profile: {blueprint_profile}")
                     
-                    response = runtime_client.invoke_data_automation_async(
+                    response = await asyncio.to_thread(
+                        runtime_client.invoke_data_automation_async,
                         inputConfiguration={
                             's3Uri': f"s3://{input_bucket}/{s3_key}"
                         },
@@ -140,80 +192,31 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
                     )
                     
                     invocation_arn = response['invocationArn']
-                    job_uuid = invocation_arn.split('/')[-1]
+                    job_uuid = bda_job_id(invocation_arn)
                     logger.info(f"✅ Bedrock job started: {invocation_arn}")
                     logger.info(f"   Job UUID: {job_uuid}")
                     
-                    # Wait for completion with extended timeout and better feedback
-                    max_wait_time = 180  # 3 minutes (increased from 2)
-                    start_time = time.time()
-                    check_count = 0
-                    
-                    logger.info(f"⏳ Waiting for Bedrock processing (max {max_wait_time}s)...")
-                    
-                    while time.time() - start_time < max_wait_time:
-                        check_count += 1
-                        elapsed = int(time.time() - start_time)
-                        
-                        try:
-                            status_response = runtime_client.get_data_automation_status(invocationArn=invocation_arn)
-                            status = status_response.get('status')
-                            
-                            logger.info(f"   [{elapsed}s] Check #{check_count}: Status = {status}")
-                            
-                            if status in ['COMPLETED', 'Success']:
-                                logger.info(f"✅ Bedrock processing completed in {elapsed}s")
-                                
-                                # Try multiple result paths
-                                possible_keys = [
-                                    f"inference_results/{job_uuid}/0/standard_output/0/result.json",
-                                    f"inference_results//{job_uuid}/0/standard_output/0/result.json",
-                                    f"inference_results/{job_uuid}/0/custom_output/0/result.json"
-                                ]
-                                
-                                bedrock_response = None
-                                for result_key in possible_keys:
-                                    try:
-                                        logger.info(f"   Trying to load: {result_key}")
-                                        result_response = s3_client.get_object(
-                                            Bucket=output_bucket,
-                                            Key=result_key
-                                        )
-                                        bedrock_response = json.loads(result_response['Body'].read().decode('utf-8'))
-                                        logger.info(f"✅ Successfully loaded results from: {result_key}")
-                                        break
-                                    except Exception as e:
-                                        logger.debug(f"   Not found at {result_key}: {e}")
-                                        continue
-                                
-                                if bedrock_response:
-                                    break
-                                else:
-                                    logger.error(f"❌ Results not found in any expected location for job {job_uuid}")
-                                    logger.error(f"   Tried: {possible_keys}")
-                                    break
-                                    
-                            elif status in ['FAILED', 'CANCELLED', 'Failed', 'Canceled']:
-                                logger.error(f"❌ Bedrock processing failed with status: {status}")
-                                error_details = status_response.get('errorMessage', 'No error details provided')
-                                logger.error(f"   Error: {error_details}")
-                                break
-                            elif status in ['IN_PROGRESS', 'InProgress', 'RUNNING', 'Running']:
-                                # Still processing, continue waiting
-                                pass
-                            else:
-                                logger.warning(f"⚠️  Unknown status: {status}")
-                            
-                        except Exception as status_error:
-                            logger.warning(f"Error checking status: {status_error}")
-                        
-                        time.sleep(5)  # Wait 5 seconds before checking again
+                    # Poll with growing intervals; a completion event can end the wait early
+                    waiter = BDAJobWaiter(runtime_client, events=get_bda_completion_events())
+                    logger.info(f"⏳ Waiting for Bedrock processing (max {waiter.timeout:.0f}s)...")
+                    outcome = await waiter.wait(invocation_arn)
                     
-                    # Check if we timed out
-                    if not bedrock_response:
-                        elapsed = int(time.time() - start_time)
-                        if elapsed >= max_wait_time:
-                            logger.error(f"⏱️  Timeout: Bedrock processing took longer than {max_wait_time}s")
+                    if outcome['succeeded']:
+                        logger.info(f"✅ Bedrock processing completed in {outcome['elapsed']:.0f}s "
+                                    f"({outcome['checks']} checks, via {outcome['source']})")
+                        result_key, bedrock_response = await asyncio.to_thread(
+                            _load_bedrock_job_result, s3_client, output_bucket, job_uuid
+                        )
+                        if bedrock_response:
+                            await asyncio.to_thread(
+                                _index_bedrock_result, results_index, job_uuid, input_bucket, s3_key,
+                                output_bucket, result_key, content_sha256
+                            )
+                    elif outcome['source'] == 'timeout':
+                        logger.error(f"⏱️  Timeout: Bedrock processing took longer than {waiter.timeout:.0f}s")
+                    else:
+                        logger.error(f"❌ Bedrock processing failed with status: {outcome['status']}")
+                        logger.error(f"   Error: {outcome['error']}")
                         
                 except ClientError as e:
                     error_code = e.response.get('Error', {}).get('Code', 'Unknown')
@@ -291,11 +294,14 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
                 'forms_count': len(w2_forms),
                 'total_wages': float(total_wages),
                 'total_withholding': float(total_withholding),
-                'processing_method': 'bedrock_data_automation'
+                'processing_method': processing_method,
+                'extraction_reused': extraction_reused,
+                'classification': classification.to_dict() if classification else None
             }
             
             # Save W-2 extract data for calc_1040 to use
-            await _save_w2_extract_for_calc(s3_key, result, taxpayer_name)
+            if save_extract:
+                await _save_w2_extract_for_calc(s3_key, result, taxpayer_name, tax_year)
             
             return result
         else:
@@ -307,7 +313,9 @@ async def ingest_documents(s3_key: str, taxpayer_name: str, tax_year: int, docum
                 'forms_count': len(tax_data),
                 'total_income': float(extract_object['total_income']),
                 'total_withholding': float(extract_object['total_withholding']),
-                'processing_method': 'bedrock_data_automation'
+                'processing_method': processing_method,
+                'extraction_reused': extraction_reused,
+                'classification': classification.to_dict() if classification else None
             }
         
     except ClientError as e:
@@ -330,195 +338,20 @@ def _extract_w2_from_standard_output(bedrock_response: Dict[str, Any], s3_key: s
     
     logger.info(f"Extracting W-2 data from Bedrock Data Automation standard output")
     
-    w2_data = []
-    
-    # Extract markdown content from the first page
-    page = bedrock_response['pages'][0]
-    if 'representation' not in page or 'markdown' not in page['representation']:
+    pages = [(page.get('representation') or {}).get('markdown') for page in bedrock_response['pages']]
+    if not any(pages):
         logger.warning("No markdown representation found in standard output")
         return []
+    logger.info(f"Processing markdown content: {sum(len(p or '') for p in pages)} characters over {len(pages)} pages")
     
-    markdown_content = page['representation']['markdown']
-    logger.info(f"Processing markdown content: {len(markdown_content)} characters")
-    
-    # Initialize data structures
-    employer_info = {}
-    employee_info = {}
-    boxes = {}
-    pin_cites = {}
-    
-    # Extract employer information using patterns based on actual markdown structure
-    # EIN pattern - looking for "b Employer identification number" followed by the number
-    ein_match = re.search(r'\*\*b\*\*\s+Employer\s+identification\s+number.*?\n\s*\*\*([0-9]{2}-[0-9]{7})\*\*', markdown_content, re.IGNORECASE | re.DOTALL)
-    if ein_match:
-        employer_info['EIN'] = ein_match.group(1)
-        pin_cites['EIN'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-    
-    # Employer name pattern - looking for "C Employer's name, address, and ZIP code" followed by the name
-    employer_name_match = re.search(r'\*\*C\*\*\s+Employer\'s\s+name,\s+address,\s+and\s+ZIP\s+code.*?\n\s*\*\*([^*\n]+)\*\*', markdown_content, re.IGNORECASE | re.DOTALL)
-    if employer_name_match:
-        employer_info['name'] = employer_name_match.group(1).strip()
-        pin_cites['employer_name'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-    
-    # Extract employee information
-    # SSN pattern - looking for "a Employee's social security number" followed by the number
-    ssn_match = re.search(r'\*\*a\s+Employee\'s\s+social\s+security\s+number\*\*.*?\n.*?\*\*([0-9]{3}-[0-9]{2}-[0-9]{4})\*\*', markdown_content, re.IGNORECASE | re.DOTALL)
-    if ssn_match:
-        employee_info['SSN'] = ssn_match.group(1)
-        pin_cites['SSN'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-    
-    # Employee name pattern - looking for "e Employee's first name and initial" followed by names
-    employee_name_match = re.search(r'\*\*e\*\*\s+Employee\'s\s+first\s+name\s+and\s+initial.*?\n.*?\*\*([A-Za-z]+)\*\*.*?\n\*\*([A-Za-z]+)\*\*', markdown_content, re.IGNORECASE | re.DOTALL)
-    if employee_name_match:
-        first_name = employee_name_match.group(1).strip()
-        last_name = employee_name_match.group(2).strip()
-        employee_info['name'] = f"{first_name} {last_name}"
-        pin_cites['employee_name'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
+    # One pass over every page; a file with several W-2s yields one form each
+    w2_data = parse_w2_markdown(pages, s3_key.split('/')[-1])
+    if not w2_data:
+        # Keep an (empty) form so validation reports the missing fields
+        w2_data = [{'employer': {}, 'employee': {}, 'boxes': {}, 'pin_cites': {}}]
     
-    # Employee address pattern - looking for address after employee name
-    # Format varies: **First Last**\n... or **First**\n**Last**\n...
-    # Flexible pattern to handle both cases
-    # Example 1: **Taylor Cox**\n613 Roger Crest Apt. 802\nLeeton IA\n**26442-8249**
-    # Example 2: **April**\n**Hensley**\n\n**31403 David Circles**\n\nWest Erinfort WY\n**45881-3334**
-    address_match = re.search(
-        r'\*\*[A-Za-z]+\*\*(?:\s*\n\s*\*\*[A-Za-z]+\*\*)?\s*\n+\s*\*\*([^\*\n]+)\*\*\s*\n+\s*([A-Za-z\s]+\s+[A-Z]{2})\s*\n\s*\*\*([0-9]{5}(?:-[0-9]{4})?)\*\*',
-        markdown_content,
-        re.MULTILINE
-    )
-    if address_match:
-        street = address_match.group(1).strip()
-        city_state = address_match.group(2).strip()
-        zip_code = address_match.group(3).strip()
-        
-        # Parse city and state
-        city_state_parts = city_state.rsplit(' ', 1)  # Split from right to get last 2-letter state
-        if len(city_state_parts) == 2:
-            city = city_state_parts[0].strip()
-            state = city_state_parts[1].strip()
-            
-            # Parse street for unit number (Suite, Apt, Unit, Room, #, etc.)
-            unit_patterns = [
-                r'(Apt\.?|Apartment)\s+(\S+)',
-                r'(Suite|Ste\.?)\s+(\S+)',
-                r'(Unit|#)\s*(\S+)',
-                r'(Room|Rm\.?)\s+(\S+)',
-                r'(Bldg\.?|Building)\s+(\S+)',
-                r'(Floor|Fl\.?)\s+(\S+)',
-            ]
-            
-            apt_no = ''
-            street_without_unit = street
-            for pattern in unit_patterns:
-                match = re.search(pattern, street, re.IGNORECASE)
-                if match:
-                    apt_no = match.group(2)  # Get the unit number
-                    street_without_unit = street[:match.start()].strip()  # Get street without unit
-                    logger.info(f"Extracted unit: {match.group(1)} {apt_no}")
-                    break
-            
-            employee_info['address'] = f"{street}, {city}, {state} {zip_code}"
-            employee_info['street'] = street_without_unit  # Street without unit
-            employee_info['apt_no'] = apt_no  # Unit number extracted
-            employee_info['city'] = city
-            employee_info['state'] = state
-            employee_info['zip'] = zip_code
-            pin_cites['employee_address'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.85, 'source': 'bedrock_standard_output'}
-            logger.info(f"Extracted employee address: {employee_info['address']}")
-            if apt_no:
-                logger.info(f"Extracted apt/unit: {apt_no}")
-    
-    # Extract W-2 box values using patterns based on the actual markdown structure
-    # Looking at the sample, the format is like: "1 Wages, tips, other compensation\t\t\t2 Federal income tax withheld\t\n55151.93\t\t\t16606.17\t"
-    
-    # Box 1: Wages, tips, other compensation
-    box1_match = re.search(r'1\s+Wages,\s+tips,\s+other\s+compensation.*?\n([0-9,]+\.?[0-9]*)', markdown_content, re.IGNORECASE | re.DOTALL)
-    if box1_match and box1_match.group(1).strip():
-        try:
-            boxes['1'] = float(box1_match.group(1).replace(',', ''))
-            pin_cites['1'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-        except ValueError:
-            logger.warning(f"Could not parse Box 1 value: {box1_match.group(1)}")
-    
-    # Box 2: Federal income tax withheld
-    box2_match = re.search(r'2\s+Federal\s+income\s+tax\s+withheld.*?\n[0-9,]+\.?[0-9]*\t+([0-9,]+\.?[0-9]*)', markdown_content, re.IGNORECASE | re.DOTALL)
-    if box2_match and box2_match.group(1).strip():
-        try:
-            boxes['2'] = float(box2_match.group(1).replace(',', ''))
-            pin_cites['2'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-        except ValueError:
-            logger.warning(f"Could not parse Box 2 value: {box2_match.group(1)}")
-    
-    # Box 3: Social security wages
-    box3_match = re.search(r'3\s+Social\s+security\s+wages.*?\n([0-9,]+\.?[0-9]*)', markdown_content, re.IGNORECASE | re.DOTALL)
-    if box3_match and box3_match.group(1).strip():
-        try:
-            boxes['3'] = float(box3_match.group(1).replace(',', ''))
-            pin_cites['3'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-        except ValueError:
-            logger.warning(f"Could not parse Box 3 value: {box3_match.group(1)}")
-    
-    # Box 4: Social security tax withheld
-    box4_match = re.search(r'4\s+Social\s+security\s+tax\s+withheld.*?\n[0-9,]+\.?[0-9]*\t+([0-9,]+\.?[0-9]*)', markdown_content, re.IGNORECASE | re.DOTALL)
-    if box4_match and box4_match.group(1).strip():
-        try:
-            boxes['4'] = float(box4_match.group(1).replace(',', ''))
-            pin_cites['4'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-        except ValueError:
-            logger.warning(f"Could not parse Box 4 value: {box4_match.group(1)}")
-    
-    # Box 5: Medicare wages and tips
-    box5_match = re.search(r'5\s+Medicare\s+wages\s+and\s+tips.*?\n([0-9,]+\.?[0-9]*)', markdown_content, re.IGNORECASE | re.DOTALL)
-    if box5_match and box5_match.group(1).strip():
-        try:
-            boxes['5'] = float(box5_match.group(1).replace(',', ''))
-            pin_cites['5'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-        except ValueError:
-            logger.warning(f"Could not parse Box 5 value: {box5_match.group(1)}")
-    
-    # Box 6: Medicare tax withheld
-    box6_match = re.search(r'6\s+Medicare\s+tax\s+withheld.*?\n[0-9,]+\.?[0-9]*\t+([0-9,]+\.?[0-9]*)', markdown_content, re.IGNORECASE | re.DOTALL)
-    if box6_match and box6_match.group(1).strip():
-        try:
-            boxes['6'] = float(box6_match.group(1).replace(',', ''))
-            pin_cites['6'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-        except ValueError:
-            logger.warning(f"Could not parse Box 6 value: {box6_match.group(1)}")
-    
-    # For state information, look in the table format
-    # State information is in a table format: | DC | 786-41-049 | 28287.2 | 1608.75 | 44590.6 | 6842.08 | Rocha Wells |
-    state_table_match = re.search(r'\|\s*([A-Z]{2})\s*\|\s*[0-9-]+\s*\|\s*([0-9,]+\.?[0-9]*)\s*\|\s*([0-9,]+\.?[0-9]*)\s*\|\s*([0-9,]+\.?[0-9]*)\s*\|\s*([0-9,]+\.?[0-9]*)\s*\|\s*([^|]+)\s*\|', markdown_content)
-    if state_table_match:
-        try:
-            # Box 15: State
-            boxes['15'] = state_table_match.group(1).strip()
-            pin_cites['15'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-            
-            # Box 16: State wages
-            if state_table_match.group(2).strip():
-                boxes['16'] = float(state_table_match.group(2).replace(',', ''))
-                pin_cites['16'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-            
-            # Box 17: State income tax
-            if state_table_match.group(3).strip():
-                boxes['17'] = float(state_table_match.group(3).replace(',', ''))
-                pin_cites['17'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-                
-            # Box 20: Locality name
-            if state_table_match.group(6).strip():
-                boxes['20'] = state_table_match.group(6).strip()
-                pin_cites['20'] = {'file': s3_key.split('/')[-1], 'page': 1, 'bbox': [0, 0, 0, 0], 'confidence': 0.9, 'source': 'bedrock_standard_output'}
-        except ValueError as e:
-            logger.warning(f"Could not parse state table values: {e}")
-    
-    # Create the W-2 form data
-    w2_data.append({
-        'employer': employer_info,
-        'employee': employee_info,
-        'boxes': boxes,
-        'pin_cites': pin_cites
-    })
-    
-    logger.info(f"Extracted W-2 data from standard output: {len(boxes)} boxes found")
+    logger.info(f"Extracted {len(w2_data)} W-2 form(s) from standard output: "
+                f"{sum(len(form['boxes']) for form in w2_data)} boxes found")
     return w2_data
 
 
@@ -654,78 +487,138 @@ def _extract_w2_from_bedrock(bedrock_response: Dict[str, Any], s3_key: str) -> L
     return w2_data
 
 
-def _check_existing_bedrock_results(s3_client, bucket_name: str, s3_key: str) -> Dict[str, Any]:
-    """Check if Bedrock results already exist for this file."""
+def _load_bedrock_job_result(s3_client, bucket_name: str, job_uuid: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Load the result JSON of a completed Bedrock job, trying each known output path; returns (key, result)."""
+    possible_keys = bda_result_keys(job_uuid)
+    
+    for result_key in possible_keys:
+        try:
+            logger.info(f"   Trying to load: {result_key}")
+            result_response = s3_client.get_object(
+                Bucket=bucket_name,
+                Key=result_key
+            )
+            bedrock_response = json.loads(result_response['Body'].read().decode('utf-8'))
+            logger.info(f"✅ Successfully loaded results from: {result_key}")
+            return result_key, bedrock_response
+        except Exception as e:
+            logger.debug(f"   Not found at {result_key}: {e}")
+            continue
+    
+    logger.error(f"❌ Results not found in any expected location for job {job_uuid}")
+    logger.error(f"   Tried: {possible_keys}")
+    return None, None
+
+
+def _download_document(s3_client, bucket_name: str, s3_key: str) -> Optional[bytes]:
+    """The uploaded file's bytes, or None if it cannot be read (Bedrock reads it from S3 itself)."""
     try:
-        # Look for existing results in the inference_results folder
-        # Bedrock creates results with UUIDs in inference_results/{uuid}/0/standard_output/0/result.json
-        response = s3_client.list_objects_v2(
-            Bucket=bucket_name,
-            Prefix="inference_results/"
-        )
-        
-        if 'Contents' not in response:
-            return None
-            
-        # Look for results that match our input file by checking job metadata
-        input_filename = s3_key.split('/')[-1]
-        logger.info(f"Looking for existing results for file: {input_filename}")
-        
-        # First, find job metadata files
-        metadata_files = [obj for obj in response['Contents'] if obj['Key'].endswith('job_metadata.json')]
-        
-        for metadata_obj in metadata_files:
-            try:
-                # Read the job metadata to check if it matches our file
-                metadata_response = s3_client.get_object(
-                    Bucket=bucket_name,
-                    Key=metadata_obj['Key']
-                )
-                metadata = json.loads(metadata_response['Body'].read().decode('utf-8'))
-                
-                # Check if this job processed our file
-                if 'output_metadata' in metadata and len(metadata['output_metadata']) > 0:
-                    asset_input_path = metadata['output_metadata'][0].get('asset_input_path', {})
-                    processed_s3_key = asset_input_path.get('s3_key', '')
-                    
-                    if s3_key in processed_s3_key or input_filename in processed_s3_key:
-                        logger.info(f"Found matching job metadata: {metadata_obj['Key']}")
-                        
-                        # Get the job ID from the metadata file path
-                        job_id = metadata_obj['Key'].split('/')[1]
-                        
-                        # Try to get the standard output result (proper Bedrock structure)
-                        # Try both path formats (with and without double slash)
-                        possible_keys = [
-                            f"inference_results/{job_id}/0/standard_output/0/result.json",
-                            f"inference_results//{job_id}/0/standard_output/0/result.json"
-                        ]
-                        
-                        for result_key in possible_keys:
-                            try:
-                                result_response = s3_client.get_object(
-                                    Bucket=bucket_name,
-                                    Key=result_key
-                                )
-                                result_data = json.loads(result_response['Body'].read().decode('utf-8'))
-                                logger.info(f"Successfully loaded existing Bedrock results from {result_key}")
-                                return result_data
-                            except Exception as e:
-                                logger.debug(f"Could not read result file {result_key}: {e}")
-                                continue
-                            
-            except Exception as e:
-                logger.warning(f"Could not read metadata file {metadata_obj['Key']}: {e}")
-                continue
-        
-        logger.info(f"No existing results found for {s3_key}")
-        return None
-        
+        return s3_client.get_object(Bucket=bucket_name, Key=s3_key)['Body'].read()
     except Exception as e:
-        logger.error(f"Error checking existing Bedrock results: {e}")
+        logger.warning(f"Could not download {s3_key} for local processing: {e}")
         return None
 
 
+def _apply_classification(classification: DocumentClassification, document_type: Optional[str], s3_key: str,
+                          min_confidence: float) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Document type to use given the classifier's decision, or the result rejecting a non-tax upload.
+
+    Confident classifications override the caller's (file-name based) type; anything
+    else keeps it. Returns (document type, rejection result or None).
+    """
+    decided = classification.confidence >= min_confidence
+    corrected = (decided and classification.document_type is not None
+                 and classification.document_type != (document_type or _detect_document_type(s3_key)))
+    get_document_classifier_stats().record(classification, decided, corrected)
+    logger.info(f"Classified {s3_key} as {classification.document_type or 'unknown'} "
+                f"(tax form: {classification.is_tax_form}, confidence {classification.confidence:.2f}, "
+                f"{classification.method}, {classification.elapsed_ms:.1f}ms)")
+    if not decided:
+        return document_type, None
+    if classification.is_tax_form is False:
+        logger.info(f"Skipping Bedrock Data Automation for {s3_key}: not a tax form")
+        return document_type, {
+            'success': False,
+            'retryable': False,
+            'error': 'The document does not look like a W-2 or 1099 tax form.',
+            'classification': classification.to_dict()
+        }
+    if corrected:
+        logger.info(f"Routing {s3_key} as {classification.document_type} instead of "
+                    f"{document_type or _detect_document_type(s3_key)}")
+    return classification.document_type or document_type, None
+
+
+def _extract_w2_from_text_layer(pdf_bytes: bytes, s3_key: str,
+                                min_confidence: float) -> Optional[List[Dict[str, Any]]]:
+    """W-2 forms read from the PDF's text layer, or None to fall back to Bedrock Data Automation."""
+    extraction = extract_w2_text_layer(pdf_bytes, s3_key, min_confidence)
+    get_text_layer_stats().record(extraction)
+    if not extraction.hit:
+        logger.info(f"Text layer fast path missed for {s3_key} ({extraction.miss_reason}); using Bedrock")
+        return None
+    logger.info(f"Read {len(extraction.forms)} W-2 form(s) from the text layer of {s3_key} "
+                f"in {extraction.elapsed_ms:.1f}ms (layout {extraction.layout})")
+    return extraction.forms
+
+
+def _find_reusable_bedrock_result(results_index: BDAResultsIndex, input_bucket: str, s3_key: str,
+                                  pdf_bytes: Optional[bytes] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Result JSON of an earlier Bedrock job on this file or on a file with identical bytes.
+
+    Looks up the S3 key first, then the SHA-256 of the upload: of pdf_bytes when
+    the upload was already downloaded, otherwise streamed from S3. A content
+    match from another engagement is reused too: the caller re-extracts it against
+    this upload's key, and only the result JSON (derived from the same bytes) is read
+    from the other job, never its key, engagement or job id. The new key is aliased
+    to the result so the next ingest of it is a key hit.
+
+    Returns:
+        (result JSON or None, content SHA-256 if it was computed)
+    """
+    stats = get_extraction_dedup_stats()
+    content_sha256 = None
+    try:
+        entry = results_index.lookup(s3_key=s3_key)
+        if entry:
+            result = results_index.load_result(entry)
+            stats.record('s3_key')
+            return result, entry.get('content_sha256')
+        
+        if pdf_bytes is not None:
+            content_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        else:
+            content_sha256 = hash_s3_object(results_index.s3_client, input_bucket, s3_key)
+        entry = results_index.lookup(content_sha256=content_sha256)
+        if entry:
+            result = results_index.load_result(entry)
+            cross_engagement = engagement_of(entry['source_s3_key']) != engagement_of(s3_key)
+            stats.record('content_hash', cross_engagement=cross_engagement)
+            results_index.record_alias(entry, s3_key)
+            logger.info(f"Reusing Bedrock results for identical content (sha256 {content_sha256[:12]}...)")
+            return result, content_sha256
+    except Exception as e:
+        # The index is an optimisation; a miss just means the document is processed again
+        logger.warning(f"Error checking Bedrock results index: {e}")
+    
+    stats.record(None)
+    logger.info(f"No existing results found for {s3_key}")
+    return None, content_sha256
+
+
+def _index_bedrock_result(results_index: BDAResultsIndex, job_uuid: str, input_bucket: str, s3_key: str,
+                          output_bucket: str, result_key: str, content_sha256: Optional[str] = None) -> None:
+    """Record a completed job in the results index under the input's key and content hash."""
+    try:
+        content_sha256 = content_sha256 or hash_s3_object(results_index.s3_client, input_bucket, s3_key)
+        results_index.record(job_uuid, s3_key, output_bucket, result_key, content_sha256)
+        logger.info(f"Indexed Bedrock results for {s3_key} (sha256 {content_sha256[:12]}...)")
+    except Exception as e:
+        logger.warning(f"Could not index Bedrock results for {s3_key}: {e}")
+
+
 def _get_bedrock_results_from_s3(s3_client, bucket_name: str, output_key: str) -> Dict[str, Any]:
     """Retrieve Bedrock Data Automation results from S3."""
     
@@ -1010,35 +903,53 @@ def _validate_1099_data(tax_data: List[Dict[str, Any]], taxpayer_name: str, tax_
     return validation_results
 
 
-async def _save_w2_extract_for_calc(s3_key: str, w2_result: Dict[str, Any], taxpayer_name: str) -> None:
+async def _save_w2_extract_for_calc(s3_key: str, w2_result: Dict[str, Any], taxpayer_name: str,
+                                    tax_year: int = 2024) -> None:
     """
     Save W-2 extract data in the format that calc_1040 expects.
     This bridges the gap between ingest_documents and calc_1040.
     """
+    engagement_id = engagement_of(s3_key)
+    if not engagement_id:
+        logger.warning(f"Could not extract engagement_id from s3_key: {s3_key}")
+        return
+    await save_w2_extracts_for_calc(engagement_id, {s3_key: w2_result}, taxpayer_name, tax_year)
+
+
+async def save_w2_extracts_for_calc(engagement_id: str, w2_results: Dict[str, Dict[str, Any]],
+                                    taxpayer_name: str, tax_year: int) -> Optional[str]:
+    """
+    Write one W2_Extracts.json for an engagement covering every given W-2 ingest.
+
+    Forms from all documents are combined and the totals summed, so a batch of
+    uploads produces a single extract (and a single tax-documents row) for
+    calc_1040 rather than each document overwriting the last.
+
+    Args:
+        engagement_id: Engagement the documents belong to
+        w2_results: Successful ingest_documents results keyed by source S3 key
+        taxpayer_name: Name of the taxpayer
+        tax_year: Tax year of the documents
+
+    Returns:
+        S3 key of the extract, or None if it could not be saved
+    """
     try:
-        # Extract engagement_id from s3_key if it follows the pattern
-        # tax-engagements/{engagement_id}/...
-        parts = s3_key.split('/')
-        if len(parts) >= 2 and parts[0] == 'tax-engagements':
-            engagement_id = parts[1]
-        else:
-            logger.warning(f"Could not extract engagement_id from s3_key: {s3_key}")
-            return
-        
         # Get user_id from engagement
         settings = get_settings()
         dynamodb = boto3.resource('dynamodb', region_name=settings.aws_region)
         engagements_table = dynamodb.Table(settings.tax_engagements_table_name)
         
         # Find the engagement to get user_id
-        response = engagements_table.scan(
+        response = await asyncio.to_thread(
+            engagements_table.scan,
             FilterExpression=boto3.dynamodb.conditions.Attr('engagement_id').eq(engagement_id)
         )
         
         items = response.get('Items', [])
         if not items:
             logger.warning(f"Could not find engagement {engagement_id}")
-            return
+            return None
         
         user_id = items[0]['user_id']
         
@@ -1046,24 +957,37 @@ async def _save_w2_extract_for_calc(s3_key: str, w2_result: Dict[str, Any], taxp
         s3_client = boto3.client('s3', region_name=settings.aws_region)
         extract_s3_key = f"tax-engagements/{engagement_id}/Workpapers/W2_Extracts.json"
         
+        # Sum in Decimal so many documents don't accumulate float error
+        total_wages = sum(Decimal(str(r.get('total_wages', 0))) for r in w2_results.values())
+        total_withholding = sum(Decimal(str(r.get('total_withholding', 0))) for r in w2_results.values())
+        forms_count = sum(r.get('forms_count', 0) for r in w2_results.values())
+        if len(w2_results) == 1:
+            validation_results = next(iter(w2_results.values())).get('validation_results', {})
+        else:
+            validation_results = {key: r.get('validation_results', {}) for key, r in w2_results.items()}
+        
         # Prepare the data in the format calc_1040 expects
         w2_extract_data = {
             "taxpayer_name": taxpayer_name,
-            "tax_year": 2024,  # Could be extracted from the result
-            "w2_forms": w2_result.get('w2_extract', {}).get('forms', []),
-            "total_wages": w2_result.get('total_wages', 0),
-            "total_withholding": w2_result.get('total_withholding', 0),
-            "forms_count": w2_result.get('forms_count', 0),
-            "validation_results": w2_result.get('validation_results', {}),
-            "processing_method": w2_result.get('processing_method', 'bedrock_data_automation'),
+            "tax_year": tax_year,
+            "w2_forms": [form for r in w2_results.values() for form in r.get('w2_extract', {}).get('forms', [])],
+            "total_wages": float(total_wages),
+            "total_withholding": float(total_withholding),
+            "forms_count": forms_count,
+            "validation_results": validation_results,
+            "source_documents": list(w2_results),
+            "processing_method": ','.join(sorted({r.get('processing_method', 'bedrock_data_automation')
+                                                  for r in w2_results.values()})),
             "created_at": datetime.now().isoformat()
         }
+        extract_body = json.dumps(w2_extract_data, indent=2, default=str)
         
         # Upload to S3
-        s3_client.put_object(
+        await asyncio.to_thread(
+            s3_client.put_object,
             Bucket=settings.documents_bucket_name,
             Key=extract_s3_key,
-            Body=json.dumps(w2_extract_data, indent=2, default=str),
+            Body=extract_body,
             ContentType='application/json'
         )
         
@@ -1078,19 +1002,19 @@ async def _save_w2_extract_for_calc(s3_key: str, w2_result: Dict[str, Any], taxp
             'mime_type': 'application/json',
             'created_at': datetime.now().isoformat(),
             's3_key': extract_s3_key,
-            'size_bytes': len(json.dumps(w2_extract_data, default=str)),
+            'size_bytes': len(extract_body),
             'hash': 'w2-extract-hash',
-            'total_wages': Decimal(str(w2_result.get('total_wages', 0))),
-            'total_withholding': Decimal(str(w2_result.get('total_withholding', 0))),
-            'forms_count': w2_result.get('forms_count', 0)
+            'total_wages': total_wages,
+            'total_withholding': total_withholding,
+            'forms_count': forms_count
         }
         
-        documents_table.put_item(Item=document_item)
+        await asyncio.to_thread(documents_table.put_item, Item=document_item)
         
-        logger.info(f"Saved W-2 extract data for calc_1040: {extract_s3_key}")
+        logger.info(f"Saved W-2 extract data for calc_1040: {extract_s3_key} ({len(w2_results)} documents)")
+        return extract_s3_key
         
     except Exception as e:
         logger.error(f"Failed to save W-2 extract for calc_1040: {e}")
         # Don't raise the exception - this is a supplementary operation
-
-
+        return None
@@ -0,0 +1,627 @@
+"""
+Durable ingestion jobs.
+
+Uploads are enqueued as jobs instead of being extracted inside the HTTP request
+or Lambda invocation that received them. enqueue_ingest_job writes a row to the
+ingest jobs table, sends the job id to an SQS queue and returns immediately;
+IngestWorkerPool runs ingest_workers worker threads (or processes), each
+receiving one message at a time under a visibility timeout, running
+ingest_documents and recording the outcome on the job row. Throughput is set by
+the number of workers, and a burst of uploads waits in the queue.
+
+A failed attempt is retried by leaving its message on the queue, visible again
+after ingest_job_retry_delay_seconds. After ingest_job_max_attempts the message
+is moved to the dead-letter queue and the job is marked dead_lettered; results
+marked not retryable (an upload that is not a tax form) end the job as
+rejected on the first attempt. A worker
+that dies mid-job stops extending its message's visibility, so the job is
+picked up by another worker once the timeout lapses; rows already finished
+ignore such duplicate deliveries. Jobs queued for an engagement (the upload
+Lambda passes one) get the chat's completed/error notification from the worker
+that finishes them.
+
+The API process starts its own workers on first enqueue; Lambdas and other
+producers only enqueue, and the worker service in the document processing
+stack runs the __main__ block below.
+
+LocalSQS implements the SQS calls used here in process. It is used when
+ingest_queue_url is empty (development, tests) and only supports thread workers.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from province.core.completion_events import CompletionEvents
+from province.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_DEAD_LETTERED = 'dead_lettered'
+JOB_REJECTED = 'rejected'  # finished without extraction: the upload is not a document we extract
+TERMINAL_JOB_STATUSES = {JOB_SUCCEEDED, JOB_DEAD_LETTERED, JOB_REJECTED}
+
+# ingest_documents result fields kept on the job row (the full extract is saved to S3 by the ingest)
+RESULT_FIELDS = ('success', 'document_type', 'forms_count', 'total_wages', 'total_withholding',
+                 'processing_method', 'extraction_reused', 'validation_results', 'classification', 'error')
+
+
+class LocalSQS:
+    """
+    In-process stand-in for the SQS client calls the ingest workers make.
+
+    Queues are created with create_queue and addressed by URL. Received messages
+    stay invisible for their visibility timeout and are redelivered (with a
+    higher ApproximateReceiveCount) unless deleted. Thread-safe; receive_message
+    long-polls for up to WaitTimeSeconds.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._condition = threading.Condition()
+
+    def create_queue(self, QueueName: str, **kwargs) -> Dict[str, Any]:
+        url = f"local://sqs/{QueueName}"
+        with self._condition:
+            self._queues.setdefault(url, {})
+        return {'QueueUrl': url}
+
+    def send_message(self, QueueUrl: str, MessageBody: str, DelaySeconds: int = 0, **kwargs) -> Dict[str, Any]:
+        message_id = uuid.uuid4().hex
+        with self._condition:
+            self._queues[QueueUrl][message_id] = {
+                'body': MessageBody,
+                'visible_at': time.monotonic() + DelaySeconds,
+                'receive_count': 0,
+                'receipt_handle': None
+            }
+            self._condition.notify_all()
+        return {'MessageId': message_id}
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, WaitTimeSeconds: float = 0,
+                        VisibilityTimeout: float = 30, **kwargs) -> Dict[str, Any]:
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                messages = self._queues[QueueUrl]
+                visible = [(message_id, m) for message_id, m in messages.items() if m['visible_at'] <= now]
+                if visible or now >= deadline:
+                    break
+                next_visible = min((m['visible_at'] for m in messages.values()), default=deadline)
+                self._condition.wait(max(0.0, min(deadline, next_visible) - now))
+            received = []
+            for message_id, message in visible[:MaxNumberOfMessages]:
+                message['receive_count'] += 1
+                message['visible_at'] = now + VisibilityTimeout
+                message['receipt_handle'] = f"{message_id}#{message['receive_count']}"
+                received.append({
+                    'MessageId': message_id,
+                    'ReceiptHandle': message['receipt_handle'],
+                    'Body': message['body'],
+                    'Attributes': {'ApproximateReceiveCount': str(message['receive_count'])}
+                })
+        return {'Messages': received} if received else {}
+
+    def _find(self, queue_url: str, receipt_handle: str) -> Optional[str]:
+        message_id = receipt_handle.split('#')[0]
+        message = self._queues[queue_url].get(message_id)
+        # A stale handle (the message was redelivered since) no longer refers to it
+        return message_id if message and message['receipt_handle'] == receipt_handle else None
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str, **kwargs) -> Dict[str, Any]:
+        with self._condition:
+            message_id = self._find(QueueUrl, ReceiptHandle)
+            if message_id:
+                del self._queues[QueueUrl][message_id]
+        return {}
+
+    def change_message_visibility(self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: float,
+                                  **kwargs) -> Dict[str, Any]:
+        with self._condition:
+            message_id = self._find(QueueUrl, ReceiptHandle)
+            if message_id:
+                self._queues[QueueUrl][message_id]['visible_at'] = time.monotonic() + VisibilityTimeout
+                self._condition.notify_all()
+        return {}
+
+    def get_queue_attributes(self, QueueUrl: str, **kwargs) -> Dict[str, Any]:
+        with self._condition:
+            now = time.monotonic()
+            messages = self._queues[QueueUrl].values()
+            visible = sum(1 for m in messages if m['visible_at'] <= now)
+            return {'Attributes': {'ApproximateNumberOfMessages': str(visible),
+                                   'ApproximateNumberOfMessagesNotVisible': str(len(messages) - visible)}}
+
+
+class IngestJobStore:
+    """Ingest job rows (job_id hash key) and their state transitions."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def create(self, s3_key: str, taxpayer_name: str, tax_year: int,
+               document_type: Optional[str] = None, engagement_id: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.utcnow().isoformat()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': JOB_QUEUED,
+            's3_key': s3_key,
+            'taxpayer_name': taxpayer_name,
+            'tax_year': tax_year,
+            'attempts': 0,
+            'created_at': now,
+            'updated_at': now
+        }
+        if document_type:
+            job['document_type'] = document_type
+        if engagement_id:
+            job['engagement_id'] = engagement_id
+        self.table.put_item(Item=job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={'job_id': job_id}).get('Item')
+        return _job_view(item) if item else None
+
+    def _update(self, job_id: str, values: Dict[str, Any], only_unfinished: bool = True) -> Optional[Dict[str, Any]]:
+        """Set `values` on the row; None if the job does not exist or (only_unfinished) already finished."""
+        from botocore.exceptions import ClientError
+
+        values = {**values, 'updated_at': datetime.utcnow().isoformat()}
+        names = {f"#{name}": name for name in values}
+        attribute_values = {f":{name}": value for name, value in values.items()}
+        condition = 'attribute_exists(job_id)'
+        if only_unfinished:
+            condition += ' AND NOT #status IN (:succeeded, :dead_lettered, :rejected)'
+            names['#status'] = 'status'
+            attribute_values.update({':succeeded': JOB_SUCCEEDED, ':dead_lettered': JOB_DEAD_LETTERED,
+                                     ':rejected': JOB_REJECTED})
+        try:
+            response = self.table.update_item(
+                Key={'job_id': job_id},
+                UpdateExpression='SET ' + ', '.join(f"#{name} = :{name}" for name in values),
+                ConditionExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=attribute_values,
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return None
+            raise
+        return _job_view(response['Attributes'])
+
+    def start_attempt(self, job_id: str, attempt: int) -> Optional[Dict[str, Any]]:
+        """Mark the job running; None for unknown or finished jobs (a duplicate delivery)."""
+        return self._update(job_id, {'status': JOB_RUNNING, 'attempts': attempt,
+                                     'started_at': datetime.utcnow().isoformat()})
+
+    def succeed(self, job_id: str, result: Dict[str, Any], status: str = JOB_SUCCEEDED) -> Optional[Dict[str, Any]]:
+        summary = {field: result[field] for field in RESULT_FIELDS if field in result}
+        return self._update(job_id, {'status': status, 'result': json.dumps(summary, default=str),
+                                     'finished_at': datetime.utcnow().isoformat()})
+
+    def retry(self, job_id: str, error: str) -> Optional[Dict[str, Any]]:
+        return self._update(job_id, {'status': JOB_QUEUED, 'last_error': error})
+
+    def dead_letter(self, job_id: str, error: str) -> Optional[Dict[str, Any]]:
+        return self._update(job_id, {'status': JOB_DEAD_LETTERED, 'last_error': error,
+                                     'finished_at': datetime.utcnow().isoformat()})
+
+
+def _job_view(item: Dict[str, Any]) -> Dict[str, Any]:
+    """A job row with numbers as ints and the stored result decoded."""
+    job = dict(item)
+    for name in ('tax_year', 'attempts'):
+        if name in job:
+            job[name] = int(job[name])
+    if 'result' in job:
+        job['result'] = json.loads(job['result'])
+    return job
+
+
+def ensure_ingest_jobs_table(dynamodb, table_name: str):
+    """Create the jobs table (job_id hash key) unless it already exists."""
+    from botocore.exceptions import ClientError
+
+    try:
+        dynamodb.meta.client.describe_table(TableName=table_name)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ResourceNotFoundException':
+            raise
+        logger.info(f"Creating DynamoDB table: {table_name}")
+        dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[{'AttributeName': 'job_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'job_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        dynamodb.meta.client.get_waiter('table_exists').wait(TableName=table_name)
+    return dynamodb.Table(table_name)
+
+
+class IngestJobEvents(CompletionEvents):
+    """Wakes long-polls in this process when a job finishes (other processes' jobs are found by polling)."""
+
+    def publish(self, job_id: str):
+        self.complete(job_id)
+
+
+@lru_cache()
+def get_ingest_job_events() -> IngestJobEvents:
+    """Get the process-wide job completion signal."""
+    return IngestJobEvents()
+
+
+class IngestJobStats:
+    """Counters for jobs handled by this process's workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.succeeded = 0
+        self.rejected = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.duplicates = 0
+        self.errors = 0  # messages whose handling raised; they reappear after the visibility timeout
+        self.in_flight = 0
+        self.total_run_ms = 0.0
+
+    def record(self, outcome: str, run_ms: float = 0.0):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.total_run_ms += run_ms
+
+    def add_in_flight(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.succeeded + self.rejected + self.retried + self.dead_lettered
+            return {
+                'enqueued': self.enqueued,
+                'succeeded': self.succeeded,
+                'rejected': self.rejected,
+                'retried': self.retried,
+                'dead_lettered': self.dead_lettered,
+                'duplicates': self.duplicates,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'avg_attempt_ms': round(self.total_run_ms / attempts, 1) if attempts else 0.0
+            }
+
+
+@lru_cache()
+def get_ingest_job_stats() -> IngestJobStats:
+    """Get the process-wide ingest job counters."""
+    return IngestJobStats()
+
+
+class IngestWorkerPool:
+    """Workers that receive ingest jobs from the queue and run them one at a time each."""
+
+    def __init__(self, sqs_client, queue_url: str, store: IngestJobStore, workers: int,
+                 dead_letter_queue_url: Optional[str] = None, mode: str = 'thread',
+                 visibility_timeout: Optional[int] = None, max_attempts: Optional[int] = None,
+                 retry_delay: Optional[int] = None, receive_wait: Optional[float] = None):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown ingest worker mode: {mode}")
+        if mode == 'process' and isinstance(sqs_client, LocalSQS):
+            raise ValueError("Process workers need an SQS queue (ingest_queue_url); LocalSQS is in-process only")
+        settings = get_settings()
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.dead_letter_queue_url = dead_letter_queue_url
+        self.store = store
+        self.workers = workers
+        self.mode = mode
+        self.visibility_timeout = visibility_timeout or settings.ingest_job_visibility_timeout_seconds
+        self.max_attempts = max_attempts or settings.ingest_job_max_attempts
+        self.retry_delay = settings.ingest_job_retry_delay_seconds if retry_delay is None else retry_delay
+        self.receive_wait = settings.ingest_queue_wait_seconds if receive_wait is None else receive_wait
+        self._stop = threading.Event()
+        self._runners: List[Any] = []
+
+    def start(self):
+        """Start the workers (idempotent)."""
+        if self._runners:
+            return
+        logger.info(f"Starting {self.workers} ingest {self.mode} workers on {self.queue_url}")
+        if self.mode == 'process':
+            context = multiprocessing.get_context('spawn')
+            self._stop = context.Event()
+            self._runners = [context.Process(target=_run_worker_process, args=(self._stop,), daemon=True,
+                                             name=f"ingest-worker-{i}") for i in range(self.workers)]
+        else:
+            self._stop = threading.Event()
+            self._runners = [threading.Thread(target=self.run_worker, args=(self._stop,), daemon=True,
+                                              name=f"ingest-worker-{i}") for i in range(self.workers)]
+        for runner in self._runners:
+            runner.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Ask workers to exit after their current job and wait up to `timeout` for them."""
+        self._stop.set()
+        for runner in self._runners:
+            runner.join(timeout)
+        self._runners = []
+
+    def run_worker(self, stop):
+        """Receive and run jobs until `stop` is set; one event loop per worker."""
+        loop = asyncio.new_event_loop()
+        try:
+            while not stop.is_set():
+                try:
+                    response = self.sqs.receive_message(
+                        QueueUrl=self.queue_url,
+                        MaxNumberOfMessages=1,
+                        WaitTimeSeconds=self.receive_wait,
+                        VisibilityTimeout=self.visibility_timeout,
+                        AttributeNames=['ApproximateReceiveCount']
+                    )
+                except Exception as e:
+                    logger.error(f"Ingest worker could not receive from {self.queue_url}: {e}")
+                    stop.wait(1.0)
+                    continue
+                for message in response.get('Messages', []):
+                    try:
+                        loop.run_until_complete(self.process_message(message))
+                    except Exception as e:
+                        # e.g. a throttled job row update or a malformed body. The message is left
+                        # unsettled, so it comes back once its visibility timeout lapses.
+                        logger.exception(f"Ingest worker could not handle message {message.get('MessageId')}: {e}")
+                        get_ingest_job_stats().record('errors')
+        finally:
+            loop.close()
+
+    async def process_message(self, message: Dict[str, Any]) -> str:
+        """
+        Run the job a queue message refers to and settle the message.
+
+        Returns:
+            The outcome: 'succeeded', 'rejected', 'retried', 'dead_lettered' or 'duplicates'
+        """
+        from .ingest_documents import ingest_documents
+
+        stats = get_ingest_job_stats()
+        receipt_handle = message['ReceiptHandle']
+        job_id = json.loads(message['Body'])['job_id']
+        attempt = int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1))
+
+        job = self.store.start_attempt(job_id, attempt)
+        if job is None:
+            logger.info(f"Dropping message for unknown or finished ingest job {job_id}")
+            self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt_handle)
+            stats.record('duplicates')
+            return 'duplicates'
+
+        stats.add_in_flight(1)
+        heartbeat = asyncio.create_task(self._keep_invisible(receipt_handle))
+        started = time.time()
+        try:
+            result = await ingest_documents(job['s3_key'], job['taxpayer_name'], job['tax_year'],
+                                            job.get('document_type'))
+            error = None if result.get('success') else (result.get('error') or 'Ingestion failed')
+        except Exception as e:
+            logger.error(f"Ingest job {job_id} attempt {attempt} raised: {e}")
+            result, error = None, str(e)
+        finally:
+            heartbeat.cancel()
+            stats.add_in_flight(-1)
+        run_ms = (time.time() - started) * 1000
+
+        if error is None:
+            self.store.succeed(job_id, result)
+            self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt_handle)
+            outcome = 'succeeded'
+        elif result is not None and result.get('retryable') is False:
+            # Another attempt would decide the same (e.g. the upload is not a tax form)
+            self.store.succeed(job_id, result, status=JOB_REJECTED)
+            self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt_handle)
+            outcome = 'rejected'
+        elif attempt >= self.max_attempts:
+            if self.dead_letter_queue_url:
+                self.sqs.send_message(QueueUrl=self.dead_letter_queue_url,
+                                      MessageBody=json.dumps({'job_id': job_id, 'error': error}))
+            self.store.dead_letter(job_id, error)
+            self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt_handle)
+            outcome = 'dead_lettered'
+        else:
+            # Leave the message on the queue; it becomes visible again after the retry delay
+            self.store.retry(job_id, error)
+            self.sqs.change_message_visibility(QueueUrl=self.queue_url, ReceiptHandle=receipt_handle,
+                                               VisibilityTimeout=self.retry_delay)
+            outcome = 'retried'
+        logger.info(f"Ingest job {job_id} attempt {attempt}: {outcome} in {run_ms:.0f}ms"
+                    + (f" ({error})" if error else ""))
+        stats.record(outcome, run_ms)
+        if outcome != 'retried':
+            get_ingest_job_events().publish(job_id)
+            if job.get('engagement_id'):
+                await _notify_engagement(job, outcome, result, error)
+        return outcome
+
+    async def _keep_invisible(self, receipt_handle: str):
+        """Extend the message's visibility while its job runs, so a slow job is not redelivered."""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 2)
+            try:
+                await asyncio.to_thread(self.sqs.change_message_visibility, QueueUrl=self.queue_url,
+                                        ReceiptHandle=receipt_handle, VisibilityTimeout=self.visibility_timeout)
+            except Exception as e:
+                logger.warning(f"Could not extend visibility of {receipt_handle}: {e}")
+
+
+async def _notify_engagement(job: Dict[str, Any], outcome: str, result: Optional[Dict[str, Any]],
+                             error: Optional[str]):
+    """Tell the job's engagement chat how its upload ended (as the upload Lambda does for direct processing)."""
+    from .chat_notifications import send_chat_notification
+
+    file_name = os.path.basename(job['s3_key'])
+    if outcome == 'succeeded':
+        doc_type = result.get('document_type', 'document')
+        total_wages = result.get('total_wages', 0)
+        await send_chat_notification(
+            job['engagement_id'],
+            f"✅ {file_name} processed successfully! Found {doc_type} with wages: ${total_wages:,.2f}",
+            "completed",
+            {field: result[field] for field in RESULT_FIELDS if field in result}
+        )
+    else:
+        await send_chat_notification(
+            job['engagement_id'],
+            f"❌ Failed to process {file_name}: {error}",
+            "error"
+        )
+
+
+@lru_cache()
+def get_ingest_queue() -> Tuple[Any, str, Optional[str]]:
+    """Get (SQS client, queue URL, dead-letter queue URL); LocalSQS queues when ingest_queue_url is empty."""
+    settings = get_settings()
+    if settings.ingest_queue_url:
+        import boto3
+
+        sqs = boto3.client('sqs', region_name=settings.aws_region)
+        return sqs, settings.ingest_queue_url, settings.ingest_dead_letter_queue_url or None
+    sqs = LocalSQS()
+    return (sqs, sqs.create_queue(QueueName='ingest-jobs')['QueueUrl'],
+            sqs.create_queue(QueueName='ingest-jobs-dlq')['QueueUrl'])
+
+
+@lru_cache()
+def get_ingest_job_store() -> IngestJobStore:
+    """Get the process-wide ingest job store."""
+    import boto3
+
+    settings = get_settings()
+    dynamodb = boto3.resource('dynamodb', region_name=settings.aws_region)
+    return IngestJobStore(dynamodb.Table(settings.ingest_jobs_table_name))
+
+
+@lru_cache()
+def get_ingest_worker_pool() -> IngestWorkerPool:
+    """Get the process-wide worker pool (not started)."""
+    settings = get_settings()
+    sqs, queue_url, dead_letter_queue_url = get_ingest_queue()
+    return IngestWorkerPool(sqs, queue_url, get_ingest_job_store(), settings.ingest_workers,
+                            dead_letter_queue_url=dead_letter_queue_url, mode=settings.ingest_worker_mode)
+
+
+def shutdown_ingest_workers():
+    """Stop the worker pool if it was ever created."""
+    if get_ingest_worker_pool.cache_info().currsize:
+        get_ingest_worker_pool().stop()
+        get_ingest_worker_pool.cache_clear()
+
+
+def _run_worker_process(stop):
+    """Entry point of a process worker: its own clients, one job at a time."""
+    logging.basicConfig(level=logging.INFO)
+    pool = get_ingest_worker_pool()
+    pool.run_worker(stop)
+
+
+def enqueue_ingest_job(s3_key: str, taxpayer_name: str, tax_year: int,
+                       document_type: Optional[str] = None, engagement_id: Optional[str] = None,
+                       start_workers: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Record an ingest job and queue it for the workers.
+
+    Starts this process's worker pool on first use when start_workers is true
+    (None = ingest_workers_in_process); otherwise workers run separately, see
+    the __main__ block below. With an engagement_id, the worker that finishes
+    the job posts its completed/error notification to that engagement's chat.
+
+    Returns:
+        The new job row (status 'queued')
+    """
+    sqs, queue_url, _ = get_ingest_queue()
+    job = get_ingest_job_store().create(s3_key, taxpayer_name, tax_year, document_type, engagement_id)
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({'job_id': job['job_id']}))
+    get_ingest_job_stats().record('enqueued')
+    if start_workers is None:
+        start_workers = get_settings().ingest_workers_in_process
+    if start_workers:
+        get_ingest_worker_pool().start()
+    return job
+
+
+async def wait_for_ingest_job(job_id: str, timeout: float, poll_interval: float = 1.0) -> Optional[Dict[str, Any]]:
+    """
+    The job once it finishes, or as it stands after `timeout` seconds.
+
+    Jobs run by this process wake the wait immediately; others are seen by
+    re-reading the row every `poll_interval` seconds.
+
+    Returns:
+        The job row, or None if the job does not exist
+    """
+    store = get_ingest_job_store()
+    events = get_ingest_job_events()
+    deadline = time.monotonic() + timeout
+    while True:
+        finished = events.watch(job_id)
+        try:
+            job = await asyncio.to_thread(store.get, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in TERMINAL_JOB_STATUSES or remaining <= 0:
+                return job
+            try:
+                await asyncio.wait_for(finished, min(poll_interval, remaining))
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            events.unwatch(job_id, finished)
+
+
+# Standalone workers: python -m province.agents.tax.tools.ingest_jobs [--workers N] [--create-table]
+if __name__ == "__main__":
+    import argparse
+
+    import boto3
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Run ingest job workers against the SQS ingest queue")
+    parser.add_argument('--workers', type=int, help="Worker count (defaults to INGEST_WORKERS)")
+    parser.add_argument('--create-table', action='store_true', help="Create the jobs table if it is missing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv('.env.local')
+    settings = get_settings()
+    if not settings.ingest_queue_url:
+        raise SystemExit("INGEST_QUEUE_URL is not set")
+    if args.create_table:
+        ensure_ingest_jobs_table(boto3.resource('dynamodb', region_name=settings.aws_region),
+                                 settings.ingest_jobs_table_name)
+    if args.workers:
+        settings.ingest_workers = args.workers
+
+    # Containers are stopped with SIGTERM; finish the jobs in hand like on Ctrl-C
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+    pool = get_ingest_worker_pool()
+    pool.start()
+    try:
+        while not stopping.wait(3600):
+            pass
+    except KeyboardInterrupt:
+        pass
+    pool.stop(timeout=pool.visibility_timeout)
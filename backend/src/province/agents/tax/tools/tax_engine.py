@@ -0,0 +1,385 @@
+"""
+Rules-driven federal income tax engine.
+
+Bracket, standard deduction and child tax credit tables come from rules
+packages in the format export_rules_to_gcs.py writes (US_<year>_rules.json).
+Complete packages for the supported years ship in agents/tax/rules; exports in
+settings.tax_rules_dir are laid over them, and any field an export fills in
+(a non-zero deduction, a non-empty bracket list) replaces the bundled value.
+
+All arithmetic is on int64 cents. Each bracket's tax is accumulated in
+cent-basis-points (1/10000 of a cent) and rounded half-up to a cent once, so
+results are exact and match a Decimal walk over the same brackets. Returns are
+computed as arrays: np.searchsorted finds every income's bracket, and the
+precomputed tax below each bracket's floor plus the marginal slice gives the
+tax, so a single return and a 100k-return batch take the same path.
+"""
+
+import glob
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from province.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'rules')
+
+# Filing status codes (FilingStatus values), in the order of the engine's per-status arrays
+FILING_STATUSES = ('S', 'MFJ', 'MFS', 'HOH', 'QW')
+# Rules package keys per filing status; qualifying surviving spouses use the joint tables
+PACKAGE_STATUS_KEYS = {
+    'S': 'single',
+    'MFJ': 'married_filing_jointly',
+    'MFS': 'married_filing_separately',
+    'HOH': 'head_of_household',
+    'QW': 'married_filing_jointly',
+}
+_STATUS_NAMES = {
+    'single': 'S',
+    'married filing jointly': 'MFJ',
+    'married filing separately': 'MFS',
+    'head of household': 'HOH',
+    'qualifying widow': 'QW',
+    'qualifying widower': 'QW',
+    'qualifying widow(er)': 'QW',
+    'qualifying surviving spouse': 'QW',
+}
+
+BASIS_POINTS = 10000
+# Amounts beyond this many cents could overflow int64 once multiplied by a rate in basis points
+MAX_AMOUNT_CENTS = 10 ** 13
+# The child tax credit shrinks by phase_out_per_1000 for each $1,000 (or part of one) over the threshold
+CTC_PHASE_OUT_STEP_CENTS = 100000
+
+
+def normalize_filing_status(filing_status: Any) -> str:
+    """
+    Map a filing status to its code.
+
+    Accepts codes ('MFJ'), FilingStatus members and names in any case with
+    spaces or underscores ('Married Filing Jointly', 'married_filing_jointly').
+
+    Raises:
+        ValueError: For an unknown filing status
+    """
+    text = str(getattr(filing_status, 'value', filing_status)).strip()
+    if text.upper() in FILING_STATUSES:
+        return text.upper()
+    code = _STATUS_NAMES.get(text.lower().replace('_', ' '))
+    if code is None:
+        raise ValueError(f"Unknown filing status: {filing_status}")
+    return code
+
+
+def to_cents(amounts: Any) -> np.ndarray:
+    """
+    Convert dollar amounts (numbers, Decimals or arrays of them) to int64 cents, rounding half-up.
+
+    Floats round as the Decimal of their shortest repr would, so 1.005 is 101
+    cents rather than the 100 its binary value (1.00499...) gives. Only floats
+    within rounding error of a half cent take the Decimal path.
+
+    Raises:
+        ValueError: For NaN, infinite or too large amounts
+    """
+    values = np.asarray(amounts)
+    if values.dtype.kind in 'iub':
+        if values.size and np.abs(values.astype(np.float64)).max() * 100 >= MAX_AMOUNT_CENTS:
+            raise ValueError("Amount too large for the tax engine")
+        return values.astype(np.int64) * 100
+    if values.dtype.kind == 'f':
+        if values.size and (not np.isfinite(values).all() or np.abs(values).max() * 100 >= MAX_AMOUNT_CENTS):
+            raise ValueError("Amount too large for the tax engine")
+        scaled = values * 100
+        cents = np.atleast_1d(np.floor(scaled + 0.5).astype(np.int64))
+        halves = np.atleast_1d(np.abs(scaled - np.floor(scaled) - 0.5) <= np.maximum(1e-6, np.abs(scaled) * 1e-12))
+        if halves.any():
+            cents[halves] = _decimal_cents(np.atleast_1d(values)[halves])
+        return cents.reshape(values.shape)
+    return _decimal_cents(values)
+
+
+def _decimal_cents(values: np.ndarray) -> np.ndarray:
+    amounts = [Decimal(str(value)) * 100 for value in values.ravel()]
+    if not all(amount.is_finite() and abs(amount) < MAX_AMOUNT_CENTS for amount in amounts):
+        raise ValueError("Amount too large for the tax engine")
+    return np.array([int(amount.to_integral_value(ROUND_HALF_UP)) for amount in amounts],
+                    dtype=np.int64).reshape(values.shape)
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+@dataclass(frozen=True)
+class TaxYearRules:
+    """One tax year's tables, as arrays indexed like FILING_STATUSES."""
+    tax_year: int
+    package_ids: Tuple[str, ...]
+    standard_deduction_cents: np.ndarray
+    bracket_floors_cents: Tuple[np.ndarray, ...]
+    bracket_rates_bp: Tuple[np.ndarray, ...]
+    # Tax on the income below each bracket's floor, in cent-basis-points
+    bracket_base_tax: Tuple[np.ndarray, ...]
+    ctc_per_child_cents: int
+    ctc_phase_out_threshold_cents: np.ndarray
+    ctc_phase_out_per_step_cents: int
+
+
+@dataclass
+class TaxComputation:
+    """One return's results, in dollars."""
+    tax_year: int
+    filing_status: str
+    agi: Decimal
+    standard_deduction: Decimal
+    taxable_income: Decimal
+    tax: Decimal
+    child_tax_credit: Decimal
+    tax_after_credits: Decimal
+    withholding: Decimal
+    refund_or_due: Decimal
+    marginal_rate: Decimal
+    package_ids: Tuple[str, ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: float(value) if isinstance(value, Decimal) else value for key, value in asdict(self).items()}
+
+
+def _rate_bp(rate: Any) -> int:
+    # Exported brackets give rates as percentages (10); accept fractions (0.10) too
+    rate = Decimal(str(rate))
+    return int((rate * (100 if rate > 1 else BASIS_POINTS)).to_integral_value(ROUND_HALF_UP))
+
+
+def _parse_brackets(brackets: List[Dict[str, Any]], source: str) -> List[Tuple[int, int]]:
+    """Exported brackets as (floor in cents, rate in basis points), checked to tile [0, inf)."""
+    ordered = sorted(brackets, key=lambda bracket: Decimal(str(bracket.get('min') or 0)))
+    parsed, expected_floor = [], 0
+    for position, bracket in enumerate(ordered):
+        floor = int(to_cents(Decimal(str(bracket.get('min') or 0))))
+        if floor != expected_floor:
+            raise ValueError(f"{source}: bracket starting at {floor / 100} leaves a gap or overlap")
+        parsed.append((floor, _rate_bp(bracket['rate'])))
+        if bracket.get('max') is None:
+            if position != len(ordered) - 1:
+                raise ValueError(f"{source}: only the top bracket may be open-ended")
+            return parsed
+        expected_floor = int(to_cents(Decimal(str(bracket['max']))))
+    raise ValueError(f"{source}: the top bracket must have no max")
+
+
+def _base_tax(floors: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    widths = np.diff(floors)
+    return np.concatenate(([0], np.cumsum(widths * rates[:-1]))).astype(np.int64)
+
+
+class TaxEngine:
+    """Tax tables by year, and vectorized 1040 tax computations over them."""
+
+    def __init__(self, packages: Iterable[Dict[str, Any]]):
+        merged: Dict[int, Dict[str, Any]] = {}
+        for package in packages:
+            self._merge(merged, package)
+        self._rules: Dict[int, TaxYearRules] = {}
+        for tax_year, tables in merged.items():
+            try:
+                self._rules[tax_year] = self._build(tax_year, tables)
+            except ValueError as e:
+                logger.warning(f"Tax year {tax_year} is incomplete and was not loaded: {e}")
+
+    @classmethod
+    def from_directories(cls, *directories: str) -> 'TaxEngine':
+        """Load the *_rules.json packages of each directory; later directories override earlier ones."""
+        packages = []
+        for directory in directories:
+            if not directory:
+                continue
+            for path in sorted(glob.glob(os.path.join(directory, '*_rules.json'))):
+                with open(path) as f:
+                    package = json.load(f)
+                package.setdefault('metadata', {}).setdefault('package_id', os.path.basename(path))
+                packages.append(package)
+        return cls(packages)
+
+    @staticmethod
+    def _merge(merged: Dict[int, Dict[str, Any]], package: Dict[str, Any]):
+        metadata, rules = package.get('metadata', {}), package.get('rules', {})
+        if metadata.get('jurisdiction', {}).get('level', 'federal') != 'federal':
+            return
+        tax_year, package_id = int(metadata['tax_year']), metadata.get('package_id', 'unknown')
+        tables = merged.setdefault(tax_year, {'package_ids': [], 'standard_deduction': {}, 'tax_brackets': {},
+                                              'child_tax_credit': None})
+        used = False
+        for key, amount in (rules.get('standard_deduction') or {}).items():
+            if amount:  # exports leave deductions they could not extract at 0
+                tables['standard_deduction'][key] = amount
+                used = True
+        for key, brackets in (rules.get('tax_brackets') or {}).items():
+            if brackets:
+                tables['tax_brackets'][key] = _parse_brackets(brackets, f"{package_id} {key}")
+                used = True
+        child_tax_credit = (rules.get('credits') or {}).get('child_tax_credit')
+        if child_tax_credit:
+            tables['child_tax_credit'] = child_tax_credit
+            used = True
+        if used:
+            tables['package_ids'].append(package_id)
+
+    @staticmethod
+    def _build(tax_year: int, tables: Dict[str, Any]) -> TaxYearRules:
+        deductions, floors, rates, bases = [], [], [], []
+        for status in FILING_STATUSES:
+            key = PACKAGE_STATUS_KEYS[status]
+            if key not in tables['standard_deduction'] or key not in tables['tax_brackets']:
+                raise ValueError(f"no standard deduction or brackets for {key}")
+            deductions.append(int(to_cents(Decimal(str(tables['standard_deduction'][key])))))
+            status_floors = np.array([floor for floor, _ in tables['tax_brackets'][key]], dtype=np.int64)
+            status_rates = np.array([rate for _, rate in tables['tax_brackets'][key]], dtype=np.int64)
+            floors.append(status_floors)
+            rates.append(status_rates)
+            bases.append(_base_tax(status_floors, status_rates))
+
+        child_tax_credit = tables['child_tax_credit'] or {}
+        thresholds = child_tax_credit.get('phase_out_threshold', {})
+        return TaxYearRules(
+            tax_year=tax_year,
+            package_ids=tuple(tables['package_ids']),
+            standard_deduction_cents=np.array(deductions, dtype=np.int64),
+            bracket_floors_cents=tuple(floors),
+            bracket_rates_bp=tuple(rates),
+            bracket_base_tax=tuple(bases),
+            ctc_per_child_cents=int(to_cents(Decimal(str(child_tax_credit.get('amount_per_child', 0))))),
+            ctc_phase_out_threshold_cents=np.array(
+                [int(to_cents(Decimal(str(thresholds.get(PACKAGE_STATUS_KEYS[status], 0)))))
+                 for status in FILING_STATUSES], dtype=np.int64),
+            ctc_phase_out_per_step_cents=int(to_cents(Decimal(str(child_tax_credit.get('phase_out_per_1000', 0)))))
+        )
+
+    @property
+    def tax_years(self) -> List[int]:
+        return sorted(self._rules)
+
+    def rules(self, tax_year: int) -> TaxYearRules:
+        """
+        Get one year's tables.
+
+        Raises:
+            ValueError: If no complete rules package covers the year
+        """
+        try:
+            return self._rules[int(tax_year)]
+        except KeyError:
+            raise ValueError(f"No tax rules for {tax_year} (available: {self.tax_years})") from None
+
+    def status_indexes(self, filing_statuses: Any) -> np.ndarray:
+        """Map filing statuses (one, or an array of them) to indexes into FILING_STATUSES."""
+        values = np.asarray(filing_statuses, dtype=object)
+        if values.ndim == 0:
+            return np.asarray(FILING_STATUSES.index(normalize_filing_status(values.item())), dtype=np.int64)
+        unique, inverse = np.unique(values.astype(str), return_inverse=True)
+        codes = np.array([FILING_STATUSES.index(normalize_filing_status(value)) for value in unique], dtype=np.int64)
+        return codes[inverse].reshape(values.shape)
+
+    def tax_on_taxable_income(self, tax_year: int, taxable_cents: np.ndarray,
+                              status_indexes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Regular income tax on arrays of taxable income.
+
+        Args:
+            tax_year: Tax year of the tables to use
+            taxable_cents: Taxable incomes in cents (negative counts as 0)
+            status_indexes: Filing status index of each income (see status_indexes)
+
+        Returns:
+            (tax in cents, marginal rate in basis points), shaped like taxable_cents
+        """
+        rules = self.rules(tax_year)
+        taxable_cents, status_indexes = np.broadcast_arrays(np.maximum(np.asarray(taxable_cents, dtype=np.int64), 0),
+                                                            np.asarray(status_indexes, dtype=np.int64))
+        tax_cbp = np.zeros(taxable_cents.shape, dtype=np.int64)
+        marginal_bp = np.zeros(taxable_cents.shape, dtype=np.int64)
+        for status in np.unique(status_indexes):
+            mask = status_indexes == status
+            income = taxable_cents[mask]
+            floors = rules.bracket_floors_cents[status]
+            bracket = np.searchsorted(floors, income, side='right') - 1
+            rates = rules.bracket_rates_bp[status][bracket]
+            tax_cbp[mask] = rules.bracket_base_tax[status][bracket] + (income - floors[bracket]) * rates
+            marginal_bp[mask] = rates
+        return (tax_cbp + BASIS_POINTS // 2) // BASIS_POINTS, marginal_bp
+
+    def compute_returns(self, tax_year: int, filing_statuses: Any, agi: Any, withholding: Any = 0,
+                        qualifying_children: Any = 0) -> Dict[str, np.ndarray]:
+        """
+        Compute simple 1040 returns in bulk (standard deduction, regular tax, child tax credit).
+
+        Each argument may be a scalar or an array; they are broadcast together.
+
+        Args:
+            tax_year: Tax year of the tables to use
+            filing_statuses: Filing status codes or names
+            agi: Adjusted gross income in dollars
+            withholding: Federal income tax withheld in dollars
+            qualifying_children: Children qualifying for the child tax credit
+
+        Returns:
+            Dict of int64 arrays in cents (agi, standard_deduction, taxable_income, tax,
+            child_tax_credit, tax_after_credits, withholding, refund_or_due) plus
+            marginal_rate_bp in basis points
+        """
+        rules = self.rules(tax_year)
+        status, agi_cents, withholding_cents, children = np.broadcast_arrays(
+            self.status_indexes(filing_statuses), to_cents(agi), to_cents(withholding),
+            np.asarray(qualifying_children, dtype=np.int64))
+
+        standard_deduction = rules.standard_deduction_cents[status]
+        taxable_income = np.maximum(agi_cents - standard_deduction, 0)
+        tax, marginal_bp = self.tax_on_taxable_income(tax_year, taxable_income, status)
+
+        # Nonrefundable child tax credit, phased out by AGI and limited to the tax
+        excess = np.maximum(agi_cents - rules.ctc_phase_out_threshold_cents[status], 0)
+        phase_out = -(-excess // CTC_PHASE_OUT_STEP_CENTS) * rules.ctc_phase_out_per_step_cents
+        child_tax_credit = np.minimum(np.maximum(np.maximum(children, 0) * rules.ctc_per_child_cents - phase_out, 0),
+                                      tax)
+        tax_after_credits = tax - child_tax_credit
+
+        return {
+            'agi': agi_cents,
+            'standard_deduction': standard_deduction,
+            'taxable_income': taxable_income,
+            'tax': tax,
+            'child_tax_credit': child_tax_credit,
+            'tax_after_credits': tax_after_credits,
+            'withholding': withholding_cents,
+            'refund_or_due': withholding_cents - tax_after_credits,
+            'marginal_rate_bp': marginal_bp
+        }
+
+    def compute_return(self, tax_year: int, filing_status: Any, agi: Any, withholding: Any = 0,
+                       qualifying_children: int = 0) -> TaxComputation:
+        """Compute one simple 1040 return; see compute_returns."""
+        code = normalize_filing_status(filing_status)
+        results = self.compute_returns(tax_year, code, agi, withholding, qualifying_children)
+        amounts = {name: cents_to_decimal(values) for name, values in results.items() if name != 'marginal_rate_bp'}
+        return TaxComputation(
+            tax_year=int(tax_year),
+            filing_status=code,
+            marginal_rate=Decimal(int(results['marginal_rate_bp'])).scaleb(-4),
+            package_ids=self.rules(tax_year).package_ids,
+            **amounts
+        )
+
+
+@lru_cache()
+def get_tax_engine() -> TaxEngine:
+    """Get the process-wide tax engine (bundled rules plus settings.tax_rules_dir)."""
+    return TaxEngine.from_directories(BUNDLED_RULES_DIR, get_settings().tax_rules_dir)
@@ -0,0 +1,114 @@
+"""
+What-if comparisons of a simple 1040 return.
+
+"What if I file jointly?" or "what if I add a dependent?" used to take one
+calc_1040_tool call per question. evaluate_scenarios takes a base return and
+a grid of variations (filing statuses x dependent counts x wage deltas x
+withholding deltas), expands the grid with NumPy and computes every scenario
+in a single TaxEngine.compute_returns pass, so a few hundred scenarios cost
+about as much as one. Results come back as a compact table: column names once,
+then one row per scenario.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .tax_engine import get_tax_engine, normalize_filing_status
+
+# Columns of each scenario row; amounts are in dollars
+SCENARIO_COLUMNS = (
+    'filing_status', 'dependents', 'wages', 'withholding', 'taxable_income', 'tax', 'child_tax_credit',
+    'tax_after_credits', 'refund_or_due', 'change_vs_base', 'marginal_rate'
+)
+
+
+def count_scenarios(filing_statuses: Optional[Sequence[str]] = None, dependents: Optional[Sequence[int]] = None,
+                    wage_deltas: Optional[Sequence[float]] = None,
+                    withholding_deltas: Optional[Sequence[float]] = None) -> int:
+    """Number of scenarios in a grid (an omitted axis keeps the base value)."""
+    return math.prod(len(axis) if axis else 1 for axis in (filing_statuses, dependents, wage_deltas,
+                                                           withholding_deltas))
+
+
+def evaluate_scenarios(
+    tax_year: int,
+    filing_status: str,
+    wages: float,
+    withholding: float = 0,
+    dependents: int = 0,
+    filing_statuses: Optional[Sequence[str]] = None,
+    dependent_counts: Optional[Sequence[int]] = None,
+    wage_deltas: Optional[Sequence[float]] = None,
+    withholding_deltas: Optional[Sequence[float]] = None,
+    max_scenarios: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Compute a base return and every combination of the given variations.
+
+    Args:
+        tax_year: Tax year
+        filing_status: Base filing status
+        wages: Base wages (the return's AGI)
+        withholding: Base federal withholding
+        dependents: Base number of qualifying children
+        filing_statuses: Filing statuses to compare (None = the base status)
+        dependent_counts: Dependent counts to compare (None = the base count)
+        wage_deltas: Dollar changes to the base wages (None = no change)
+        withholding_deltas: Dollar changes to the base withholding (None = no change)
+        max_scenarios: Refuse grids larger than this
+
+    Returns:
+        Dict with columns, the base row, the scenario rows, their count and
+        the index of the row with the largest refund_or_due
+
+    Raises:
+        ValueError: For an unknown filing status or tax year, a negative dependent
+            count, or a grid over max_scenarios
+    """
+    count = count_scenarios(filing_statuses, dependent_counts, wage_deltas, withholding_deltas)
+    if max_scenarios is not None and count > max_scenarios:
+        raise ValueError(f"{count} scenarios exceed the limit of {max_scenarios}")
+    if dependents < 0 or any(value < 0 for value in dependent_counts or []):
+        raise ValueError("Dependent counts cannot be negative")
+
+    base_status = normalize_filing_status(filing_status)
+    statuses = [normalize_filing_status(status) for status in filing_statuses or [base_status]]
+    status_axis, dependents_axis, wage_axis, withholding_axis = (axis.ravel() for axis in np.meshgrid(
+        np.arange(len(statuses)),
+        np.asarray(dependent_counts or [dependents], dtype=np.int64),
+        np.asarray(wage_deltas or [0], dtype=np.float64),
+        np.asarray(withholding_deltas or [0], dtype=np.float64),
+        indexing='ij'
+    ))
+
+    # Row 0 is the base return; the grid follows
+    scenario_statuses = np.concatenate(([base_status], np.asarray(statuses, dtype=object)[status_axis]))
+    scenario_dependents = np.concatenate(([dependents], dependents_axis))
+    scenario_wages = np.maximum(wages + np.concatenate(([0.0], wage_axis)), 0)
+    scenario_withholding = np.maximum(withholding + np.concatenate(([0.0], withholding_axis)), 0)
+
+    results = get_tax_engine().compute_returns(tax_year, scenario_statuses, scenario_wages, scenario_withholding,
+                                               scenario_dependents)
+
+    columns = {
+        'filing_status': scenario_statuses.tolist(),
+        'dependents': scenario_dependents.tolist(),
+        'wages': (results['agi'] / 100).tolist(),
+        'withholding': (results['withholding'] / 100).tolist(),
+        'change_vs_base': ((results['refund_or_due'] - results['refund_or_due'][0]) / 100).tolist(),
+        'marginal_rate': (results['marginal_rate_bp'] / 10000).tolist()
+    }
+    for name in ('taxable_income', 'tax', 'child_tax_credit', 'tax_after_credits', 'refund_or_due'):
+        columns[name] = (results[name] / 100).tolist()
+    rows: List[List[Any]] = [list(row) for row in zip(*(columns[name] for name in SCENARIO_COLUMNS))]
+
+    return {
+        'tax_year': tax_year,
+        'columns': list(SCENARIO_COLUMNS),
+        'base': rows[0],
+        'scenarios': rows[1:],
+        'count': count,
+        'best': int(np.argmax(results['refund_or_due'][1:]))
+    }
@@ -0,0 +1,302 @@
+"""
+Single-pass parser for W-2 markdown from Bedrock Data Automation standard output.
+
+BDA renders each page as markdown: box labels on one line with their values on
+the next ("1 Wages, tips, other compensation\\t\\t2 Federal income tax
+withheld" over "55151.93\\t\\t16606.17"), identifiers and names in bold under
+their labels, and state/local rows as a markdown table. parse_w2_markdown walks
+the lines of every page once. Labels, located with plain substring searches
+(no backtracking regex spans the markdown), set what the following lines are
+expected to hold; value lines fill those expectations. A label for a field the
+current form already has starts a new form, so files with several W-2s yield
+one form each, and identical copies (Copy B, C, 2) are collapsed.
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+SOURCE = 'bedrock_standard_output'
+
+# Boxes whose values sit on the line under a row of labels, in column order
+BOX_LABELS = {
+    'wages, tips, other compensation': '1',
+    'federal income tax withheld': '2',
+    'social security wages': '3',
+    'social security tax withheld': '4',
+    'medicare wages and tips': '5',
+    'medicare tax withheld': '6',
+    'social security tips': '7',
+    'allocated tips': '8',
+    'dependent care benefits': '10',
+    'nonqualified plans': '11',
+}
+
+# Label phrases (lowercase, bold markers removed) and what the lines after them hold
+_LABELS: Tuple[Tuple[str, str], ...] = (
+    ("employee's social security number", 'ssn'),
+    ("employer identification number", 'ein'),
+    ("employer's name, address, and zip code", 'employer_name'),
+    ("employer's name, address and zip code", 'employer_name'),
+    ("employee's first name and initial", 'employee_name'),
+    ("employee's address and zip code", 'employee_address'),
+    ("employee's address, and zip code", 'employee_address'),
+) + tuple((label, 'box') for label in BOX_LABELS)
+_BOLD_RE = re.compile(r'\*\*([^*\n]+)\*\*')
+_LETTER_RE = re.compile(r'[A-Za-z]')
+_AMOUNT_RE = re.compile(r'^\$?([0-9][0-9,]*(?:\.[0-9]*)?)$')
+# A line holding nothing but amounts (the values under a row of box labels)
+_VALUE_ROW_RE = re.compile(r'[\s|*]*\$?[0-9][0-9,]*(?:\.[0-9]*)?(?:[\s|*]+\$?[0-9][0-9,]*(?:\.[0-9]*)?)*[\s|*]*')
+_VALUE_RE = re.compile(r'[0-9][0-9,]*(?:\.[0-9]*)?')
+_EIN_RE = re.compile(r'\b([0-9]{2}-[0-9]{7})\b')
+_SSN_RE = re.compile(r'\b([0-9]{3}-[0-9]{2}-[0-9]{4})\b')
+_NAME_TOKEN_RE = re.compile(r"^[A-Za-z][A-Za-z .'-]*$")
+_CITY_STATE_RE = re.compile(r'^([A-Za-z][A-Za-z\s]*?)\s+([A-Z]{2})$')
+_ZIP_RE = re.compile(r'^([0-9]{5}(?:-[0-9]{4})?)$')
+_STATE_CODE_RE = re.compile(r'^[A-Z]{2}$')
+_UNIT_RE = re.compile(
+    r'(Apt\.?|Apartment|Suite|Ste\.?|Unit|#|Room|Rm\.?|Bldg\.?|Building|Floor|Fl\.?)\s*(?<=\s|#)(\S+)',
+    re.IGNORECASE
+)
+
+# State table columns after the state code and state ID: boxes 16-19, then the locality name
+_STATE_TABLE_BOXES = ('16', '17', '18', '19', '20')
+
+
+@dataclass
+class _FormBuilder:
+    """Fields of the W-2 being parsed, with where each was read."""
+    employer: Dict[str, Any] = field(default_factory=dict)
+    employee: Dict[str, Any] = field(default_factory=dict)
+    boxes: Dict[str, Any] = field(default_factory=dict)
+    pin_cites: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def has(self, name: str) -> bool:
+        return name in self.pin_cites
+
+    def set(self, target: Dict[str, Any], key: str, value: Any, cite: str, page: int, file_name: str,
+            confidence: float = 0.9):
+        target[key] = value
+        self.pin_cites[cite] = {'file': file_name, 'page': page, 'bbox': [0, 0, 0, 0],
+                                'confidence': confidence, 'source': SOURCE}
+
+    def identity(self) -> Tuple:
+        return (self.employer.get('EIN'), self.employee.get('SSN'), tuple(sorted(self.boxes.items())))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'employer': self.employer, 'employee': self.employee, 'boxes': self.boxes,
+                'pin_cites': self.pin_cites}
+
+
+def _amount(token: str) -> Optional[float]:
+    match = _AMOUNT_RE.match(token.strip(' *'))
+    if not match:
+        return None
+    try:
+        return float(match.group(1).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _split_street(street: str) -> Tuple[str, str]:
+    """(street without unit, unit number) for addresses like '613 Roger Crest Apt. 802'."""
+    match = _UNIT_RE.search(street)
+    if not match:
+        return street, ''
+    return street[:match.start()].strip(), match.group(2)
+
+
+class _W2MarkdownParser:
+    """State machine over markdown lines; see the module docstring."""
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.forms: List[_FormBuilder] = []
+        self.form = _FormBuilder()
+        self.pending_boxes: List[str] = []
+        self.expect: Optional[str] = None  # 'ssn', 'ein', 'employer_name', 'employee_name', 'last_name'
+        self.address: Optional[List[str]] = None  # employee address lines read so far
+        self.first_name = ''
+        self.state_rows = 0
+
+    def _finish_form(self):
+        if self.form.pin_cites:
+            self.forms.append(self.form)
+        self.form = _FormBuilder()
+        self.pending_boxes, self.expect, self.address, self.state_rows = [], None, None, 0
+
+    @property
+    def idle(self) -> bool:
+        """Nothing is expected, so only a label or a table row can matter."""
+        return not self.pending_boxes and self.expect is None and self.address is None
+
+    def feed(self, line: str, plain: str, labels: List[Tuple[int, str, str]], page: int):
+        """Consume one line (`plain` has bold markers removed) and the labels found on it."""
+        if labels:
+            self._on_labels(labels)
+            if self.expect in ('ssn', 'ein'):
+                start, label, _ = labels[-1]
+                self._on_identifier(plain[start + len(label):], page)  # value printed beside its label
+            return
+        stripped = plain.strip()
+        if not stripped:
+            return
+        if stripped[0] == '|':
+            self._on_table_row(stripped, page)
+        elif self.pending_boxes and self._on_box_values(plain, page):
+            return
+        elif self.expect in ('ssn', 'ein'):
+            self._on_identifier(plain, page)
+        elif self.expect in ('employer_name', 'employee_name', 'last_name'):
+            self._on_name(line, page)
+        elif self.address is not None:
+            self._on_address(stripped, page)
+
+    def _on_labels(self, labels: List[Tuple[int, str, str]]):
+        boxes = [BOX_LABELS[label] for _, label, kind in labels if kind == 'box']
+        others = [kind for _, _, kind in labels if kind != 'box']
+        if others == ['employee_address']:
+            return  # the address block under the employee's name continues
+        cites = boxes[:1] + [{'ssn': 'SSN', 'ein': 'EIN'}.get(kind, kind) for kind in others]
+        if any(self.form.has(cite) for cite in cites):
+            self._finish_form()
+        if boxes:
+            self.pending_boxes = boxes
+        others = [kind for kind in others if kind != 'employee_address']
+        if others:
+            self.expect = others[-1]
+        self.address = None
+
+    def _on_box_values(self, line: str, page: int) -> bool:
+        if not _VALUE_ROW_RE.fullmatch(line):
+            return False  # not a value row, e.g. stray OCR text between labels and values
+        amounts = [float(value.replace(',', '')) for value in _VALUE_RE.findall(line)]
+        for box, value in zip(self.pending_boxes, amounts):
+            self.form.set(self.form.boxes, box, value, box, page, self.file_name)
+        self.pending_boxes = []
+        return True
+
+    def _on_identifier(self, line: str, page: int):
+        pattern, target, key = (_SSN_RE, self.form.employee, 'SSN') if self.expect == 'ssn' \
+            else (_EIN_RE, self.form.employer, 'EIN')
+        match = pattern.search(line)
+        if match:
+            self.form.set(target, key, match.group(1), key, page, self.file_name)
+            self.expect = None
+
+    def _on_name(self, line: str, page: int):
+        if _BOLD_RE.sub('', line).strip():
+            return  # names are printed in bold on lines of their own; skip stray OCR text
+        bold = [b.strip() for b in _BOLD_RE.findall(line)]
+        if self.expect == 'employer_name':
+            bold = [b for b in bold if _LETTER_RE.search(b)]
+            if bold:
+                self.form.set(self.form.employer, 'name', bold[0], 'employer_name', page, self.file_name)
+                self.expect = None
+            return
+        names = [b for b in bold if _NAME_TOKEN_RE.match(b)]
+        if not names:
+            return
+        if self.expect == 'employee_name' and (' ' in names[0] or len(names) > 1):
+            full_name = names[0] if ' ' in names[0] else f"{names[0]} {names[1]}"
+            self._set_employee_name(full_name, page)
+        elif self.expect == 'employee_name':
+            self.first_name, self.expect = names[0], 'last_name'
+        else:
+            self._set_employee_name(f"{self.first_name} {names[0]}", page)
+
+    def _set_employee_name(self, name: str, page: int):
+        self.form.set(self.form.employee, 'name', name, 'employee_name', page, self.file_name)
+        self.expect = None
+        self.address = []
+
+    def _on_address(self, text: str, page: int):
+        # Street (starting with a house number), then "City ST", then the ZIP code; other
+        # lines in between are OCR noise, and the next label ends the block
+        if not self.address:
+            if text[0].isdigit() and _LETTER_RE.search(text):
+                self.address.append(text)
+        elif len(self.address) == 1:
+            if _CITY_STATE_RE.match(text):
+                self.address.append(text)
+        else:
+            zip_match = _ZIP_RE.match(text)
+            if not zip_match:
+                return
+            street = self.address[0]
+            city, state = _CITY_STATE_RE.match(self.address[1]).groups()
+            street_without_unit, apt_no = _split_street(street)
+            employee = self.form.employee
+            employee.update({'street': street_without_unit, 'apt_no': apt_no, 'city': city.strip(),
+                             'state': state, 'zip': zip_match.group(1)})
+            self.form.set(employee, 'address', f"{street}, {city.strip()}, {state} {zip_match.group(1)}",
+                          'employee_address', page, self.file_name, confidence=0.85)
+            self.address = None
+
+    def _on_table_row(self, line: str, page: int):
+        cells = [c.strip() for c in line.strip('|').split('|')]
+        if len(cells) < 3 or not _STATE_CODE_RE.match(cells[0]):
+            return  # header, separator or an unrelated table
+        suffix = '' if self.state_rows == 0 else f"_{chr(ord('a') + self.state_rows - 1)}"
+        self.state_rows += 1
+        self.form.set(self.form.boxes, f'15{suffix}', cells[0], f'15{suffix}', page, self.file_name)
+        for box, cell in zip(_STATE_TABLE_BOXES, cells[2:]):
+            value = cell if box == '20' else _amount(cell)
+            if value:
+                self.form.set(self.form.boxes, f'{box}{suffix}', value, f'{box}{suffix}', page, self.file_name)
+
+    def result(self) -> List[Dict[str, Any]]:
+        self._finish_form()
+        forms, seen = [], set()
+        for form in self.forms:
+            identity = form.identity()
+            if identity not in seen:
+                seen.add(identity)
+                forms.append(form.to_dict())
+        return forms
+
+
+def _labels_by_line(lower: str, line_starts: List[int]) -> Dict[int, List[Tuple[int, str, str]]]:
+    """Label occurrences of a page, grouped by line index, with their column in the line."""
+    found: Dict[int, List[Tuple[int, str, str]]] = {}
+    for label, kind in _LABELS:
+        start = lower.find(label)
+        while start >= 0:
+            line_index = bisect_right(line_starts, start) - 1
+            found.setdefault(line_index, []).append((start - line_starts[line_index], label, kind))
+            start = lower.find(label, start + len(label))
+    for labels in found.values():
+        labels.sort()
+    return found
+
+
+def parse_w2_markdown(pages: List[Optional[str]], file_name: str) -> List[Dict[str, Any]]:
+    """
+    Parse W-2 forms from the markdown of each page of a BDA standard output.
+
+    Args:
+        pages: Markdown per page (None for pages without a markdown representation)
+        file_name: Source file name recorded in pin cites
+
+    Returns:
+        One form dict (employer, employee, boxes, pin_cites) per distinct W-2 found
+    """
+    parser = _W2MarkdownParser(file_name)
+    for page_num, markdown in enumerate(pages, start=1):
+        if not markdown:
+            continue
+        # Labels are located with one str.find per phrase over the whole page; removing
+        # '**' keeps lines aligned, so only lines with a label or an open expectation do work
+        plain = markdown.replace('**', '').replace('’', "'")
+        plain_lines = plain.split('\n')
+        line_starts = list(accumulate((len(line) + 1 for line in plain_lines[:-1]), initial=0))
+        labels_by_line = _labels_by_line(plain.lower(), line_starts)
+        raw_lines = markdown.split('\n')
+        for index, plain_line in enumerate(plain_lines):
+            labels = labels_by_line.get(index)
+            if labels is None and '|' not in plain_line and parser.idle:
+                continue
+            parser.feed(raw_lines[index], plain_line, labels or (), page_num)
+    return parser.result()
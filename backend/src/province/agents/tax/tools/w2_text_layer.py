@@ -0,0 +1,285 @@
+"""
+Local W-2 extraction from a PDF's text layer.
+
+Payroll-generated W-2s carry real text, so the boxes can be read with PyMuPDF
+in milliseconds instead of a Bedrock Data Automation job. Each standard layout
+is a set of box templates: the printed label to find, where the value sits
+relative to it and what the value must look like. A field is confident when
+every copy on the page (Copy B, C, 2...) yields exactly one matching value and
+the copies agree. The document is only accepted when boxes 1 and 2, the EIN
+and the SSN are confident on every W-2 page; anything else (scans, masked
+SSNs, unfamiliar layouts) is left to BDA.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOURCE = 'pdf_text_layer'
+REQUIRED_FIELDS = ('1', '2', 'EIN', 'SSN')
+
+# Confidence of a field read from a single copy, and from several copies that agree
+SINGLE_COPY_CONFIDENCE = 0.95
+AGREEING_COPIES_CONFIDENCE = 0.99
+AMBIGUOUS_CONFIDENCE = 0.5
+
+MONEY = re.compile(r'^\$?(\d{1,3}(?:,\d{3})*|\d+)\.\d{2}$')
+EIN = re.compile(r'^\d{2}-\d{7}$')
+SSN = re.compile(r'^\d{3}-\d{2}-\d{4}$')
+TEXT = re.compile(r'\S')
+
+
+@dataclass(frozen=True)
+class BoxTemplate:
+    """Where one W-2 field's value is printed relative to its label."""
+    name: str
+    labels: Tuple[str, ...]
+    pattern: Pattern
+    placement: str = 'below'  # 'below' the label inside the box, or to its 'right' on the same line
+    width: float = 135.0
+    height: float = 24.0
+    kind: str = 'money'  # 'money', 'id' or 'text' (first line of words in the region)
+
+
+def _box(name, label, **kwargs):
+    return BoxTemplate(name, (label,), MONEY, **kwargs)
+
+
+_EMPLOYER_NAME_LABELS = ("Employer's name, address, and ZIP code", "Employer’s name, address, and ZIP code")
+_EMPLOYEE_NAME_LABELS = ("Employee's first name and initial", "Employee’s first name and initial",
+                         "Employee's name", "Employee’s name")
+
+W2_LAYOUTS: Dict[str, Tuple[BoxTemplate, ...]] = {
+    # IRS Form W-2 and the payroll renderings that copy it: value under the label, inside the box
+    'irs_w2': (
+        _box('1', 'Wages, tips, other compensation'),
+        _box('2', 'Federal income tax withheld'),
+        _box('3', 'Social security wages'),
+        _box('4', 'Social security tax withheld'),
+        _box('5', 'Medicare wages and tips'),
+        _box('6', 'Medicare tax withheld'),
+        BoxTemplate('EIN', ('Employer identification number',), EIN, kind='id', width=200),
+        BoxTemplate('SSN', ('social security number',), SSN, kind='id', width=200),
+        BoxTemplate('employer_name', _EMPLOYER_NAME_LABELS, TEXT, kind='text', width=290, height=60),
+        BoxTemplate('employee_name', _EMPLOYEE_NAME_LABELS, TEXT, kind='text', width=290, height=24),
+    ),
+    # Compact payroll summaries: "Label ........ value" on one line
+    'payroll_inline': (
+        _box('1', 'Wages, tips, other comp', placement='right', width=160),
+        _box('2', 'Federal income tax withheld', placement='right', width=160),
+        _box('3', 'Social security wages', placement='right', width=160),
+        _box('4', 'Social security tax withheld', placement='right', width=160),
+        _box('5', 'Medicare wages and tips', placement='right', width=160),
+        _box('6', 'Medicare tax withheld', placement='right', width=160),
+        BoxTemplate('EIN', ('Employer identification number', 'Employer ID number'), EIN, 'right', 160, kind='id'),
+        BoxTemplate('SSN', ('social security number',), SSN, 'right', 160, kind='id'),
+        BoxTemplate('employer_name', ("Employer's name", "Employer’s name"), TEXT, 'right', 250, kind='text'),
+        BoxTemplate('employee_name', _EMPLOYEE_NAME_LABELS, TEXT, 'right', 250, kind='text'),
+    ),
+}
+
+
+@dataclass
+class FieldReading:
+    """A field's value, where it was read and how sure the read is."""
+    value: Any
+    page: int
+    bbox: List[float]
+    confidence: float
+
+
+@dataclass
+class TextLayerExtraction:
+    """Outcome of the fast path: forms when it hit, otherwise why it missed."""
+    forms: List[Dict[str, Any]] = field(default_factory=list)
+    layout: Optional[str] = None
+    miss_reason: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def hit(self) -> bool:
+        return self.miss_reason is None and bool(self.forms)
+
+
+def _line_start(words: List[tuple], label_rect) -> float:
+    """Left edge of the label's text run, so box letters and numbers ("a", "1") before the phrase count."""
+    x0 = label_rect.x0
+    same_line = [w for w in words if label_rect.y0 <= (w[1] + w[3]) / 2 <= label_rect.y1]
+    while True:
+        previous = [w for w in same_line if x0 - 12 <= w[2] <= x0 + 1 and w[0] < x0 - 0.5]
+        if not previous:
+            return x0
+        x0 = min(w[0] for w in previous)
+
+
+def _region(words: List[tuple], label_rect, template: BoxTemplate) -> Tuple[float, float, float, float]:
+    if template.placement == 'right':
+        return (label_rect.x1, label_rect.y0 - 2, label_rect.x1 + template.width, label_rect.y1 + 2)
+    x0 = _line_start(words, label_rect)
+    return (x0 - 2, label_rect.y1 - 1, x0 + template.width, label_rect.y1 + template.height)
+
+
+def _words_in(words: List[tuple], region: Tuple[float, float, float, float]) -> List[tuple]:
+    x0, y0, x1, y1 = region
+    inside = [w for w in words if x0 <= (w[0] + w[2]) / 2 <= x1 and y0 <= (w[1] + w[3]) / 2 <= y1]
+    return sorted(inside, key=lambda w: (round(w[1]), w[0]))
+
+
+def _read_copy(words: List[tuple], label_rect, template: BoxTemplate) -> Tuple[List[Any], Optional[List[float]]]:
+    """Candidate values of one copy of a field (one label occurrence), with the first one's bbox."""
+    region_words = _words_in(words, _region(words, label_rect, template))
+    if template.kind == 'text':
+        if not region_words:
+            return [], None
+        first_line = [w for w in region_words if abs(w[1] - region_words[0][1]) < 3]
+        text = ' '.join(w[4] for w in first_line).strip()
+        bbox = [first_line[0][0], first_line[0][1], first_line[-1][2], first_line[-1][3]]
+        return ([text], bbox) if text else ([], None)
+
+    matches = [w for w in region_words if template.pattern.match(w[4])]
+    values = [float(w[4].lstrip('$').replace(',', '')) if template.kind == 'money' else w[4] for w in matches]
+    return values, (list(matches[0][:4]) if matches else None)
+
+
+def _read_field(page, words: List[tuple], page_num: int, template: BoxTemplate) -> Optional[FieldReading]:
+    """Read a field from every copy on the page; confident only if each copy has one value and all agree."""
+    label_rects = [rect for label in template.labels for rect in page.search_for(label)]
+    copies = []
+    for rect in label_rects:
+        values, bbox = _read_copy(words, rect, template)
+        if values:
+            copies.append((values, bbox))
+    if not copies:
+        return None
+
+    first_values, first_bbox = copies[0]
+    distinct = {v for values, _ in copies for v in values}
+    if len(distinct) == 1 and all(len(values) == 1 for values, _ in copies):
+        confidence = AGREEING_COPIES_CONFIDENCE if len(copies) > 1 else SINGLE_COPY_CONFIDENCE
+    else:
+        confidence = AMBIGUOUS_CONFIDENCE
+    return FieldReading(first_values[0], page_num, [round(c, 1) for c in first_bbox], confidence)
+
+
+def _form_from_readings(readings: Dict[str, FieldReading], file_name: str) -> Dict[str, Any]:
+    """W-2 form dict in the shape the Bedrock extractors produce."""
+    employer, employee, boxes, pin_cites = {}, {}, {}, {}
+    targets = {'EIN': (employer, 'EIN'), 'employer_name': (employer, 'name'),
+               'SSN': (employee, 'SSN'), 'employee_name': (employee, 'name')}
+    for name, reading in readings.items():
+        target, key = targets.get(name, (boxes, name))
+        target[key] = reading.value
+        pin_cites[name] = {'file': file_name, 'page': reading.page, 'bbox': reading.bbox,
+                           'confidence': reading.confidence, 'source': SOURCE}
+    return {'employer': employer, 'employee': employee, 'boxes': boxes, 'pin_cites': pin_cites}
+
+
+def _extract_with_layout(doc, layout: Tuple[BoxTemplate, ...], file_name: str,
+                         min_confidence: float) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    forms, seen = [], set()
+    w2_pages = 0
+    for page_num, page in enumerate(doc, start=1):
+        words = page.get_text('words')
+        readings = {}
+        for template in layout:
+            reading = _read_field(page, words, page_num, template)
+            if reading is not None:
+                readings[template.name] = reading
+        if not readings.keys() & set(REQUIRED_FIELDS):
+            continue  # instructions or a blank back page
+        w2_pages += 1
+        weak = [name for name in REQUIRED_FIELDS
+                if name not in readings or readings[name].confidence < min_confidence]
+        if weak:
+            return [], f"low_confidence:{','.join(weak)}"
+        # Copies of the same W-2 may sit on separate pages; keep one form per distinct W-2
+        identity = tuple(readings[name].value for name in REQUIRED_FIELDS)
+        if identity not in seen:
+            seen.add(identity)
+            forms.append(_form_from_readings(readings, file_name))
+    return forms, (None if w2_pages else 'no_w2_layout')
+
+
+def extract_w2_text_layer(pdf_bytes: bytes, s3_key: str, min_confidence: float = 0.9) -> TextLayerExtraction:
+    """
+    Read W-2 forms from a PDF's text layer.
+
+    Args:
+        pdf_bytes: The uploaded PDF
+        s3_key: Its S3 key (file name recorded in pin cites)
+        min_confidence: Confidence every required field must reach
+
+    Returns:
+        TextLayerExtraction with one form per distinct W-2 on a hit, or the miss reason
+    """
+    import fitz  # PyMuPDF
+
+    started = time.perf_counter()
+    result = TextLayerExtraction()
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+    except Exception as e:
+        result.miss_reason = 'unreadable_pdf'
+        logger.info(f"Text layer fast path could not open {s3_key}: {e}")
+        return result
+    try:
+        if not any(page.get_text('text').strip() for page in doc):
+            result.miss_reason = 'no_text_layer'
+        else:
+            file_name = s3_key.split('/')[-1]
+            reasons = []
+            for layout_name, layout in W2_LAYOUTS.items():
+                forms, miss_reason = _extract_with_layout(doc, layout, file_name, min_confidence)
+                if forms and miss_reason is None:
+                    result.forms, result.layout = forms, layout_name
+                    break
+                reasons.append(miss_reason)
+            else:
+                # Report the most specific reason: a layout that matched but was unsure beats no match
+                result.miss_reason = next((r for r in reasons if r != 'no_w2_layout'), 'no_w2_layout')
+    finally:
+        doc.close()
+        result.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+class TextLayerStats:
+    """Counters for the W-2 text layer fast path: hits, and misses by reason."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses: Dict[str, int] = {}
+        self.hit_ms_total = 0.0
+
+    def record(self, extraction: TextLayerExtraction):
+        with self._lock:
+            if extraction.hit:
+                self.hits += 1
+                self.hit_ms_total += extraction.elapsed_ms
+            else:
+                reason = (extraction.miss_reason or 'no_forms').split(':')[0]
+                self.misses[reason] = self.misses.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.hits + sum(self.misses.values())
+            return {
+                'attempts': attempts,
+                'hits': self.hits,
+                'misses': dict(self.misses),
+                'hit_rate': self.hits / attempts if attempts else 0.0,
+                'avg_hit_ms': self.hit_ms_total / self.hits if self.hits else 0.0
+            }
+
+
+@lru_cache()
+def get_text_layer_stats() -> TextLayerStats:
+    """Get the process-wide text layer fast path counters."""
+    return TextLayerStats()
@@ -2,12 +2,20 @@
 API endpoints for PDF form filling functionality.
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
+import json
 import logging
+import time
 
-from province.agents.tax.tools.form_filler import fill_tax_form, get_available_tax_forms, get_tax_form_fields
+from province.agents.tax.tools.fill_pool import fill_forms_batch
+from province.agents.tax.tools.form_filler import (
+    fill_tax_form, fill_tax_package, get_available_tax_forms, get_tax_form_fields, get_template_cache,
+    get_mapping_cache, get_tax_form_filler, rasterize_pdf_page, run_blocking
+)
+from province.agents.tax.tools.tax_engine import get_tax_engine
 from province.core.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -125,6 +133,166 @@ async def fill_tax_form_endpoint(request: FormFillRequest):
         )
 
 
+class BatchFillItem(BaseModel):
+    """One form fill within a batch."""
+    form_type: str = Field(default="1040", description="Type of tax form to fill")
+    form_data: Dict[str, Any] = Field(..., description="Semantic field values for the form")
+    user_id: Optional[str] = Field(None, description="Clerk user ID for PII-safe storage")
+
+
+class BatchFillRequest(BaseModel):
+    """Request to fill many tax forms at once."""
+    items: List[BatchFillItem] = Field(..., min_length=1, description="Forms to fill")
+    skip_questions: bool = Field(default=True, description="Fill with available data instead of asking questions")
+
+
+@router.post("/fill-form/batch")
+async def fill_form_batch_endpoint(request: BatchFillRequest):
+    """
+    Fill many tax forms in parallel on the form fill process pool.
+    
+    Results are streamed as newline-delimited JSON in completion order, one
+    line per item (tagged with its request index), followed by a summary line.
+    
+    Args:
+        request: Batch of fill requests
+        
+    Returns:
+        StreamingResponse of application/x-ndjson result lines
+        
+    Raises:
+        HTTPException: If the batch exceeds the configured size limit
+    """
+    
+    max_items = get_settings().form_fill_batch_max_items
+    if len(request.items) > max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(request.items)} exceeds the limit of {max_items} forms"
+        )
+    
+    logger.info(f"Processing batch fill of {len(request.items)} forms")
+    items = [item.model_dump() for item in request.items]
+    
+    async def stream_results():
+        succeeded = 0
+        async for result in fill_forms_batch(items, skip_questions=request.skip_questions):
+            if result.get('success'):
+                succeeded += 1
+            yield json.dumps({'type': 'result', **result}, default=str) + "\n"
+        yield json.dumps({
+            'type': 'summary',
+            'total': len(items),
+            'succeeded': succeeded,
+            'failed': len(items) - succeeded
+        }) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+class PackageFillRequest(BaseModel):
+    """Request to fill a multi-form return package."""
+    form_types: List[str] = Field(..., min_length=1, description="Forms in the package, in merge order")
+    form_data: Dict[str, Any] = Field(..., description="Semantic field values shared by all forms")
+    user_id: Optional[str] = Field(None, description="Clerk user ID for PII-safe storage")
+
+
+@router.post("/fill-package")
+async def fill_package_endpoint(request: PackageFillRequest):
+    """
+    Fill a return package (e.g. 1040 plus schedules and a state form) in one pass.
+    
+    All forms are rendered concurrently and uploaded as one version: a merged
+    package PDF plus the individual forms.
+    
+    Args:
+        request: Package fill request with form types and shared form data
+        
+    Returns:
+        Package URL, per-form URLs and versioning info
+        
+    Raises:
+        HTTPException: If any form in the package fails to fill
+    """
+    
+    logger.info(f"Processing package fill of {request.form_types}")
+    result = await fill_tax_package(request.form_types, request.form_data, user_id=request.user_id)
+    
+    if not result.get('success'):
+        raise HTTPException(
+            status_code=500,
+            detail=f"Package filling failed: {result.get('error', 'Unknown error')}"
+        )
+    
+    return result
+
+
+class PreviewRequest(BaseModel):
+    """Request to render a live preview of a filled form."""
+    form_type: str = Field(default="1040", description="Type of tax form to preview")
+    form_data: Dict[str, Any] = Field(..., description="Semantic field values for the form")
+    user_id: Optional[str] = Field(None, description="Clerk user ID, used when committing the preview")
+    page: Optional[int] = Field(None, ge=1, description="Rasterize only this page (1-based) to PNG")
+    dpi: int = Field(default=72, ge=18, le=300, description="Resolution of the rasterized page")
+    commit: bool = Field(default=False, description="Also save the rendered PDF as a new version, in the background")
+
+
+PREVIEW_CHUNK_SIZE = 64 * 1024
+
+
+@router.post("/preview")
+async def preview_form_endpoint(request: PreviewRequest, background_tasks: BackgroundTasks):
+    """
+    Fill a form in memory and stream it straight back for a live preview.
+    
+    Nothing is uploaded unless `commit` is set, in which case the rendered PDF is
+    stored as a new version after the response has been sent.
+    
+    Args:
+        request: Preview request with form data and optional page to rasterize
+        background_tasks: Runs the commit upload after the response
+        
+    Returns:
+        StreamingResponse of the filled PDF, or a PNG of one page when `page` is set
+        
+    Raises:
+        HTTPException: If rendering fails or the page is out of range
+    """
+    
+    filler = get_tax_form_filler()
+    started = time.perf_counter()
+    try:
+        pdf_bytes, mapping_version = await filler.render_preview(request.form_type, request.form_data)
+        if request.page:
+            content = await run_blocking(rasterize_pdf_page, pdf_bytes, request.page, request.dpi)
+            media_type = "image/png"
+        else:
+            content = pdf_bytes
+            media_type = "application/pdf"
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Preview of {request.form_type} failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Preview failed: {str(e)}")
+    
+    headers = {
+        "Content-Disposition": "inline",
+        "X-Render-Ms": f"{(time.perf_counter() - started) * 1000:.1f}",
+        "X-Preview-Commit": "scheduled" if request.commit else "none"
+    }
+    if request.commit:
+        background_tasks.add_task(
+            filler.commit_rendered_form,
+            request.form_type, request.form_data, pdf_bytes, mapping_version, user_id=request.user_id
+        )
+    
+    def stream_content():
+        for offset in range(0, len(content), PREVIEW_CHUNK_SIZE):
+            yield content[offset:offset + PREVIEW_CHUNK_SIZE]
+    
+    return StreamingResponse(stream_content(), media_type=media_type, headers=headers)
+
+
 @router.get("/available-forms")
 async def get_available_forms():
     """
@@ -143,6 +311,21 @@ async def get_available_forms():
     }
 
 
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Get template and mapping cache counters (hits, misses, revalidations, bytes saved).
+    
+    Returns:
+        Cache statistics for the current worker process
+    """
+    
+    return {
+        "template_cache": get_template_cache().stats(),
+        "mapping_cache": get_mapping_cache().stats()
+    }
+
+
 @router.get("/form-fields/{form_type}")
 async def get_form_fields(form_type: str, year: int = 2024):
     """
@@ -231,45 +414,24 @@ async def preview_calculations(request: FormFillRequest):
     """
     
     try:
-        # This would use the same calculation logic as the form filler
-        # but return just the calculated values for preview
-        
         w2_extract = request.w2_extract_data.get('w2_extract', {})
         total_wages = float(w2_extract.get('total_wages', 0))
         total_withholding = float(w2_extract.get('total_withholding', 0))
-        
-        # Get standard deduction
         filing_status = request.taxpayer_info.filing_status
-        standard_deduction_amounts = {
-            'single': 14600.0,
-            'married_filing_jointly': 29200.0,
-            'married_filing_separately': 14600.0,
-            'head_of_household': 21900.0
-        }
-        standard_deduction = standard_deduction_amounts.get(filing_status, 14600.0)
         
-        # Calculate taxable income
-        adjusted_gross_income = total_wages
-        taxable_income = max(0, adjusted_gross_income - standard_deduction)
-        
-        # Simple tax calculation (this would use the same logic as the form filler)
-        if taxable_income <= 11000:
-            tax_owed = taxable_income * 0.10
-        elif taxable_income <= 44725:
-            tax_owed = 1100 + (taxable_income - 11000) * 0.12
-        else:
-            tax_owed = 5147 + (taxable_income - 44725) * 0.22  # Simplified
-        
-        # Refund or amount owed
-        refund_or_owed = total_withholding - tax_owed
+        try:
+            result = get_tax_engine().compute_return(request.form_year, filing_status, total_wages, total_withholding)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        refund_or_owed = float(result.refund_or_due)
         
         return {
             "calculations": {
                 "total_wages": total_wages,
-                "adjusted_gross_income": adjusted_gross_income,
-                "standard_deduction": standard_deduction,
-                "taxable_income": taxable_income,
-                "tax_owed": tax_owed,
+                "adjusted_gross_income": float(result.agi),
+                "standard_deduction": float(result.standard_deduction),
+                "taxable_income": float(result.taxable_income),
+                "tax_owed": float(result.tax_after_credits),
                 "total_withholding": total_withholding,
                 "refund_amount": max(0, refund_or_owed),
                 "amount_owed": max(0, -refund_or_owed),
@@ -282,6 +444,8 @@ async def preview_calculations(request: FormFillRequest):
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in preview calculations: {e}")
         raise HTTPException(
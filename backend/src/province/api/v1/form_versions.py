@@ -1,7 +1,7 @@
 """
 Form Versions API
 
-Endpoints for fetching filled form versions from S3 with metadata.
+Endpoints for fetching filled form versions and their metadata.
 """
 
 from fastapi import APIRouter, HTTPException, Query
@@ -12,6 +12,7 @@ import boto3
 from datetime import datetime
 import os
 
+from ...agents.tax.tools.form_filler import get_tax_form_filler
 from ...core.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -97,20 +98,29 @@ async def get_form_versions(
         )
         
         bucket = settings.documents_bucket_name
+        versions = []
         
-        # If we have a user_id, search for that specific user's forms
+        # If we have a user_id, read that user's version rows (one Query, however many versions)
         if user_id:
-            # Forms are now stored as: filled_forms/{user_id}/{form_type}/{tax_year}/vXXX_*.pdf
-            prefix = f"filled_forms/{user_id}/{form_type.lower()}/{tax_year}/"
-            
-            logger.info(f"Searching for forms with prefix: {prefix}")
+            filler = get_tax_form_filler()
+            document_id = filler.build_document_id(user_id, form_type, tax_year)
+            logger.info(f"Querying version history for {document_id}")
             
-            # List all form versions for this user
-            response = s3_client.list_objects_v2(
-                Bucket=bucket,
-                Prefix=prefix,
-                MaxKeys=limit
-            )
+            for entry in await filler.get_version_history(document_id, limit=limit):
+                created = datetime.fromisoformat(entry['last_modified'])
+                versions.append(FormVersion(
+                    version=entry['version'],
+                    version_number=entry['version_number'],
+                    s3_key=entry['s3_key'],
+                    size=entry['size'],
+                    timestamp=created.isoformat(),
+                    last_modified=created.strftime('%Y-%m-%d %H:%M:%S'),
+                    download_url=s3_client.generate_presigned_url(
+                        'get_object',
+                        Params={'Bucket': bucket, 'Key': entry['s3_key']},
+                        ExpiresIn=3600
+                    )
+                ))
         else:
             # Fallback: scan all users' forms
             logger.info(f"Scanning all users for {form_type} forms (engagement not found in DynamoDB)")
@@ -122,28 +132,23 @@ async def get_form_versions(
                 Prefix=base_prefix,
                 MaxKeys=1000  # Scan more to find any forms
             )
-        
-        versions = []
-        
-        if response.get('Contents'):
-            for obj in response['Contents']:
+            
+            for obj in response.get('Contents', []):
                 key = obj['Key']
                 
                 # Skip if not a PDF
                 if not key.endswith('.pdf'):
                     continue
                 
-                # If scanning all users, filter by form_type and tax_year
-                if not user_id:
-                    # Path format: filled_forms/{user_id}/{form_type}/{tax_year}/vXXX_*.pdf
-                    parts = key.split('/')
-                    if len(parts) < 5:
-                        continue
-                    key_form_type = parts[2]
-                    key_tax_year = parts[3]
-                    
-                    if key_form_type.lower() != form_type.lower() or key_tax_year != str(tax_year):
-                        continue
+                # Path format: filled_forms/{user_id}/{form_type}/{tax_year}/vXXX_*.pdf
+                parts = key.split('/')
+                if len(parts) < 5:
+                    continue
+                key_form_type = parts[2]
+                key_tax_year = parts[3]
+                
+                if key_form_type.lower() != form_type.lower() or key_tax_year != str(tax_year):
+                    continue
                 
                 # Extract version from filename (e.g., v031_1040_1760887161.pdf)
                 filename = key.split('/')[-1]
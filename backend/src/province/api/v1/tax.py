@@ -2,15 +2,32 @@
 Tax Processing API Endpoints
 
 Provides REST API endpoints for tax-related document processing,
-including W2 ingestion using AWS Bedrock Data Automation.
+including W2 ingestion using AWS Bedrock Data Automation, and what-if
+tax calculations.
 """
 
+import asyncio
+import json
 import logging
-from typing import Dict, Any, Optional
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, confloat, conint
 
+from ...agents.tax.tools.bda_jobs import get_bda_completion_events
+from ...agents.tax.tools.bda_results_index import get_extraction_dedup_stats
+from ...agents.tax.tools.document_classifier import get_document_classifier_stats
+from ...agents.tax.tools.ingest_batch import ingest_documents_batch
 from ...agents.tax.tools.ingest_documents import ingest_documents
+from ...agents.tax.tools.ingest_jobs import (
+    enqueue_ingest_job,
+    get_ingest_job_stats,
+    get_ingest_queue,
+    wait_for_ingest_job
+)
+from ...agents.tax.tools.tax_scenarios import count_scenarios, evaluate_scenarios
+from ...agents.tax.tools.w2_text_layer import get_text_layer_stats
+from ...core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +50,7 @@ class IngestW2Response(BaseModel):
     total_wages: Optional[float] = Field(None, description="Total wages from all forms")
     total_withholding: Optional[float] = Field(None, description="Total withholding from all forms")
     processing_method: Optional[str] = Field(None, description="Processing method used")
+    extraction_reused: Optional[bool] = Field(None, description="Whether an earlier extraction of the same document was reused")
     error: Optional[str] = Field(None, description="Error message if processing failed")
 
 
@@ -45,6 +63,10 @@ async def ingest_w2_endpoint(request: IngestW2Request) -> IngestW2Response:
     structured tax data including employer information, employee information,
     and all W2 tax boxes with validation.
     
+    Runs in the request rather than as an ingest job: the response carries the
+    full extract, which job rows deliberately do not store (see RESULT_FIELDS).
+    Uploads should use POST /tax/ingest/jobs instead.
+    
     Args:
         request: W2 ingestion request with S3 key, taxpayer name, and tax year
         
@@ -71,6 +93,7 @@ async def ingest_w2_endpoint(request: IngestW2Request) -> IngestW2Response:
             total_wages=result.get('total_wages'),
             total_withholding=result.get('total_withholding'),
             processing_method=result.get('processing_method'),
+            extraction_reused=result.get('extraction_reused'),
             error=result.get('error')
         )
         
@@ -86,6 +109,184 @@ async def ingest_w2_endpoint(request: IngestW2Request) -> IngestW2Response:
         raise HTTPException(status_code=500, detail=f"W2 processing failed: {str(e)}")
 
 
+class IngestBatchRequest(BaseModel):
+    """Request model for batch document ingestion."""
+    s3_keys: List[str] = Field(..., min_length=1, description="S3 keys of the documents (PDF or JPEG)")
+    taxpayer_name: str = Field(..., description="Name of the taxpayer for validation")
+    tax_year: int = Field(..., description="Tax year of the documents", ge=2000, le=2030)
+    document_type: Optional[str] = Field(None, description="Document type for every key, or None to detect each one")
+
+
+@router.post("/ingest/batch")
+async def ingest_batch_endpoint(request: IngestBatchRequest):
+    """
+    Ingest many W-2/1099 documents concurrently, streaming progress.
+    
+    Documents are processed ingest_batch_max_concurrency at a time. Progress is
+    sent as server-sent events: 'started' and 'result' per document (tagged
+    with its request index), then a 'summary'. W-2 results are written to one
+    aggregated W2_Extracts.json per engagement once all documents finish.
+    
+    Args:
+        request: Batch ingestion request with S3 keys, taxpayer name, and tax year
+        
+    Returns:
+        StreamingResponse of text/event-stream progress events
+        
+    Raises:
+        HTTPException: If the batch exceeds the configured size limit
+    """
+    max_items = get_settings().ingest_batch_max_items
+    if len(request.s3_keys) > max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(request.s3_keys)} exceeds the limit of {max_items} documents"
+        )
+    
+    logger.info(f"Processing batch ingestion of {len(request.s3_keys)} documents")
+    
+    async def stream_events():
+        async for event in ingest_documents_batch(request.s3_keys, request.taxpayer_name, request.tax_year,
+                                                  request.document_type):
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(stream_events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+class IngestJobRequest(BaseModel):
+    """Request model for queueing a document ingestion job."""
+    s3_key: str = Field(..., description="S3 key of the document (PDF or JPEG)")
+    taxpayer_name: str = Field(..., description="Name of the taxpayer for validation")
+    tax_year: int = Field(..., description="Tax year of the document", ge=2000, le=2030)
+    document_type: Optional[str] = Field(None, description="Document type, or None to detect it")
+
+
+@router.post("/ingest/jobs", status_code=202)
+async def enqueue_ingest_job_endpoint(request: IngestJobRequest) -> Dict[str, Any]:
+    """
+    Queue a document for ingestion and return its job id without waiting.
+
+    The job is run by the ingest worker pool; follow it with
+    GET /tax/ingest/jobs/{job_id}?wait_seconds=N.
+    """
+    try:
+        job = await asyncio.to_thread(enqueue_ingest_job, request.s3_key, request.taxpayer_name,
+                                      request.tax_year, request.document_type)
+    except Exception as e:
+        logger.error(f"Could not enqueue ingest job for {request.s3_key}: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Could not queue ingestion: {str(e)}")
+    logger.info(f"Queued ingest job {job['job_id']} for {request.s3_key}")
+    return {"job_id": job["job_id"], "status": job["status"], "s3_key": job["s3_key"]}
+
+
+@router.get("/ingest/jobs/{job_id}")
+async def get_ingest_job_endpoint(
+    job_id: str,
+    wait_seconds: float = Query(0, ge=0, description="Wait up to this long for the job to finish (long poll)")
+) -> Dict[str, Any]:
+    """
+    Get an ingest job's state: queued, running, succeeded, rejected or dead_lettered.
+
+    With wait_seconds the response is held until the job finishes or the wait
+    (capped at ingest_job_max_wait_seconds) runs out. Finished jobs include the
+    ingestion result summary; failed attempts leave last_error.
+    """
+    wait_seconds = min(wait_seconds, get_settings().ingest_job_max_wait_seconds)
+    job = await wait_for_ingest_job(job_id, wait_seconds)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job {job_id} not found")
+    return job
+
+
+@router.post("/bda-events")
+async def bda_completion_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Deliver a Bedrock Data Automation completion event to waiting ingests.
+
+    Accepts the EventBridge BDA job event or the S3 notification for the job's
+    job_metadata.json, as forwarded by the EventBridge rule's target. Ingests
+    waiting on the job check its status as soon as it arrives; the event
+    itself is not trusted, so it cannot complete or fail a running job.
+    """
+    job_id = get_bda_completion_events().publish(event)
+    return {"accepted": job_id is not None, "job_id": job_id}
+
+
+@router.get("/ingest-stats")
+async def ingest_stats() -> Dict[str, Any]:
+    """
+    Get extraction counters for this worker process.
+
+    extraction_dedup.hit_rate is the share of ingests that reused an earlier
+    extraction (same S3 key or identical content) instead of running Bedrock
+    Data Automation; w2_text_layer.hit_rate is the share of W-2 PDFs read
+    locally from their text layer, with misses counted by reason;
+    document_classifier counts content-based routing decisions (not_tax_form
+    uploads skipped Bedrock, type_corrections overrode the file name); ingest_jobs
+    counts job outcomes of this process's workers and the queue's depth.
+    """
+    sqs, queue_url, _ = get_ingest_queue()
+    try:
+        queue = (await asyncio.to_thread(sqs.get_queue_attributes, QueueUrl=queue_url,
+                                         AttributeNames=["ApproximateNumberOfMessages",
+                                                         "ApproximateNumberOfMessagesNotVisible"]))["Attributes"]
+        depth = {"waiting": int(queue["ApproximateNumberOfMessages"]),
+                 "in_progress": int(queue["ApproximateNumberOfMessagesNotVisible"])}
+    except Exception as e:
+        logger.warning(f"Could not read ingest queue depth: {str(e)}")
+        depth = None
+    return {
+        "extraction_dedup": get_extraction_dedup_stats().stats(),
+        "w2_text_layer": get_text_layer_stats().stats(),
+        "document_classifier": get_document_classifier_stats().stats(),
+        "ingest_jobs": {**get_ingest_job_stats().stats(), "queue": depth}
+    }
+
+
+class TaxScenariosRequest(BaseModel):
+    """Request model for a what-if comparison of a simple 1040 return."""
+    tax_year: int = Field(2024, description="Tax year", ge=2000, le=2030)
+    filing_status: str = Field(..., description="Base filing status (S, MFJ, MFS, HOH, QW or its name)")
+    wages: float = Field(..., ge=0, le=1e9, description="Base wages")
+    withholding: float = Field(0, ge=0, le=1e9, description="Base federal income tax withheld")
+    dependents: int = Field(0, ge=0, le=20, description="Base number of qualifying children")
+    filing_statuses: Optional[List[str]] = Field(None, description="Filing statuses to compare, or None for the base status")
+    dependent_counts: Optional[List[conint(ge=0, le=20)]] = Field(
+        None, description="Dependent counts to compare, or None for the base count")
+    wage_deltas: Optional[List[confloat(ge=-1e9, le=1e9)]] = Field(None, description="Dollar changes to the base wages")
+    withholding_deltas: Optional[List[confloat(ge=-1e9, le=1e9)]] = Field(
+        None, description="Dollar changes to the base withholding")
+
+
+@router.post("/calc/scenarios")
+async def tax_scenarios_endpoint(request: TaxScenariosRequest) -> Dict[str, Any]:
+    """
+    Compare a base return against every combination of the given variations.
+
+    The grid (filing_statuses x dependent_counts x wage_deltas x
+    withholding_deltas) is computed in one vectorized pass. The response lists
+    the columns once, then the base row and one row per scenario; best is the
+    index of the scenario with the largest refund (or smallest amount due).
+
+    Raises:
+        HTTPException: 413 if the grid exceeds tax_scenarios_max_count, 400 for
+            an unknown filing status or tax year or an amount out of range
+    """
+    max_count = get_settings().tax_scenarios_max_count
+    count = count_scenarios(request.filing_statuses, request.dependent_counts, request.wage_deltas,
+                            request.withholding_deltas)
+    if count > max_count:
+        raise HTTPException(status_code=413, detail=f"{count} scenarios exceed the limit of {max_count}")
+
+    try:
+        return evaluate_scenarios(request.tax_year, request.filing_status, request.wages, request.withholding,
+                                  request.dependents, request.filing_statuses, request.dependent_counts,
+                                  request.wage_deltas, request.withholding_deltas)
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/health")
 async def tax_health_check():
     """Health check endpoint for tax processing services."""
@@ -94,6 +295,9 @@ async def tax_health_check():
         "service": "tax_processing",
         "features": [
             "w2_ingestion",
+            "batch_ingestion",
+            "ingest_jobs",
+            "tax_scenarios",
             "bedrock_data_automation"
         ]
     }
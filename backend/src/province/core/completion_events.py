@@ -0,0 +1,62 @@
+"""Thread-safe completion signals awaited from any event loop (ingest jobs, BDA jobs)."""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+
+class CompletionEvents:
+    """
+    Futures keyed by id, resolved when a publisher on any thread completes the id.
+
+    Each watcher's future is resolved on its own loop via call_soon_threadsafe.
+    The last `max_retained` results are kept, so a watcher that starts after its
+    id completed still sees it; with 0 only current watchers are woken.
+    """
+
+    def __init__(self, max_retained: int = 0):
+        self.max_retained = max_retained
+        self._completed: "OrderedDict[str, Any]" = OrderedDict()
+        self._watchers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._lock = threading.Lock()
+
+    def complete(self, key: str, result: Any = None):
+        """Resolve every watcher of key with result (safe to call from any thread)."""
+        with self._lock:
+            if self.max_retained:
+                self._completed[key] = result
+                self._completed.move_to_end(key)
+                while len(self._completed) > self.max_retained:
+                    self._completed.popitem(last=False)
+            watchers = self._watchers.pop(key, [])
+        for loop, future in watchers:
+            loop.call_soon_threadsafe(_resolve, future, result)
+
+    def watch(self, key: str) -> asyncio.Future:
+        """Future on the running loop resolved with key's result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            done = key in self._completed
+            if done:
+                result = self._completed[key]
+            else:
+                self._watchers.setdefault(key, []).append((loop, future))
+        if done:
+            future.set_result(result)
+        return future
+
+    def unwatch(self, key: str, future: asyncio.Future):
+        """Stop watching key with future (e.g. after a timeout)."""
+        with self._lock:
+            watchers = [w for w in self._watchers.get(key, []) if w[1] is not future]
+            if watchers:
+                self._watchers[key] = watchers
+            else:
+                self._watchers.pop(key, None)
+
+
+def _resolve(future: asyncio.Future, result: Any):
+    if not future.done():
+        future.set_result(result)
@@ -49,7 +49,55 @@ class Settings(BaseSettings):
     # S3 Configuration
     documents_bucket_name: str = Field(default="documents", description="Documents S3 bucket")
     templates_bucket_name: str = Field(default="templates", description="Templates S3 bucket")
-    
+
+    # Form Template Cache
+    template_cache_dir: str = Field(default="", description="On-disk template cache directory (empty = system temp dir)")
+    template_cache_ttl_seconds: int = Field(default=3600, description="Seconds before a cached template is revalidated against S3")
+    template_cache_max_entries: int = Field(default=32, description="Maximum templates held in the in-process LRU")
+    mapping_cache_ttl_seconds: int = Field(default=60, description="Seconds a cached form mapping is used before its version stamp is rechecked")
+    mapping_cache_max_age_seconds: int = Field(default=900, description="Seconds after which a cached form mapping is always reloaded")
+
+    # Form Fill Pool
+    form_fill_pool_workers: int = Field(default=0, description="Batch form fill worker processes (0 = CPU count)")
+    form_fill_pool_warm_forms: str = Field(default="1040", description="Comma-separated form types preloaded by each worker")
+    form_fill_batch_max_items: int = Field(default=100, description="Maximum fills accepted in one batch request")
+    form_fill_max_concurrency: int = Field(default=4, description="Concurrent form renders/uploads per event loop")
+    form_fill_io_threads: int = Field(default=16, description="Threads running blocking boto3/PyMuPDF calls for fills")
+    form_fill_output_profile: str = Field(default="final", description="PDF output profile for stored form fills (standard, incremental, final, flattened)")
+    form_fill_preview_output_profile: str = Field(default="incremental", description="PDF output profile for live previews, which are never stored as rendered")
+    form_fill_package_output_profile: str = Field(default="final", description="PDF output profile for return packages")
+    form_fill_finalize_workers: int = Field(default=0, description="Worker processes re-saving fills with the final profile (0 = CPU count)")
+
+    # Bedrock Data Automation
+    bda_wait_timeout_seconds: float = Field(default=180, description="Seconds to wait for a Bedrock Data Automation job")
+    bda_poll_initial_seconds: float = Field(default=2.0, description="First status poll interval; doubles after each poll")
+    bda_poll_max_seconds: float = Field(default=15.0, description="Longest status poll interval")
+    bda_results_index_table_name: str = Field(default="province-bda-results-index", description="Table indexing Bedrock Data Automation results by input key and content hash")
+    w2_text_layer_enabled: bool = Field(default=True, description="Read W-2 PDFs with a text layer locally before falling back to Bedrock Data Automation")
+    w2_text_layer_min_confidence: float = Field(default=0.9, description="Confidence boxes 1 and 2, the EIN and the SSN must reach for the local W-2 read to be used")
+    document_classifier_enabled: bool = Field(default=True, description="Classify PDF uploads from their first page's text before choosing a Bedrock Data Automation blueprint")
+    document_classifier_min_confidence: float = Field(default=0.7, description="Confidence a classification needs to override the file-name document type or reject a non-tax upload")
+    ingest_batch_max_items: int = Field(default=50, description="Maximum documents accepted in one batch ingest request")
+    ingest_batch_max_concurrency: int = Field(default=8, description="Documents of a batch ingest processed at once")
+
+    # Ingest Jobs
+    ingest_jobs_table_name: str = Field(default="province-ingest-jobs", description="Table of queued ingest jobs and their states")
+    ingest_queue_url: str = Field(default="", description="SQS queue of ingest jobs (empty = in-process queue)")
+    ingest_dead_letter_queue_url: str = Field(default="", description="SQS queue receiving jobs that exhausted their attempts")
+    ingest_workers: int = Field(default=4, description="Ingest worker threads or processes (each runs one job at a time)")
+    ingest_worker_mode: str = Field(default="thread", description="Ingest workers as 'thread' or 'process' (process needs ingest_queue_url)")
+    ingest_workers_in_process: bool = Field(default=True, description="Start the ingest worker pool in the API process on first enqueue (false for Lambdas and other producers)")
+    ingest_job_visibility_timeout_seconds: int = Field(default=300, description="Seconds a received job stays hidden from other workers; extended while it runs")
+    ingest_job_max_attempts: int = Field(default=3, description="Attempts before a job is dead-lettered")
+    ingest_job_retry_delay_seconds: int = Field(default=30, description="Seconds before a failed job is retried")
+    ingest_queue_wait_seconds: int = Field(default=20, description="Long-poll seconds of each queue receive")
+    ingest_job_max_wait_seconds: float = Field(default=20, description="Longest wait accepted by the job status long-poll")
+    notifications_table: str = Field(default="province-chat-notifications", description="Table of document processing notifications polled by the chat")
+
+    # Tax Engine
+    tax_rules_dir: str = Field(default="", description="Directory of exported *_rules.json packages laid over the bundled tax rules")
+    tax_scenarios_max_count: int = Field(default=1000, description="Maximum what-if scenarios computed in one request")
+
     # OpenSearch Configuration
     opensearch_endpoint: str = Field(default="", description="OpenSearch Serverless endpoint")
     opensearch_index_name: str = Field(default="legal-documents", description="OpenSearch index name")
@@ -0,0 +1,86 @@
+"""
+Content-addressed storage of form mappings in S3.
+
+A mapping, its validation results and (optionally) the fill plan compiled from
+it are serialized with msgpack, compressed, and stored under the SHA-256 of the
+resulting bytes. The form-mappings table keeps only a small pointer to the
+artifact, so large forms stay well under DynamoDB's 400 KB item limit and
+readers can cache artifacts by hash.
+"""
+
+import hashlib
+import zlib
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+import msgpack
+
+from province.core.exceptions import ProcessingError
+
+ARTIFACT_FORMAT = 'msgpack+zlib/1'
+ARTIFACT_PREFIX = 'mapping_artifacts/'
+
+
+class MappingArtifactError(ProcessingError):
+    """Raised when a stored mapping artifact is missing, corrupt or in an unknown format."""
+
+
+def _encode_default(obj):
+    # Mappings reused from legacy DynamoDB rows may still carry Decimals
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Cannot serialize {type(obj).__name__} in a mapping artifact")
+
+
+def encode_mapping_artifact(mapping: Dict[str, Any], fill_plan: Optional[Dict[str, Tuple[str, int]]] = None,
+                            validation: Optional[Dict[str, Any]] = None) -> bytes:
+    """Serialize a mapping (plus optional fill plan and validation results) to artifact bytes."""
+    payload = {'mapping': mapping, 'fill_plan': fill_plan, 'validation': validation}
+    return zlib.compress(msgpack.packb(payload, default=_encode_default, use_bin_type=True), 6)
+
+
+def decode_mapping_artifact(data: bytes) -> Dict[str, Any]:
+    """
+    Deserialize artifact bytes.
+
+    Returns {'mapping', 'fill_plan', 'validation'}; fill plan entries come back as
+    (semantic name, widget type) tuples, as compile_fill_plan produces them.
+    """
+    try:
+        payload = msgpack.unpackb(zlib.decompress(data), raw=False)
+    except (zlib.error, ValueError, msgpack.UnpackException) as e:
+        raise MappingArtifactError(f"Unreadable mapping artifact: {e}") from e
+    fill_plan = payload.get('fill_plan')
+    if fill_plan is not None:
+        fill_plan = {path: tuple(planned) for path, planned in fill_plan.items()}
+    return {'mapping': payload['mapping'], 'fill_plan': fill_plan, 'validation': payload.get('validation')}
+
+
+def artifact_key(sha256: str) -> str:
+    """S3 key of the artifact with the given content hash."""
+    return f"{ARTIFACT_PREFIX}{sha256}.msgpack"
+
+
+def put_mapping_artifact(s3_client, bucket: str, mapping: Dict[str, Any],
+                         fill_plan: Optional[Dict[str, Tuple[str, int]]] = None,
+                         validation: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Upload a mapping artifact and return the pointer to store in the mappings table.
+
+    Identical content hashes to the same key, so rewriting it is harmless.
+    """
+    data = encode_mapping_artifact(mapping, fill_plan, validation)
+    sha256 = hashlib.sha256(data).hexdigest()
+    key = artifact_key(sha256)
+    s3_client.put_object(Bucket=bucket, Key=key, Body=data, ContentType='application/x-msgpack')
+    return {'bucket': bucket, 'key': key, 'sha256': sha256, 'size': len(data), 'format': ARTIFACT_FORMAT}
+
+
+def get_mapping_artifact(s3_client, pointer: Dict[str, Any]) -> Dict[str, Any]:
+    """Download and decode the artifact a pointer refers to, verifying its content hash."""
+    if pointer.get('format', ARTIFACT_FORMAT) != ARTIFACT_FORMAT:
+        raise MappingArtifactError(f"Unsupported mapping artifact format: {pointer.get('format')}")
+    data = s3_client.get_object(Bucket=pointer['bucket'], Key=pointer['key'])['Body'].read()
+    if hashlib.sha256(data).hexdigest() != pointer['sha256']:
+        raise MappingArtifactError(f"Mapping artifact {pointer['key']} does not match its content hash")
+    return decode_mapping_artifact(data)
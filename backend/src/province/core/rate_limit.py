@@ -0,0 +1,74 @@
+"""Async rate limiting for quota-bound external APIs (e.g. Bedrock RPM/TPM)."""
+
+import asyncio
+import time
+from functools import lru_cache
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `rate_per_minute`.
+
+    Waiters are served in arrival order: the lock is held while a waiter sleeps
+    for its deficit, so a large request is not starved by a stream of small ones.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # asyncio locks bind to one event loop; sync callers may drive each batch with asyncio.run()
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available and take them (capped at the bucket capacity)."""
+        amount = min(amount, self.capacity)
+        async with self._get_lock():
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate_per_second)
+                self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute quotas shared by concurrent callers."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    async def acquire(self, estimated_tokens: int = 0):
+        """Wait for one request slot and, when a token quota is set, `estimated_tokens` tokens."""
+        await self.requests.acquire(1)
+        if self.tokens and estimated_tokens:
+            await self.tokens.acquire(estimated_tokens)
+
+
+@lru_cache()
+def get_rate_limiter(quota: str, requests_per_minute: float,
+                     tokens_per_minute: Optional[float] = None) -> RateLimiter:
+    """
+    Get the process-wide limiter for a quota (e.g. 'bedrock:<model id>').
+
+    Quotas are per account, not per client object, so every caller of the same
+    quota in this process must draw from the same buckets.
+    """
+    return RateLimiter(requests_per_minute, tokens_per_minute)
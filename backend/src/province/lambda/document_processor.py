@@ -10,12 +10,15 @@ Event Flow:
 2. S3 → EventBridge → Lambda (this function)
 3. Lambda → Bedrock Data Automation
 4. Lambda → WebSocket/Chat notification
+
+When INGEST_QUEUE_URL is set, steps 3 and 4 are handed to the ingest worker
+service instead: the Lambda records an ingest job, queues it and returns
+without waiting for the extraction (see province.agents.tax.tools.ingest_jobs).
 """
 
 import json
 import logging
 import asyncio
-import boto3
 from typing import Dict, Any
 import os
 import sys
@@ -25,6 +28,8 @@ sys.path.append('/opt/python/lib/python3.11/site-packages')
 sys.path.append('/var/task/src')
 
 from province.agents.tax.tools.ingest_documents import ingest_documents
+from province.agents.tax.tools.chat_notifications import send_chat_notification
+from province.agents.tax.tools.ingest_jobs import enqueue_ingest_job
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -85,13 +90,22 @@ def lambda_handler(event, context):
                     logger.info(f"Unsupported document type: {file_name}")
                     continue
                 
-                # Process the document asynchronously
-                result = asyncio.run(process_document(
-                    s3_key=object_key,
-                    engagement_id=engagement_id,
-                    document_type=document_type,
-                    file_name=file_name
-                ))
+                if os.getenv('INGEST_QUEUE_URL'):
+                    # Workers run the extraction; don't hold the invocation open for it
+                    result = asyncio.run(queue_document(
+                        s3_key=object_key,
+                        engagement_id=engagement_id,
+                        document_type=document_type,
+                        file_name=file_name
+                    ))
+                else:
+                    # Process the document asynchronously
+                    result = asyncio.run(process_document(
+                        s3_key=object_key,
+                        engagement_id=engagement_id,
+                        document_type=document_type,
+                        file_name=file_name
+                    ))
                 
                 results.append(result)
                 
@@ -124,6 +138,9 @@ def detect_document_type(file_name: str) -> str:
     """
     Detect document type from file name.
     
+    This is only a hint: for PDFs, ingest_documents classifies the first page's
+    text and overrides it when confident.
+    
     Args:
         file_name: Name of the uploaded file
     
@@ -231,36 +248,43 @@ async def process_document(s3_key: str, engagement_id: str, document_type: str,
             's3_key': s3_key
         }
 
-async def send_chat_notification(engagement_id: str, message: str, status: str, data: Dict = None):
+async def queue_document(s3_key: str, engagement_id: str, document_type: str, file_name: str) -> Dict[str, Any]:
     """
-    Send real-time notification to the chat interface.
+    Queue a tax document for the ingest workers instead of processing it here.
+    
+    The workers run in their own service; this invocation never starts any.
+    They send the completed/error notification when the job finishes.
     
-    This could be implemented using:
-    - WebSocket API Gateway
-    - AWS AppSync
-    - Server-Sent Events
-    - Polling endpoint
+    Args:
+        s3_key: S3 key of the document
+        engagement_id: Tax engagement ID
+        document_type: Type of document (W-2, 1099, etc.)
+        file_name: Original file name
     
-    For now, we'll store the notification in DynamoDB for the frontend to poll.
+    Returns:
+        Queueing result dictionary with the ingest job id
     """
-    try:
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('province-chat-notifications')
-        
-        notification = {
-            'engagement_id': engagement_id,
-            'timestamp': int(asyncio.get_event_loop().time() * 1000),
-            'message': message,
-            'status': status,
-            'type': 'document_processing'
-        }
-        
-        if data:
-            notification['data'] = data
-        
-        table.put_item(Item=notification)
-        logger.info(f"Sent notification for engagement {engagement_id}: {message}")
-        
-    except Exception as e:
-        logger.error(f"Failed to send chat notification: {e}")
-        # Don't fail the whole process if notification fails
+    job = enqueue_ingest_job(
+        s3_key=s3_key,
+        taxpayer_name="User",  # Will be updated with actual user info
+        tax_year=2024,
+        document_type=document_type,
+        engagement_id=engagement_id,
+        start_workers=False
+    )
+    logger.info(f"Queued {s3_key} as ingest job {job['job_id']}")
+    
+    await send_chat_notification(
+        engagement_id=engagement_id,
+        message=f"📄 {file_name} is queued for processing...",
+        status="queued",
+        data={'job_id': job['job_id']}
+    )
+    
+    return {
+        'success': True,
+        'queued': True,
+        'job_id': job['job_id'],
+        'engagement_id': engagement_id,
+        's3_key': s3_key
+    }
@@ -2,22 +2,31 @@
 Form Template Processor Lambda
 
 Automatically processes tax form templates uploaded to S3, extracts fields,
-uses AI to generate semantic mappings, and caches them in DynamoDB.
+uses AI to generate semantic mappings, and stores them as content-addressed
+S3 artifacts referenced from DynamoDB.
 
 Triggered by: S3 EventBridge notification on object created
 """
 
+import hashlib
 import json
 import logging
+import math
+import multiprocessing
 import os
 import re
 import sys
-import tempfile
-from typing import Dict, List, Any
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
 import boto3
 import fitz  # PyMuPDF
+from boto3.dynamodb.conditions import Key
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -28,6 +37,8 @@ backend_src = os.path.abspath(os.path.join(current_dir, '../../'))  # Points to
 if backend_src not in sys.path:
     sys.path.insert(0, backend_src)
 
+from province.core.mapping_artifacts import get_mapping_artifact, put_mapping_artifact
+
 try:
     from province.agents.form_mapping_agent import FormMappingAgent
     USE_AGENT = True
@@ -36,6 +47,239 @@ except ImportError as e:
     logger.warning(f"⚠️  FormMappingAgent not available ({e}), using single-shot AI")
     USE_AGENT = False
 
+try:
+    from province.agents.tax.tools.form_filler import compile_fill_plan, get_mapping_cache
+except ImportError:
+    # Lambda packages without the API dependencies rely on the version stamp alone,
+    # and fillers compile the fill plan on first use
+    compile_fill_plan = None
+    get_mapping_cache = None
+
+
+# Worker processes for per-page field extraction (1 = in-process). Sequential extraction
+# of an IRS form takes ~100ms, less than starting a pool, so workers only pay off for
+# large templates: parallel extraction also needs both thresholds below to be reached
+EXTRACT_WORKERS = int(os.getenv('TEMPLATE_EXTRACT_WORKERS', '1'))
+EXTRACT_PARALLEL_MIN_PAGES = int(os.getenv('TEMPLATE_EXTRACT_PARALLEL_MIN_PAGES', '8'))
+EXTRACT_PARALLEL_MIN_FIELDS = int(os.getenv('TEMPLATE_EXTRACT_PARALLEL_MIN_FIELDS', '500'))
+
+# Structural fingerprints: positions snap to this grid (points) so sub-point jitter between
+# template revisions does not count as a change
+FINGERPRINT_POSITION_GRID = 1.0
+# Largest share of fields that may be new or moved for a stored mapping to be reused
+FINGERPRINT_MAX_CHANGED_FRACTION = float(os.getenv('TEMPLATE_FINGERPRINT_MAX_CHANGED', '0.1'))
+# Fingerprint rows share the mappings table: form_type=FINGERPRINT#<hash>, tax_year='-'
+FINGERPRINT_KEY_PREFIX = 'FINGERPRINT#'
+
+# Bucket for mapping artifacts (defaults to the bucket the template was uploaded to)
+MAPPING_ARTIFACTS_BUCKET = os.getenv('MAPPING_ARTIFACTS_BUCKET_NAME')
+
+
+def field_signature(field: Dict[str, Any]) -> str:
+    """Structural signature of one extracted field: page, snapped position, type and name."""
+    x = round(field['position']['x'] / FINGERPRINT_POSITION_GRID)
+    y = round(field['position']['y'] / FINGERPRINT_POSITION_GRID)
+    return f"{field['page']}|{x}|{y}|{field['field_type']}|{field['field_name']}"
+
+
+def field_signatures(fields: List[Dict[str, Any]]) -> List[str]:
+    """Sorted signatures of every extracted field."""
+    return sorted(field_signature(f) for f in fields)
+
+
+def structural_fingerprint(signatures: List[str]) -> str:
+    """Hash of a template's field tree; identical AcroForm layouts hash identically across years."""
+    return hashlib.sha256('\n'.join(signatures).encode('utf-8')).hexdigest()
+
+
+def diff_field_signatures(old_signatures: List[str], new_signatures: List[str]) -> Tuple[set, set]:
+    """
+    Compare two templates by field.
+
+    Returns (changed, removed): names that are new or whose type/position differs in
+    the new template, and names that no longer exist in it.
+    """
+    def by_name(signatures):
+        grouped = defaultdict(set)
+        for signature in signatures:
+            grouped[signature.split('|', 4)[4]].add(signature)
+        return grouped
+
+    old, new = by_name(old_signatures), by_name(new_signatures)
+    changed = {name for name, sigs in new.items() if old.get(name) != sigs}
+    removed = set(old) - set(new)
+    return changed, removed
+
+
+def prune_mapping(mapping: Any, field_names: set) -> Any:
+    """Copy of `mapping` without entries whose value is one of `field_names`."""
+    if isinstance(mapping, dict):
+        return {k: prune_mapping(v, field_names) for k, v in mapping.items()
+                if not (isinstance(v, str) and v in field_names)}
+    if isinstance(mapping, list):
+        return [prune_mapping(v, field_names) for v in mapping if not (isinstance(v, str) and v in field_names)]
+    return mapping
+
+
+class LabelIndex:
+    """
+    Uniform grid over the top-left corners of a page's text lines.
+    
+    Answers "nearest label above or to the left of a point" by scanning grid
+    rings outward from the point's cell and stopping once no unvisited cell can
+    hold anything closer, so each lookup touches only the neighbouring cells.
+    """
+    
+    def __init__(self, text_labels: List[Dict[str, Any]], cell_size: float = 50.0,
+                 max_above: float = 50, max_left: float = 100):
+        self.text_labels = text_labels
+        self.cell_size = cell_size
+        self.max_above = max_above
+        self.max_left = max_left
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, label in enumerate(text_labels):
+            self.cells[self._cell(label['bbox'][0], label['bbox'][1])].append(i)
+        xs = [cx for cx, _ in self.cells] or [0]
+        ys = [cy for _, cy in self.cells] or [0]
+        self.bounds = (min(xs), max(xs), min(ys), max(ys))
+    
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+    
+    def _ring(self, cx: int, cy: int, r: int):
+        """Cells at Chebyshev distance r from (cx, cy)."""
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+    
+    def nearest(self, field_x: float, field_y: float) -> Optional[str]:
+        """
+        Text of the closest label above (within max_above) or left (within max_left) of a point.
+        
+        Distance is measured between top-left corners; ties go to the label that
+        comes first in reading order, as the full scan did.
+        """
+        if not self.text_labels:
+            return None
+        cx, cy = self._cell(field_x, field_y)
+        min_x, max_x, min_y, max_y = self.bounds
+        max_r = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy, 0)
+        
+        best = None  # (distance, label index)
+        for r in range(max_r + 1):
+            for cell in self._ring(cx, cy, r):
+                for i in self.cells.get(cell, ()):
+                    label_x, label_y = self.text_labels[i]['bbox'][:2]
+                    # Label should be above or to the left of field
+                    if (label_y < field_y and field_y - label_y < self.max_above) or \
+                       (label_x < field_x and field_x - label_x < self.max_left):
+                        candidate = (math.hypot(label_x - field_x, label_y - field_y), i)
+                        if best is None or candidate < best:
+                            best = candidate
+            # Anything in ring r+1 or beyond is at least r cells away
+            if best is not None and best[0] < r * self.cell_size:
+                break
+        return self.text_labels[best[1]]['text'] if best else None
+
+
+def extract_page_fields(doc, page_num: int) -> List[Dict[str, Any]]:
+    """Extract the form fields of one page with their nearest text labels."""
+    page = doc[page_num]
+    
+    # Get text blocks for label matching
+    text_blocks = page.get_text("dict")['blocks']
+    text_labels = []
+    for block in text_blocks:
+        if block['type'] == 0:  # Text block
+            for line in block.get('lines', []):
+                text = ''.join([span['text'] for span in line.get('spans', [])])
+                if text.strip():
+                    text_labels.append({
+                        'text': text.strip(),
+                        'bbox': line['bbox']
+                    })
+    label_index = LabelIndex(text_labels)
+    
+    # Extract form fields
+    fields = []
+    for widget in page.widgets():
+        field_name = widget.field_name
+        if not field_name:
+            continue
+        
+        field_type = "text"
+        if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+            field_type = "checkbox"
+        elif widget.field_type == fitz.PDF_WIDGET_TYPE_RADIOBUTTON:
+            field_type = "radio"
+        
+        # Find nearby label
+        rect = widget.rect
+        nearby_label = label_index.nearest(rect.x0, rect.y0)
+        
+        fields.append({
+            'field_name': field_name,
+            'field_type': field_type,
+            'page': page_num + 1,
+            'position': {
+                'x': round(rect.x0, 1),
+                'y': round(rect.y0, 1),
+                'width': round(rect.width, 1),
+                'height': round(rect.height, 1)
+            },
+            'nearby_label': nearby_label[:200] if nearby_label else None
+        })
+    return fields
+
+
+def count_widgets(doc) -> int:
+    """Number of form field widgets in a document, from the annotation lists alone."""
+    return sum(1 for page in doc for annot in page.annot_xrefs() if annot[1] == fitz.PDF_ANNOT_WIDGET)
+
+
+def _extract_pages_in_worker(pdf_bytes: bytes, page_nums: List[int]) -> List[List[Dict[str, Any]]]:
+    """Extract a run of pages inside an extraction worker (one document open per run)."""
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return [extract_page_fields(doc, page_num) for page_num in page_nums]
+    finally:
+        doc.close()
+
+
+# Extraction pool shared by every call in this process, started on first parallel extraction
+_extract_pool: Optional[ProcessPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """
+    Get the process-wide extraction pool of EXTRACT_WORKERS workers.
+
+    spawn, not fork: the pool outlives the call that starts it, and forking a
+    process that runs boto3 and logging threads can deadlock the children.
+    """
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return _extract_pool
+
+
+def shutdown_extract_pool():
+    """Stop the extraction pool if it was started (the next parallel extraction starts a new one)."""
+    global _extract_pool
+    with _extract_pool_lock:
+        pool, _extract_pool = _extract_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
 
 class FormTemplateProcessor:
     """Processes tax form templates and generates AI-powered semantic mappings."""
@@ -52,115 +296,171 @@ class FormTemplateProcessor:
             logger.info("🤖 FormMappingAgent initialized")
     
     def extract_fields_from_pdf(self, pdf_bytes: bytes) -> List[Dict[str, Any]]:
-        """Extract all form fields from PDF using PyMuPDF."""
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(pdf_bytes)
-            temp_path = temp_file.name
-        
+        """
+        Extract all form fields from PDF using PyMuPDF.
+        
+        Pages are extracted in this process unless EXTRACT_WORKERS > 1 and the
+        template has at least EXTRACT_PARALLEL_MIN_PAGES pages and
+        EXTRACT_PARALLEL_MIN_FIELDS fields; those are split into one run of
+        pages per worker of the shared extraction pool.
+        """
         try:
-            doc = fitz.open(temp_path)
-            fields = []
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            try:
+                page_count = doc.page_count
+                workers = min(EXTRACT_WORKERS, page_count)
                 
-                # Get text blocks for label matching
-                text_blocks = page.get_text("dict")['blocks']
-                text_labels = []
-                for block in text_blocks:
-                    if block['type'] == 0:  # Text block
-                        for line in block.get('lines', []):
-                            text = ''.join([span['text'] for span in line.get('spans', [])])
-                            if text.strip():
-                                text_labels.append({
-                                    'text': text.strip(),
-                                    'bbox': line['bbox']
-                                })
+                pages = None
+                if (workers > 1 and page_count >= EXTRACT_PARALLEL_MIN_PAGES
+                        and count_widgets(doc) >= EXTRACT_PARALLEL_MIN_FIELDS):
+                    run_length = math.ceil(page_count / workers)
+                    runs = [list(range(start, min(start + run_length, page_count)))
+                            for start in range(0, page_count, run_length)]
+                    try:
+                        run_pages = get_extract_pool().map(_extract_pages_in_worker, [pdf_bytes] * len(runs), runs)
+                        pages = [page_fields for run in run_pages for page_fields in run]
+                    except (OSError, ValueError, BrokenProcessPool) as e:
+                        # e.g. no /dev/shm (Lambda); a broken pool is replaced on the next call
+                        logger.warning(f"Parallel extraction unavailable ({e}), extracting pages sequentially")
+                        if isinstance(e, BrokenProcessPool):
+                            shutdown_extract_pool()
                 
-                # Extract form fields
-                for widget in page.widgets():
-                    field_name = widget.field_name
-                    if not field_name:
-                        continue
-                    
-                    field_type = "text"
-                    if widget.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                        field_type = "checkbox"
-                    elif widget.field_type == fitz.PDF_WIDGET_TYPE_RADIOBUTTON:
-                        field_type = "radio"
-                    
-                    # Find nearby label
-                    rect = widget.rect
-                    nearby_label = self._find_nearby_label(rect, text_labels)
-                    
-                    fields.append({
-                        'field_name': field_name,
-                        'field_type': field_type,
-                        'page': page_num + 1,
-                        'position': {
-                            'x': round(rect.x0, 1),
-                            'y': round(rect.y0, 1),
-                            'width': round(rect.width, 1),
-                            'height': round(rect.height, 1)
-                        },
-                        'nearby_label': nearby_label[:200] if nearby_label else None
-                    })
-            
-            doc.close()
-            os.unlink(temp_path)
+                if pages is None:
+                    pages = [extract_page_fields(doc, page_num) for page_num in range(page_count)]
+            finally:
+                doc.close()
             
+            fields = [field for page_fields in pages for field in page_fields]
             logger.info(f"Extracted {len(fields)} fields from PDF")
             return fields
             
         except Exception as e:
             logger.error(f"Error extracting fields: {e}")
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
             raise
     
-    def _find_nearby_label(self, field_rect, text_labels) -> str:
-        """Find text label near a form field."""
-        field_x = field_rect.x0
-        field_y = field_rect.y0
-        
-        candidates = []
-        for label in text_labels:
-            label_x = label['bbox'][0]
-            label_y = label['bbox'][1]
+    @staticmethod
+    def _to_agent_fields(fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Convert extracted fields to the format expected by FormMappingAgent."""
+        agent_fields = []
+        for f in fields:
+            agent_fields.append({
+                'field_name': f['field_name'],
+                'field_type': 'Text' if f['field_type'] == 'text' else 'CheckBox',
+                'field_value': None,
+                'page_number': f['page'],
+                'rect': {
+                    'x0': f['position']['x'],
+                    'y0': f['position']['y'],
+                    'x1': f['position']['x'] + f['position']['width'],
+                    'y1': f['position']['y'] + f['position']['height']
+                },
+                'nearby_label': f.get('nearby_label', '')
+            })
+        return agent_fields
+    
+    def find_reusable_mapping(self, form_type: str, signatures: List[str],
+                              fingerprint: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Look up a stored mapping for a template with the same or a nearly identical field tree.
+
+        An exact fingerprint match (any form type or year) is reused as is. Otherwise the
+        other years of `form_type` are compared field by field, and the closest one is
+        reused when at most FINGERPRINT_MAX_CHANGED_FRACTION of the fields are new or
+        moved; its entries for removed or moved fields are dropped.
+
+        Returns:
+            (mapping, source) with source describing the match, or (None, None)
+        """
+        try:
+            pointer = self.mappings_table.get_item(
+                Key={'form_type': f"{FINGERPRINT_KEY_PREFIX}{fingerprint}", 'tax_year': '-'}
+            ).get('Item')
+            if pointer:
+                mapping = self._load_fingerprinted_mapping(pointer, fingerprint)
+                if mapping is not None:
+                    return mapping, {'match': 'exact', 'form_type': pointer['source_form_type'],
+                                     'tax_year': pointer['source_tax_year'], 'changed_fields': []}
             
-            # Label should be above or to the left of field
-            if (label_y < field_y and field_y - label_y < 50) or \
-               (label_x < field_x and field_x - label_x < 100):
-                
-                distance = ((label_x - field_x)**2 + (label_y - field_y)**2)**0.5
-                candidates.append((distance, label['text']))
-        
-        if candidates:
-            candidates.sort(key=lambda x: x[0])
-            return candidates[0][1]
-        return None
+            # Near match: earlier (or later) years of the same form
+            rows = self.mappings_table.query(
+                KeyConditionExpression=Key('form_type').eq(form_type),
+                ProjectionExpression='tax_year, structural_fingerprint'
+            )['Items']
+            best = None
+            for row in rows:
+                other = row.get('structural_fingerprint')
+                if not other or other == fingerprint:
+                    continue
+                other_pointer = self.mappings_table.get_item(
+                    Key={'form_type': f"{FINGERPRINT_KEY_PREFIX}{other}", 'tax_year': '-'}
+                ).get('Item')
+                if not other_pointer:
+                    continue
+                changed, removed = diff_field_signatures(other_pointer.get('field_signatures', []), signatures)
+                if best is None or len(changed) + len(removed) < len(best[2]) + len(best[3]):
+                    best = (other, other_pointer, changed, removed)
+            
+            if best is not None:
+                other, other_pointer, changed, removed = best
+                if len(changed) <= FINGERPRINT_MAX_CHANGED_FRACTION * len(signatures):
+                    mapping = self._load_fingerprinted_mapping(other_pointer, other)
+                    if mapping is not None:
+                        return prune_mapping(mapping, changed | removed), {
+                            'match': 'partial', 'form_type': other_pointer['source_form_type'],
+                            'tax_year': other_pointer['source_tax_year'], 'changed_fields': sorted(changed)
+                        }
+                else:
+                    logger.info(f"Closest stored template differs in {len(changed)} fields; not reusing")
+        except Exception as e:
+            # Reuse is an optimisation; fall back to a full AI mapping
+            logger.warning(f"Fingerprint lookup failed ({e}), generating mapping from scratch")
+        return None, None
+    
+    def _load_fingerprinted_mapping(self, pointer: Dict[str, Any], fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Mapping row a fingerprint row points at, if it still belongs to that fingerprint."""
+        row = self.mappings_table.get_item(
+            Key={'form_type': pointer['source_form_type'], 'tax_year': pointer['source_tax_year']}
+        ).get('Item')
+        if not row or row.get('structural_fingerprint') != fingerprint:
+            return None  # row was regenerated for a different template since
+        if row.get('mapping_artifact'):
+            return get_mapping_artifact(self.s3_client, row['mapping_artifact'])['mapping']
+        return row.get('mapping')
+    
+    def generate_mapping(self, form_type: str, tax_year: str, fields: List[Dict[str, Any]],
+                         signatures: List[str], fingerprint: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Reuse a fingerprint-matched mapping where possible, else generate one with AI.
+
+        Returns:
+            (mapping, source) where source['match'] is 'exact', 'partial' or 'none'
+        """
+        mapping, source = self.find_reusable_mapping(form_type, signatures, fingerprint)
+        if source and source['match'] == 'exact':
+            logger.info(f"♻️  Template matches {source['form_type']}-{source['tax_year']}; reusing its mapping")
+            mapping = dict(mapping)
+            mapping['form_metadata'] = {**mapping.get('form_metadata', {}), 'form_type': form_type,
+                                        'tax_year': tax_year, 'total_fields': len(fields)}
+            return mapping, source
+        if source and source['match'] == 'partial' and USE_AGENT:
+            logger.info(f"♻️  Template is close to {source['form_type']}-{source['tax_year']}; "
+                        f"mapping {len(source['changed_fields'])} changed fields")
+            mapping = self.mapping_agent.remap_changed_fields(
+                form_type=form_type,
+                tax_year=tax_year,
+                fields=self._to_agent_fields(fields),
+                base_mapping=mapping,
+                changed_field_names=set(source['changed_fields'])
+            )
+            return mapping, source
+        return self.generate_mapping_with_ai(form_type, tax_year, fields), {'match': 'none', 'changed_fields': []}
     
     def generate_mapping_with_ai(self, form_type: str, tax_year: str, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Use FormMappingAgent (agentic reasoning) or fallback to single-shot AI."""
         
         if USE_AGENT:
             logger.info("🤖 Using FormMappingAgent (agentic reasoning)...")
-            # Convert fields to format expected by agent
-            agent_fields = []
-            for f in fields:
-                agent_fields.append({
-                    'field_name': f['field_name'],
-                    'field_type': 'Text' if f['field_type'] == 'text' else 'CheckBox',
-                    'field_value': None,
-                    'page_number': f['page'],
-                    'rect': {
-                        'x0': f['position']['x'],
-                        'y0': f['position']['y'],
-                        'x1': f['position']['x'] + f['position']['width'],
-                        'y1': f['position']['y'] + f['position']['height']
-                    },
-                    'nearby_label': f.get('nearby_label', '')
-                })
+            agent_fields = self._to_agent_fields(fields)
             
             mapping = self.mapping_agent.map_form_fields(
                 form_type=form_type,
@@ -377,25 +677,75 @@ Output ONLY valid JSON. No explanations, no markdown, just pure JSON."""
             'coverage': f"{len(mapped_fields)}/{len(field_names)} fields mapped"
         }
     
+    def precompile_fill_plan(self, mapping: Dict[str, Any], pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+        """Fill plan for the mapping against this template, stored with it so fillers skip compiling."""
+        if compile_fill_plan is None:
+            return None
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            return compile_fill_plan(mapping, doc)
+        finally:
+            doc.close()
+    
     def save_mapping(self, form_type: str, tax_year: str, mapping: Dict[str, Any], 
-                    validation_result: Dict[str, Any], fields_count: int):
-        """Save mapping to DynamoDB."""
+                    validation_result: Dict[str, Any], fields_count: int,
+                    signatures: Optional[List[str]] = None, mapping_source: Optional[Dict[str, Any]] = None,
+                    artifact_bucket: Optional[str] = None, fill_plan: Optional[Dict[str, Any]] = None):
+        """
+        Save mapping as an S3 artifact and point DynamoDB at it, stamping a new
+        mapping_version so filler caches reload it.
+
+        The mapping, full validation results and `fill_plan` go into a compact
+        content-addressed artifact in `artifact_bucket` (MAPPING_ARTIFACTS_BUCKET by
+        default); the row keeps only the pointer, version and a validation summary.
+        With `signatures`, the row records the template's structural fingerprint and a
+        fingerprint row pointing at it is written for reuse by later templates.
+        """
         try:
-            self.mappings_table.put_item(
-                Item={
-                    'form_type': form_type,
-                    'tax_year': tax_year,
-                    'mapping': mapping,
-                    'metadata': {
-                        'generated_at': datetime.utcnow().isoformat(),
-                        'model': 'claude-3.5-sonnet',
-                        'fields_count': fields_count,
-                        'validation': validation_result,
-                        'version': '1.0'
-                    }
+            bucket = artifact_bucket or MAPPING_ARTIFACTS_BUCKET
+            if not bucket:
+                raise ValueError("No bucket for mapping artifacts (set MAPPING_ARTIFACTS_BUCKET_NAME)")
+            artifact = put_mapping_artifact(self.s3_client, bucket, mapping, fill_plan, validation_result)
+            generated_at = datetime.utcnow().isoformat()
+            mapping_version = f"{generated_at}-{uuid.uuid4().hex[:8]}"
+            item = {
+                'form_type': form_type,
+                'tax_year': tax_year,
+                'mapping_artifact': artifact,
+                'mapping_version': mapping_version,
+                'metadata': {
+                    'generated_at': generated_at,
+                    'model': 'claude-3.5-sonnet',
+                    'fields_count': fields_count,
+                    'validation': {'valid': validation_result.get('valid'),
+                                   'coverage': validation_result.get('coverage')},
+                    'version': '2.0'
                 }
-            )
-            logger.info(f"Saved mapping for {form_type}-{tax_year} to DynamoDB")
+            }
+            if mapping_source:
+                item['metadata']['mapping_source'] = mapping_source
+            fingerprint = structural_fingerprint(signatures) if signatures is not None else None
+            if fingerprint:
+                item['structural_fingerprint'] = fingerprint
+            self.mappings_table.put_item(Item=item)
+            logger.info(f"Saved mapping for {form_type}-{tax_year} (version {mapping_version}, "
+                        f"artifact {artifact['key']}, {artifact['size']:,} bytes)")
+            
+            if fingerprint:
+                self.mappings_table.put_item(
+                    Item={
+                        'form_type': f"{FINGERPRINT_KEY_PREFIX}{fingerprint}",
+                        'tax_year': '-',
+                        'source_form_type': form_type,
+                        'source_tax_year': tax_year,
+                        'field_signatures': signatures,
+                        'created_at': generated_at
+                    }
+                )
+            
+            # Other processes pick the new version up from the stamp once their TTL lapses
+            if get_mapping_cache is not None:
+                get_mapping_cache().invalidate(form_type, tax_year)
         except Exception as e:
             logger.error(f"Error saving mapping: {e}")
             raise
@@ -421,9 +771,11 @@ Output ONLY valid JSON. No explanations, no markdown, just pure JSON."""
         
         # Extract fields
         fields = self.extract_fields_from_pdf(pdf_bytes)
+        signatures = field_signatures(fields)
+        fingerprint = structural_fingerprint(signatures)
         
-        # Generate AI mapping
-        mapping = self.generate_mapping_with_ai(form_type, tax_year, fields)
+        # Reuse a stored mapping for the same field tree, else generate one with AI
+        mapping, mapping_source = self.generate_mapping(form_type, tax_year, fields, signatures, fingerprint)
         
         # Validate mapping
         validation_result = self.validate_mapping(mapping, fields)
@@ -435,13 +787,19 @@ Output ONLY valid JSON. No explanations, no markdown, just pure JSON."""
         if validation_result['warnings']:
             logger.warning(f"Mapping warnings: {validation_result['warnings']}")
         
-        # Save to DynamoDB
-        self.save_mapping(form_type, tax_year, mapping, validation_result, len(fields))
+        # Save the artifact (with its precompiled fill plan) to S3 and the pointer to DynamoDB
+        self.save_mapping(form_type, tax_year, mapping, validation_result, len(fields),
+                          signatures=signatures, mapping_source=mapping_source,
+                          artifact_bucket=MAPPING_ARTIFACTS_BUCKET or bucket,
+                          fill_plan=self.precompile_fill_plan(mapping, pdf_bytes))
         
         return {
             'form_type': form_type,
             'tax_year': tax_year,
             'fields_count': len(fields),
+            'structural_fingerprint': fingerprint,
+            'mapping_source': mapping_source,
+            'mapping_stats': mapping.get('form_metadata', {}).get('mapping_stats'),
             'validation': validation_result
         }
 
@@ -16,6 +16,8 @@ from province.api.routes import api_router
 from province.core.config import get_settings
 from province.core.logging import setup_logging
 from province.agents.agent_service import register_tax_agents
+from province.agents.tax.tools.fill_pool import shutdown_fill_pool, shutdown_finalize_pool
+from province.agents.tax.tools.ingest_jobs import shutdown_ingest_workers
 
 # Load environment variables from .env.local
 load_dotenv('.env.local')
@@ -54,6 +56,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("=" * 80)
     logger.info("🛑 Province Tax Filing Backend Shutting Down")
     logger.info("=" * 80)
+    shutdown_fill_pool()
+    shutdown_finalize_pool()
+    shutdown_ingest_workers()
 
 
 def create_app() -> FastAPI:
@@ -116,10 +121,19 @@ def create_app() -> FastAPI:
                             request_id=request_id,
                             body_size=len(body)
                         )
-                # Reset body for next middleware
-                async def receive():
-                    return {"type": "http.request", "body": body}
-                request._receive = receive
+                # Reset body for next middleware. Newer Starlette replays the cached
+                # body itself (and treats a second http.request as an error once a
+                # streaming response waits for disconnect), so only patch older versions.
+                if not hasattr(request, "wrapped_receive"):
+                    original_receive = request._receive
+                    body_replayed = False
+                    async def receive():
+                        nonlocal body_replayed
+                        if not body_replayed:
+                            body_replayed = True
+                            return {"type": "http.request", "body": body, "more_body": False}
+                        return await original_receive()
+                    request._receive = receive
             except Exception as e:
                 logger.error("Error reading request body", error=str(e))
         
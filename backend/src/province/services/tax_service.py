@@ -22,8 +22,10 @@ from strands import Agent, tool
 from ..core.config import get_settings
 from ..agents.tax.tools.ingest_documents import ingest_documents
 from ..agents.tax.tools.calc_1040 import calc_1040
-from ..agents.tax.tools.form_filler import fill_tax_form
+from ..agents.tax.tools.form_filler import fill_tax_form, fill_tax_package
 from ..agents.tax.tools.save_document import save_document
+from ..agents.tax.tools.tax_engine import get_tax_engine
+from ..agents.tax.tools.tax_scenarios import evaluate_scenarios
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +52,8 @@ async def ingest_documents_tool(s3_key: str, taxpayer_name: str = "Test User", t
         logger.info(f"Processing tax document: {s3_key} (type: {document_type or 'auto-detect'})")
         
         # Note: ingest_documents will wait for Bedrock processing to complete (up to 3 minutes)
-        # This ensures we always have the data before continuing
+        # This ensures we always have the data before continuing. Not an ingest job: the
+        # session needs the full extract, which job rows do not store (RESULT_FIELDS)
         result = await ingest_documents(s3_key, taxpayer_name, tax_year, document_type)
         
         if result.get('success'):
@@ -94,7 +97,8 @@ async def calc_1040_tool(
     wages: float,
     withholding: float,
     dependents: int = 0,
-    zip_code: str = "12345"
+    zip_code: str = "12345",
+    tax_year: int = 2024
 ) -> str:
     """
     Calculate tax liability and refund/amount due based on user information.
@@ -105,6 +109,7 @@ async def calc_1040_tool(
         withholding: Federal tax withholding from W2
         dependents: Number of dependents
         zip_code: ZIP code for state tax purposes
+        tax_year: Tax year
     
     Returns:
         String describing the tax calculation results
@@ -112,47 +117,13 @@ async def calc_1040_tool(
     try:
         logger.info(f"Calculating taxes for {filing_status} with wages ${wages:,.2f}")
         
-        # Simplified tax calculation for demo purposes
-        # In production, this would use the full calc_1040 function
-        
-        # Standard deductions for 2024
-        standard_deductions = {
-            'Single': 14600,
-            'Married Filing Jointly': 29200,
-            'Married Filing Separately': 14600,
-            'Head of Household': 21900
-        }
-        
-        standard_deduction = standard_deductions.get(filing_status, 14600)
-        
-        # Calculate AGI (simplified - just wages for W2 employees)
-        agi = wages
-        
-        # Calculate taxable income
-        taxable_income = max(0, agi - standard_deduction)
-        
-        # Simplified tax calculation (2024 tax brackets for single filers)
-        if filing_status == 'Single':
-            if taxable_income <= 11600:
-                tax = taxable_income * 0.10
-            elif taxable_income <= 47150:
-                tax = 1160 + (taxable_income - 11600) * 0.12
-            elif taxable_income <= 100525:
-                tax = 5426 + (taxable_income - 47150) * 0.22
-            else:
-                tax = 17168.5 + (taxable_income - 100525) * 0.24
-        else:
-            # Simplified calculation for other filing statuses
-            tax = taxable_income * 0.15  # Rough estimate
-        
-        # Child Tax Credit (simplified)
-        child_tax_credit = min(dependents * 2000, tax)  # Up to $2000 per child
-        
-        # Final tax after credits
-        final_tax = max(0, tax - child_tax_credit)
-        
-        # Calculate refund or amount due
-        refund_or_due = withholding - final_tax
+        result = get_tax_engine().compute_return(tax_year, filing_status, wages, withholding, dependents)
+        agi = float(result.agi)
+        standard_deduction = float(result.standard_deduction)
+        taxable_income = float(result.taxable_income)
+        child_tax_credit = float(result.child_tax_credit)
+        final_tax = float(result.tax_after_credits)
+        refund_or_due = float(result.refund_or_due)
         
         # Store calculation results in conversation state
         session_id = conversation_state.get('current_session_id', 'default')
@@ -193,6 +164,311 @@ async def calc_1040_tool(
         return f"Error calculating taxes: {str(e)}"
 
 
+@tool
+async def tax_scenarios_tool(
+    filing_status: str,
+    wages: float,
+    withholding: float,
+    dependents: int = 0,
+    compare_filing_statuses: List[str] = None,
+    compare_dependents: List[int] = None,
+    wage_changes: List[float] = None,
+    withholding_changes: List[float] = None,
+    tax_year: int = 2024
+) -> str:
+    """
+    Compare what-if variations of a return in one call ("what if I file jointly",
+    "what if I add a dependent", "what if I earn $5,000 more").
+    
+    Every combination of the variations is calculated at once, so ask for all
+    the alternatives the user is weighing in a single call.
+    
+    Args:
+        filing_status: Current filing status
+        wages: Current total wages
+        withholding: Current federal tax withholding
+        dependents: Current number of dependents
+        compare_filing_statuses: Filing statuses to compare (e.g. ["Single", "Head of Household"])
+        compare_dependents: Dependent counts to compare (e.g. [0, 1, 2])
+        wage_changes: Dollar changes to wages (e.g. [0, 5000, -5000])
+        withholding_changes: Dollar changes to withholding (e.g. [0, 1000])
+        tax_year: Tax year
+    
+    Returns:
+        String table of the scenarios with each one's refund or amount due
+    """
+    try:
+        result = evaluate_scenarios(
+            tax_year, filing_status, wages, withholding, dependents, compare_filing_statuses,
+            compare_dependents, wage_changes, withholding_changes,
+            max_scenarios=get_settings().tax_scenarios_max_count
+        )
+        
+        columns = result['columns']
+        index = {name: columns.index(name) for name in columns}
+        lines = [f"Tax year {tax_year}, {result['count']} scenario(s). Refund is positive, amount due negative."]
+        lines.append("status | dependents | wages | withholding | tax | refund_or_due | vs current")
+        for label, row in [('current', result['base'])] + [(str(i + 1), row) for i, row in enumerate(result['scenarios'])]:
+            lines.append(
+                f"{label}: {row[index['filing_status']]} | {row[index['dependents']]} | "
+                f"${row[index['wages']]:,.2f} | ${row[index['withholding']]:,.2f} | "
+                f"${row[index['tax_after_credits']]:,.2f} | ${row[index['refund_or_due']]:,.2f} | "
+                f"{row[index['change_vs_base']]:+,.2f}"
+            )
+        lines.append(f"Best: scenario {result['best'] + 1}")
+        return "\n".join(lines)
+        
+    except Exception as e:
+        logger.error(f"Error in tax scenarios: {e}")
+        return f"Error comparing tax scenarios: {str(e)}"
+
+
+def _session_form_data(session_id: str, filing_status: str = None, wages: float = None,
+                       withholding: float = None, dependents: int = 0) -> tuple:
+    """
+    Build the semantic form data for a session from its W-2, calculation and state.
+    
+    Returns:
+        (form_data, user_id) for fill_tax_form / fill_tax_package
+    """
+    session_data = conversation_state.get(session_id, {})
+    
+    logger.info(f"🔍 DEBUG fill_form_tool:")
+    logger.info(f"   Current session_id: {session_id}")
+    logger.info(f"   Session data keys: {list(session_data.keys())}")
+    logger.info(f"   All conversation_state keys: {list(conversation_state.keys())}")
+    logger.info(f"   filing_status param: {filing_status}")
+    logger.info(f"   session filing_status: {session_data.get('filing_status', 'NOT SET')}")
+    
+    # Use calculation data if available
+    calc_data = session_data.get('tax_calculation', {})
+    w2_data = session_data.get('w2_data', {})
+    
+    logger.info(f"   Has w2_data: {bool(w2_data)}")
+    if w2_data:
+        logger.info(f"   W2 data keys: {list(w2_data.keys())}")
+    
+    # Extract employee info from W-2 if available
+    employee_info = {}
+    if w2_data and 'forms' in w2_data and len(w2_data['forms']) > 0:
+        employee_info = w2_data['forms'][0].get('employee', {})
+        logger.info(f"✅ Found W-2 employee data: {employee_info}")
+    else:
+        logger.warning(f"⚠️  NO W-2 DATA FOUND in session '{session_id}' - will use fallback values!")
+    
+    # Get SSN from W-2 (capital SSN key from Bedrock) and remove dashes
+    ssn_raw = employee_info.get('SSN') or employee_info.get('ssn') or session_data.get('ssn', '123-45-6789')
+    ssn = ssn_raw.replace('-', '') if ssn_raw else '123456789'  # Remove dashes for PDF form digit boxes
+    
+    # Parse taxpayer name from W-2 'name' field (full name)
+    if employee_info.get('name'):
+        full_name = employee_info.get('name')
+        logger.info(f"📝 Parsing W-2 name: {full_name}")
+        name_parts = full_name.split()
+        first_name = name_parts[0] if len(name_parts) > 0 else 'John'
+        last_name = name_parts[-1] if len(name_parts) > 1 else 'Smith'
+        middle_initial = name_parts[1][0] if len(name_parts) > 2 else ''
+    else:
+        # Fallback to session data
+        taxpayer_name = session_data.get('taxpayer_name', 'John A. Smith')
+        name_parts = taxpayer_name.split()
+        first_name = name_parts[0] if len(name_parts) > 0 else 'John'
+        middle_initial = name_parts[1][0] if len(name_parts) > 2 and name_parts[1] else ''
+        last_name = name_parts[-1] if len(name_parts) > 1 else 'Smith'
+    
+    # Get address from W-2 if available (extracted from Bedrock markdown)
+    if employee_info.get('address'):
+        # W-2 has full address extracted from markdown
+        address_full = employee_info.get('address')
+        street = employee_info.get('street', '123 Main St')
+        apt_no = employee_info.get('apt_no', '')
+        city = employee_info.get('city', 'Anytown')
+        state = employee_info.get('state', 'CA')
+        zip_code = employee_info.get('zip', '90210')
+        logger.info(f"📍 Using address from W-2: {address_full}")
+        if apt_no:
+            logger.info(f"   Apt/Unit: {apt_no}")
+    elif session_data.get('address'):
+        # Use address from session
+        address_full = session_data.get('address')
+        address_parts = address_full.split(',') if ',' in address_full else address_full.split()
+        street = address_parts[0].strip() if len(address_parts) > 0 else '123 Main St'
+        city = address_parts[1].strip() if len(address_parts) > 1 else 'Anytown'
+        state_zip_part = address_parts[2].strip() if len(address_parts) > 2 else 'CA 90210'
+        state_zip_components = state_zip_part.split()
+        state = state_zip_components[0] if state_zip_components else 'CA'
+        zip_code = state_zip_components[1] if len(state_zip_components) > 1 else '90210'
+    else:
+        # Fallback: use state from W-2 box 15 if available
+        boxes = w2_data.get('forms', [{}])[0].get('boxes', {}) if w2_data else {}
+        state_from_w2 = boxes.get('15', 'CA')  # Box 15 is state
+        street = '123 Main St'
+        city = 'Anytown'
+        state = state_from_w2
+        zip_code = '90210'
+        logger.info(f"📍 Using fallback address with state from W-2 box 15: {state}")
+
+    
+    logger.info(f"📝 Form filling with: {first_name} {last_name}, SSN: {ssn}, Address: {street}, {city}, {state} {zip_code}")
+    
+    # Get filing status for checkbox mapping (normalize case)
+    filing_status_value = filing_status or session_data.get('filing_status', 'Single')
+    filing_status_normalized = filing_status_value.strip().lower()
+    
+    logger.info(f"📋 Filing status: '{filing_status_value}' (normalized: '{filing_status_normalized}')")
+    
+    # Debug: Show ALL checkbox states
+    is_single = filing_status_normalized == 'single'
+    is_married_joint = filing_status_normalized in ['married filing jointly', 'married jointly', 'married']
+    is_married_separate = filing_status_normalized in ['married filing separately', 'married separately']
+    is_head_household = filing_status_normalized in ['head of household', 'head household']
+    is_qualifying_widow = filing_status_normalized in ['qualifying widow', 'qualifying widow(er)', 'qualifying surviving spouse']
+    
+    logger.info(f"🗳️  FILING STATUS DEBUG:")
+    logger.info(f"   Raw filing_status: '{filing_status}'")
+    logger.info(f"   Session filing_status: '{session_data.get('filing_status', 'NOT SET')}'")
+    logger.info(f"   Final filing_status_value: '{filing_status_value}'")
+    logger.info(f"   Normalized: '{filing_status_normalized}'")
+    logger.info(f"   Checkbox values:")
+    logger.info(f"     - single: {is_single} (should be True if user said 'single')")
+    logger.info(f"     - married_joint: {is_married_joint}")
+    logger.info(f"     - married_separate: {is_married_separate}")
+    logger.info(f"     - head_household: {is_head_household}")
+    logger.info(f"     - qualifying_widow: {is_qualifying_widow}")
+    
+    # Calculate refund/owe outside dict
+    refund_or_due = calc_data.get('refund_or_due', 0)
+    is_refund = refund_or_due > 0
+    
+    # Prepare comprehensive form data using SEMANTIC names from DynamoDB mapping
+    form_data = {
+        # === PERSONAL INFORMATION === (from 'personal_info' section)
+        'taxpayer_first_name': first_name,
+        'taxpayer_last_name': last_name,
+        'taxpayer_ssn': ssn,  # Already formatted without dashes
+        
+        # === ADDRESS === (from 'address' section)
+        'street_address': street,
+        'apt_no': apt_no if 'apt_no' in locals() else '',
+        'city': city,
+        'state': state,
+        'zip_code': zip_code,
+        
+        # === FILING STATUS === (from 'filing_status' section)
+        # Use normalized comparison and explicitly set ALL checkboxes
+        # Only ONE should be True, all others MUST be False
+        'single': is_single,
+        'married_joint': is_married_joint,
+        'married_separate': is_married_separate,
+        'head_household': is_head_household,
+        'qualifying_widow': is_qualifying_widow,
+        
+        # === TAX YEAR === (from 'header' section)
+        # For calendar year (Jan 1 - Dec 31, 2024), these fields should be BLANK
+        # Only fill these for fiscal/other tax years
+        # 'tax_year': '',  # Blank for calendar year
+        # 'year_suffix': '',  # Blank for calendar year
+        
+        # === INCOME === (from 'income_page1' section)
+        'wages_line_1a': wages or calc_data.get('agi', 0),  # Line 1a - Wages
+        'total_income_9': wages or calc_data.get('agi', 0),  # Line 9 - Total income
+        
+        # === ADJUSTMENTS === (from 'adjustments' section)
+        'adjusted_gross_income_11': calc_data.get('agi', wages or 0),  # Line 11 - AGI
+        
+        # === DEDUCTIONS === (from 'income_page1' section)
+        'total_deductions_line_14_computed': calc_data.get('standard_deduction', 0),  # Line 12 - Standard deduction
+        
+        # === PAYMENTS === (from 'payments' section)
+        'withholding': withholding or calc_data.get('withholding', 0),  # Line 25a - Federal withholding
+        'total_payments': withholding or calc_data.get('withholding', 0),  # Line 33 - Total payments
+        
+        # === REFUND === (from 'refund_or_amount_owed' section)
+        'overpayment': abs(refund_or_due) if is_refund else 0,  # Line 34 - Refund
+        'amount_owed': abs(refund_or_due) if not is_refund else 0,  # Line 37 - Amount owed
+        
+        # === REFUND BANKING INFO === (from 'refund_or_amount_owed' section)
+        # Line 35a - Amount to be refunded (same as overpayment if user wants direct deposit)
+        'refund_amount': abs(refund_or_due) if is_refund else 0,
+        # Get banking info from session if available
+        'routing_number': session_data.get('routing_number', ''),
+        'account_number': session_data.get('account_number', ''),
+        'checking_account': session_data.get('account_type', '').lower() == 'checking' if session_data.get('account_type') else False,
+        'savings_account': session_data.get('account_type', '').lower() == 'savings' if session_data.get('account_type') else False,
+        
+        # Line 36 - Amount applied to estimated tax (default 0, user can specify)
+        'estimated_tax_payment': session_data.get('estimated_tax_payment', 0),
+        
+        # === DIGITAL ASSETS === (from 'digital_assets' section)
+        # User conversation: "Do you have digital assets?" - "No"
+        'digital_assets_yes_checkbox': False,  # Always False unless user says yes
+        'digital_assets_no': True,  # Always True unless user says yes
+        
+        # === DEPENDENTS === (from 'dependents' section)
+        # Extract dependent info from session data
+        'dependent_count_qualifying': dependents or session_data.get('dependents', 0),
+        'dependent_count_other': 0,  # Other dependents (not qualifying)
+        
+        # === METADATA ===
+        'filing_status': filing_status_value,
+        'dependents': dependents or session_data.get('dependents', 0),
+    }
+    
+    # Add dependent details if available in session
+    dependents_list = session_data.get('dependents_list', [])
+    logger.info(f"📋 Processing {len(dependents_list)} dependents from session")
+    logger.info(f"   Dependents list: {dependents_list}")
+    
+    for i, dep in enumerate(dependents_list[:4], 1):  # Max 4 dependents on form
+        # Name (combined first + last in one field)
+        full_name = f"{dep.get('first_name', '')} {dep.get('last_name', '')}".strip()
+        if full_name:
+            key = f'dependent_{i}_first_last_name'
+            form_data[key] = full_name
+            logger.info(f"   ✅ Set {key} = '{full_name}'")
+        else:
+            logger.warning(f"   ⚠️  No name for dependent {i}")
+        
+        # SSN
+        if dep.get('ssn'):
+            key = f'dependent_{i}_ssn'
+            ssn_clean = dep['ssn'].replace('-', '')
+            form_data[key] = ssn_clean
+            logger.info(f"   ✅ Set {key} = '{ssn_clean}'")
+        
+        # Relationship
+        if dep.get('relationship'):
+            key = f'dependent_{i}_relationship'
+            form_data[key] = dep['relationship']
+            logger.info(f"   ✅ Set {key} = '{dep['relationship']}'")
+        
+        # Tax credits (default to child tax credit for "child" or "son" or "daughter")
+        relationship_lower = dep.get('relationship', '').lower()
+        if any(word in relationship_lower for word in ['child', 'son', 'daughter']):
+            key_child = f'dependent_{i}_child_tax_credit'
+            key_other = f'dependent_{i}_other_credit'
+            form_data[key_child] = True
+            form_data[key_other] = False
+            logger.info(f"   ✅ Set {key_child} = True (relationship: {dep.get('relationship')})")
+        else:
+            key_child = f'dependent_{i}_child_tax_credit'
+            key_other = f'dependent_{i}_other_credit'
+            form_data[key_child] = False
+            form_data[key_other] = True
+            logger.info(f"   ✅ Set {key_other} = True (relationship: {dep.get('relationship')})")
+    
+    # Debug: Show all dependent-related keys in form_data
+    dependent_keys = {k: v for k, v in form_data.items() if 'dependent' in k}
+    logger.info(f"📦 All dependent keys in form_data: {dependent_keys}")
+    
+    # Get user_id from session for PII-safe storage
+    user_id = session_data.get('user_id')
+    logger.info(f"🔑 Filling form with user_id: {user_id} (from session: {session_id})")
+    logger.info(f"📦 Session data keys: {list(session_data.keys())}")
+    
+    return form_data, user_id
+
+
 @tool
 async def fill_form_tool(
     form_type: str = "1040",
@@ -219,240 +495,7 @@ async def fill_form_tool(
         
         # Get data from conversation state if not provided
         session_id = conversation_state.get('current_session_id', 'default')
-        session_data = conversation_state.get(session_id, {})
-        
-        logger.info(f"🔍 DEBUG fill_form_tool:")
-        logger.info(f"   Current session_id: {session_id}")
-        logger.info(f"   Session data keys: {list(session_data.keys())}")
-        logger.info(f"   All conversation_state keys: {list(conversation_state.keys())}")
-        logger.info(f"   filing_status param: {filing_status}")
-        logger.info(f"   session filing_status: {session_data.get('filing_status', 'NOT SET')}")
-        
-        # Use calculation data if available
-        calc_data = session_data.get('tax_calculation', {})
-        w2_data = session_data.get('w2_data', {})
-        
-        logger.info(f"   Has w2_data: {bool(w2_data)}")
-        if w2_data:
-            logger.info(f"   W2 data keys: {list(w2_data.keys())}")
-        
-        # Extract employee info from W-2 if available
-        employee_info = {}
-        if w2_data and 'forms' in w2_data and len(w2_data['forms']) > 0:
-            employee_info = w2_data['forms'][0].get('employee', {})
-            logger.info(f"✅ Found W-2 employee data: {employee_info}")
-        else:
-            logger.warning(f"⚠️  NO W-2 DATA FOUND in session '{session_id}' - will use fallback values!")
-        
-        # Get SSN from W-2 (capital SSN key from Bedrock) and remove dashes
-        ssn_raw = employee_info.get('SSN') or employee_info.get('ssn') or session_data.get('ssn', '123-45-6789')
-        ssn = ssn_raw.replace('-', '') if ssn_raw else '123456789'  # Remove dashes for PDF form digit boxes
-        
-        # Parse taxpayer name from W-2 'name' field (full name)
-        if employee_info.get('name'):
-            full_name = employee_info.get('name')
-            logger.info(f"📝 Parsing W-2 name: {full_name}")
-            name_parts = full_name.split()
-            first_name = name_parts[0] if len(name_parts) > 0 else 'John'
-            last_name = name_parts[-1] if len(name_parts) > 1 else 'Smith'
-            middle_initial = name_parts[1][0] if len(name_parts) > 2 else ''
-        else:
-            # Fallback to session data
-            taxpayer_name = session_data.get('taxpayer_name', 'John A. Smith')
-            name_parts = taxpayer_name.split()
-            first_name = name_parts[0] if len(name_parts) > 0 else 'John'
-            middle_initial = name_parts[1][0] if len(name_parts) > 2 and name_parts[1] else ''
-            last_name = name_parts[-1] if len(name_parts) > 1 else 'Smith'
-        
-        # Get address from W-2 if available (extracted from Bedrock markdown)
-        if employee_info.get('address'):
-            # W-2 has full address extracted from markdown
-            address_full = employee_info.get('address')
-            street = employee_info.get('street', '123 Main St')
-            apt_no = employee_info.get('apt_no', '')
-            city = employee_info.get('city', 'Anytown')
-            state = employee_info.get('state', 'CA')
-            zip_code = employee_info.get('zip', '90210')
-            logger.info(f"📍 Using address from W-2: {address_full}")
-            if apt_no:
-                logger.info(f"   Apt/Unit: {apt_no}")
-        elif session_data.get('address'):
-            # Use address from session
-            address_full = session_data.get('address')
-            address_parts = address_full.split(',') if ',' in address_full else address_full.split()
-            street = address_parts[0].strip() if len(address_parts) > 0 else '123 Main St'
-            city = address_parts[1].strip() if len(address_parts) > 1 else 'Anytown'
-            state_zip_part = address_parts[2].strip() if len(address_parts) > 2 else 'CA 90210'
-            state_zip_components = state_zip_part.split()
-            state = state_zip_components[0] if state_zip_components else 'CA'
-            zip_code = state_zip_components[1] if len(state_zip_components) > 1 else '90210'
-        else:
-            # Fallback: use state from W-2 box 15 if available
-            boxes = w2_data.get('forms', [{}])[0].get('boxes', {}) if w2_data else {}
-            state_from_w2 = boxes.get('15', 'CA')  # Box 15 is state
-            street = '123 Main St'
-            city = 'Anytown'
-            state = state_from_w2
-            zip_code = '90210'
-            logger.info(f"📍 Using fallback address with state from W-2 box 15: {state}")
-
-        
-        logger.info(f"📝 Form filling with: {first_name} {last_name}, SSN: {ssn}, Address: {street}, {city}, {state} {zip_code}")
-        
-        # Get filing status for checkbox mapping (normalize case)
-        filing_status_value = filing_status or session_data.get('filing_status', 'Single')
-        filing_status_normalized = filing_status_value.strip().lower()
-        
-        logger.info(f"📋 Filing status: '{filing_status_value}' (normalized: '{filing_status_normalized}')")
-        
-        # Debug: Show ALL checkbox states
-        is_single = filing_status_normalized == 'single'
-        is_married_joint = filing_status_normalized in ['married filing jointly', 'married jointly', 'married']
-        is_married_separate = filing_status_normalized in ['married filing separately', 'married separately']
-        is_head_household = filing_status_normalized in ['head of household', 'head household']
-        is_qualifying_widow = filing_status_normalized in ['qualifying widow', 'qualifying widow(er)', 'qualifying surviving spouse']
-        
-        logger.info(f"🗳️  FILING STATUS DEBUG:")
-        logger.info(f"   Raw filing_status: '{filing_status}'")
-        logger.info(f"   Session filing_status: '{session_data.get('filing_status', 'NOT SET')}'")
-        logger.info(f"   Final filing_status_value: '{filing_status_value}'")
-        logger.info(f"   Normalized: '{filing_status_normalized}'")
-        logger.info(f"   Checkbox values:")
-        logger.info(f"     - single: {is_single} (should be True if user said 'single')")
-        logger.info(f"     - married_joint: {is_married_joint}")
-        logger.info(f"     - married_separate: {is_married_separate}")
-        logger.info(f"     - head_household: {is_head_household}")
-        logger.info(f"     - qualifying_widow: {is_qualifying_widow}")
-        
-        # Calculate refund/owe outside dict
-        refund_or_due = calc_data.get('refund_or_due', 0)
-        is_refund = refund_or_due > 0
-        
-        # Prepare comprehensive form data using SEMANTIC names from DynamoDB mapping
-        form_data = {
-            # === PERSONAL INFORMATION === (from 'personal_info' section)
-            'taxpayer_first_name': first_name,
-            'taxpayer_last_name': last_name,
-            'taxpayer_ssn': ssn,  # Already formatted without dashes
-            
-            # === ADDRESS === (from 'address' section)
-            'street_address': street,
-            'apt_no': apt_no if 'apt_no' in locals() else '',
-            'city': city,
-            'state': state,
-            'zip_code': zip_code,
-            
-            # === FILING STATUS === (from 'filing_status' section)
-            # Use normalized comparison and explicitly set ALL checkboxes
-            # Only ONE should be True, all others MUST be False
-            'single': is_single,
-            'married_joint': is_married_joint,
-            'married_separate': is_married_separate,
-            'head_household': is_head_household,
-            'qualifying_widow': is_qualifying_widow,
-            
-            # === TAX YEAR === (from 'header' section)
-            # For calendar year (Jan 1 - Dec 31, 2024), these fields should be BLANK
-            # Only fill these for fiscal/other tax years
-            # 'tax_year': '',  # Blank for calendar year
-            # 'year_suffix': '',  # Blank for calendar year
-            
-            # === INCOME === (from 'income_page1' section)
-            'wages_line_1a': wages or calc_data.get('agi', 0),  # Line 1a - Wages
-            'total_income_9': wages or calc_data.get('agi', 0),  # Line 9 - Total income
-            
-            # === ADJUSTMENTS === (from 'adjustments' section)
-            'adjusted_gross_income_11': calc_data.get('agi', wages or 0),  # Line 11 - AGI
-            
-            # === DEDUCTIONS === (from 'income_page1' section)
-            'total_deductions_line_14_computed': calc_data.get('standard_deduction', 0),  # Line 12 - Standard deduction
-            
-            # === PAYMENTS === (from 'payments' section)
-            'withholding': withholding or calc_data.get('withholding', 0),  # Line 25a - Federal withholding
-            'total_payments': withholding or calc_data.get('withholding', 0),  # Line 33 - Total payments
-            
-            # === REFUND === (from 'refund_or_amount_owed' section)
-            'overpayment': abs(refund_or_due) if is_refund else 0,  # Line 34 - Refund
-            'amount_owed': abs(refund_or_due) if not is_refund else 0,  # Line 37 - Amount owed
-            
-            # === REFUND BANKING INFO === (from 'refund_or_amount_owed' section)
-            # Line 35a - Amount to be refunded (same as overpayment if user wants direct deposit)
-            'refund_amount': abs(refund_or_due) if is_refund else 0,
-            # Get banking info from session if available
-            'routing_number': session_data.get('routing_number', ''),
-            'account_number': session_data.get('account_number', ''),
-            'checking_account': session_data.get('account_type', '').lower() == 'checking' if session_data.get('account_type') else False,
-            'savings_account': session_data.get('account_type', '').lower() == 'savings' if session_data.get('account_type') else False,
-            
-            # Line 36 - Amount applied to estimated tax (default 0, user can specify)
-            'estimated_tax_payment': session_data.get('estimated_tax_payment', 0),
-            
-            # === DIGITAL ASSETS === (from 'digital_assets' section)
-            # User conversation: "Do you have digital assets?" - "No"
-            'digital_assets_yes_checkbox': False,  # Always False unless user says yes
-            'digital_assets_no': True,  # Always True unless user says yes
-            
-            # === DEPENDENTS === (from 'dependents' section)
-            # Extract dependent info from session data
-            'dependent_count_qualifying': dependents or session_data.get('dependents', 0),
-            'dependent_count_other': 0,  # Other dependents (not qualifying)
-            
-            # === METADATA ===
-            'filing_status': filing_status_value,
-            'dependents': dependents or session_data.get('dependents', 0),
-        }
-        
-        # Add dependent details if available in session
-        dependents_list = session_data.get('dependents_list', [])
-        logger.info(f"📋 Processing {len(dependents_list)} dependents from session")
-        logger.info(f"   Dependents list: {dependents_list}")
-        
-        for i, dep in enumerate(dependents_list[:4], 1):  # Max 4 dependents on form
-            # Name (combined first + last in one field)
-            full_name = f"{dep.get('first_name', '')} {dep.get('last_name', '')}".strip()
-            if full_name:
-                key = f'dependent_{i}_first_last_name'
-                form_data[key] = full_name
-                logger.info(f"   ✅ Set {key} = '{full_name}'")
-            else:
-                logger.warning(f"   ⚠️  No name for dependent {i}")
-            
-            # SSN
-            if dep.get('ssn'):
-                key = f'dependent_{i}_ssn'
-                ssn_clean = dep['ssn'].replace('-', '')
-                form_data[key] = ssn_clean
-                logger.info(f"   ✅ Set {key} = '{ssn_clean}'")
-            
-            # Relationship
-            if dep.get('relationship'):
-                key = f'dependent_{i}_relationship'
-                form_data[key] = dep['relationship']
-                logger.info(f"   ✅ Set {key} = '{dep['relationship']}'")
-            
-            # Tax credits (default to child tax credit for "child" or "son" or "daughter")
-            relationship_lower = dep.get('relationship', '').lower()
-            if any(word in relationship_lower for word in ['child', 'son', 'daughter']):
-                key_child = f'dependent_{i}_child_tax_credit'
-                key_other = f'dependent_{i}_other_credit'
-                form_data[key_child] = True
-                form_data[key_other] = False
-                logger.info(f"   ✅ Set {key_child} = True (relationship: {dep.get('relationship')})")
-            else:
-                key_child = f'dependent_{i}_child_tax_credit'
-                key_other = f'dependent_{i}_other_credit'
-                form_data[key_child] = False
-                form_data[key_other] = True
-                logger.info(f"   ✅ Set {key_other} = True (relationship: {dep.get('relationship')})")
-        
-        # Debug: Show all dependent-related keys in form_data
-        dependent_keys = {k: v for k, v in form_data.items() if 'dependent' in k}
-        logger.info(f"📦 All dependent keys in form_data: {dependent_keys}")
-        
-        # Get user_id from session for PII-safe storage
-        user_id = session_data.get('user_id')
-        logger.info(f"🔑 Filling form with user_id: {user_id} (from session: {session_id})")
-        logger.info(f"📦 Session data keys: {list(session_data.keys())}")
+        form_data, user_id = _session_form_data(session_id, filing_status, wages, withholding, dependents)
         
         # Skip questions when called from tool - we have all the data we need
         result = await fill_tax_form(form_type, form_data, user_id=user_id, skip_questions=True)
@@ -484,6 +527,58 @@ async def fill_form_tool(
         return f"Error filling form: {str(e)}"
 
 
+@tool
+async def fill_package_tool(
+    form_types: List[str],
+    filing_status: str = None,
+    wages: float = None,
+    withholding: float = None,
+    dependents: int = 0
+) -> str:
+    """
+    Fill a whole return package (e.g. 1040 plus schedules and a state form) in one call.
+    
+    Every form is filled from the same information as fill_form_tool and the
+    forms are merged into one package PDF, saved as a single versioned document.
+    
+    Args:
+        form_types: Forms in the package, in order (e.g. ["1040", "SCHEDULE_B", "STATE_CA"])
+        filing_status: Filing status
+        wages: Total wages
+        withholding: Federal withholding
+        dependents: Number of dependents
+    
+    Returns:
+        String describing the package filling result
+    """
+    try:
+        logger.info(f"Filling package of {form_types}")
+        
+        session_id = conversation_state.get('current_session_id', 'default')
+        form_data, user_id = _session_form_data(session_id, filing_status, wages, withholding, dependents)
+        
+        result = await fill_tax_package(form_types, form_data, user_id=user_id)
+        
+        if result.get('success'):
+            conversation_state.setdefault(session_id, {})['filled_form'] = {
+                'form_type': 'PACKAGE',
+                'form_types': result.get('form_types'),
+                'form_url': result.get('filled_form_url'),
+                'form_data': form_data,
+                'filled_at': datetime.now().isoformat(),
+                'versioning': result.get('versioning', {})
+            }
+            versioning = result.get('versioning', {})
+            return (f"Successfully filled a package of {', '.join(result['form_types'])} "
+                    f"(Version {versioning.get('version', 'v001')})! The merged package is available at: "
+                    f"{result.get('filled_form_url')}")
+        else:
+            return f"Failed to fill package: {result.get('error', 'Unknown error')}"
+    except Exception as e:
+        logger.error(f"Error filling package: {e}")
+        return f"Error filling package: {str(e)}"
+
+
 @tool
 async def save_document_tool(
     document_type: str = "tax_return",
@@ -705,8 +800,8 @@ async def list_version_history_tool(document_id: str = None) -> str:
             return "No document ID available. Please fill a form first or provide a document ID."
         
         # Get version history from form filler
-        from ..agents.tax.tools.form_filler import TaxFormFiller
-        filler = TaxFormFiller()
+        from ..agents.tax.tools.form_filler import get_tax_form_filler
+        filler = get_tax_form_filler()
         versions = await filler.get_version_history(document_id)
         
         if not versions:
@@ -791,7 +886,9 @@ class TaxService:
             tools=[
                 ingest_documents_tool,
                 calc_1040_tool,
+                tax_scenarios_tool,
                 fill_form_tool,
+                fill_package_tool,
                 save_document_tool,
                 manage_state_tool,
                 add_dependent_tool,
@@ -839,7 +936,9 @@ Agent action:
 TOOL USAGE:
 - Use ingest_w2_tool when user mentions W2 or you need to process W2 data
 - Use calc_1040_tool when you have enough information to calculate taxes
+- Use tax_scenarios_tool for "what if" questions (another filing status, more dependents, different wages or withholding); put every alternative in one call
 - Use fill_form_tool to progressively fill out tax forms (MUST pass filing_status parameter explicitly)
+- Use fill_package_tool when the return needs more than one form (1040 plus schedules or a state form); it fills and merges them all in one call (also pass filing_status explicitly)
 - Use add_dependent_tool when user tells you about dependents (name, SSN, relationship)
 - Use save_document_tool to save completed forms
 - Use manage_state_tool to track conversation progress
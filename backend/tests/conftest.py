@@ -7,6 +7,12 @@ from pathlib import Path
 src_path = Path(__file__).parent.parent / "src"
 sys.path.insert(0, str(src_path))
 
+import importlib
+import importlib.util
+import json
+import time
+import uuid
+
 import pytest
 from fastapi.testclient import TestClient
 from moto import mock_aws
@@ -149,4 +155,201 @@ def app(mock_aws_services, monkeypatch):
 @pytest.fixture
 def client(app):
     """Create test client."""
-    return TestClient(app)
\ No newline at end of file
+    return TestClient(app)
+
+@pytest.fixture(scope="session")
+def finalize_pool():
+    """Stop the final-profile save pool after the session; its workers are kept warm across tests."""
+    from province.agents.tax.tools.fill_pool import shutdown_finalize_pool
+
+    yield
+    shutdown_finalize_pool()
+
+
+@pytest.fixture
+def form_filler_aws(mock_aws_credentials, finalize_pool, tmp_path, monkeypatch):
+    """Mock S3/DynamoDB for the tax form filler with the 2024 1040 template and a mapping."""
+    import fitz
+
+    from province.agents.tax.tools import form_filler
+    from province.core.config import get_settings
+
+    settings = get_settings()
+    template_bytes = (Path(__file__).parent.parent / "tax_form_templates" / "2024" / "f1040.pdf").read_bytes()
+
+    # Sectioned mapping covering every widget on the template
+    doc = fitz.open(stream=template_bytes, filetype="pdf")
+    mapping = {"form_metadata": {"form_type": "F1040", "tax_year": "2024"}}
+    for page_num, page in enumerate(doc, start=1):
+        section = mapping.setdefault(f"page_{page_num}", {})
+        for i, widget in enumerate(page.widgets()):
+            if widget.field_name:
+                section[f"p{page_num}_field_{i}"] = widget.field_name
+    doc.close()
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=settings.templates_bucket_name)
+        s3.create_bucket(Bucket=settings.documents_bucket_name)
+        s3.put_object(Bucket=settings.templates_bucket_name, Key="tax_forms/2024/f1040.pdf", Body=template_bytes)
+
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        mappings_table = dynamodb.create_table(
+            TableName="province-form-mappings",
+            KeySchema=[
+                {"AttributeName": "form_type", "KeyType": "HASH"},
+                {"AttributeName": "tax_year", "KeyType": "RANGE"}
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "form_type", "AttributeType": "S"},
+                {"AttributeName": "tax_year", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        mappings_table.put_item(Item={
+            "form_type": "F1040",
+            "tax_year": "2024",
+            "mapping": mapping,
+            "metadata": {"generated_at": "2024-01-01T00:00:00", "version": "1.0"}
+        })
+        versions_table = dynamodb.create_table(
+            TableName="province-document-versions",
+            KeySchema=[
+                {"AttributeName": "document_id", "KeyType": "HASH"},
+                {"AttributeName": "version", "KeyType": "RANGE"}
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "document_id", "AttributeType": "S"},
+                {"AttributeName": "version", "AttributeType": "S"},
+                {"AttributeName": "version_number", "AttributeType": "N"}
+            ],
+            GlobalSecondaryIndexes=[{
+                "IndexName": form_filler.VERSION_NUMBER_INDEX,
+                "KeySchema": [
+                    {"AttributeName": "document_id", "KeyType": "HASH"},
+                    {"AttributeName": "version_number", "KeyType": "RANGE"}
+                ],
+                "Projection": {"ProjectionType": "ALL"}
+            }],
+            BillingMode="PAY_PER_REQUEST"
+        )
+
+        cache = form_filler.TemplateCache(cache_dir=str(tmp_path / "templates"))
+        monkeypatch.setattr(form_filler, "get_template_cache", lambda: cache)
+        form_filler.get_tax_form_filler.cache_clear()
+        form_filler.get_mapping_cache().invalidate()
+
+        yield {
+            "s3": s3,
+            "settings": settings,
+            "mapping": mapping,
+            "mappings_table": mappings_table,
+            "versions_table": versions_table,
+            "template_cache": cache
+        }
+
+        form_filler.get_tax_form_filler.cache_clear()
+        form_filler.get_mapping_cache().invalidate()
+
+
+@pytest.fixture(scope="module")
+def processor_module():
+    """lambda/form_template_processor.py ('lambda' is a keyword), under its package name so spawned pool
+    workers can import it."""
+    name = "province.lambda.form_template_processor"
+    path = Path(__file__).parent.parent / "src" / "province" / "lambda" / "form_template_processor.py"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    yield module
+    module.shutdown_extract_pool()
+    sys.modules.pop(name, None)
+
+
+BDA_OUTPUT_BUCKET = "bda-output"
+W2_MARKDOWN = "1 Wages, tips, other compensation\t\t\t2 Federal income tax withheld\t\n55151.93\t\t\t16606.17\t\n"
+
+
+class FakeDataAutomation:
+    """Finishes every job on its first status check (after `latency` seconds), writing a standard-output result."""
+
+    def __init__(self, s3, latency=0.0):
+        self.s3 = s3
+        self.latency = latency
+        self.invocations = []
+
+    def invoke_data_automation_async(self, inputConfiguration, **kwargs):
+        job_id = uuid.uuid4().hex
+        self.invocations.append(inputConfiguration["s3Uri"])
+        self.s3.put_object(Bucket=BDA_OUTPUT_BUCKET, Key=f"inference_results/{job_id}/0/standard_output/0/result.json",
+                           Body=json.dumps({"pages": [{"representation": {"markdown": W2_MARKDOWN}}]}))
+        return {"invocationArn": f"arn:aws:bedrock:us-east-1:123456789012:data-automation-invocation/{job_id}"}
+
+    def get_data_automation_status(self, invocationArn):
+        time.sleep(self.latency)
+        return {"status": "Success"}
+
+
+@pytest.fixture
+def ingest_env(mock_aws_credentials, monkeypatch):
+    """Mocked buckets, results index and engagement tables, with BDA replaced by FakeDataAutomation."""
+    from province.agents.tax.tools.bda_results_index import get_extraction_dedup_stats
+    from province.core.config import get_settings
+
+    # The tools package re-exports the function under the module's name
+    ingest_module = importlib.import_module("province.agents.tax.tools.ingest_documents")
+    monkeypatch.setenv("BEDROCK_DATA_AUTOMATION_PROJECT_ARN", "arn:aws:bedrock:us-east-1:123456789012:project/p")
+    monkeypatch.setenv("BEDROCK_DATA_AUTOMATION_PROFILE_ARN", "arn:aws:bedrock:us-east-1:123456789012:profile/p")
+    monkeypatch.setenv("BEDROCK_OUTPUT_BUCKET_NAME", BDA_OUTPUT_BUCKET)
+    monkeypatch.setenv("AWS_ACCOUNT_ID", "123456789012")
+    settings = get_settings()
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=settings.documents_bucket_name)
+        s3.create_bucket(Bucket=BDA_OUTPUT_BUCKET)
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        dynamodb.create_table(
+            TableName=settings.bda_results_index_table_name,
+            KeySchema=[{"AttributeName": "lookup_key", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "lookup_key", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        engagements_table = dynamodb.create_table(
+            TableName=settings.tax_engagements_table_name,
+            KeySchema=[{"AttributeName": "engagement_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "engagement_id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        documents_table = dynamodb.create_table(
+            TableName=settings.tax_documents_table_name,
+            KeySchema=[
+                {"AttributeName": "tenant_id#engagement_id", "KeyType": "HASH"},
+                {"AttributeName": "doc#path", "KeyType": "RANGE"}
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "tenant_id#engagement_id", "AttributeType": "S"},
+                {"AttributeName": "doc#path", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        bda = FakeDataAutomation(s3)
+        real_client = boto3.client
+        monkeypatch.setattr(ingest_module.boto3, "client", lambda service, **kwargs: (
+            bda if service == "bedrock-data-automation-runtime" else real_client(service, **kwargs)))
+        get_extraction_dedup_stats.cache_clear()
+
+        def upload(key, body):
+            s3.put_object(Bucket=settings.documents_bucket_name, Key=key, Body=body)
+            return key
+
+        yield {
+            "bda": bda,
+            "s3": s3,
+            "settings": settings,
+            "upload": upload,
+            "ingest_module": ingest_module,
+            "engagements_table": engagements_table,
+            "documents_table": documents_table
+        }
+        get_extraction_dedup_stats.cache_clear()
@@ -0,0 +1,127 @@
+"""Tests for non-blocking Bedrock Data Automation job waiting."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from province.agents.tax.tools.bda_jobs import (
+    BDACompletionEvents,
+    BDAJobWaiter,
+    parse_bda_completion_event,
+)
+
+ARN = "arn:aws:bedrock:us-east-1:123456789012:data-automation-invocation/job-1"
+
+
+class FakeRuntime:
+    """Reports InProgress until `done_after` polls, then `final_status`; each poll blocks briefly."""
+
+    def __init__(self, done_after=None, final_status="Success", latency=0.0):
+        self.done_after = done_after
+        self.final_status = final_status
+        self.latency = latency
+        self.polls = []
+
+    def get_data_automation_status(self, invocationArn):
+        time.sleep(self.latency)
+        self.polls.append(time.monotonic())
+        if self.done_after is not None and len(self.polls) >= self.done_after:
+            return {"status": self.final_status, "errorMessage": "bad input"}
+        return {"status": "InProgress"}
+
+
+class TestBDAJobWaiter:
+    """Test polling back-off, early completion from events and concurrent waits."""
+
+    @pytest.mark.asyncio
+    async def test_poll_intervals_grow_to_the_cap(self):
+        """Test intervals double from the initial value and stop at max_interval."""
+        runtime = FakeRuntime(done_after=5)
+
+        outcome = await BDAJobWaiter(runtime, initial_interval=0.02, max_interval=0.08, timeout=5).wait(ARN)
+
+        gaps = [b - a for a, b in zip(runtime.polls, runtime.polls[1:])]
+        assert outcome == {**outcome, "status": "Success", "succeeded": True, "source": "poll", "checks": 5}
+        assert gaps[0] == pytest.approx(0.02, abs=0.015)
+        assert gaps[1] == pytest.approx(0.04, abs=0.015)
+        assert gaps[2] == pytest.approx(0.08, abs=0.015)
+        assert gaps[3] == pytest.approx(0.08, abs=0.015)
+
+    @pytest.mark.asyncio
+    async def test_failure_and_timeout(self):
+        """Test a failed job reports its error and a stuck job times out."""
+        failed = await BDAJobWaiter(FakeRuntime(done_after=1, final_status="FAILED"), timeout=1).wait(ARN)
+        stuck = await BDAJobWaiter(FakeRuntime(), initial_interval=0.01, timeout=0.05).wait(ARN)
+
+        assert (failed["succeeded"], failed["error"]) == (False, "bad input")
+        assert (stuck["source"], stuck["status"], stuck["succeeded"]) == ("timeout", None, False)
+
+    @pytest.mark.asyncio
+    async def test_completion_event_ends_wait_early(self):
+        """Test an event published from another thread wakes the waiter mid-interval."""
+        events = BDACompletionEvents()
+        waiter = BDAJobWaiter(FakeRuntime(done_after=2), events=events, initial_interval=30, timeout=60)
+        s3_event = {"Records": [{"s3": {"object": {"key": "inference_results/job-1/job_metadata.json"}}}]}
+        threading.Timer(0.05, events.publish, args=(s3_event,)).start()
+
+        started = time.monotonic()
+        outcome = await waiter.wait(ARN)
+
+        assert time.monotonic() - started < 1
+        assert (outcome["status"], outcome["source"], outcome["checks"]) == ("Success", "event", 2)
+
+    @pytest.mark.asyncio
+    async def test_event_before_wait_is_retained(self):
+        """Test a completion that arrives before the waiter starts is not lost."""
+        events = BDACompletionEvents()
+        events.publish({"detail-type": "Bedrock Data Automation Job Failed", "detail": {"job_id": "job-1"}})
+        runtime = FakeRuntime(done_after=2, final_status="FAILED")
+
+        outcome = await BDAJobWaiter(runtime, events=events, initial_interval=30, timeout=60).wait(ARN)
+
+        assert (outcome["status"], outcome["source"], outcome["error"]) == ("FAILED", "event", "bad input")
+
+    @pytest.mark.asyncio
+    async def test_unconfirmed_event_does_not_end_the_wait(self):
+        """Test a forged completion event only triggers a status check, then polling resumes."""
+        events = BDACompletionEvents()
+        events.publish({"detail-type": "Bedrock Data Automation Job Succeeded", "detail": {"job_id": "job-1"}})
+        runtime = FakeRuntime(done_after=4)
+
+        outcome = await BDAJobWaiter(runtime, events=events, initial_interval=0.02, timeout=5).wait(ARN)
+
+        assert (outcome["status"], outcome["source"], outcome["checks"]) == ("Success", "poll", 4)
+
+    @pytest.mark.asyncio
+    async def test_many_waits_share_one_loop(self):
+        """Test concurrent waits overlap and the loop keeps serving other work."""
+        runtimes = [FakeRuntime(done_after=3, latency=0.01) for _ in range(50)]
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        beat = asyncio.create_task(heartbeat())
+        started = time.monotonic()
+        outcomes = await asyncio.gather(*(BDAJobWaiter(r, initial_interval=0.05, timeout=5).wait(ARN)
+                                          for r in runtimes))
+        beat.cancel()
+
+        assert all(o["succeeded"] for o in outcomes)
+        assert time.monotonic() - started < 1.5  # serially this would be 50 x 0.15s
+        assert ticks >= 5
+
+    def test_parse_ignores_unrelated_events(self):
+        """Test only terminal BDA job events and job metadata objects are recognised."""
+        assert parse_bda_completion_event({"detail-type": "Object Created",
+                                           "detail": {"object": {"key": "inference_results/j/job_metadata.json"}}}) \
+            == ("j", "COMPLETED")
+        assert parse_bda_completion_event({"detail-type": "Object Created",
+                                           "detail": {"object": {"key": "inference_results/j/0/result.json"}}}) is None
+        assert parse_bda_completion_event({"detail-type": "Bedrock Data Automation Job Status Change",
+                                           "detail": {"job_id": "j", "job_status": "InProgress"}}) is None
@@ -0,0 +1,84 @@
+"""Tests for the Bedrock Data Automation results index."""
+
+import hashlib
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from province.agents.tax.tools.bda_results_index import (
+    BDAResultsIndex,
+    backfill_bda_results_index,
+    source_key_from_job_metadata,
+)
+
+OUTPUT_BUCKET = "bda-output"
+INPUT_BUCKET = "documents"
+
+
+@pytest.fixture
+def index(mock_aws_credentials):
+    """Index over a mocked table and buckets."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=OUTPUT_BUCKET)
+        s3.create_bucket(Bucket=INPUT_BUCKET)
+        table = boto3.resource("dynamodb", region_name="us-east-1").create_table(
+            TableName="province-bda-results-index",
+            KeySchema=[{"AttributeName": "lookup_key", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "lookup_key", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        yield BDAResultsIndex(table, s3)
+
+
+def put_job(s3, job_id, source_key, double_slash=False):
+    """Write a finished job's metadata and standard output result."""
+    s3.put_object(Bucket=OUTPUT_BUCKET, Key=f"inference_results/{job_id}/job_metadata.json", Body=json.dumps({
+        "output_metadata": [{"asset_input_path": {"s3_key": f"s3://{INPUT_BUCKET}/{source_key}"}}]
+    }))
+    prefix = "inference_results//" if double_slash else "inference_results/"
+    s3.put_object(Bucket=OUTPUT_BUCKET, Key=f"{prefix}{job_id}/0/standard_output/0/result.json",
+                  Body=json.dumps({"job": job_id}))
+
+
+class TestBDAResultsIndex:
+    """Test recording, lookup and backfill of BDA results."""
+
+    def test_record_and_lookup_by_key_or_hash(self, index):
+        """Test a recorded job is found by either its source key or its content hash."""
+        put_job(index.s3_client, "job-1", "tax-engagements/e1/w2.pdf")
+        index.record("job-1", "tax-engagements/e1/w2.pdf", OUTPUT_BUCKET,
+                     "inference_results/job-1/0/standard_output/0/result.json", content_sha256="abc")
+
+        by_key = index.lookup(s3_key="tax-engagements/e1/w2.pdf")
+        by_hash = index.lookup(s3_key="tax-engagements/e2/copy.pdf", content_sha256="abc")
+
+        assert by_key["job_id"] == by_hash["job_id"] == "job-1"
+        assert index.load_result(by_key) == {"job": "job-1"}
+        assert index.lookup(s3_key="tax-engagements/e3/other.pdf") is None
+
+    def test_backfill_walks_every_page(self, index):
+        """Test backfill indexes jobs beyond the first listing page and hashes surviving inputs."""
+        s3 = index.s3_client
+        for i in range(7):
+            put_job(s3, f"job-{i}", f"tax-engagements/e{i}/w2.pdf", double_slash=(i == 3))
+        s3.put_object(Bucket=INPUT_BUCKET, Key="tax-engagements/e5/w2.pdf", Body=b"%PDF w2 five")
+        s3.put_object(Bucket=OUTPUT_BUCKET, Key="inference_results/orphan/job_metadata.json", Body=b"{}")
+
+        stats = backfill_bda_results_index(index, OUTPUT_BUCKET, input_bucket=INPUT_BUCKET, page_size=2)
+
+        assert stats == {"jobs": 8, "indexed": 7, "skipped": 1}
+        assert index.lookup(s3_key="tax-engagements/e6/w2.pdf")["job_id"] == "job-6"
+        assert index.lookup(s3_key="tax-engagements/e3/w2.pdf")["result_key"].startswith("inference_results//")
+        digest = hashlib.sha256(b"%PDF w2 five").hexdigest()
+        assert index.lookup(content_sha256=digest)["source_s3_key"] == "tax-engagements/e5/w2.pdf"
+
+    def test_source_key_from_job_metadata(self):
+        """Test s3:// URIs and plain keys both resolve to the object key."""
+        plain = {"output_metadata": [{"asset_input_path": {"s3_key": "a/b.pdf"}}]}
+        uri = {"output_metadata": [{"asset_input_path": {"s3_key": "s3://bucket/a/b.pdf"}}]}
+
+        assert source_key_from_job_metadata(plain) == source_key_from_job_metadata(uri) == "a/b.pdf"
+        assert source_key_from_job_metadata({}) is None
@@ -0,0 +1,92 @@
+"""Tests for routing uploads by their content rather than their file name."""
+
+import fitz
+import pytest
+
+from province.agents.tax.tools.document_classifier import classify_document, get_document_classifier_stats
+
+W2_TEXT = [
+    "Form W-2 Wage and Tax Statement 2024", "a Employee's social security number 123-45-6789",
+    "b Employer identification number (EIN) 12-3456789", "1 Wages, tips, other compensation 55151.93",
+    "2 Federal income tax withheld 16606.17", "3 Social security wages 55151.93", "5 Medicare wages and tips",
+]
+INT_TEXT = [
+    "Form 1099-INT Interest Income", "PAYER'S TIN 12-3456789 RECIPIENT'S TIN XXX-XX-6789",
+    "1 Interest income $412.08", "2 Early withdrawal penalty", "3 Interest on U.S. Savings Bonds and Treasury obligations",
+    "4 Federal income tax withheld", "Department of the Treasury - Internal Revenue Service",
+]
+MISC_TEXT = [
+    "Form 1099-MISC Miscellaneous Information", "1 Rents $12,000.00", "2 Royalties", "3 Other income",
+    "5 Fishing boat proceeds", "6 Medical and health care payments", "PAYER'S TIN RECIPIENT'S TIN",
+]
+LETTER_TEXT = [
+    "Dear Jane,", "Thank you for choosing our moving company for your relocation to Springfield.",
+    "Your invoice for the packing materials and the two movers is attached to this letter.",
+    "Please remit payment within thirty days of receipt. We appreciate your business and hope",
+    "to help you again in the future. Kind regards, the team at Reliable Moving and Storage.",
+]
+
+
+def text_pdf(lines):
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    for i, line in enumerate(lines):
+        page.insert_text((40, 60 + 16 * i), line, fontsize=8)
+    return doc.tobytes()
+
+
+class TestDocumentClassifier:
+    """Test form type and tax-form decisions from the first page's text."""
+
+    @pytest.mark.parametrize("lines,document_type", [
+        (W2_TEXT, "W-2"), (INT_TEXT, "1099-INT"), (MISC_TEXT, "1099-MISC"),
+    ], ids=["w2", "1099_int", "1099_misc"])
+    def test_tax_forms_are_typed_confidently(self, lines, document_type):
+        """Test each supported form is recognized with high confidence, quickly."""
+        classification = classify_document(text_pdf(lines), "upload.pdf")
+
+        assert (classification.document_type, classification.is_tax_form) == (document_type, True)
+        assert classification.confidence >= 0.8
+        assert classification.elapsed_ms < 100
+
+    def test_other_documents_are_not_tax_forms(self):
+        """Test a page of ordinary text is rejected and a page without text is left undecided."""
+        letter = classify_document(text_pdf(LETTER_TEXT), "w2.pdf")
+        scan = fitz.open()
+        scan.new_page().draw_rect(fitz.Rect(40, 40, 200, 200), fill=(0.5, 0.5, 0.5))
+        image_only = classify_document(scan.tobytes(), "w2.pdf")
+
+        assert (letter.is_tax_form, letter.document_type, letter.confidence) == (False, None, 0.9)
+        assert (image_only.method, image_only.is_tax_form, image_only.confidence) == ("no_text_layer", None, 0.0)
+        assert classify_document(b"not a pdf", "w2.pdf").method == "unreadable_pdf"
+
+
+class TestClassifiedIngest:
+    """Test ingest_documents routes by the classification and skips Bedrock for non-tax uploads."""
+
+    @pytest.mark.asyncio
+    async def test_misnamed_upload_uses_the_classified_type(self, ingest_env):
+        """Test a 1099-INT named like a W-2 is processed as a 1099-INT and the decision is recorded."""
+        get_document_classifier_stats.cache_clear()
+        key = ingest_env["upload"]("tax-engagements/e1/w2_scan.pdf", text_pdf(INT_TEXT))
+
+        result = await ingest_env["ingest_module"].ingest_documents(key, "Jane", 2024, "W-2")
+
+        assert result["document_type"] == "1099-INT"
+        assert result["classification"]["document_type"] == "1099-INT"
+        assert len(ingest_env["bda"].invocations) == 1
+        assert get_document_classifier_stats().stats()["type_corrections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_non_tax_upload_skips_bedrock(self, ingest_env):
+        """Test a letter is rejected without a Bedrock Data Automation job."""
+        get_document_classifier_stats.cache_clear()
+        key = ingest_env["upload"]("tax-engagements/e1/w2.pdf", text_pdf(LETTER_TEXT))
+
+        result = await ingest_env["ingest_module"].ingest_documents(key, "Jane", 2024, "W-2")
+
+        assert (result["success"], result["retryable"]) == (False, False)
+        assert result["classification"]["is_tax_form"] is False
+        assert ingest_env["bda"].invocations == []
+        assert get_document_classifier_stats().stats()["not_tax_form"] == 1
+        get_document_classifier_stats.cache_clear()
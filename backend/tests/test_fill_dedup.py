@@ -0,0 +1,71 @@
+"""Tests for skipping fills whose inputs match the latest filled version."""
+
+import pytest
+
+from province.agents.tax.tools import form_filler
+
+
+class TestFillDedup:
+    """Test unchanged fills reuse the latest version instead of re-rendering."""
+
+    FORM_DATA = {"tax_year": "2024", "p1_field_0": "JANE", "p1_field_1": "DOE"}
+
+    def _stored_pdfs(self, aws):
+        response = aws["s3"].list_objects_v2(Bucket=aws["settings"].documents_bucket_name, Prefix="filled_forms/")
+        return [obj["Key"] for obj in response.get("Contents", [])]
+
+    def test_input_hash_ignores_key_order(self):
+        """Test the hash is stable across dict ordering and sensitive to values."""
+        a = form_filler.fill_input_hash("1040", "v1", {"a": 1, "b": "x"})
+        b = form_filler.fill_input_hash("1040", "v1", {"b": "x", "a": 1})
+        assert a == b
+        assert a != form_filler.fill_input_hash("1040", "v2", {"a": 1, "b": "x"})
+        assert a != form_filler.fill_input_hash("1040", "v1", {"a": 2, "b": "x"})
+
+    @pytest.mark.asyncio
+    async def test_identical_fill_reuses_latest_version(self, form_filler_aws, monkeypatch):
+        """Test a repeat fill returns the stored version without rendering or uploading."""
+        filler = form_filler.get_tax_form_filler()
+        first = await filler.fill_tax_form("1040", dict(self.FORM_DATA), user_id="user_1", skip_questions=True)
+
+        def fail_render(*args, **kwargs):
+            raise AssertionError("unchanged fill should not render")
+
+        monkeypatch.setattr(filler, "_fill_pdf_with_hybrid_mapping", fail_render)
+        second = await filler.fill_tax_form("1040", dict(self.FORM_DATA), user_id="user_1", skip_questions=True)
+
+        assert first["success"] and not first["unchanged"]
+        assert second["success"] and second["unchanged"]
+        assert second["versioning"]["version"] == first["versioning"]["version"]
+        assert second["versioning"]["noop_hits"] == 1
+        assert second["file_size"] == first["file_size"]
+        assert len(self._stored_pdfs(form_filler_aws)) == 1
+
+        row = form_filler_aws["versions_table"].get_item(Key={
+            "document_id": first["versioning"]["document_id"],
+            "version": first["versioning"]["version"]
+        })["Item"]
+        assert row["noop_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_changed_inputs_create_new_version(self, form_filler_aws):
+        """Test different values or a different mapping version still fill."""
+        filler = form_filler.get_tax_form_filler()
+        await filler.fill_tax_form("1040", dict(self.FORM_DATA), user_id="user_1", skip_questions=True)
+
+        changed = await filler.fill_tax_form(
+            "1040", {**self.FORM_DATA, "p1_field_1": "SMITH"}, user_id="user_1", skip_questions=True
+        )
+        assert not changed["unchanged"]
+
+        form_filler_aws["mappings_table"].put_item(Item={
+            "form_type": "F1040", "tax_year": "2024",
+            "mapping": form_filler_aws["mapping"], "mapping_version": "v2"
+        })
+        form_filler.get_mapping_cache().invalidate()
+        remapped = await filler.fill_tax_form(
+            "1040", {**self.FORM_DATA, "p1_field_1": "SMITH"}, user_id="user_1", skip_questions=True
+        )
+
+        assert not remapped["unchanged"]
+        assert len(self._stored_pdfs(form_filler_aws)) == 3
@@ -0,0 +1,108 @@
+"""Tests for multi-form return package filling."""
+
+import fitz
+import pytest
+
+from province.agents.tax.tools import form_filler
+
+
+class TestFillPackage:
+    """Test package fills render concurrently and upload as one version."""
+
+    @pytest.fixture
+    def package_aws(self, form_filler_aws):
+        """Add a Schedule C template and mapping (the 1040 layout stands in for the schedule)."""
+        aws = form_filler_aws
+        template = aws["s3"].get_object(Bucket=aws["settings"].templates_bucket_name,
+                                        Key="tax_forms/2024/f1040.pdf")["Body"].read()
+        aws["s3"].put_object(Bucket=aws["settings"].templates_bucket_name,
+                             Key="tax_forms/2024/f1040sc.pdf", Body=template)
+        aws["mappings_table"].put_item(Item={
+            "form_type": "SCHEDULE_C", "tax_year": "2024",
+            "mapping": {"page_1": {"business_name": aws["mapping"]["page_1"]["p1_field_1"]}},
+            "mapping_version": "sc-1"
+        })
+        return aws
+
+    def test_merge_pdfs_keeps_pages_and_values(self, form_filler_aws):
+        """Test merged output has every page and each form's own field values."""
+        filler = form_filler.get_tax_form_filler()
+        template = form_filler_aws["s3"].get_object(Bucket=form_filler_aws["settings"].templates_bucket_name,
+                                                    Key="tax_forms/2024/f1040.pdf")["Body"].read()
+        mapping = form_filler_aws["mapping"]
+        first = filler._fill_pdf_with_hybrid_mapping(template, {"p1_field_1": "ALPHA"}, mapping)
+        second = filler._fill_pdf_with_hybrid_mapping(template, {"p1_field_1": "BETA"}, mapping)
+
+        doc = fitz.open(stream=form_filler.merge_pdfs([first, second]), filetype="pdf")
+        values = [w.field_value for page in doc for w in page.widgets()]
+        doc.close()
+
+        assert len(values) == 2 * sum(len(section) for key, section in mapping.items() if key != "form_metadata")
+        assert "ALPHA" in values and "BETA" in values
+
+    @pytest.mark.asyncio
+    async def test_package_uploads_merged_and_individual_forms_as_one_version(self, package_aws):
+        """Test one version row covers the merged PDF and each form."""
+        filler = form_filler.get_tax_form_filler()
+
+        result = await filler.fill_tax_package(
+            ["1040", "schedule_c", "1040"], {"tax_year": "2024", "p1_field_1": "DOE", "business_name": "ACME"},
+            user_id="user_1"
+        )
+
+        assert result["success"], result.get("error")
+        assert result["form_types"] == ["1040", "SCHEDULE_C"]
+        assert result["versioning"]["document_id"] == "tax_form_user_1_PACKAGE_2024"
+        assert result["versioning"]["version"] == "v001"
+
+        bucket = package_aws["settings"].documents_bucket_name
+        keys = sorted(o["Key"] for o in package_aws["s3"].list_objects_v2(Bucket=bucket)["Contents"])
+        assert keys[:2] == ["filled_forms/user_1/package/2024/v001/1040.pdf",
+                            "filled_forms/user_1/package/2024/v001/schedule_c.pdf"]
+        assert len(keys) == 3
+
+        merged = package_aws["s3"].get_object(Bucket=bucket, Key=keys[2])["Body"].read()
+        doc = fitz.open(stream=merged, filetype="pdf")
+        values = {w.field_value for page in doc for w in page.widgets()}
+        assert doc.page_count == 4
+        doc.close()
+        assert {"DOE", "ACME"} <= values
+
+        rows = package_aws["versions_table"].scan()["Items"]
+        version_rows = [r for r in rows if r["version"].startswith("v")]
+        assert len(version_rows) == 1
+        assert set(version_rows[0]["attachments"]) == {"1040", "SCHEDULE_C"}
+
+    @pytest.mark.asyncio
+    async def test_package_fails_when_a_form_fails(self, package_aws, monkeypatch):
+        """Test a failing form fails the package without uploading anything."""
+        filler = form_filler.get_tax_form_filler()
+        original_render = filler._render_form
+
+        async def failing_render(form_type, form_data, output_profile):
+            if form_type == "SCHEDULE_C":
+                raise RuntimeError("template missing")
+            return await original_render(form_type, form_data, output_profile)
+
+        monkeypatch.setattr(filler, "_render_form", failing_render)
+        result = await filler.fill_tax_package(["1040", "SCHEDULE_C"], {"tax_year": "2024"}, user_id="user_1")
+
+        assert not result["success"]
+        assert result["failed_forms"] == {"SCHEDULE_C": "template missing"}
+        bucket = package_aws["settings"].documents_bucket_name
+        assert "Contents" not in package_aws["s3"].list_objects_v2(Bucket=bucket)
+
+    @pytest.mark.asyncio
+    async def test_agent_tool_fills_the_session_package(self, package_aws, monkeypatch):
+        """Test the agent tool fills the package from the session and records it."""
+        from province.services import tax_service
+
+        monkeypatch.setattr(tax_service, "conversation_state",
+                            {"current_session_id": "s1", "s1": {"user_id": "user_1", "filing_status": "Single"}})
+
+        answer = await tax_service.fill_package_tool(["1040", "SCHEDULE_C"], wages=85000, withholding=9000)
+
+        assert "1040, SCHEDULE_C" in answer and "v001" in answer, answer
+        filled = tax_service.conversation_state["s1"]["filled_form"]
+        assert filled["form_type"] == "PACKAGE" and filled["form_data"]["wages_line_1a"] == 85000
+        assert filled["versioning"]["document_id"] == "tax_form_user_1_PACKAGE_2024"
@@ -0,0 +1,81 @@
+"""Tests for compiled fill plans used by the hybrid-mapping form filler."""
+
+from pathlib import Path
+
+import fitz
+import pytest
+
+from province.agents.tax.tools.form_filler import (
+    TaxFormFiller,
+    compile_fill_plan,
+    flatten_hybrid_mapping,
+    get_mapping_cache,
+)
+
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "tax_form_templates" / "2024" / "f1040.pdf"
+
+
+class TestFillPlan:
+    """Test fill plan compilation and plan-driven filling."""
+
+    @pytest.fixture
+    def template_bytes(self):
+        """Blank 2024 1040 template."""
+        return TEMPLATE_PATH.read_bytes()
+
+    @pytest.fixture
+    def widget_names(self, template_bytes):
+        """First text field and first checkbox on the template."""
+        doc = fitz.open(stream=template_bytes, filetype="pdf")
+        widgets = [w for w in doc[0].widgets() if w.field_name]
+        text = next(w.field_name for w in widgets if w.field_type == 7)
+        checkbox = next(w.field_name for w in widgets if w.field_type == 2)
+        doc.close()
+        return text, checkbox
+
+    @pytest.fixture
+    def mapping(self, widget_names):
+        """Sectioned hybrid mapping covering two widgets."""
+        text, checkbox = widget_names
+        return {
+            "form_metadata": {"form_type": "F1040"},
+            "personal_info": {"taxpayer_first_name": f" {text} "},
+            "filing_status": {"single": {"pdf_field_path": checkbox}},
+        }
+
+    def test_flatten_sectioned_mapping(self, mapping, widget_names):
+        """Test sectioned mappings flatten to semantic -> path."""
+        flat = flatten_hybrid_mapping(mapping)
+        assert flat["single"] == widget_names[1]
+        assert "form_metadata" not in flat
+
+    def test_compile_fill_plan(self, template_bytes, mapping, widget_names):
+        """Test the plan keys on normalized paths and records widget types."""
+        doc = fitz.open(stream=template_bytes, filetype="pdf")
+        plan = compile_fill_plan(mapping, doc)
+        doc.close()
+
+        text, checkbox = widget_names
+        assert plan[text] == ("taxpayer_first_name", 7)
+        assert plan[checkbox] == ("single", 2)
+        assert len(plan) == 2
+
+    def test_fill_uses_cached_plan(self, template_bytes, mapping, widget_names):
+        """Test filling with a plan key compiles once and fills the widgets."""
+        filler = TaxFormFiller.__new__(TaxFormFiller)
+        plan_key = ("F1040", "2024", "test")
+        cache = get_mapping_cache()
+        cache.invalidate("F1040", "2024")
+
+        form_data = {"taxpayer_first_name": "JANE", "single": True}
+        filled = filler._fill_pdf_with_hybrid_mapping(template_bytes, form_data, mapping, plan_key=plan_key)
+        assert cache.get("F1040", "2024")["fill_plan"] is not None
+
+        doc = fitz.open(stream=filled, filetype="pdf")
+        values = {w.field_name: w.field_value for w in doc[0].widgets()}
+        doc.close()
+        text, checkbox = widget_names
+        assert values[text] == "JANE"
+        assert values[checkbox] not in ("Off", "", None)
+        cache.invalidate("F1040", "2024")
@@ -0,0 +1,93 @@
+"""Tests for batch form filling on the fill pool."""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from province.agents.tax.tools import fill_pool
+
+
+def fake_fill(form_type, form_data, user_id, skip_questions):
+    """Stand-in for a worker fill; sleeps for form_data['delay'] seconds."""
+    time.sleep(form_data.get("delay", 0))
+    if form_data.get("explode"):
+        raise RuntimeError("boom")
+    return {"success": True, "filled_form_url": f"https://example.com/{form_type}.pdf"}
+
+
+class TestFillPool:
+    """Test batch fan-out and completion-order streaming."""
+
+    @pytest.fixture
+    def executor(self, monkeypatch):
+        """Thread executor running the fake fill in place of worker processes."""
+        monkeypatch.setattr(fill_pool, "_fill_in_worker", fake_fill)
+        monkeypatch.setattr(fill_pool, "get_fill_pool", lambda: pool)
+        pool = ThreadPoolExecutor(max_workers=4)
+        yield pool
+        pool.shutdown(wait=True)
+
+    @pytest.mark.asyncio
+    async def test_results_stream_in_completion_order(self, executor):
+        """Test faster fills are yielded before slower ones."""
+        items = [
+            {"form_type": "1040", "form_data": {"delay": 0.2}},
+            {"form_type": "SCHEDULE_C", "form_data": {"delay": 0.0}},
+        ]
+
+        results = [r async for r in fill_pool.fill_forms_batch(items, executor=executor)]
+
+        assert [r["index"] for r in results] == [1, 0]
+        assert all(r["success"] for r in results)
+
+    @pytest.mark.asyncio
+    async def test_fills_run_concurrently(self, executor):
+        """Test wall-clock time tracks the slowest fill, not the sum."""
+        items = [{"form_type": "1040", "form_data": {"delay": 0.2}} for _ in range(4)]
+
+        started = time.time()
+        results = [r async for r in fill_pool.fill_forms_batch(items, executor=executor)]
+
+        assert len(results) == 4
+        assert time.time() - started < 0.6
+
+    @pytest.mark.asyncio
+    async def test_item_failure_is_reported_per_item(self, executor):
+        """Test one failing fill does not fail the batch."""
+        items = [
+            {"form_type": "1040", "form_data": {"explode": True}},
+            {"form_type": "1040", "form_data": {}},
+        ]
+
+        results = {r["index"]: r async for r in fill_pool.fill_forms_batch(items, executor=executor)}
+
+        assert results[0]["success"] is False
+        assert results[0]["error"] == "boom"
+        assert results[1]["success"] is True
+
+    def test_batch_endpoint_streams_ndjson(self, client, executor):
+        """Test the batch endpoint streams one line per item plus a summary."""
+        response = client.post("/api/v1/form-filler/fill-form/batch", json={
+            "items": [
+                {"form_type": "1040", "form_data": {}},
+                {"form_type": "1040", "form_data": {"explode": True}},
+            ]
+        })
+
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.strip().split("\n")]
+        assert len(lines) == 3
+        assert lines[-1] == {"type": "summary", "total": 2, "succeeded": 1, "failed": 1}
+
+    def test_batch_endpoint_rejects_oversized_batch(self, client, executor, monkeypatch):
+        """Test batches above the configured limit are rejected."""
+        from province.core.config import get_settings
+        monkeypatch.setattr(get_settings(), "form_fill_batch_max_items", 1)
+
+        response = client.post("/api/v1/form-filler/fill-form/batch", json={
+            "items": [{"form_data": {}}, {"form_data": {}}]
+        })
+
+        assert response.status_code == 413
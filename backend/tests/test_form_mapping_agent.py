@@ -0,0 +1,213 @@
+"""Tests for concurrent, rate-limited gap filling in FormMappingAgent."""
+
+import asyncio
+import io
+import json
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from botocore.exceptions import ClientError
+
+from province.agents import form_mapping_agent
+from province.agents.form_mapping_agent import FormMappingAgent
+from province.core.rate_limit import RateLimiter, TokenBucket, get_rate_limiter
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "tax_form_templates" / "2024" / "f1040.pdf"
+
+
+def make_fields(pages=3, per_page=40):
+    """Unmapped-looking fields spread over several pages."""
+    return [
+        {
+            'field_name': f'topmostSubform[0].Page{page}[0].f{page}_{i:02d}[0]',
+            'field_type': 'Text',
+            'page_number': page,
+            'rect': {'y0': float(i * 10)},
+            'nearby_label': None,
+        }
+        for page in range(1, pages + 1) for i in range(per_page)
+    ]
+
+
+class FakeBedrock:
+    """Answers gap prompts by mapping each listed field to its simple ref, after a random delay."""
+
+    def __init__(self, delay=0.05, throttle_first=0):
+        self.delay = delay
+        self.throttle_first = throttle_first
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def invoke_model(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            throttle = self.calls <= self.throttle_first
+        try:
+            if throttle:
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'InvokeModel')
+            time.sleep(random.uniform(0, self.delay))
+            prompt = json.loads(kwargs['body'])['messages'][0]['content']
+            self.prompts.append(prompt)
+            if prompt.startswith('You are analyzing'):
+                text = '{}'  # leave everything to gap filling
+            else:
+                names = re.findall(r'"field_name": "([^"]+)"', prompt)
+                # Every chunk reuses "line_total" so merging has to resolve the clash
+                mapping = {'fields': {re.sub(r'\W+', '_', n): n for n in names},
+                           'totals': {'line_total': names[0]}}
+                text = json.dumps(mapping)
+            return {'body': io.BytesIO(json.dumps({'content': [{'text': text}]}).encode())}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def make_agent(bedrock, rpm=6000):
+    agent = FormMappingAgent.__new__(FormMappingAgent)  # no AWS client needed
+    agent.bedrock = bedrock
+    agent.model_id = 'test-model'
+    agent.requests_per_minute = rpm
+    agent.limiter = RateLimiter(rpm)
+    return agent
+
+
+class TestTokenBucket:
+    """Test the async token bucket used for Bedrock quotas."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_refill_rate(self):
+        """Test the bucket allows its capacity at once, then paces at the refill rate."""
+        bucket = TokenBucket(rate_per_minute=600, capacity=3)  # 10 tokens/s
+
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        elapsed = time.monotonic() - start
+
+        assert 0.15 <= elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_token_quota_limits_large_requests(self):
+        """Test the TPM bucket delays a request whose estimate exceeds what is left."""
+        limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=6000)  # 100 tokens/s
+
+        start = time.monotonic()
+        await limiter.acquire(6000)
+        await limiter.acquire(20)
+        elapsed = time.monotonic() - start
+
+        assert 0.15 <= elapsed < 0.5
+
+
+class TestFormMappingAgent:
+    """Test gap chunks run concurrently and merge deterministically."""
+
+    def test_chunks_split_by_page_and_size(self):
+        """Test chunks never span pages and hold at most GAP_CHUNK_SIZE fields."""
+        agent = make_agent(FakeBedrock())
+        fields = make_fields(pages=2, per_page=40)
+        random.shuffle(fields)
+
+        chunks = agent._chunk_unmapped_fields(fields)
+
+        assert [len(c) for c in chunks] == [30, 10, 30, 10]
+        assert all(len({f['page_number'] for f in c}) == 1 for c in chunks)
+        assert [f['rect']['y0'] for f in chunks[0]] == sorted(f['rect']['y0'] for f in chunks[0])
+
+    @pytest.mark.asyncio
+    async def test_gap_chunks_run_concurrently_and_map_everything(self):
+        """Test one iteration issues all chunks at once and reaches full coverage."""
+        bedrock = FakeBedrock(delay=0.1)
+        agent = make_agent(bedrock)
+        fields = make_fields()
+
+        mapping = await agent.map_form_fields_async('F1040', '2024', fields)
+
+        assert bedrock.calls == 1 + 6  # initial mapping + 3 pages x 2 chunks
+        assert bedrock.max_active > 1
+        assert agent._extract_mapped_fields(mapping) == {f['field_name'] for f in fields}
+
+    @pytest.mark.asyncio
+    async def test_merge_is_deterministic(self):
+        """Test clashing semantic names resolve in chunk order regardless of completion order, without
+        inventing suffixed names."""
+        fields = make_fields()
+        results = []
+        for _ in range(3):
+            results.append(await make_agent(FakeBedrock(delay=0.05)).map_form_fields_async('F1040', '2024', fields))
+
+        assert results[0] == results[1] == results[2]
+        assert results[0]['totals'] == {'line_total': fields[0]['field_name']}
+
+    def test_colliding_gap_name_leaves_its_field_unmapped(self):
+        """Test a name already used for another field is dropped, not renamed to name_2."""
+        mapping = {'income': {'wages': 'f1_01'}}
+
+        FormMappingAgent._merge_gap_mapping(mapping, {'income': {'wages': 'f1_02', 'tips': 'f1_03'}})
+
+        assert mapping == {'income': {'wages': 'f1_01', 'tips': 'f1_03'}}
+
+    def test_agents_share_the_process_rate_limiter(self, monkeypatch):
+        """Test every agent for a model draws from one process-wide limiter."""
+        monkeypatch.setattr(form_mapping_agent.boto3, 'client', lambda *args, **kwargs: FakeBedrock())
+        get_rate_limiter.cache_clear()
+
+        first, second = FormMappingAgent(requests_per_minute=2), FormMappingAgent(requests_per_minute=2)
+
+        assert first.limiter is second.limiter
+        get_rate_limiter.cache_clear()
+
+    @pytest.mark.asyncio
+    async def test_throttled_requests_are_retried(self, monkeypatch):
+        """Test a ThrottlingException backs off and retries instead of failing the chunk."""
+        sleeps = []
+        real_sleep = asyncio.sleep
+
+        async def fast_sleep(seconds):
+            sleeps.append(seconds)
+            await real_sleep(0)
+
+        monkeypatch.setattr(form_mapping_agent.asyncio, 'sleep', fast_sleep)
+        bedrock = FakeBedrock(delay=0, throttle_first=1)
+
+        gaps = await make_agent(bedrock, rpm=60)._fill_gaps('F1040', make_fields(pages=1, per_page=2), {})
+
+        assert bedrock.calls == 2
+        assert sleeps[-1] == 1.0  # one request interval at 60 RPM
+        assert len(gaps['fields']) == 2
+
+    @pytest.mark.asyncio
+    async def test_premapped_fields_are_not_sent_to_model(self, processor_module):
+        """Test confidently pre-mapped 1040 fields stay out of every prompt and are reported."""
+        processor = processor_module.FormTemplateProcessor.__new__(processor_module.FormTemplateProcessor)
+        fields = processor._to_agent_fields(processor.extract_fields_from_pdf(TEMPLATE_PATH.read_bytes()))
+        bedrock = FakeBedrock(delay=0)
+
+        mapping = await make_agent(bedrock).map_form_fields_async('F1040', '2024', fields)
+
+        stats = mapping['form_metadata']['mapping_stats']
+        premapped = {name for section in ('income_page1', 'personal_info') for name in mapping[section].values()}
+        assert mapping['income_page1']['wages_line_1a'].endswith('.f1_32[0]')
+        assert not any(name in prompt for name in premapped for prompt in bedrock.prompts)
+        assert stats['premapped_fields'] >= 80
+        assert stats['premapped_fields'] + stats['model_mapped_fields'] + stats['unmapped_fields'] == len(fields)
+        assert stats['unmapped_fields'] == 0
+        assert stats['estimated_prompt_tokens_saved'] > 0
+
+    def test_sync_entry_point(self):
+        """Test the synchronous wrapper used by the template Lambda still returns the mapping."""
+        agent = make_agent(FakeBedrock(delay=0))
+
+        mapping = agent.map_form_fields('F1040', '2024', make_fields(pages=1, per_page=5))
+
+        assert mapping['form_metadata']['total_fields'] == 5
+        assert len(mapping['fields']) == 5
@@ -0,0 +1,73 @@
+"""Tests for deterministic pre-mapping of form fields."""
+
+from pathlib import Path
+
+import pytest
+
+from province.agents.form_premapper import label_similarity, premap_fields, tokenize
+
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "tax_form_templates" / "2024" / "f1040.pdf"
+
+
+@pytest.fixture(scope="module")
+def f1040_fields(processor_module):
+    """2024 1040 fields in FormMappingAgent format."""
+    processor = processor_module.FormTemplateProcessor.__new__(processor_module.FormTemplateProcessor)
+    return processor._to_agent_fields(processor.extract_fields_from_pdf(TEMPLATE_PATH.read_bytes()))
+
+
+def by_ref(result):
+    """Semantic name per short field ref, e.g. {'f1_32[0]': 'wages_line_1a'}."""
+    return {name.rsplit(".", 1)[-1]: semantic for name, semantic in result.assigned.items()}
+
+
+class TestFormPremapper:
+    """Test vocabulary matching assigns confident fields and leaves the rest."""
+
+    def test_label_similarity(self):
+        """Test exact, embedded and unrelated labels score as expected."""
+        phrase = tokenize("city town or post office")
+
+        assert label_similarity(tokenize("City, town, or post office"), phrase) == 1.0
+        assert label_similarity(tokenize("City, town, or post office. If you have a foreign address, also "
+                                         "complete spaces below."), phrase) == pytest.approx(0.9)
+        assert label_similarity(tokenize("Spouse’s social security number"),
+                                tokenize("spouse social security number")) == 1.0
+        # single-token phrases only match exactly, so "1a" inside a sentence does not count
+        assert label_similarity(tokenize("see line 1a instructions"), tokenize("1a")) < 0.8
+
+    def test_1040_assignments(self, f1040_fields):
+        """Test line and identity fields resolve locally and each name is used once."""
+        result = premap_fields("F1040", f1040_fields)
+        refs = by_ref(result)
+
+        assert len(result.assigned) >= 80
+        assert refs["f1_32[0]"] == "wages_line_1a"
+        assert refs["f1_54[0]"] == "total_income_9"
+        assert (refs["f1_05[0]"], refs["f1_08[0]"]) == ("taxpayer_last_name", "spouse_last_name")
+        assert refs["f2_22[0]"] == "total_payments"
+        assert len(set(result.assigned.values())) == len(result.assigned)
+        assert len(result.assigned) + len(result.unresolved) == len(f1040_fields)
+        assert result.mapping["income_page1"]["wages_line_1a"] == next(
+            f["field_name"] for f in f1040_fields if f["field_name"].endswith(".f1_32[0]"))
+
+    def test_unknown_refs_fall_back_to_labels_and_order(self, f1040_fields):
+        """Test a renumbered template still maps by label, pairing identical labels top to bottom."""
+        renumbered = [{**f, "field_name": f["field_name"].replace("f1_", "g1_").replace("f2_", "g2_")}
+                      for f in f1040_fields]
+
+        result = premap_fields("F1040", renumbered)
+        refs = by_ref(result)
+
+        assert refs["g1_32[0]"] == "wages_line_1a"
+        assert (refs["g1_05[0]"], refs["g1_08[0]"]) == ("taxpayer_last_name", "spouse_last_name")
+        # two fields labelled "Spouse’s occupation" and no ref to tell them apart
+        assert "g2_35[0]" not in refs and "g2_38[0]" not in refs
+
+    def test_forms_without_vocabulary_map_nothing(self, f1040_fields):
+        """Test other forms send every field to the model."""
+        result = premap_fields("SCHEDULE_C", f1040_fields)
+
+        assert result.assigned == {}
+        assert result.unresolved == f1040_fields
@@ -0,0 +1,72 @@
+"""Tests for the in-memory form preview endpoint."""
+
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+
+from province.main import create_app
+
+
+class TestFormPreview:
+    """Test previews stream rendered bytes and only persist on commit."""
+
+    FORM_DATA = {"tax_year": "2024", "p1_field_1": "PREVIEW"}
+
+    @pytest.fixture
+    def preview_client(self, form_filler_aws):
+        """Test client sharing the form filler's mocked AWS."""
+        return TestClient(create_app())
+
+    def _stored_pdfs(self, aws):
+        response = aws["s3"].list_objects_v2(Bucket=aws["settings"].documents_bucket_name)
+        return [obj["Key"] for obj in response.get("Contents", [])]
+
+    def test_preview_streams_pdf_without_uploading(self, preview_client, form_filler_aws):
+        """Test the filled PDF comes back in the response and nothing is stored."""
+        response = preview_client.post("/api/v1/form-filler/preview",
+                                       json={"form_type": "1040", "form_data": self.FORM_DATA})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.headers["x-preview-commit"] == "none"
+        doc = fitz.open(stream=response.content, filetype="pdf")
+        assert "PREVIEW" in {w.field_value for w in doc[0].widgets()}
+        doc.close()
+        assert self._stored_pdfs(form_filler_aws) == []
+
+    def test_preview_page_thumbnail(self, preview_client):
+        """Test a single page can be rasterized to PNG."""
+        response = preview_client.post("/api/v1/form-filler/preview",
+                                       json={"form_type": "1040", "form_data": self.FORM_DATA, "page": 2, "dpi": 36})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content.startswith(b"\x89PNG")
+
+    def test_preview_page_out_of_range(self, preview_client):
+        """Test asking for a page the form does not have is a client error."""
+        response = preview_client.post("/api/v1/form-filler/preview",
+                                       json={"form_type": "1040", "form_data": self.FORM_DATA, "page": 9})
+
+        assert response.status_code == 400
+
+    def test_commit_persists_rendered_preview(self, preview_client, form_filler_aws):
+        """Test commit stores the previewed form, re-saved in the stored-fill profile, after responding."""
+        response = preview_client.post("/api/v1/form-filler/preview", json={
+            "form_type": "1040", "form_data": self.FORM_DATA, "user_id": "user_1", "commit": True
+        })
+
+        assert response.headers["x-preview-commit"] == "scheduled"
+        keys = self._stored_pdfs(form_filler_aws)
+        assert len(keys) == 1 and keys[0].startswith("filled_forms/user_1/1040/2024/v001_")
+        stored = form_filler_aws["s3"].get_object(Bucket=form_filler_aws["settings"].documents_bucket_name,
+                                                  Key=keys[0])["Body"].read()
+        assert len(stored) < len(response.content)  # final, not the preview's incremental save
+        assert self._field_values(stored) == self._field_values(response.content)
+
+    @staticmethod
+    def _field_values(pdf_bytes):
+        import fitz
+
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return {widget.field_name: widget.field_value for page in doc for widget in page.widgets()}
@@ -0,0 +1,142 @@
+"""Tests for filled form version allocation and history."""
+
+import asyncio
+import threading
+
+import pytest
+
+from province.agents.tax.tools import form_filler
+from province.api.v1.form_versions import get_form_versions
+
+
+class TestFormVersions:
+    """Test atomic version numbers and table-backed version history."""
+
+    FORM_DATA = {"tax_year": "2024", "p1_field_0": "JANE"}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_allocations_are_distinct(self, form_filler_aws, monkeypatch):
+        """Test concurrent fills of one document get distinct, gapless numbers."""
+        filler = form_filler.get_tax_form_filler()
+        base_key = "filled_forms/user_1/1040/2024"
+
+        # DynamoDB applies writes to one item serially; moto's in-process handlers do not
+        item_lock = threading.Lock()
+        update_item = filler.versions_table.update_item
+
+        def serialized_update_item(**kwargs):
+            with item_lock:
+                return update_item(**kwargs)
+
+        monkeypatch.setattr(filler.versions_table, "update_item", serialized_update_item)
+
+        numbers = await asyncio.gather(*[
+            filler._allocate_version_number("tax_form_user_1_1040_2024", base_key) for _ in range(10)
+        ])
+
+        assert sorted(numbers) == list(range(1, 11))
+
+    @pytest.mark.asyncio
+    async def test_counter_is_seeded_from_legacy_s3_versions(self, form_filler_aws):
+        """Test documents versioned before the counter continue after their last S3 version."""
+        filler = form_filler.get_tax_form_filler()
+        base_key = "filled_forms/user_1/1040/2024"
+        form_filler_aws["s3"].put_object(
+            Bucket=form_filler_aws["settings"].documents_bucket_name,
+            Key=f"{base_key}/v005_1040_1700000000.pdf", Body=b"%PDF"
+        )
+
+        first = await filler._allocate_version_number("tax_form_user_1_1040_2024", base_key)
+        second = await filler._allocate_version_number("tax_form_user_1_1040_2024", base_key)
+
+        assert (first, second) == (6, 7)
+
+    @pytest.mark.asyncio
+    async def test_fills_do_not_list_s3(self, form_filler_aws, monkeypatch):
+        """Test later fills allocate from the counter without listing the S3 prefix."""
+        filler = form_filler.get_tax_form_filler()
+        await filler.fill_tax_form("1040", dict(self.FORM_DATA), user_id="user_1", skip_questions=True)
+
+        async def fail_listing(base_key):
+            raise AssertionError("S3 prefix should not be listed once the counter exists")
+
+        monkeypatch.setattr(filler, "_list_existing_versions", fail_listing)
+        results = [
+            await filler.fill_tax_form("1040", {**self.FORM_DATA, "p1_field_0": name}, user_id="user_1",
+                                       skip_questions=True)
+            for name in ("JOHN", "JILL")
+        ]
+
+        assert [r["versioning"]["version"] for r in results] == ["v002", "v003"]
+        assert results[-1]["versioning"]["previous_versions"] == ["v001", "v002"]
+
+    @pytest.mark.asyncio
+    async def test_history_comes_from_versions_table(self, form_filler_aws, monkeypatch):
+        """Test history and the versions endpoint read the table, newest `limit` rows."""
+        filler = form_filler.get_tax_form_filler()
+        for name in ("A", "B", "C"):
+            await filler.fill_tax_form("1040", {**self.FORM_DATA, "p1_field_0": name}, user_id="user_1",
+                                       skip_questions=True)
+
+        async def fail_listing(base_key):
+            raise AssertionError("history should not list S3")
+
+        monkeypatch.setattr(filler, "_list_existing_versions", fail_listing)
+        history = await filler.get_version_history("tax_form_user_1_1040_2024")
+        latest_two = await filler.get_version_history("tax_form_user_1_1040_2024", limit=2)
+        response = await get_form_versions(form_type="1040", engagement_id="eng_1", tax_year=2024,
+                                           limit=50, user_id="user_1")
+
+        assert [v["version"] for v in history] == ["v001", "v002", "v003"]
+        assert [v["version"] for v in latest_two] == ["v002", "v003"]
+        assert response.total_versions == 3
+        assert {v.version for v in response.versions} == {"v001", "v002", "v003"}
+        assert all(v.download_url for v in response.versions)
+
+    @pytest.mark.asyncio
+    async def test_latest_versions_cross_v999_to_v1000_in_order(self, form_filler_aws):
+        """Test the newest `limit` rows are the highest numbers, not the highest 'vNNN' strings."""
+        filler = form_filler.get_tax_form_filler()
+        document_id = "tax_form_user_1_1040_2024"
+        for number in (1, 998, 999, 1000, 1001):
+            form_filler_aws["versions_table"].put_item(Item={
+                "document_id": document_id, "version": f"v{number:03d}", "version_number": number,
+                "s3_key": f"filled_forms/user_1/1040/2024/v{number:03d}_1040.pdf", "size": 1
+            })
+        form_filler_aws["versions_table"].put_item(Item={
+            "document_id": document_id, "version": form_filler.LATEST_VERSION_KEY, "version_number": 1001,
+            "version_counter": 1001, "latest_version": "v1001"
+        })
+
+        latest_three = await filler.get_version_history(document_id, limit=3)
+        history = await filler.get_version_history(document_id)
+
+        assert [v["version"] for v in latest_three] == ["v999", "v1000", "v1001"]
+        assert [v["version_number"] for v in history] == [1, 998, 999, 1000, 1001]
+
+    @pytest.mark.asyncio
+    async def test_versions_endpoint_lists_s3_only_documents(self, form_filler_aws):
+        """Test a document with no version rows is listed from S3, numbered from its file names."""
+        bucket = form_filler_aws["settings"].documents_bucket_name
+        base_key = "filled_forms/user_1/1040/2024"
+        for key in (f"{base_key}/v002_1040_1700000100.pdf", f"{base_key}/v001_1040_1700000000.pdf",
+                    f"{base_key}/v001/w2.pdf", f"{base_key}/vouchers.pdf"):
+            form_filler_aws["s3"].put_object(Bucket=bucket, Key=key, Body=b"%PDF")
+
+        response = await get_form_versions(form_type="1040", engagement_id="eng_1", tax_year=2024,
+                                           limit=50, user_id="user_1")
+
+        assert [(v.version, v.version_number) for v in response.versions] == [("v001", 1), ("v002", 2)]
+        assert all(v.last_modified and v.download_url for v in response.versions)
+
+    def test_each_thread_gets_its_own_table_resource(self, form_filler_aws):
+        """Test table calls from different threads never share a boto3 resource."""
+        table = form_filler.get_tax_form_filler().versions_table
+        resolved = []
+        worker = threading.Thread(target=lambda: resolved.append(table._table()))
+        worker.start()
+        worker.join()
+
+        assert table._table() is table._table()
+        assert resolved[0] is not table._table()
+        assert resolved[0].name == table.name
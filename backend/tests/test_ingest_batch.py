@@ -0,0 +1,87 @@
+"""Tests for concurrent batch ingestion of tax documents."""
+
+import json
+import time
+
+import pytest
+
+from province.agents.tax.tools.ingest_batch import ingest_documents_batch
+
+
+class TestIngestBatch:
+    """Test bounded concurrency, progress events and the aggregated W-2 extract."""
+
+    @pytest.mark.asyncio
+    async def test_batch_runs_documents_concurrently(self, ingest_env):
+        """Test a batch takes about as long as one document, not the sum of all of them."""
+        ingest_env["bda"].latency = 0.3
+        keys = [ingest_env["upload"](f"tax-engagements/eng-1/w2_{i}.pdf", f"%PDF w2 {i}".encode()) for i in range(4)]
+
+        started = time.monotonic()
+        events = [e async for e in ingest_documents_batch(keys, "Jane", 2024, "W-2", max_concurrency=4)]
+
+        assert time.monotonic() - started < 0.9  # serially this would be 4 x 0.3s
+        assert [e["type"] for e in events].count("started") == 4
+        results = [e for e in events if e["type"] == "result"]
+        assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+        assert all(r["success"] for r in results)
+        assert events[-1]["type"] == "summary"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_is_respected(self, ingest_env):
+        """Test no more than max_concurrency documents are in flight at once."""
+        keys = [ingest_env["upload"](f"tax-engagements/eng-1/w2_{i}.pdf", f"%PDF w2 {i}".encode()) for i in range(5)]
+        in_flight = max_in_flight = 0
+
+        async for event in ingest_documents_batch(keys, "Jane", 2024, "W-2", max_concurrency=2):
+            in_flight += {"started": 1, "result": -1}.get(event["type"], 0)
+            max_in_flight = max(max_in_flight, in_flight)
+
+        assert max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_one_aggregated_extract_per_engagement(self, ingest_env):
+        """Test W-2 results are written once, combined, and failures do not stop the batch."""
+        ingest_env["engagements_table"].put_item(Item={"engagement_id": "eng-1", "user_id": "user-1"})
+        keys = [ingest_env["upload"](f"tax-engagements/eng-1/w2_{i}.pdf", f"%PDF w2 {i}".encode()) for i in range(3)]
+        keys.append("tax-engagements/eng-1/notes.txt")
+
+        events = [e async for e in ingest_documents_batch(keys, "Jane", 2024, "W-2")]
+
+        summary = events[-1]
+        assert (summary["total"], summary["succeeded"], summary["failed"]) == (4, 3, 1)
+        assert summary["total_wages"] == pytest.approx(3 * 55151.93)
+        assert summary["extract_keys"] == ["tax-engagements/eng-1/Workpapers/W2_Extracts.json"]
+        body = ingest_env["s3"].get_object(Bucket=ingest_env["settings"].documents_bucket_name,
+                                           Key=summary["extract_keys"][0])["Body"].read()
+        extract = json.loads(body)
+        assert (extract["forms_count"], len(extract["w2_forms"])) == (3, 3)
+        assert extract["source_documents"] == keys[:3]
+        assert extract["total_withholding"] == pytest.approx(3 * 16606.17)
+        row = ingest_env["documents_table"].get_item(Key={
+            "tenant_id#engagement_id": "user-1#eng-1", "doc#path": "doc#/Workpapers/W2_Extracts.json"
+        })["Item"]
+        assert row["forms_count"] == 3
+
+    def test_batch_endpoint_streams_server_sent_events(self, ingest_env, monkeypatch):
+        """Test the batch route streams progress as SSE and rejects oversized batches."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from province.api.v1 import tax
+
+        app = FastAPI()
+        app.include_router(tax.router)
+        client = TestClient(app)
+        key = ingest_env["upload"]("tax-engagements/eng-1/w2.pdf", b"%PDF w2")
+
+        response = client.post("/tax/ingest/batch", json={"s3_keys": [key], "taxpayer_name": "Jane", "tax_year": 2024})
+        event_types = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event:")]
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert event_types == ["started", "result", "summary"]
+
+        monkeypatch.setattr(ingest_env["settings"], "ingest_batch_max_items", 1)
+        too_many = client.post("/tax/ingest/batch",
+                               json={"s3_keys": [key, key], "taxpayer_name": "Jane", "tax_year": 2024})
+        assert too_many.status_code == 413
@@ -0,0 +1,63 @@
+"""Tests for reusing document extractions across uploads with identical content."""
+
+import importlib
+import json
+
+import pytest
+
+from province.agents.tax.tools.bda_results_index import get_extraction_dedup_stats
+
+# The tools package re-exports the function under the module's name
+ingest_module = importlib.import_module("province.agents.tax.tools.ingest_documents")
+
+
+class TestIngestDedup:
+    """Test identical uploads skip Bedrock Data Automation."""
+
+    @pytest.mark.asyncio
+    async def test_identical_content_reuses_extraction_across_engagements(self, ingest_env):
+        """Test a copy in another engagement is extracted once and returns nothing of the original."""
+        original = ingest_env["upload"]("tax-engagements/eng-a/acme_w2.pdf", b"%PDF same w2 bytes")
+        copy = ingest_env["upload"]("tax-engagements/eng-b/upload.pdf", b"%PDF same w2 bytes")
+
+        first = await ingest_module.ingest_documents(original, "Jane", 2024, "W-2")
+        second = await ingest_module.ingest_documents(copy, "Jane", 2024, "W-2")
+        again = await ingest_module.ingest_documents(copy, "Jane", 2024, "W-2")
+
+        assert len(ingest_env["bda"].invocations) == 1
+        assert (first["extraction_reused"], second["extraction_reused"], again["extraction_reused"]) == \
+            (False, True, True)
+        assert second["total_wages"] == first["total_wages"] == 55151.93
+        serialized = json.dumps(second, default=str)
+        assert "eng-a" not in serialized and "acme_w2" not in serialized
+        assert second["w2_extract"]["forms"][0]["pin_cites"]["1"]["file"] == "upload.pdf"
+        stats = get_extraction_dedup_stats().stats()
+        assert stats == {"lookups": 3, "key_hits": 1, "hash_hits": 1, "cross_engagement_hits": 1,
+                         "misses": 1, "hit_rate": pytest.approx(2 / 3)}
+
+    @pytest.mark.asyncio
+    async def test_different_content_is_extracted(self, ingest_env):
+        """Test uploads with different bytes each run Bedrock Data Automation."""
+        for i in range(2):
+            key = ingest_env["upload"](f"tax-engagements/eng-{i}/w2.pdf", f"%PDF w2 {i}".encode())
+            result = await ingest_module.ingest_documents(key, "Jane", 2024, "W-2")
+            assert result["extraction_reused"] is False
+
+        assert len(ingest_env["bda"].invocations) == 2
+        assert get_extraction_dedup_stats().stats()["hit_rate"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_downloaded_pdf_is_hashed_in_memory(self, ingest_env, monkeypatch):
+        """Test the content hash of an already-downloaded PDF does not fetch the upload from S3 again."""
+        def no_second_download(s3_client, bucket, key):
+            raise AssertionError(f"{key} fetched again to hash it")
+
+        monkeypatch.setattr(ingest_module, "hash_s3_object", no_second_download)
+        original = ingest_env["upload"]("tax-engagements/eng-a/w2.pdf", b"%PDF same w2 bytes")
+        copy = ingest_env["upload"]("tax-engagements/eng-b/w2.pdf", b"%PDF same w2 bytes")
+
+        await ingest_module.ingest_documents(original, "Jane", 2024, "W-2")
+        second = await ingest_module.ingest_documents(copy, "Jane", 2024, "W-2")
+
+        assert second["extraction_reused"] is True
+        assert get_extraction_dedup_stats().stats()["hash_hits"] == 1
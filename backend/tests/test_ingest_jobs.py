@@ -0,0 +1,192 @@
+"""Tests for queued ingest jobs run by the worker pool."""
+
+import asyncio
+import json
+
+import boto3
+import pytest
+
+from province.agents.tax.tools import ingest_jobs
+from province.agents.tax.tools.ingest_jobs import (
+    LocalSQS,
+    enqueue_ingest_job,
+    ensure_ingest_jobs_table,
+    get_ingest_job_stats,
+    wait_for_ingest_job
+)
+
+
+def _clear_job_singletons():
+    ingest_jobs.shutdown_ingest_workers()
+    for getter in (ingest_jobs.get_ingest_queue, ingest_jobs.get_ingest_job_store,
+                   ingest_jobs.get_ingest_job_stats, ingest_jobs.get_ingest_job_events):
+        getter.cache_clear()
+
+
+@pytest.fixture
+def job_env(ingest_env, monkeypatch):
+    """ingest_env plus the jobs table, an in-process queue and fast worker timings."""
+    settings = ingest_env["settings"]
+    for name, value in (("ingest_workers", 2), ("ingest_queue_url", ""), ("ingest_workers_in_process", True),
+                        ("ingest_queue_wait_seconds", 0.1), ("ingest_job_retry_delay_seconds", 0),
+                        ("ingest_job_max_attempts", 2)):
+        monkeypatch.setattr(settings, name, value)
+    ensure_ingest_jobs_table(boto3.resource("dynamodb", region_name="us-east-1"), settings.ingest_jobs_table_name)
+    _clear_job_singletons()
+    yield ingest_env
+    _clear_job_singletons()
+
+
+class TestIngestJobs:
+    """Test enqueueing, worker throughput, retries, dead-lettering and redelivery."""
+
+    @pytest.mark.asyncio
+    async def test_jobs_are_queued_and_run_by_the_workers(self, job_env, monkeypatch):
+        """Test enqueue returns at once and no more jobs run at a time than there are workers."""
+        bda, in_flight, peak = job_env["bda"], [0], [0]
+        bda.latency = 0.2
+        check_status = bda.get_data_automation_status
+
+        def counting_status(**kwargs):
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            try:
+                return check_status(**kwargs)
+            finally:
+                in_flight[0] -= 1
+
+        monkeypatch.setattr(bda, "get_data_automation_status", counting_status)
+        keys = [job_env["upload"](f"tax-engagements/eng-1/w2_{i}.pdf", f"%PDF w2 {i}".encode()) for i in range(4)]
+
+        jobs = [enqueue_ingest_job(key, "Jane", 2024, "W-2") for key in keys]
+        assert {job["status"] for job in jobs} == {"queued"}
+        finished = await asyncio.gather(*(wait_for_ingest_job(job["job_id"], timeout=10) for job in jobs))
+
+        assert peak[0] == 2  # ingest_workers
+        assert [job["status"] for job in finished] == ["succeeded"] * 4
+        assert finished[0]["attempts"] == 1
+        assert finished[0]["result"]["total_wages"] == 55151.93
+        assert get_ingest_job_stats().stats()["succeeded"] == 4
+
+    @pytest.mark.asyncio
+    async def test_failing_job_is_retried_then_dead_lettered(self, job_env, monkeypatch):
+        """Test a job that keeps failing is attempted ingest_job_max_attempts times and dead-lettered."""
+        def throttled(**kwargs):
+            raise RuntimeError("ThrottlingException")
+
+        monkeypatch.setattr(job_env["bda"], "invoke_data_automation_async", throttled)
+        key = job_env["upload"]("tax-engagements/eng-1/w2.pdf", b"%PDF w2")
+        job = enqueue_ingest_job(key, "Jane", 2024, "W-2")
+
+        finished = await wait_for_ingest_job(job["job_id"], timeout=10)
+
+        assert (finished["status"], finished["attempts"]) == ("dead_lettered", 2)
+        assert "ThrottlingException" in finished["last_error"]
+        sqs, _, dead_letter_queue_url = ingest_jobs.get_ingest_queue()
+        [message] = sqs.receive_message(QueueUrl=dead_letter_queue_url)["Messages"]
+        assert json.loads(message["Body"])["job_id"] == job["job_id"]
+        stats = get_ingest_job_stats().stats()
+        assert (stats["retried"], stats["dead_lettered"]) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_unsettled_messages_are_redelivered_and_finished_jobs_not_rerun(self, job_env, monkeypatch):
+        """Test a message from a worker that died comes back, and a duplicate of a finished job is dropped."""
+        monkeypatch.setattr(job_env["settings"], "ingest_workers_in_process", False)
+        key = job_env["upload"]("tax-engagements/eng-1/w2.pdf", b"%PDF w2")
+        job = enqueue_ingest_job(key, "Jane", 2024, "W-2")
+        sqs, queue_url, _ = ingest_jobs.get_ingest_queue()
+
+        sqs.receive_message(QueueUrl=queue_url, VisibilityTimeout=0.1)  # received, never deleted
+        assert sqs.receive_message(QueueUrl=queue_url, VisibilityTimeout=30) == {}
+        [redelivered] = sqs.receive_message(QueueUrl=queue_url, WaitTimeSeconds=1,
+                                            VisibilityTimeout=30)["Messages"]
+        assert redelivered["Attributes"]["ApproximateReceiveCount"] == "2"
+
+        pool = ingest_jobs.get_ingest_worker_pool()
+        assert await pool.process_message(redelivered) == "succeeded"
+        assert await pool.process_message({**redelivered, "ReceiptHandle": "stale"}) == "duplicates"
+        assert len(job_env["bda"].invocations) == 1
+        assert ingest_jobs.get_ingest_job_store().get(job["job_id"])["attempts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_lambda_enqueues_without_workers_and_the_worker_notifies(self, job_env, monkeypatch):
+        """Test the upload Lambda starts no workers, and the worker that runs the job posts to the chat."""
+        import importlib
+
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        notifications = dynamodb.create_table(
+            TableName=job_env["settings"].notifications_table,
+            KeySchema=[{"AttributeName": "engagement_id", "KeyType": "HASH"},
+                       {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "engagement_id", "AttributeType": "S"},
+                                  {"AttributeName": "timestamp", "AttributeType": "N"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        processor = importlib.import_module("province.lambda.document_processor")
+        key = job_env["upload"]("tax-engagements/eng-1/w2.pdf", b"%PDF w2")
+
+        queued = await processor.queue_document(key, "eng-1", "W-2", "w2.pdf")
+
+        assert ingest_jobs.get_ingest_worker_pool.cache_info().currsize == 0  # no worker threads in the Lambda
+        assert ingest_jobs.get_ingest_job_store().get(queued["job_id"])["engagement_id"] == "eng-1"
+        sqs, queue_url, _ = ingest_jobs.get_ingest_queue()
+        [message] = sqs.receive_message(QueueUrl=queue_url, VisibilityTimeout=30)["Messages"]
+        assert await ingest_jobs.get_ingest_worker_pool().process_message(message) == "succeeded"
+
+        items = notifications.query(KeyConditionExpression="engagement_id = :e",
+                                    ExpressionAttributeValues={":e": "eng-1"})["Items"]
+        assert [item["status"] for item in items] == ["queued", "completed"]
+        assert items[1]["message"] == "✅ w2.pdf processed successfully! Found W-2 with wages: $55,151.93"
+        assert float(items[1]["data"]["total_wages"]) == 55151.93
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_a_failing_store_and_the_message_comes_back(self, job_env, monkeypatch):
+        """Test an exception while settling a job leaves the worker running and the job is redelivered."""
+        monkeypatch.setattr(job_env["settings"], "ingest_workers", 1)
+        monkeypatch.setattr(job_env["settings"], "ingest_job_visibility_timeout_seconds", 1)
+        store = ingest_jobs.get_ingest_job_store()
+        succeed, calls = store.succeed, []
+
+        def throttled_once(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise RuntimeError("ProvisionedThroughputExceededException")
+            return succeed(*args, **kwargs)
+
+        monkeypatch.setattr(store, "succeed", throttled_once)
+        key = job_env["upload"]("tax-engagements/eng-1/w2.pdf", b"%PDF w2")
+        job = enqueue_ingest_job(key, "Jane", 2024, "W-2")
+
+        finished = await wait_for_ingest_job(job["job_id"], timeout=10, poll_interval=0.2)
+
+        assert (finished["status"], finished["attempts"]) == ("succeeded", 2)
+        assert get_ingest_job_stats().stats()["errors"] == 1
+        assert all(runner.is_alive() for runner in ingest_jobs.get_ingest_worker_pool()._runners)
+
+    def test_process_workers_need_a_real_queue(self, job_env):
+        """Test process mode is refused for the in-process queue."""
+        sqs = LocalSQS()
+        with pytest.raises(ValueError):
+            ingest_jobs.IngestWorkerPool(sqs, sqs.create_queue(QueueName="q")["QueueUrl"],
+                                         ingest_jobs.get_ingest_job_store(), 2, mode="process")
+
+    def test_job_endpoints(self, job_env):
+        """Test POST queues a job (202) and GET long-polls it to completion."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from province.api.v1 import tax
+
+        app = FastAPI()
+        app.include_router(tax.router)
+        client = TestClient(app)
+        key = job_env["upload"]("tax-engagements/eng-1/w2.pdf", b"%PDF w2")
+
+        queued = client.post("/tax/ingest/jobs", json={"s3_key": key, "taxpayer_name": "Jane", "tax_year": 2024,
+                                                       "document_type": "W-2"})
+        assert queued.status_code == 202 and queued.json()["status"] == "queued"
+
+        job = client.get(f"/tax/ingest/jobs/{queued.json()['job_id']}", params={"wait_seconds": 10}).json()
+        assert job["status"] == "succeeded" and job["result"]["forms_count"] == 1
+        assert client.get("/tax/ingest/jobs/nope").status_code == 404
+        assert client.get("/tax/ingest-stats").json()["ingest_jobs"]["queue"] == {"waiting": 0, "in_progress": 0}
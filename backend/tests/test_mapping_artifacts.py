@@ -0,0 +1,98 @@
+"""Tests for content-addressed mapping artifacts in S3."""
+
+from decimal import Decimal
+
+import pytest
+
+from province.agents.tax.tools import form_filler
+from province.core.mapping_artifacts import (
+    MappingArtifactError,
+    decode_mapping_artifact,
+    encode_mapping_artifact,
+    get_mapping_artifact,
+    put_mapping_artifact,
+)
+
+
+class TestMappingArtifacts:
+    """Test artifact encoding, pointer rows and cached reads in the filler."""
+
+    @pytest.fixture
+    def processor(self, processor_module, form_filler_aws):
+        """Processor against the mocked bucket and table."""
+        processor = processor_module.FormTemplateProcessor.__new__(processor_module.FormTemplateProcessor)
+        processor.s3_client = form_filler_aws["s3"]
+        processor.mappings_table = form_filler_aws["mappings_table"]
+        return processor
+
+    @pytest.fixture
+    def cache(self, form_filler_aws):
+        """The process-wide mapping cache, reset for the test."""
+        cache = form_filler.get_mapping_cache()
+        cache.invalidate()
+        cache.hits = cache.misses = cache.revalidations = cache.artifact_hits = 0
+        return cache
+
+    def test_round_trip(self):
+        """Test mapping, fill plan and validation survive encoding, with Decimals converted."""
+        data = encode_mapping_artifact({"income": {"wages": "f1_11", "count": Decimal("3")}},
+                                       fill_plan={"f1_11[0]": ("wages", 7)}, validation={"valid": True})
+
+        artifact = decode_mapping_artifact(data)
+
+        assert artifact["mapping"] == {"income": {"wages": "f1_11", "count": 3}}
+        assert artifact["fill_plan"] == {"f1_11[0]": ("wages", 7)}
+        assert artifact["validation"] == {"valid": True}
+        with pytest.raises(MappingArtifactError):
+            decode_mapping_artifact(b"not an artifact")
+
+    def test_same_content_same_key_and_hash_is_verified(self, form_filler_aws):
+        """Test identical mappings share one object and a tampered object is rejected."""
+        s3, bucket = form_filler_aws["s3"], form_filler_aws["settings"].templates_bucket_name
+
+        first = put_mapping_artifact(s3, bucket, form_filler_aws["mapping"])
+        second = put_mapping_artifact(s3, bucket, form_filler_aws["mapping"])
+        s3.put_object(Bucket=bucket, Key=first["key"], Body=encode_mapping_artifact({"other": {}}))
+
+        assert first == second
+        with pytest.raises(MappingArtifactError):
+            get_mapping_artifact(s3, first)
+
+    def test_pointer_row_is_small_and_filler_reads_artifact(self, processor, cache, form_filler_aws):
+        """Test save_mapping keeps the mapping out of DynamoDB and the filler uses the stored fill plan."""
+        bucket = form_filler_aws["settings"].templates_bucket_name
+        template = form_filler_aws["s3"].get_object(Bucket=bucket, Key="tax_forms/2024/f1040.pdf")["Body"].read()
+        mapping = form_filler_aws["mapping"]
+        fill_plan = processor.precompile_fill_plan(mapping, template)
+
+        processor.save_mapping("F1040", "2024", mapping, {"valid": True, "coverage": "all", "warnings": []},
+                               len(fill_plan), artifact_bucket=bucket, fill_plan=fill_plan)
+
+        item = form_filler_aws["mappings_table"].get_item(Key={"form_type": "F1040", "tax_year": "2024"})["Item"]
+        assert "mapping" not in item
+        assert item["mapping_artifact"]["bucket"] == bucket
+        assert item["metadata"]["validation"] == {"valid": True, "coverage": "all"}
+
+        filler = form_filler.get_tax_form_filler()
+        loaded, version = filler._load_hybrid_mapping("F1040", "2024")
+        assert loaded == mapping
+        assert version == item["mapping_version"]
+        assert cache.get("F1040", "2024")["fill_plan"] == fill_plan
+
+    def test_new_stamp_with_same_content_skips_download(self, processor, cache, form_filler_aws, monkeypatch):
+        """Test a re-saved identical mapping is served from the artifact cache by hash."""
+        bucket = form_filler_aws["settings"].templates_bucket_name
+        processor.save_mapping("F1040", "2024", form_filler_aws["mapping"], {"valid": True}, 1,
+                               artifact_bucket=bucket)
+        filler = form_filler.get_tax_form_filler()
+        first, first_version = filler._load_hybrid_mapping("F1040", "2024")
+
+        processor.save_mapping("F1040", "2024", form_filler_aws["mapping"], {"valid": True}, 1,
+                               artifact_bucket=bucket)
+        monkeypatch.setattr(form_filler, "get_mapping_artifact",
+                            lambda *args: pytest.fail("artifact downloaded again"))
+        second, second_version = filler._load_hybrid_mapping("F1040", "2024")
+
+        assert second is first
+        assert second_version != first_version
+        assert cache.stats()["artifact_hits"] == 1
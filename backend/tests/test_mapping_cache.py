@@ -0,0 +1,88 @@
+"""Tests for the process-wide hybrid mapping cache."""
+
+from decimal import Decimal
+
+import pytest
+
+from province.agents.tax.tools import form_filler
+
+
+class TestMappingCache:
+    """Test mapping cache hits, stamp revalidation and invalidation."""
+
+    @pytest.fixture
+    def filler(self, form_filler_aws):
+        """Filler bound to the mocked mappings table."""
+        return form_filler.get_tax_form_filler()
+
+    @pytest.fixture
+    def cache(self, form_filler_aws):
+        """The process-wide mapping cache, reset for the test."""
+        cache = form_filler.get_mapping_cache()
+        cache.invalidate()
+        cache.hits = cache.misses = cache.revalidations = 0
+        return cache
+
+    def test_second_load_is_served_from_cache(self, filler, cache):
+        """Test the mapping is read and converted once within the TTL."""
+        first, version = filler._load_hybrid_mapping("F1040", "2024")
+        second, second_version = filler._load_hybrid_mapping("F1040", 2024)
+
+        assert first is second
+        assert version == second_version == "2024-01-01T00:00:00"
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_decimals_are_converted(self, filler, cache, form_filler_aws):
+        """Test DynamoDB Decimals come back as floats."""
+        form_filler_aws["mappings_table"].put_item(Item={
+            "form_type": "SCHEDULE_C", "tax_year": "2024",
+            "mapping": {"form_metadata": {"total_fields": Decimal("12")}}
+        })
+
+        mapping, _ = filler._load_hybrid_mapping("SCHEDULE_C", "2024")
+
+        assert mapping["form_metadata"]["total_fields"] == 12.0
+        assert isinstance(mapping["form_metadata"]["total_fields"], float)
+
+    def test_stale_entry_with_same_stamp_is_revalidated(self, filler, cache):
+        """Test an expired TTL rechecks only the stamp when it is unchanged."""
+        cache.ttl_seconds = 0
+        first, _ = filler._load_hybrid_mapping("F1040", "2024")
+        second, _ = filler._load_hybrid_mapping("F1040", "2024")
+
+        assert first is second
+        assert cache.stats()["revalidations"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_new_stamp_reloads_mapping(self, filler, cache, form_filler_aws):
+        """Test a changed mapping_version forces a full reload."""
+        cache.ttl_seconds = 0
+        filler._load_hybrid_mapping("F1040", "2024")
+        form_filler_aws["mappings_table"].put_item(Item={
+            "form_type": "F1040", "tax_year": "2024",
+            "mapping": {"personal_info": {"taxpayer_first_name": "f1_01"}},
+            "mapping_version": "v2"
+        })
+
+        mapping, version = filler._load_hybrid_mapping("F1040", "2024")
+
+        assert version == "v2"
+        assert mapping == {"personal_info": {"taxpayer_first_name": "f1_01"}}
+        assert cache.stats()["misses"] == 2
+
+    def test_save_mapping_stamps_version_and_invalidates(self, filler, cache, form_filler_aws, processor_module):
+        """Test FormTemplateProcessor.save_mapping writes a new stamp and drops the local entry."""
+        filler._load_hybrid_mapping("F1040", "2024")
+        processor = processor_module.FormTemplateProcessor.__new__(processor_module.FormTemplateProcessor)
+        processor.mappings_table = form_filler_aws["mappings_table"]
+        processor.s3_client = form_filler_aws["s3"]
+
+        processor.save_mapping("F1040", "2024", {"income": {"wages": "f1_11"}}, {"valid": True}, 1,
+                               artifact_bucket=form_filler_aws["settings"].templates_bucket_name)
+
+        assert cache.get("F1040", "2024") is None
+        item = form_filler_aws["mappings_table"].get_item(Key={"form_type": "F1040", "tax_year": "2024"})["Item"]
+        mapping, version = filler._load_hybrid_mapping("F1040", "2024")
+        assert version == item["mapping_version"]
+        assert mapping == {"income": {"wages": "f1_11"}}
@@ -0,0 +1,72 @@
+"""Tests for filled PDF output profiles."""
+
+import tempfile
+from pathlib import Path
+
+import fitz
+import pytest
+
+from province.agents.tax.tools.form_filler import PDF_OUTPUT_PROFILES, TaxFormFiller
+
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "tax_form_templates" / "2024" / "f1040.pdf"
+
+
+class TestPdfOutputProfiles:
+    """Test each output profile saves a usable, correctly filled PDF."""
+
+    @pytest.fixture
+    def template_bytes(self):
+        """Blank 2024 1040 template."""
+        return TEMPLATE_PATH.read_bytes()
+
+    @pytest.fixture
+    def fill(self, template_bytes, tmp_path, monkeypatch):
+        """Fill the first text widget with a marker value using a given profile."""
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        doc = fitz.open(stream=template_bytes, filetype="pdf")
+        field = next(w.field_name for w in doc[0].widgets() if w.field_type == 7)
+        doc.close()
+        filler = TaxFormFiller.__new__(TaxFormFiller)
+
+        def run(profile):
+            return filler._fill_pdf_with_hybrid_mapping(
+                template_bytes, {"taxpayer_first_name": "MARKER"}, {"personal_info": {"taxpayer_first_name": field}},
+                output_profile=profile
+            )
+
+        run.field = field
+        return run
+
+    @pytest.mark.parametrize("profile", ["standard", "incremental", "final"])
+    def test_profile_keeps_filled_field(self, fill, profile, tmp_path):
+        """Test editable profiles keep the field with its value and leave no temp files."""
+        doc = fitz.open(stream=fill(profile), filetype="pdf")
+        values = {w.field_name: w.field_value for w in doc[0].widgets()}
+        doc.close()
+
+        assert values[fill.field] == "MARKER"
+        assert list(tmp_path.iterdir()) == []
+
+    def test_incremental_appends_to_template(self, fill, template_bytes):
+        """Test the incremental profile leaves the template bytes untouched as a prefix."""
+        output = fill("incremental")
+        assert output.startswith(template_bytes)
+        assert len(output) > len(template_bytes)
+
+    def test_final_is_smallest(self, fill):
+        """Test the archival profile compresses below the standard full rewrite."""
+        assert len(fill("final")) < len(fill("standard"))
+
+    def test_flattened_bakes_values_into_content(self, fill):
+        """Test the flattened profile has no widgets but still shows the value."""
+        doc = fitz.open(stream=fill("flattened"), filetype="pdf")
+        assert not list(doc[0].widgets())
+        assert "MARKER" in doc[0].get_text()
+        doc.close()
+
+    def test_unknown_profile_is_rejected(self, fill):
+        """Test an unknown profile fails fast."""
+        with pytest.raises(ValueError, match="Unknown PDF output profile"):
+            fill("tiny")
+        assert "tiny" not in PDF_OUTPUT_PROFILES
@@ -0,0 +1,181 @@
+"""Parity tests for the rules-driven tax engine and the calculators built on it."""
+
+import json
+import random
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+from province.agents.tax.models import FilingStatus
+from province.agents.tax.tools.tax_engine import (
+    BUNDLED_RULES_DIR,
+    FILING_STATUSES,
+    PACKAGE_STATUS_KEYS,
+    TaxEngine,
+    get_tax_engine,
+    to_cents
+)
+
+
+def reference_tax(tax_year, status, taxable_income):
+    """Walk the bundled package's brackets in Decimal, rounding once to the cent."""
+    with open(f"{BUNDLED_RULES_DIR}/US_{tax_year}_rules.json") as f:
+        brackets = json.load(f)["rules"]["tax_brackets"][PACKAGE_STATUS_KEYS[status]]
+    tax = Decimal(0)
+    for bracket in brackets:
+        low, high = Decimal(bracket["min"]), bracket["max"]
+        top = taxable_income if high is None else min(taxable_income, Decimal(high))
+        if top > low:
+            tax += (top - low) * Decimal(bracket["rate"]) / 100
+    return tax.quantize(Decimal("0.01"), ROUND_HALF_UP)
+
+
+def legacy_single_2024(taxable_income):
+    """The bracket formula calc_1040_tool used for single filers (valid up to the 24% bracket)."""
+    if taxable_income <= 11600:
+        return taxable_income * 0.10
+    if taxable_income <= 47150:
+        return 1160 + (taxable_income - 11600) * 0.12
+    if taxable_income <= 100525:
+        return 5426 + (taxable_income - 47150) * 0.22
+    return 17168.5 + (taxable_income - 100525) * 0.24
+
+
+class TestTaxEngine:
+    """Test vectorized results against a Decimal bracket walk and published amounts."""
+
+    @pytest.mark.parametrize("tax_year", [2024, 2025])
+    def test_batch_matches_decimal_reference_to_the_cent(self, tax_year):
+        """Test random incomes across every status, including bracket edges, match the Decimal walk."""
+        rng = random.Random(tax_year)
+        engine = get_tax_engine()
+        rules = engine.rules(tax_year)
+        incomes = [Decimal(rng.randrange(0, 100_000_000)) / 100 for _ in range(3000)]
+        incomes += [Decimal(int(floor)) / 100 + delta for floors in rules.bracket_floors_cents
+                    for floor in floors for delta in (Decimal("-0.01"), 0, Decimal("0.01")) if floor]
+        statuses = [rng.choice(FILING_STATUSES) for _ in incomes]
+
+        tax, _ = engine.tax_on_taxable_income(tax_year, to_cents(incomes), engine.status_indexes(statuses))
+
+        expected = [int(reference_tax(tax_year, status, income) * 100) for status, income in zip(statuses, incomes)]
+        assert tax.tolist() == expected
+
+    def test_published_amounts(self):
+        """Test amounts worked from the 2024 and 2025 rate schedules."""
+        engine = get_tax_engine()
+        single = engine.compute_return(2024, "S", 64600, 8000)
+        joint = engine.compute_return(2024, "MFJ", 129200, 8000, qualifying_children=2)
+        top = engine.compute_return(2025, "HOH", Decimal("1000000.00"))
+
+        assert (single.taxable_income, single.tax, single.refund_or_due) == (50000, 6053, 1947)
+        assert (joint.tax, joint.child_tax_credit, joint.refund_or_due) == (12106, 4000, -106)
+        assert (top.standard_deduction, top.tax, top.marginal_rate) == (23625, Decimal("316540.75"),
+                                                                        Decimal("0.37"))
+
+    def test_matches_previous_single_filer_formula(self):
+        """Test the 2024 single schedule agrees with the old calc_1040_tool brackets where they were complete."""
+        incomes = np.arange(0, 190_000_00, 7_919, dtype=np.int64)
+        tax, _ = get_tax_engine().tax_on_taxable_income(2024, incomes, 0)
+
+        expected = [round(legacy_single_2024(income / 100) * 100) for income in incomes.tolist()]
+        assert np.abs(tax - np.array(expected)).max() <= 1  # the old formula never rounded
+
+    def test_to_cents_rounds_half_up_and_rejects_bad_amounts(self):
+        """Test floats round like their Decimal repr and non-finite or huge amounts raise."""
+        assert to_cents(1.005) == 101
+        assert to_cents(0.285) == 29
+        assert to_cents([2.675, -0.125, 3]).tolist() == [268, -13, 300]
+        assert to_cents(Decimal("2.345")) == 235
+        for amount in [1e300, float("inf"), float("nan"), [1.0, float("-inf")], 10 ** 19, Decimal("NaN")]:
+            with pytest.raises(ValueError):
+                to_cents(amount)
+
+    def test_child_tax_credit_phase_out_and_limit(self):
+        """Test the credit loses $50 per $1,000 (or part) over the threshold and never exceeds the tax."""
+        results = get_tax_engine().compute_returns(2024, "S", [200000, 200000.01, 210000, 30000], 0, [1, 1, 1, 3])
+
+        assert results["child_tax_credit"].tolist() == [200000, 195000, 150000, results["tax"][3]]
+        assert results["tax_after_credits"][3] == 0
+
+    def test_single_return_matches_batch(self):
+        """Test compute_return and a 100k-return compute_returns agree."""
+        engine = get_tax_engine()
+        rng = np.random.default_rng(7)
+        agi = rng.integers(0, 900_000_00, 100_000) / 100
+        statuses = rng.choice(["single", "Married Filing Jointly", "MFS", "head_of_household", "QW"], 100_000)
+        children = rng.integers(0, 4, 100_000)
+
+        batch = engine.compute_returns(2025, statuses, agi, 12000, children)
+
+        assert batch["refund_or_due"].shape == (100_000,) and batch["tax"].dtype == np.int64
+        for i in rng.integers(0, 100_000, 50).tolist():
+            single = engine.compute_return(2025, statuses[i], agi[i], 12000, int(children[i]))
+            assert int(single.refund_or_due * 100) == batch["refund_or_due"][i]
+            assert int(single.tax * 100) == batch["tax"][i]
+
+    def test_exported_packages_override_filled_fields_only(self, tmp_path):
+        """Test an export's non-zero deductions and bracket lists replace the bundled ones; its zeros do not."""
+        (tmp_path / "US_2024_rules.json").write_text(json.dumps({
+            "metadata": {"package_id": "US_2024_v2", "tax_year": "2024",
+                         "jurisdiction": {"level": "federal", "code": "US"}},
+            "rules": {"standard_deduction": {"single": 15000, "head_of_household": 0},
+                      "tax_brackets": {"single": [{"rate": 10, "min": 0, "max": 20000},
+                                                  {"rate": 20, "min": 20000, "max": None}]}}
+        }))
+        engine = TaxEngine.from_directories(BUNDLED_RULES_DIR, str(tmp_path))
+
+        single = engine.compute_return(2024, "S", 45000)
+        head = engine.compute_return(2024, "HOH", 45000)
+
+        assert (single.standard_deduction, single.tax) == (15000, 4000)
+        assert head.standard_deduction == 21900
+        assert engine.rules(2024).package_ids == ("US_2024_bundled", "US_2024_v2")
+        with pytest.raises(ValueError):
+            engine.rules(2019)
+        with pytest.raises(ValueError):
+            engine.compute_return(2024, "married", 1000)
+
+    def test_brackets_must_tile_income(self, tmp_path):
+        """Test a package whose brackets leave a gap is refused."""
+        (tmp_path / "US_2024_rules.json").write_text(json.dumps({
+            "metadata": {"package_id": "bad", "tax_year": "2024"},
+            "rules": {"tax_brackets": {"single": [{"rate": 10, "min": 0, "max": 10000},
+                                                  {"rate": 20, "min": 12000, "max": None}]}}
+        }))
+        with pytest.raises(ValueError):
+            TaxEngine.from_directories(str(tmp_path))
+
+
+class TestCalculatorParity:
+    """Test the three 1040 calculators now give the same answers."""
+
+    @pytest.mark.asyncio
+    async def test_call_sites_agree(self):
+        """Test calc_1040, calc_1040_tool and preview-calculations compute the same 2024 return."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from province.agents.tax.tools.calc_1040 import _perform_tax_calculation
+        from province.api.v1 import form_filler
+        from province.services import tax_service
+
+        calculation = _perform_tax_calculation(Decimal("87500.00"), Decimal("9000.00"),
+                                               FilingStatus.HEAD_OF_HOUSEHOLD, 1, 2024)
+        await tax_service.calc_1040_tool("Head of Household", 87500.00, 9000.00, dependents=1)
+        tool_result = tax_service.conversation_state["default"]["tax_calculation"]
+        app = FastAPI()
+        app.include_router(form_filler.router)
+        preview = TestClient(app).post("/form-filler/preview-calculations", json={
+            "w2_extract_data": {"w2_extract": {"total_wages": 87500.00, "total_withholding": 9000.00}},
+            "taxpayer_info": {"first_name": "Jane", "last_name": "Doe", "ssn": "123-45-6789", "address": "1 Main",
+                              "city": "Springfield", "state": "IL", "zip_code": "62701",
+                              "filing_status": "head_of_household"},
+            "form_year": 2024
+        }).json()["calculations"]
+
+        assert calculation.taxable_income == tool_result["taxable_income"] == preview["taxable_income"] == 65600
+        assert calculation.tax == Decimal("7791.00")
+        assert calculation.tax - calculation.credits["child_tax_credit"] == tool_result["tax"] == 5791.00
+        assert calculation.refund_or_due == tool_result["refund_or_due"] == 3209.00
+        assert preview["tax_owed"] == 7791.00  # preview-calculations takes no dependents
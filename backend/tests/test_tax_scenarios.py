@@ -0,0 +1,98 @@
+"""Tests for what-if tax scenario sweeps."""
+
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from province.agents.tax.tools.tax_engine import TaxEngine, get_tax_engine
+from province.agents.tax.tools.tax_scenarios import evaluate_scenarios
+from province.api.v1 import tax
+from province.core.config import get_settings
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(tax.router)
+    return TestClient(app)
+
+
+class TestTaxScenarios:
+    """Test the grid matches one-at-a-time calculations and is computed in one pass."""
+
+    def test_grid_matches_individual_returns(self):
+        """Test every scenario row equals compute_return for the same inputs, in grid order."""
+        result = evaluate_scenarios(2024, "Single", 85000, 9000, 0, ["Single", "married_filing_jointly", "HOH"],
+                                    [0, 2], [0, -5000], [0, 1000])
+        columns = result["columns"]
+        engine = get_tax_engine()
+
+        assert result["count"] == len(result["scenarios"]) == 24
+        assert result["base"][columns.index("change_vs_base")] == 0
+        for row in result["scenarios"]:
+            scenario = dict(zip(columns, row))
+            expected = engine.compute_return(2024, scenario["filing_status"], scenario["wages"],
+                                             scenario["withholding"], scenario["dependents"])
+            assert Decimal(str(scenario["refund_or_due"])) == expected.refund_or_due
+            assert Decimal(str(scenario["child_tax_credit"])) == expected.child_tax_credit
+        first, last = dict(zip(columns, result["scenarios"][0])), dict(zip(columns, result["scenarios"][-1]))
+        assert (first["filing_status"], first["dependents"], first["wages"], first["withholding"]) == ("S", 0, 85000,
+                                                                                                      9000)
+        assert (last["filing_status"], last["dependents"], last["wages"], last["withholding"]) == ("HOH", 2, 80000,
+                                                                                                   10000)
+        best = dict(zip(columns, result["scenarios"][result["best"]]))
+        assert best["refund_or_due"] == max(row[columns.index("refund_or_due")] for row in result["scenarios"])
+
+    def test_hundreds_of_scenarios_take_one_engine_pass(self, monkeypatch):
+        """Test a 500-scenario grid calls compute_returns once."""
+        calls = []
+        compute_returns = TaxEngine.compute_returns
+
+        def counting(self, *args, **kwargs):
+            calls.append(len(args[1]))
+            return compute_returns(self, *args, **kwargs)
+
+        monkeypatch.setattr(TaxEngine, "compute_returns", counting)
+
+        result = evaluate_scenarios(2025, "MFJ", 120000, 15000, 1, ["S", "MFJ", "MFS", "HOH", "QW"],
+                                    list(range(10)), [delta * 1000.0 for delta in range(10)])
+
+        assert result["count"] == 500
+        assert calls == [501]  # the base return plus the grid
+
+    def test_endpoint(self, client, monkeypatch):
+        """Test the endpoint returns the table and refuses oversized grids, unknown statuses and bad amounts."""
+        monkeypatch.setattr(get_settings(), "tax_scenarios_max_count", 50)
+        body = {"tax_year": 2024, "filing_status": "Single", "wages": 85000, "withholding": 9000,
+                "filing_statuses": ["Single", "Head of Household"], "dependent_counts": [0, 1]}
+
+        response = client.post("/tax/calc/scenarios", json=body)
+        too_many = client.post("/tax/calc/scenarios", json={**body, "wage_deltas": list(range(20))})
+        unknown = client.post("/tax/calc/scenarios", json={**body, "filing_statuses": ["Married"]})
+        huge = client.post("/tax/calc/scenarios", json={**body, "wages": 1e300})
+        infinite = client.post("/tax/calc/scenarios", json={**body, "wage_deltas": ["Infinity"]})
+
+        assert response.status_code == 200
+        table = response.json()
+        assert table["count"] == 4 and table["columns"][0] == "filing_status"
+        assert [row[0] for row in table["scenarios"]] == ["S", "S", "HOH", "HOH"]
+        assert table["scenarios"][table["best"]][:2] == ["HOH", 1]
+        assert too_many.status_code == 413
+        assert unknown.status_code == 400
+        assert huge.status_code == 422 and infinite.status_code == 422
+        assert client.post("/tax/calc/scenarios", json={**body, "dependent_counts": [-1]}).status_code == 422
+        assert client.post("/tax/calc/scenarios", json={**body, "dependent_counts": [10 ** 20]}).status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_agent_tool(self):
+        """Test the agent tool answers several what-ifs in one call."""
+        from province.services.tax_service import tax_scenarios_tool
+
+        answer = await tax_scenarios_tool("Single", 85000, 9000, compare_filing_statuses=["Single", "HOH"],
+                                          compare_dependents=[0, 1])
+
+        assert "4 scenario(s)" in answer
+        assert "HOH | 1 | $85,000.00 | $9,000.00 | $5,241.00 | $3,759.00 | +5,300.00" in answer
+        assert "Best: scenario 4" in answer
@@ -0,0 +1,92 @@
+"""Tests for the form filler template cache."""
+
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from province.agents.tax.tools.form_filler import TemplateCache
+
+
+BUCKET = "test-templates-bucket"
+KEY = "tax_forms/2024/f1040.pdf"
+
+
+class TestTemplateCache:
+    """Test two-tier template caching with ETag revalidation."""
+
+    @pytest.fixture
+    def s3(self, mock_aws_credentials):
+        """Mocked S3 with a template uploaded."""
+        with mock_aws():
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket=BUCKET)
+            client.put_object(Bucket=BUCKET, Key=KEY, Body=b"%PDF-template-v1")
+            yield client
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Template cache backed by a temporary directory."""
+        return TemplateCache(cache_dir=str(tmp_path), ttl_seconds=3600, max_entries=2)
+
+    def test_first_get_is_miss_then_hit(self, s3, cache):
+        """Test a template is downloaded once and then served from memory."""
+        assert cache.get(s3, BUCKET, KEY) == b"%PDF-template-v1"
+        assert cache.get(s3, BUCKET, KEY) == b"%PDF-template-v1"
+
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+        assert stats["bytes_saved"] == len(b"%PDF-template-v1")
+
+    def test_disk_tier_survives_memory_clear(self, s3, cache):
+        """Test a fresh in-memory cache is warmed from disk."""
+        cache.get(s3, BUCKET, KEY)
+        cache.clear()
+
+        assert cache.get(s3, BUCKET, KEY) == b"%PDF-template-v1"
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_expired_entry_revalidates_with_304(self, s3, cache):
+        """Test an expired entry is revalidated without re-downloading."""
+        cache.ttl_seconds = 0
+        cache.get(s3, BUCKET, KEY)
+
+        assert cache.get(s3, BUCKET, KEY) == b"%PDF-template-v1"
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["revalidations"] == 1
+
+    def test_expired_entry_picks_up_new_template(self, s3, cache):
+        """Test a changed ETag replaces the cached template."""
+        cache.ttl_seconds = 0
+        cache.get(s3, BUCKET, KEY)
+        s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"%PDF-template-v2")
+
+        assert cache.get(s3, BUCKET, KEY) == b"%PDF-template-v2"
+        assert cache.stats()["misses"] == 2
+
+    def test_new_etag_replaces_the_superseded_file_on_disk(self, s3, cache):
+        """Test the disk tier keeps one data file per template across template updates."""
+        cache.ttl_seconds = 0
+        for version in range(1, 4):
+            s3.put_object(Bucket=BUCKET, Key=KEY, Body=f"%PDF-template-v{version}".encode())
+            cache.get(s3, BUCKET, KEY)
+
+        [data_file] = [n for n in os.listdir(cache.cache_dir) if n.endswith(".pdf")]
+        cache.clear()
+        cache.ttl_seconds = 3600
+        assert cache.get(s3, BUCKET, KEY) == b"%PDF-template-v3"
+        assert cache.stats()["hits"] == 1
+
+    def test_lru_eviction(self, s3, cache):
+        """Test the in-memory tier is bounded by max_entries."""
+        for i in range(3):
+            key = f"tax_forms/2024/form{i}.pdf"
+            s3.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+            cache.get(s3, BUCKET, key)
+
+        assert cache.stats()["entries"] == 2
+        assert len([n for n in os.listdir(cache.cache_dir) if n.endswith(".pdf")]) == 3
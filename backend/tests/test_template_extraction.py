@@ -0,0 +1,92 @@
+"""Tests for template field extraction and the label spatial index."""
+
+import random
+from pathlib import Path
+
+import fitz
+
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "tax_form_templates" / "2024" / "f1040.pdf"
+
+
+def scan_nearest(field_x, field_y, text_labels):
+    """Reference: the full scan-and-sort lookup the index replaces."""
+    candidates = []
+    for label in text_labels:
+        label_x, label_y = label["bbox"][:2]
+        if (label_y < field_y and field_y - label_y < 50) or (label_x < field_x and field_x - label_x < 100):
+            candidates.append((((label_x - field_x) ** 2 + (label_y - field_y) ** 2) ** 0.5, label["text"]))
+    candidates.sort(key=lambda c: c[0])
+    return candidates[0][1] if candidates else None
+
+
+class TestLabelIndex:
+    """Test the grid index returns exactly what the full scan did."""
+
+    def test_matches_scan_on_1040(self, processor_module):
+        """Test every widget on the 1040 resolves to the same label."""
+        doc = fitz.open(TEMPLATE_PATH)
+        for page in doc:
+            labels = []
+            for block in page.get_text("dict")["blocks"]:
+                for line in block.get("lines", []):
+                    text = "".join(span["text"] for span in line.get("spans", []))
+                    if text.strip():
+                        labels.append({"text": text.strip(), "bbox": line["bbox"]})
+            index = processor_module.LabelIndex(labels)
+            for widget in page.widgets():
+                assert index.nearest(widget.rect.x0, widget.rect.y0) == scan_nearest(widget.rect.x0, widget.rect.y0, labels)
+        doc.close()
+
+    def test_matches_scan_on_random_layouts(self, processor_module):
+        """Test random points, including far-away band matches and distance ties."""
+        rng = random.Random(7)
+        for _ in range(50):
+            labels = [
+                {"text": f"label {i}", "bbox": (rng.choice([0, 10, 20, 300]) + rng.randint(0, 600),
+                                                rng.randint(0, 800), 0, 0)}
+                for i in range(rng.randint(0, 40))
+            ]
+            index = processor_module.LabelIndex(labels)
+            for _ in range(20):
+                x, y = rng.randint(-50, 650), rng.randint(-50, 850)
+                assert index.nearest(x, y) == scan_nearest(x, y, labels)
+
+
+class TestExtractFields:
+    """Test field extraction from the template byte stream."""
+
+    def test_parallel_matches_sequential(self, processor_module, monkeypatch):
+        """Test per-page workers produce the same fields, in page order, from one reused pool."""
+        pdf_bytes = TEMPLATE_PATH.read_bytes()
+        processor = processor_module.FormTemplateProcessor.__new__(processor_module.FormTemplateProcessor)
+
+        monkeypatch.setattr(processor_module, "EXTRACT_WORKERS", 1)
+        sequential = processor.extract_fields_from_pdf(pdf_bytes)
+        for name, value in (("EXTRACT_WORKERS", 2), ("EXTRACT_PARALLEL_MIN_PAGES", 2),
+                            ("EXTRACT_PARALLEL_MIN_FIELDS", 100)):
+            monkeypatch.setattr(processor_module, name, value)
+        parallel = processor.extract_fields_from_pdf(pdf_bytes)
+        pool = processor_module.get_extract_pool()
+        again = processor.extract_fields_from_pdf(pdf_bytes)
+        worker_pids = set(pool._processes)
+        processor_module.shutdown_extract_pool()
+
+        assert parallel == again == sequential
+        assert pool._mp_context.get_start_method() == "spawn"
+        assert len(worker_pids) == 2  # the pool ran the extraction, no sequential fallback
+        assert len(sequential) == 141
+        assert [f["page"] for f in sequential] == sorted(f["page"] for f in sequential)
+        assert sum(1 for f in sequential if f["nearby_label"]) > 100
+
+    def test_small_templates_are_extracted_in_process(self, processor_module, monkeypatch):
+        """Test a template under the page/field thresholds never starts the pool, whatever the worker count."""
+        processor = processor_module.FormTemplateProcessor.__new__(processor_module.FormTemplateProcessor)
+        monkeypatch.setattr(processor_module, "EXTRACT_WORKERS", 4)
+
+        def no_pool():
+            raise AssertionError("extraction pool started for a two-page form")
+
+        monkeypatch.setattr(processor_module, "get_extract_pool", no_pool)
+
+        assert len(processor.extract_fields_from_pdf(TEMPLATE_PATH.read_bytes())) == 141
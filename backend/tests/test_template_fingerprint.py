@@ -0,0 +1,129 @@
+"""Tests for reusing form mappings across templates with the same field structure."""
+
+import copy
+
+import pytest
+
+from province.core.mapping_artifacts import get_mapping_artifact
+
+
+class FakeMappingAgent:
+    """Records remap requests and maps each changed field under a 'changed' section."""
+
+    def __init__(self):
+        self.calls = []
+
+    def remap_changed_fields(self, form_type, tax_year, fields, base_mapping, changed_field_names):
+        self.calls.append({"base_mapping": base_mapping, "changed": set(changed_field_names)})
+        mapping = copy.deepcopy(base_mapping)
+        mapping["changed"] = {f"changed_{i}": name for i, name in enumerate(sorted(changed_field_names))}
+        return mapping
+
+
+class TestStructuralFingerprint:
+    """Test fingerprint matching skips or narrows AI mapping."""
+
+    @pytest.fixture
+    def processor(self, processor_module, form_filler_aws, monkeypatch):
+        """Processor against the mocked tables, with AI generation recorded instead of called."""
+        monkeypatch.setattr(processor_module, "EXTRACT_WORKERS", 1)
+        monkeypatch.setattr(processor_module, "USE_AGENT", True)
+        processor = processor_module.FormTemplateProcessor.__new__(processor_module.FormTemplateProcessor)
+        processor.s3_client = form_filler_aws["s3"]
+        processor.mappings_table = form_filler_aws["mappings_table"]
+        processor.mapping_agent = FakeMappingAgent()
+        processor.ai_calls = []
+
+        def generate_mapping_with_ai(form_type, tax_year, fields):
+            processor.ai_calls.append((form_type, tax_year))
+            return {
+                "form_metadata": {"form_type": form_type, "tax_year": tax_year},
+                "fields": {f"field_{i}": f["field_name"] for i, f in enumerate(fields)}
+            }
+
+        monkeypatch.setattr(processor, "generate_mapping_with_ai", generate_mapping_with_ai)
+        return processor
+
+    def process(self, processor, form_filler_aws, tax_year):
+        """Upload the 2024 1040 under `tax_year` and process it."""
+        bucket = form_filler_aws["settings"].templates_bucket_name
+        body = form_filler_aws["s3"].get_object(Bucket=bucket, Key="tax_forms/2024/f1040.pdf")["Body"].read()
+        form_filler_aws["s3"].put_object(Bucket=bucket, Key=f"tax_forms/{tax_year}/f1040.pdf", Body=body)
+        return processor.process_form_template(bucket, f"tax_forms/{tax_year}/f1040.pdf")
+
+    def test_fingerprint_ignores_order_and_jitter(self, processor_module):
+        """Test the fingerprint is order-independent and stable under sub-grid position jitter."""
+        fields = [
+            {"field_name": "a", "field_type": "text", "page": 1, "position": {"x": 10.0, "y": 20.0}},
+            {"field_name": "b", "field_type": "checkbox", "page": 2, "position": {"x": 30.0, "y": 40.0}},
+        ]
+        jittered = [{**f, "position": {"x": f["position"]["x"] + 0.2, "y": f["position"]["y"] - 0.3}}
+                    for f in reversed(fields)]
+        moved = [fields[0], {**fields[1], "position": {"x": 30.0, "y": 60.0}}]
+
+        fingerprint = processor_module.structural_fingerprint(processor_module.field_signatures(fields))
+
+        assert processor_module.structural_fingerprint(processor_module.field_signatures(jittered)) == fingerprint
+        assert processor_module.structural_fingerprint(processor_module.field_signatures(moved)) != fingerprint
+
+    def test_identical_template_reuses_mapping_without_ai(self, processor, form_filler_aws):
+        """Test a later year with the same field tree copies the mapping and records the match."""
+        first = self.process(processor, form_filler_aws, "2024")
+        second = self.process(processor, form_filler_aws, "2025")
+
+        assert processor.ai_calls == [("F1040", "2024")]
+        assert first["mapping_source"]["match"] == "none"
+        assert second["mapping_source"]["match"] == "exact"
+        assert second["structural_fingerprint"] == first["structural_fingerprint"]
+
+        table = form_filler_aws["mappings_table"]
+        old = table.get_item(Key={"form_type": "F1040", "tax_year": "2024"})["Item"]
+        new = table.get_item(Key={"form_type": "F1040", "tax_year": "2025"})["Item"]
+        old_mapping = get_mapping_artifact(form_filler_aws["s3"], old["mapping_artifact"])["mapping"]
+        new_mapping = get_mapping_artifact(form_filler_aws["s3"], new["mapping_artifact"])["mapping"]
+        assert new_mapping["fields"] == old_mapping["fields"]
+        assert new_mapping["form_metadata"]["tax_year"] == "2025"
+        assert new["metadata"]["mapping_source"]["tax_year"] == "2024"
+
+    def test_small_changes_send_only_changed_fields_to_model(self, processor, processor_module, form_filler_aws):
+        """Test moved and added fields are remapped and stale entries for them dropped."""
+        self.process(processor, form_filler_aws, "2024")
+        fields = processor.extract_fields_from_pdf(
+            form_filler_aws["s3"].get_object(Bucket=form_filler_aws["settings"].templates_bucket_name,
+                                             Key="tax_forms/2024/f1040.pdf")["Body"].read()
+        )
+        changed = copy.deepcopy(fields)
+        for field in changed[:3]:
+            field["position"]["y"] += 25
+        changed.append({**changed[-1], "field_name": "topmostSubform[0].Page2[0].f2_99[0]"})
+        signatures = processor_module.field_signatures(changed)
+
+        mapping, source = processor.generate_mapping("F1040", "2025", changed, signatures,
+                                                     processor_module.structural_fingerprint(signatures))
+
+        moved_and_added = {f["field_name"] for f in changed[:3]} | {"topmostSubform[0].Page2[0].f2_99[0]"}
+        assert source["match"] == "partial"
+        assert set(source["changed_fields"]) == moved_and_added
+        assert processor.ai_calls == [("F1040", "2024")]
+        call = processor.mapping_agent.calls[0]
+        assert call["changed"] == moved_and_added
+        assert not moved_and_added & set(call["base_mapping"]["fields"].values())
+        assert set(mapping["changed"].values()) == moved_and_added
+
+    def test_large_changes_fall_back_to_full_mapping(self, processor, processor_module, form_filler_aws):
+        """Test a template differing in more than the allowed share of fields is mapped from scratch."""
+        self.process(processor, form_filler_aws, "2024")
+        fields = processor.extract_fields_from_pdf(
+            form_filler_aws["s3"].get_object(Bucket=form_filler_aws["settings"].templates_bucket_name,
+                                             Key="tax_forms/2024/f1040.pdf")["Body"].read()
+        )
+        for field in fields[:40]:
+            field["position"]["x"] += 50
+        signatures = processor_module.field_signatures(fields)
+
+        _, source = processor.generate_mapping("F1040", "2025", fields, signatures,
+                                               processor_module.structural_fingerprint(signatures))
+
+        assert source["match"] == "none"
+        assert processor.ai_calls == [("F1040", "2024"), ("F1040", "2025")]
+        assert not processor.mapping_agent.calls
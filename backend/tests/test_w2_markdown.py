@@ -0,0 +1,86 @@
+"""Tests for the single-pass W-2 markdown parser."""
+
+import time
+
+from province.agents.tax.tools.w2_markdown import parse_w2_markdown
+
+W2_PAGE = """**a Employee's social security number**\tOMB No. 1545-0008
+**123-45-6789**
+**b** Employer identification number (EIN)
+**12-3456789**
+**C** Employer's name, address, and ZIP code
+**Rocha Wells LLC**
+100 Industrial Way
+Springfield IL
+**e** Employee's first name and initial\tLast name\tSuff.
+**April**
+**Hensley**
+
+**31403 David Circles Apt. 12**
+
+West Erinfort WY
+**45881-3334**
+1 Wages, tips, other compensation\t\t\t2 Federal income tax withheld\t
+55151.93\t\t\t16606.17\t
+3 Social security wages\t\t\t4 Social security tax withheld\t
+55,151.93\t\t\t3419.42\t
+5 Medicare wages and tips\t\t\t6 Medicare tax withheld\t
+55151.93\t\t\t799.70\t
+| 15 State | Employer's state ID number | 16 State wages | 17 State income tax | 18 Local wages | 19 Local tax | 20 Locality |
+|---|---|---|---|---|---|---|
+| DC | 786-41-049 | 28287.2 | 1608.75 | 44590.6 | 6842.08 | Rocha Wells |
+| VA | 112-33-001 | 26864.73 | 1200.00 | | | |
+"""
+
+
+class TestW2MarkdownParser:
+    """Test boxes, identifiers, names and multi-page/multi-form files."""
+
+    def test_parses_every_field_of_a_page(self):
+        """Test boxes, state rows, IDs, names and the employee address are read in one pass."""
+        [form] = parse_w2_markdown([W2_PAGE], "w2.pdf")
+
+        assert form["boxes"] == {
+            "1": 55151.93, "2": 16606.17, "3": 55151.93, "4": 3419.42, "5": 55151.93, "6": 799.70,
+            "15": "DC", "16": 28287.2, "17": 1608.75, "18": 44590.6, "19": 6842.08, "20": "Rocha Wells",
+            "15_a": "VA", "16_a": 26864.73, "17_a": 1200.0
+        }
+        assert form["employer"] == {"EIN": "12-3456789", "name": "Rocha Wells LLC"}
+        assert form["employee"] == {
+            "SSN": "123-45-6789", "name": "April Hensley",
+            "address": "31403 David Circles Apt. 12, West Erinfort, WY 45881-3334",
+            "street": "31403 David Circles", "apt_no": "12", "city": "West Erinfort", "state": "WY",
+            "zip": "45881-3334"
+        }
+        assert form["pin_cites"]["2"] == {"file": "w2.pdf", "page": 1, "bbox": [0, 0, 0, 0],
+                                          "confidence": 0.9, "source": "bedrock_standard_output"}
+
+    def test_copies_collapse_and_distinct_w2s_are_kept(self):
+        """Test a repeated copy on another page is dropped and a second W-2 in the file is its own form."""
+        other = W2_PAGE.replace("12-3456789", "98-7654321").replace("55151.93\t\t\t16606.17", "1200.00\t\t\t80.00")
+
+        forms = parse_w2_markdown([W2_PAGE, W2_PAGE + "\n" + other, None], "w2.pdf")
+
+        assert [f["employer"]["EIN"] for f in forms] == ["12-3456789", "98-7654321"]
+        assert forms[1]["boxes"]["1"] == 1200.0
+        assert forms[1]["pin_cites"]["1"]["page"] == 2
+
+    def test_single_bold_full_name_and_plain_street(self):
+        """Test '**First Last**' names and unbolded streets."""
+        page = ("**e** Employee's first name and initial\n**Taylor Cox**\n613 Roger Crest Apt. 802\n"
+                "Leeton IA\n**26442-8249**\n")
+
+        [form] = parse_w2_markdown([page], "w2.pdf")
+
+        assert form["employee"]["name"] == "Taylor Cox"
+        assert (form["employee"]["street"], form["employee"]["apt_no"], form["employee"]["zip"]) == \
+            ("613 Roger Crest", "802", "26442-8249")
+
+    def test_noisy_input_stays_linear(self):
+        """Test long OCR noise full of partial labels parses quickly."""
+        noise = ("1 Wages, tips, other compensation 2 Federal " * 20000) + "\n" + ("**b** " * 50000)
+
+        started = time.perf_counter()
+        parse_w2_markdown([noise] * 3, "w2.pdf")
+
+        assert time.perf_counter() - started < 2
@@ -0,0 +1,112 @@
+"""Tests for the local W-2 text layer fast path."""
+
+import fitz
+import pytest
+
+from province.agents.tax.tools.w2_text_layer import extract_w2_text_layer, get_text_layer_stats
+
+VALUES = {"SSN": "123-45-6789", "EIN": "12-3456789", "employer": "Acme Payroll Inc", "employee": "Jane Doe",
+          "1": "55,151.93", "2": "16606.17", "3": "55151.93", "4": "3419.42", "5": "55151.93", "6": "799.70"}
+
+
+def w2_pdf(copies=2, overrides_by_copy=None, inline=False):
+    """A payroll-style W-2 page with `copies` stacked copies; overrides_by_copy maps copy index -> values."""
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    if inline:
+        for i, (label, key) in enumerate([("Employer identification number", "EIN"),
+                                          ("Employee's social security number", "SSN"),
+                                          ("Wages, tips, other comp.", "1"),
+                                          ("Federal income tax withheld", "2")]):
+            page.insert_text((40, 60 + 20 * i), label, fontsize=8)
+            page.insert_text((220, 60 + 20 * i), VALUES[key], fontsize=9)
+        return doc.tobytes()
+
+    for copy in range(copies):
+        values = {**VALUES, **(overrides_by_copy or {}).get(copy, {})}
+        y = 40 + 360 * copy
+        cells = [
+            ((40, y + 10), "a Employee's social security number", (44, y + 28), values["SSN"]),
+            ((40, y + 50), "b Employer identification number (EIN)", (44, y + 68), values["EIN"]),
+            ((40, y + 90), "c Employer's name, address, and ZIP code", (44, y + 108), values["employer"]),
+            ((40, y + 170), "e Employee's first name and initial", (44, y + 188), values["employee"]),
+            ((340, y + 10), "1 Wages, tips, other compensation", (344, y + 28), values["1"]),
+            ((470, y + 10), "2 Federal income tax withheld", (474, y + 28), values["2"]),
+            ((340, y + 50), "3 Social security wages", (344, y + 68), values["3"]),
+            ((470, y + 50), "4 Social security tax withheld", (474, y + 68), values["4"]),
+            ((340, y + 90), "5 Medicare wages and tips", (344, y + 108), values["5"]),
+            ((470, y + 90), "6 Medicare tax withheld", (474, y + 108), values["6"]),
+        ]
+        for label_at, label, value_at, value in cells:
+            page.insert_text(label_at, label, fontsize=6)
+            page.insert_text(value_at, value, fontsize=9)
+        page.insert_text((44, y + 120), "100 Main St, Springfield IL 62701", fontsize=9)
+    return doc.tobytes()
+
+
+class TestW2TextLayer:
+    """Test reading W-2 boxes from PDF text and declining anything uncertain."""
+
+    def test_digital_w2_is_read_locally(self):
+        """Test every box, the EIN/SSN and the names are read, with bboxes, from agreeing copies."""
+        extraction = extract_w2_text_layer(w2_pdf(), "tax-engagements/e1/w2.pdf")
+
+        assert extraction.hit and extraction.layout == "irs_w2"
+        assert len(extraction.forms) == 1
+        form = extraction.forms[0]
+        assert form["boxes"] == {"1": 55151.93, "2": 16606.17, "3": 55151.93, "4": 3419.42,
+                                 "5": 55151.93, "6": 799.70}
+        assert form["employer"] == {"EIN": "12-3456789", "name": "Acme Payroll Inc"}
+        assert form["employee"] == {"SSN": "123-45-6789", "name": "Jane Doe"}
+        assert form["pin_cites"]["1"]["confidence"] == 0.99
+        assert form["pin_cites"]["1"]["source"] == "pdf_text_layer"
+        assert form["pin_cites"]["1"]["bbox"][0] == pytest.approx(344, abs=1)
+        assert extraction.elapsed_ms < 500
+
+    def test_inline_payroll_layout(self):
+        """Test summaries that print values beside their labels use the inline layout."""
+        extraction = extract_w2_text_layer(w2_pdf(inline=True), "w2.pdf")
+
+        assert (extraction.hit, extraction.layout) == (True, "payroll_inline")
+        assert extraction.forms[0]["boxes"] == {"1": 55151.93, "2": 16606.17}
+
+    @pytest.mark.parametrize("pdf,reason", [
+        (w2_pdf(overrides_by_copy={0: {"SSN": "XXX-XX-6789"}, 1: {"SSN": "XXX-XX-6789"}}), "low_confidence:SSN"),
+        (w2_pdf(overrides_by_copy={1: {"1": "51,151.93"}}), "low_confidence:1"),
+        (b"not a pdf", "unreadable_pdf"),
+    ], ids=["masked_ssn", "copies_disagree", "not_a_pdf"])
+    def test_uncertain_documents_fall_back(self, pdf, reason):
+        """Test masked SSNs, disagreeing copies and unreadable files are left to Bedrock."""
+        extraction = extract_w2_text_layer(pdf, "w2.pdf")
+
+        assert not extraction.hit
+        assert extraction.miss_reason == reason
+
+    def test_scans_without_text_fall_back(self):
+        """Test an image-only PDF is recognised as having no text layer."""
+        doc = fitz.open()
+        doc.new_page().draw_rect(fitz.Rect(40, 40, 200, 200), fill=(0.5, 0.5, 0.5))
+
+        assert extract_w2_text_layer(doc.tobytes(), "scan.pdf").miss_reason == "no_text_layer"
+
+
+class TestIngestFastPath:
+    """Test ingest_documents uses the text layer before Bedrock Data Automation."""
+
+    @pytest.mark.asyncio
+    async def test_text_layer_hit_skips_bedrock(self, ingest_env):
+        """Test a digital W-2 is ingested without a BDA job and the path is recorded."""
+        get_text_layer_stats.cache_clear()
+        digital = ingest_env["upload"]("tax-engagements/e1/payroll_w2.pdf", w2_pdf())
+        scanned = ingest_env["upload"]("tax-engagements/e1/scan.pdf", b"%PDF scanned bytes")
+
+        fast = await ingest_env["ingest_module"].ingest_documents(digital, "Jane Doe", 2024, "W-2")
+        slow = await ingest_env["ingest_module"].ingest_documents(scanned, "Jane Doe", 2024, "W-2")
+
+        assert (fast["processing_method"], slow["processing_method"]) == ("pdf_text_layer", "bedrock_data_automation")
+        assert ingest_env["bda"].invocations == [f"s3://{ingest_env['settings'].documents_bucket_name}/{scanned}"]
+        assert fast["total_wages"] == 55151.93 and fast["validation_results"]["is_valid"]
+        stats = get_text_layer_stats().stats()
+        assert (stats["attempts"], stats["hits"], stats["misses"], stats["hit_rate"]) == \
+            (2, 1, {"unreadable_pdf": 1}, 0.5)
+        get_text_layer_stats.cache_clear()